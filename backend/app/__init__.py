@@ -92,6 +92,10 @@ def create_app(config_name=None):
     from .api.user import bp as user_bp  
     from .api.intern import bp as intern_bp  
     from .api.statutory_holiday import bp as statutory_holiday_bp
+    from .api.holiday import bp as holiday_bp
+    from .api.media import bp as media_bp
+    from .api.chunked_upload import bp as chunked_upload_bp
+    from .api.audit import bp as audit_bp
     from app.routes.leave import leave_bp
     from app.routes.overtime import overtime_bp
     
@@ -105,9 +109,46 @@ def create_app(config_name=None):
     app.register_blueprint(user_bp)
     app.register_blueprint(intern_bp)
     app.register_blueprint(statutory_holiday_bp)
+    app.register_blueprint(holiday_bp)
+    app.register_blueprint(media_bp)
+    app.register_blueprint(chunked_upload_bp)
+    app.register_blueprint(audit_bp)
     app.register_blueprint(leave_bp, url_prefix='/api')
     app.register_blueprint(overtime_bp, url_prefix='/api')
     
+    # 薪资增量重算：跟踪影响工资的变更
+    from .services.payroll_recalc_service import PayrollRecalcService
+    PayrollRecalcService.init_app(app)
+    # 个税累计预扣：工资记录发放时更新年度累计状态
+    from .services.tax_service import TaxService
+    TaxService.init_app(app)
+    # 请假/加班/假期申请区间索引：相关变更提交后失效
+    from .services.absence_index_service import AbsenceIndexService
+    AbsenceIndexService.init_app(app)
+    # 团队考勤日历：相关变更提交后清除对应月份的缓存
+    from .services.team_calendar_service import TeamCalendarService
+    TeamCalendarService.init_app(app)
+    # 打卡地理围栏：打卡地点变更提交后重建索引
+    from .services.geofence_service import GeofenceService
+    GeofenceService.init_app(app)
+    # 组织统计：员工、部门、职位变更提交后失效
+    from .services.org_stats_service import OrgStatsService
+    OrgStatsService.init_app(app)
+    # 数据变更捕获：提交时写入变更事件并异步通知订阅者
+    from .services.change_capture_service import ChangeCaptureService
+    ChangeCaptureService.init_app(app)
+    # 审计日志：提交后缓冲在内存中，后台批量写入
+    from .services.audit_service import AuditService
+    AuditService.init_app(app)
+    # 参考数据接口的条件响应缓存：相关表变更提交后失效
+    from .utils.http_cache import ResponseCache
+    ResponseCache.init_app(app)
+    # 响应序列化和压缩：orjson 编码 JSON，按 Accept-Encoding 压缩较大的响应
+    from .utils.json_provider import OrjsonProvider
+    from .utils.compression import Compression
+    OrjsonProvider.init_app(app)
+    Compression.init_app(app)
+    
     # 配置日志
     if not app.debug and not app.testing:
         if not os.path.exists('logs'):
@@ -146,9 +187,13 @@ def create_app(config_name=None):
             'msg': '服务器内部错误'
         }), 500
     
-    # 初始化默认数据
-    with app.app_context():
-        from .utils.init_data import init_default_attendance_rule
-        init_default_attendance_rule()
+    # 注册命令行工具（默认数据初始化不再在每次启动时执行）
+    register_commands(app)
     
     return app
+
+def register_commands(app):
+    """注册 flask 命令行命令"""
+    from .commands import bench, maintenance
+    for command in maintenance.COMMANDS + bench.COMMANDS:
+        app.cli.add_command(command)
@@ -2,9 +2,10 @@ from flask import Blueprint
 
 bp = Blueprint('api', __name__)
 
-from app.api import auth, employee, upload, dashboard, department, position, intern  # 导入所有API模块
-
 def init_app(app):
+    # 在注册时再导入各API模块，避免导入 app.api 子模块时连带加载全部蓝图
+    from app.api import auth, employee, upload, dashboard, department, position, intern  # 导入所有API模块
+
     app.register_blueprint(auth.bp)
     app.register_blueprint(employee.bp)
     app.register_blueprint(upload.bp)
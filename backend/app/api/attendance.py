@@ -2,11 +2,20 @@ from flask import Blueprint, request, jsonify
 from app.models.attendance import Attendance, Leave, Overtime, AttendanceRule
 from app.models.statutory_holiday import StatutoryHoliday
 from app.models.employee import Employee
-from app.models.user import User
 from app.models.attendance_location import AttendanceLocation
 from app import db
-from datetime import datetime, timedelta, time
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import calendar
+from datetime import date, datetime, timedelta, time
+from flask_jwt_extended import jwt_required
+from app.utils.auth import get_current_principal
+from app.utils.interval_index import range_condition
+from app.services.absence_index_service import AbsenceIndexService
+from app.services.geofence_service import GeofenceService
+from app.services.leave_duration_service import LeaveDurationService
+from app.services.team_calendar_service import TeamCalendarService
+from app.utils.http_cache import cached_response
+from app.utils.export_stream import export_format, stream_rows
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('attendance', __name__, url_prefix='/api')
 
@@ -31,7 +40,12 @@ def get_attendance_records():
         if status:
             query = query.filter_by(status=status)
             
-        records = query.order_by(Attendance.date.desc()).all()
+        query = query.options(joinedload(Attendance.employee)).order_by(Attendance.date.desc())
+        # 流式导出：?format=ndjson|csv
+        fmt = export_format()
+        if fmt:
+            return stream_rows(query, lambda record: record.to_dict(), fmt, 'attendance')
+        records = query.all()
         return jsonify({
             'code': 200,
             'data': [record.to_dict() for record in records],
@@ -102,7 +116,11 @@ def get_attendance_status(check_time, rule):
 
 @bp.route('/attendance', methods=['POST'])
 def create_attendance_record():
-    """创建考勤记录"""
+    """创建考勤记录
+    
+    可选字段 latitude、longitude：提供打卡坐标时必须位于某个启用的打卡地点范围内，
+    匹配到的地点ID记录到考勤记录的 location_id
+    """
     try:
         data = request.get_json()
         
@@ -123,6 +141,16 @@ def create_attendance_record():
                 'msg': '员工不存在'
             })
             
+        # 提供了打卡坐标时校验是否在打卡地点范围内
+        try:
+            point = GeofenceService.parse_point(data)
+            matched = GeofenceService.validate(*point) if point else None
+        except ValueError as e:
+            return jsonify({
+                'code': 400,
+                'msg': str(e)
+            })
+            
         # 检查是否已有当天考勤记录
         date = datetime.strptime(data['date'], '%Y-%m-%d')
         existing_record = Attendance.query.filter_by(
@@ -152,6 +180,8 @@ def create_attendance_record():
                 # 更新考勤状态
                 if existing_record.check_in:
                     existing_record.status = get_attendance_status(existing_record.check_out, rule)
+            if matched:
+                existing_record.location_id = matched.location_id
             db.session.commit()
             return jsonify({
                 'code': 200,
@@ -179,7 +209,8 @@ def create_attendance_record():
                 check_in=check_in_time,
                 check_out=check_out_time,
                 status=status,
-                remark=data.get('remark')
+                remark=data.get('remark'),
+                location_id=matched.location_id if matched else None
             )
             
             db.session.add(record)
@@ -407,8 +438,7 @@ def get_leave_records():
     """
     try:
         # 获取当前用户
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         if not current_user:
             return jsonify({
                 'code': 401,
@@ -425,26 +455,35 @@ def get_leave_records():
         
         # 权限控制：普通员工只能查看自己的请假记录
         if current_user.role != 'admin':
-            if not current_user.employee:  # 使用新的关系
+            if not current_user.employee_id:  # 使用新的关系
                 return jsonify({
                     'code': 404,
                     'msg': '未找到员工信息'
                 })
-            query = query.filter_by(employee_id=current_user.employee.id)
+            query = query.filter_by(employee_id=current_user.employee_id)
         elif employee_id:  # 管理员可以按员工ID筛选
             query = query.filter_by(employee_id=employee_id)
             
-        # 日期范围筛选
-        if start_date:
-            query = query.filter(Leave.start_date >= datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date:
-            query = query.filter(Leave.end_date <= datetime.strptime(end_date, '%Y-%m-%d'))
+        # 日期范围筛选：range_mode=within（默认）只返回完全落在范围内的记录，overlap 返回与范围有重叠的记录
+        range_mode = request.args.get('range_mode', 'within')
+        range_start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        range_end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+        if range_end and range_mode == 'overlap':
+            range_end = datetime.combine(range_end.date(), time.max)
+        condition = range_condition(Leave.start_date, Leave.end_date, range_start, range_end, range_mode)
+        if condition is not None:
+            query = query.filter(condition)
             
         # 状态筛选
         if status:
             query = query.filter_by(status=status)
             
-        records = query.order_by(Leave.created_at.desc()).all()
+        query = query.options(joinedload(Leave.employee), joinedload(Leave.approver)).order_by(Leave.created_at.desc())
+        # 流式导出：?format=ndjson|csv
+        fmt = export_format()
+        if fmt:
+            return stream_rows(query, lambda record: record.to_dict(), fmt, 'leave')
+        records = query.all()
         return jsonify({
             'code': 200,
             'data': [record.to_dict() for record in records],
@@ -470,10 +509,9 @@ def create_leave_request():
     """
     try:
         # 获取当前用户
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         
-        if not current_user or not current_user.employee:  # 使用新的关系
+        if not current_user or not current_user.employee_id:  # 使用新的关系
             return jsonify({
                 'code': 404,
                 'msg': '未找到员工信息'
@@ -519,13 +557,22 @@ def create_leave_request():
                 
         # 创建请假记录
         leave = Leave(
-            employee_id=current_user.employee.id,
+            employee_id=current_user.employee_id,
             leave_type=data['leave_type'],
             start_date=start_date,
             end_date=end_date,
             reason=data.get('reason', '')
         )
         
+        # 按工作日历计算请假天数和工时，并检查是否与已有请假重叠
+        try:
+            LeaveDurationService.apply_to_leave(leave)
+        except ValueError as e:
+            return jsonify({
+                'code': 400,
+                'msg': str(e)
+            })
+        
         db.session.add(leave)
         db.session.commit()
         
@@ -551,8 +598,7 @@ def approve_leave_request(id):
     """
     try:
         # 获取当前用户
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         
         if not current_user or current_user.role != 'admin':
             return jsonify({
@@ -577,7 +623,7 @@ def approve_leave_request(id):
             
         # 更新请假记录
         leave.status = status
-        leave.approved_by = current_user_id
+        leave.approved_by = current_user.id
         leave.updated_at = datetime.utcnow()
         
         db.session.commit()
@@ -605,8 +651,7 @@ def get_overtime_records():
     管理员可以查看所有人的加班记录
     """
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         
         # 获取查询参数
         employee_id = request.args.get('employee_id', type=int)
@@ -619,24 +664,36 @@ def get_overtime_records():
         
         # 权限控制：普通员工只能查看自己的记录
         if not current_user.is_admin:
-            if not current_user.employee:
+            if not current_user.employee_id:
                 return jsonify({
                     'code': 404,
                     'msg': '未找到员工信息'
                 })
-            query = query.filter_by(employee_id=current_user.employee.id)
+            query = query.filter_by(employee_id=current_user.employee_id)
         elif employee_id:  # 管理员可以按员工ID筛选
             query = query.filter_by(employee_id=employee_id)
             
+        # 日期范围筛选：range_mode=within（默认）只返回完全落在范围内的记录，overlap 返回与范围有重叠的记录
+        range_mode = request.args.get('range_mode', 'within')
+        range_start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        range_end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+        if range_end and range_mode == 'overlap':
+            range_end = datetime.combine(range_end.date(), time.max)
+        condition = range_condition(Overtime.start_time, Overtime.end_time, range_start, range_end, range_mode)
+        if condition is not None:
+            query = query.filter(condition)
         # 应用其他过滤条件
-        if start_date:
-            query = query.filter(Overtime.start_time >= datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date:
-            query = query.filter(Overtime.end_time <= datetime.strptime(end_date, '%Y-%m-%d'))
         if status:
             query = query.filter_by(status=status)
             
-        records = query.order_by(Overtime.created_at.desc()).all()
+        query = query.options(
+            joinedload(Overtime.employee), joinedload(Overtime.approver)
+        ).order_by(Overtime.created_at.desc())
+        # 流式导出：?format=ndjson|csv
+        fmt = export_format()
+        if fmt:
+            return stream_rows(query, lambda record: record.to_dict(), fmt, 'overtime')
+        records = query.all()
         return jsonify({
             'code': 200,
             'data': [record.to_dict() for record in records],
@@ -657,10 +714,9 @@ def create_overtime_request():
     可选字段：reason
     """
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         
-        if not current_user or not current_user.employee:
+        if not current_user or not current_user.employee_id:
             return jsonify({
                 'code': 404,
                 'msg': '未找到员工信息'
@@ -679,13 +735,22 @@ def create_overtime_request():
                 
         # 创建加班记录
         overtime = Overtime(
-            employee_id=current_user.employee.id,
+            employee_id=current_user.employee_id,
             start_time=datetime.strptime(data['start_time'], '%Y-%m-%d %H:%M:%S'),
             end_time=datetime.strptime(data['end_time'], '%Y-%m-%d %H:%M:%S'),
             reason=data.get('reason', ''),
             status='pending'
         )
         
+        # 检查是否与已有请假、加班、假期申请冲突
+        try:
+            AbsenceIndexService.check_conflicts(overtime.employee_id, overtime.start_time, overtime.end_time)
+        except ValueError as e:
+            return jsonify({
+                'code': 400,
+                'msg': str(e)
+            })
+        
         db.session.add(overtime)
         db.session.commit()
         
@@ -709,8 +774,7 @@ def approve_overtime_request(id):
     只有管理员可以审批加班申请
     """
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         
         # 验证权限
         if not current_user.is_admin:
@@ -735,7 +799,7 @@ def approve_overtime_request(id):
             })
             
         overtime.status = status
-        overtime.approved_by = current_user_id
+        overtime.approved_by = current_user.id
         db.session.commit()
         
         return jsonify({
@@ -753,6 +817,7 @@ def approve_overtime_request(id):
 # 考勤规则相关API
 @bp.route('/attendance/rules', methods=['GET'])
 @jwt_required()
+@cached_response('attendance_rules', 'departments', daily=True)
 def get_attendance_rules():
     """获取考勤规则列表
     
@@ -986,8 +1051,7 @@ def get_attendance_locations():
     """
     try:
         # 获取当前用户
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_principal()
         if not current_user:
             return jsonify({
                 'code': 401,
@@ -1007,3 +1071,215 @@ def get_attendance_locations():
             'code': 500,
             'msg': f'获取打卡地点列表失败: {str(e)}'
         })
+
+@bp.route('/attendance/absences', methods=['GET'])
+@jwt_required()
+def get_absences():
+    """查询日期范围内不在岗（请假/假期申请）的员工
+    
+    查询参数：
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)，默认与开始日期相同
+        department_id: 部门ID（可选）
+        include_overtime: 是否同时返回加班区间（可选，默认否）
+        status: 只返回指定状态（可选，默认待审批和已批准）
+        
+    管理员可以查询全部员工；普通员工只能查询本人所在部门及其下级部门，默认为本人所在部门
+    """
+    try:
+        current_user = get_current_principal()
+        if not current_user:
+            return jsonify({
+                'code': 401,
+                'msg': '用户未登录'
+            })
+            
+        try:
+            start_date = datetime.strptime(request.args.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = request.args.get('end_date')
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start_date
+        except ValueError:
+            return jsonify({
+                'code': 400,
+                'msg': '日期格式错误，请使用YYYY-MM-DD'
+            })
+        if start_date > end_date:
+            return jsonify({
+                'code': 400,
+                'msg': '开始日期不能晚于结束日期'
+            })
+            
+        employee_ids = None
+        department_id = request.args.get('department_id', type=int)
+        if not current_user.is_admin:
+            own_department_id = db.session.query(Employee.department_id).filter(
+                Employee.id == current_user.employee_id
+            ).scalar() if current_user.employee_id else None
+            if not own_department_id:
+                return jsonify({
+                    'code': 404,
+                    'msg': '未找到员工信息'
+                })
+            department_id = department_id or own_department_id
+            if department_id not in TeamCalendarService.department_subtree(own_department_id):
+                return jsonify({
+                    'code': 403,
+                    'msg': '没有权限查看该部门的不在岗记录'
+                })
+            department_ids = TeamCalendarService.department_subtree(department_id)
+            employee_ids = [row.id for row in db.session.query(Employee.id).filter(Employee.department_id.in_(department_ids))]
+        elif department_id:
+            employee_ids = [row.id for row in db.session.query(Employee.id).filter(Employee.department_id == department_id)]
+            
+        kinds = ('leave', 'holiday', 'overtime') if request.args.get('include_overtime') in ('1', 'true') else ('leave', 'holiday')
+        status = request.args.get('status')
+        absences = AbsenceIndexService.who_is_out(
+            start_date, end_date, employee_ids, kinds,
+            statuses=(status,) if status else ('pending', 'approved')
+        )
+        
+        names = dict(db.session.query(Employee.id, Employee.name).filter(
+            Employee.id.in_({absence.employee_id for absence in absences})
+        )) if absences else {}
+        data = []
+        for absence in absences:
+            item = absence.to_dict()
+            item['employee_name'] = names.get(absence.employee_id)
+            data.append(item)
+        
+        return jsonify({
+            'code': 200,
+            'data': data,
+            'msg': '获取不在岗记录成功'
+        })
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'获取不在岗记录失败: {str(e)}'
+        })
+
+@bp.route('/attendance/calendar', methods=['GET'])
+@jwt_required()
+def get_team_calendar():
+    """获取部门（含下级部门）的团队考勤日历
+    
+    查询参数：
+        department_id: 部门ID，普通员工默认为本人所在部门
+        start_date: 开始日期 (YYYY-MM-DD)，默认本月1日
+        end_date: 结束日期 (YYYY-MM-DD)，默认开始日期所在月的最后一天，最多跨越3个月
+        
+    返回每天的请假、假期申请、加班、缺勤、迟到和不在岗人数，以及每位员工的区间
+    普通员工只能查看本人所在部门及其下级部门的日历
+    """
+    try:
+        current_user = get_current_principal()
+        if not current_user:
+            return jsonify({
+                'code': 401,
+                'msg': '用户未登录'
+            })
+            
+        department_id = request.args.get('department_id', type=int)
+        own_department_id = None
+        if current_user.employee_id:
+            own_department_id = db.session.query(Employee.department_id).filter(
+                Employee.id == current_user.employee_id
+            ).scalar()
+        department_id = department_id or own_department_id
+        if not department_id:
+            return jsonify({
+                'code': 400,
+                'msg': '缺少部门ID'
+            })
+            
+        try:
+            start_date = request.args.get('start_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else date.today().replace(day=1)
+            end_date = request.args.get('end_date')
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            else:
+                end_date = start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
+        except ValueError:
+            return jsonify({
+                'code': 400,
+                'msg': '日期格式错误，请使用YYYY-MM-DD'
+            })
+            
+        try:
+            if not current_user.is_admin and (
+                not own_department_id or department_id not in TeamCalendarService.department_subtree(own_department_id)
+            ):
+                return jsonify({
+                    'code': 403,
+                    'msg': '没有权限查看该部门的日历'
+                })
+            data = TeamCalendarService.get_calendar(department_id, start_date, end_date)
+        except ValueError as e:
+            return jsonify({
+                'code': 400,
+                'msg': str(e)
+            })
+            
+        return jsonify({
+            'code': 200,
+            'data': data,
+            'msg': '获取团队日历成功'
+        })
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'获取团队日历失败: {str(e)}'
+        })
+
+@bp.route('/attendance/geofence/validate', methods=['POST'])
+@jwt_required()
+def validate_geofence():
+    """批量校验打卡坐标是否在打卡地点范围内
+    
+    请求体：
+        {'punches': [{'latitude': 纬度, 'longitude': 经度}, ...]}，单次最多 5000 个
+        
+    返回：
+        与输入顺序一致的结果列表，每项为 {'matched': 是否在范围内, 'location_id', 'distance'(米)}
+    """
+    try:
+        punches = (request.get_json(silent=True) or {}).get('punches')
+        if not isinstance(punches, list) or not punches:
+            return jsonify({
+                'code': 400,
+                'msg': '缺少打卡坐标列表'
+            })
+        if len(punches) > 5000:
+            return jsonify({
+                'code': 400,
+                'msg': '单次最多校验5000个坐标'
+            })
+            
+        try:
+            points = []
+            for punch in punches:
+                point = GeofenceService.parse_point(punch if isinstance(punch, dict) else {})
+                if point is None:
+                    raise ValueError('缺少经纬度')
+                points.append(point)
+        except ValueError as e:
+            return jsonify({
+                'code': 400,
+                'msg': str(e)
+            })
+            
+        results = GeofenceService.validate_many(points)
+        return jsonify({
+            'code': 200,
+            'data': [
+                dict(matched.to_dict(), matched=True) if matched else {'matched': False, 'location_id': None, 'distance': None}
+                for matched in results
+            ],
+            'msg': '校验完成'
+        })
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'校验打卡坐标失败: {str(e)}'
+        })
@@ -0,0 +1,59 @@
+"""
+审计日志API接口
+"""
+
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from app.services.audit_service import AuditService
+from app.utils.auth import admin_required
+
+bp = Blueprint('audit', __name__, url_prefix='/api/audit')
+
+def _parse_time(value):
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'时间格式错误: {value}')
+
+@bp.route('/logs', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_audit_logs():
+    """按实体和时间范围查询审计日志"""
+    try:
+        entity = request.args.get('entity')
+        entity_id = request.args.get('entity_id')
+        if entity_id and not entity:
+            return jsonify({'code': 400, 'msg': '按实体ID查询时必须指定 entity'}), 400
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+        pagination = AuditService.query(
+            entity, entity_id, start, end,
+            page=request.args.get('page', 1, type=int),
+            per_page=min(request.args.get('per_page', 50, type=int), 500)
+        )
+        return jsonify({
+            'code': 200,
+            'msg': '获取审计日志成功',
+            'data': {
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'current_page': pagination.page,
+                'per_page': pagination.per_page,
+                'items': [log.to_dict() for log in pagination.items]
+            }
+        })
+
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"获取审计日志失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'获取审计日志失败: {str(e)}'
+        }), 500
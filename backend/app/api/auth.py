@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from app.services.auth_service import AuthService
+from app.services.password_service import PasswordBusyError
+from app.services.identity_service import IdentityService
 from app.models import User
 
 # 创建认证蓝图
@@ -187,6 +189,13 @@ def login():
                 'user': result['user']
             }
         })
+    except PasswordBusyError as e:
+        # 密码校验排队已满时返回 503，客户端可稍后重试
+        return jsonify({
+            'code': 503,
+            'message': str(e),
+            'data': None
+        }), 503
     except Exception as e:
         print(f"登录错误: {str(e)}")
         return jsonify({
@@ -200,7 +209,14 @@ def login():
 def refresh():
     """刷新访问令牌"""
     current_user_id = get_jwt_identity()
-    access_token = create_access_token(identity=current_user_id)
+    principal = IdentityService.get_principal(current_user_id)
+    if not principal or not principal.is_active:
+        return jsonify({
+            "code": 401,
+            "message": "用户不存在或已被禁用",
+            "data": None
+        }), 401
+    access_token = create_access_token(identity=current_user_id, additional_claims=principal.claims())
     return jsonify({
         "code": 200,
         "message": "令牌刷新成功",
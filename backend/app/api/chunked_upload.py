@@ -0,0 +1,86 @@
+"""
+分片上传API
+大文件（如扫描版合同）按分片上传，网络中断后可查询进度从断点继续
+
+协议：
+    POST   /api/uploads                      创建上传会话
+    GET    /api/uploads/<upload_id>          查询已接收的字节数
+    PUT    /api/uploads/<upload_id>?offset=N 写入分片（请求体为分片二进制内容）
+    POST   /api/uploads/<upload_id>/finalize 校验 SHA-256 并完成上传
+    DELETE /api/uploads/<upload_id>          取消上传
+"""
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from app import db
+from app.services.upload_service import UploadService
+
+bp = Blueprint('chunked_upload', __name__, url_prefix='/api/uploads')
+
+@bp.route('', methods=['POST'])
+@jwt_required()
+def create_upload():
+    """创建上传会话"""
+    try:
+        data = request.get_json() or {}
+        session = UploadService.create_session(data)
+        result = session.to_dict()
+        result['chunk_size'] = current_app.config['CHUNKED_UPLOAD_CHUNK_SIZE']
+        return jsonify({'code': 200, 'msg': '创建成功', 'data': result})
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'创建上传会话失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': f'创建上传会话失败: {str(e)}'}), 500
+
+@bp.route('/<string:upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """查询上传进度，客户端据此从 received_size 处续传"""
+    try:
+        session = UploadService.get_session(upload_id)
+        return jsonify({'code': 200, 'msg': '获取成功', 'data': session.to_dict()})
+    except ValueError as e:
+        return jsonify({'code': 404, 'msg': str(e)}), 404
+
+@bp.route('/<string:upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_chunk(upload_id):
+    """写入分片，偏移量通过 offset 查询参数或 Upload-Offset 请求头传递"""
+    try:
+        offset = request.args.get('offset', request.headers.get('Upload-Offset'))
+        if offset is None:
+            return jsonify({'code': 400, 'msg': '缺少偏移量'}), 400
+        session = UploadService.write_chunk(upload_id, int(offset), request.stream)
+        return jsonify({'code': 200, 'msg': '上传成功', 'data': session.to_dict()})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'写入分片失败: upload_id={upload_id}, error={str(e)}')
+        return jsonify({'code': 500, 'msg': f'写入分片失败: {str(e)}'}), 500
+
+@bp.route('/<string:upload_id>/finalize', methods=['POST'])
+@jwt_required()
+def finalize_upload(upload_id):
+    """校验并完成上传"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = UploadService.finalize(upload_id, data.get('checksum'))
+        return jsonify({'code': 200, 'msg': '上传完成', 'data': result})
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f'完成上传失败: upload_id={upload_id}, error={str(e)}')
+        return jsonify({'code': 500, 'msg': f'完成上传失败: {str(e)}'}), 500
+
+@bp.route('/<string:upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(upload_id):
+    """取消上传"""
+    try:
+        UploadService.abort(upload_id)
+        return jsonify({'code': 200, 'msg': '已取消'})
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
@@ -1,22 +1,20 @@
-from flask import jsonify, current_app
+from flask import jsonify, current_app, request
 from flask import Blueprint
+from sqlalchemy.orm import joinedload
 from app.models.employee import Employee
-from app.models.department import Department
-from app.models.position import Position
-from app import db
+from app.services.org_stats_service import OrgStatsService
 
 bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
 @bp.route('/stats', methods=['GET'])
 def get_dashboard_stats():
     try:
-        # 获取各种统计数据
-        total_employees = Employee.query.count()
-        total_departments = Department.query.count()
-        total_positions = Position.query.count()
-        
+        stats = OrgStatsService.get_stats(refresh=request.args.get('refresh') == '1')
+
         # 获取最近添加的员工
-        recent_employees = Employee.query.order_by(Employee.created_at.desc()).limit(5).all()
+        recent_employees = Employee.query.options(
+            joinedload(Employee.department), joinedload(Employee.position)
+        ).order_by(Employee.created_at.desc()).limit(5).all()
         recent_employees_data = [{
             'id': emp.id,
             'name': emp.name,
@@ -25,26 +23,18 @@ def get_dashboard_stats():
             'created_at': emp.created_at.strftime('%Y-%m-%d %H:%M:%S')
         } for emp in recent_employees]
 
-        # 部门员工数量统计
-        department_stats = db.session.query(
-            Department.name,
-            db.func.count(Employee.id).label('count')
-        ).outerjoin(Employee, Department.id == Employee.department_id)\
-         .group_by(Department.id, Department.name).all()
-        
-        department_stats_data = [{
-            'name': dept[0],
-            'count': dept[1]
-        } for dept in department_stats]
-
         return jsonify({
             'overview': {
-                'total_employees': total_employees,
-                'total_departments': total_departments,
-                'total_positions': total_positions
+                'total_employees': stats['totals']['employees'],
+                'total_departments': stats['totals']['departments'],
+                'total_positions': stats['totals']['positions']
             },
             'recent_employees': recent_employees_data,
-            'department_stats': department_stats_data
+            'department_stats': [{'name': item['name'], 'count': item['value']} for item in stats['departments']],
+            'position_stats': [{'name': item['name'], 'count': item['value']} for item in stats['positions']],
+            'status_stats': OrgStatsService.status_counts(stats),
+            'type_stats': OrgStatsService.type_counts(stats),
+            'education_stats': stats['education']
         })
 
     except Exception as e:
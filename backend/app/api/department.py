@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app.models.department import Department
 from app import db
+from app.utils.http_cache import cached_response
 
 bp = Blueprint('department', __name__, url_prefix='/api')
 
 @bp.route('/departments', methods=['GET'])
+@cached_response('departments', 'employees')
 def get_departments():
     """获取部门列表"""
     try:
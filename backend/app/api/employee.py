@@ -4,15 +4,15 @@ from werkzeug.utils import secure_filename
 from app.models.employee import Employee, EducationHistory, WorkHistory, PositionChangeHistory, ContractAttachment
 from app.models.department import Department
 from app.models.position import Position
+from app.services.media_service import MediaService
+from app.services.contract_preview_service import ContractPreviewService, contract_file_path
+from app.services.org_stats_service import OrgStatsService
 from app import db
 import uuid
 from sqlalchemy.orm import joinedload
 from sqlalchemy import or_, func, text
 from datetime import datetime
-import pandas as pd
 from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
 from flask_cors import CORS
 import mimetypes
 
@@ -106,22 +106,13 @@ def upload_photo(employee_id):
             current_app.logger.error(f'Employee not found: {employee_id}')
             return jsonify({'code': 404, 'msg': '员工不存在'}), 404
         
-        # 生成安全的文件名
-        original_filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{employee.employee_id}_{timestamp}.{original_filename.rsplit('.', 1)[1].lower()}"
-        
-        # 确保上传目录存在
-        photos_folder = os.path.join(current_app.config['BASE_DIR'], 'static', 'uploads', 'photos')
-        os.makedirs(photos_folder, exist_ok=True)
-        
-        # 保存文件
-        file_path = os.path.join(photos_folder, filename)
-        file.save(file_path)
+        # 按内容哈希保存照片并生成缩略图
+        media = MediaService.store_image(file)
         
         # 更新员工照片URL
-        photo_url = f'/static/uploads/photos/{filename}'
+        photo_url = media.url
         employee.photo_url = photo_url
+        employee.photo_hash = media.content_hash
         db.session.commit()
         
         current_app.logger.info(f'Successfully uploaded photo for employee {employee_id}: {photo_url}')
@@ -130,7 +121,8 @@ def upload_photo(employee_id):
             'code': 200,
             'msg': '上传成功',
             'data': {
-                'photo_url': photo_url
+                'photo_url': photo_url,
+                'photo_thumbnails': employee.to_dict()['photo_thumbnails']
             }
         })
         
@@ -192,6 +184,9 @@ def upload_contract(employee_id):
             db.session.add(contract)
             db.session.commit()
             
+            # 后台生成预览图
+            ContractPreviewService.schedule(contract)
+            
             print(f"Contract saved successfully: {contract.to_dict()}")
             
             return jsonify({
@@ -235,8 +230,8 @@ def preview_contract(filename):
         if not contract:
             return jsonify({'code': 404, 'msg': '文件不存在'}), 404
         
-        file_path = os.path.join(CONTRACTS_FOLDER, f"{contract.employee_id}_{contract.upload_time.strftime('%Y%m%d_%H%M%S')}_{filename}")
-        if not os.path.exists(file_path):
+        file_path = contract_file_path(contract)
+        if not file_path or not os.path.exists(file_path):
             return jsonify({'code': 404, 'msg': '文件不存在'}), 404
         
         # 获取文件的MIME类型
@@ -248,7 +243,8 @@ def preview_contract(filename):
             file_path,
             mimetype=mime_type,
             as_attachment=False,
-            download_name=filename
+            download_name=filename,
+            conditional=True
         )
     
     except Exception as e:
@@ -264,8 +260,8 @@ def download_contract(filename):
         if not contract:
             return jsonify({'code': 404, 'msg': '文件不存在'}), 404
         
-        file_path = os.path.join(CONTRACTS_FOLDER, f"{contract.employee_id}_{contract.upload_time.strftime('%Y%m%d_%H%M%S')}_{filename}")
-        if not os.path.exists(file_path):
+        file_path = contract_file_path(contract)
+        if not file_path or not os.path.exists(file_path):
             return jsonify({'code': 404, 'msg': '文件不存在'}), 404
         
         # 获取文件的MIME类型
@@ -277,13 +273,64 @@ def download_contract(filename):
             file_path,
             mimetype=mime_type,
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            conditional=True
         )
     
     except Exception as e:
         print(f"Error downloading contract: {str(e)}")
         return jsonify({'code': 500, 'msg': '下载文件失败'}), 500
 
+def send_contract_preview(contract_id, getter):
+    """返回已缓存的预览图片，尚未生成时返回 202 让前端稍后重试"""
+    contract = ContractAttachment.query.get(contract_id)
+    if not contract:
+        return jsonify({'code': 404, 'msg': '文件不存在'}), 404
+    if not ContractPreviewService.is_supported(contract):
+        return jsonify({'code': 400, 'msg': '该文件类型不支持预览'}), 400
+
+    path = getter(contract)
+    if path is None:
+        return jsonify({'code': 202, 'msg': '预览生成中，请稍后重试'}), 202
+
+    return send_file(path, mimetype='image/png', conditional=True, max_age=86400)
+
+@bp.route('/contracts/<int:contract_id>/thumbnail', methods=['GET'])
+def get_contract_thumbnail(contract_id):
+    """获取合同首页缩略图"""
+    try:
+        return send_contract_preview(contract_id, ContractPreviewService.get_thumbnail)
+    except Exception as e:
+        current_app.logger.error(f'获取合同缩略图失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '获取缩略图失败'}), 500
+
+@bp.route('/contracts/<int:contract_id>/pages/<int:page>', methods=['GET'])
+def get_contract_page(contract_id, page):
+    """获取合同指定页的预览图片（页码从1开始）"""
+    if page < 1:
+        return jsonify({'code': 400, 'msg': '无效的页码'}), 400
+    try:
+        return send_contract_preview(contract_id, lambda contract: ContractPreviewService.get_page(contract, page))
+    except ValueError as e:
+        return jsonify({'code': 404, 'msg': str(e)}), 404
+    except Exception as e:
+        current_app.logger.error(f'获取合同预览页失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '获取预览页失败'}), 500
+
+@bp.route('/contracts/<int:contract_id>/preview-info', methods=['GET'])
+def get_contract_preview_info(contract_id):
+    """获取合同预览信息（页数、生成状态）"""
+    try:
+        contract = ContractAttachment.query.get(contract_id)
+        if not contract:
+            return jsonify({'code': 404, 'msg': '文件不存在'}), 404
+        if not ContractPreviewService.is_supported(contract):
+            return jsonify({'code': 200, 'msg': '获取成功', 'data': {'status': 'unsupported', 'page_count': None}})
+        return jsonify({'code': 200, 'msg': '获取成功', 'data': ContractPreviewService.get_info(contract)})
+    except Exception as e:
+        current_app.logger.error(f'获取合同预览信息失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '获取预览信息失败'}), 500
+
 @bp.route('', methods=['GET'])
 def get_employees():
     """获取员工列表，支持搜索和分页"""
@@ -726,6 +773,10 @@ def add_position_change(employee_id):
 @bp.route('/export', methods=['GET'])
 def export_employees():
     """导出员工信息"""
+    # openpyxl 体积较大，仅在导出时加载，避免拖慢应用启动
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
     try:
         # 获取状态参数
         status = request.args.get('status', 'active')
@@ -816,6 +867,9 @@ def export_employees():
 @bp.route('/import', methods=['POST'])
 def import_employees():
     """导入员工数据"""
+    # pandas 导入耗时较长，仅在导入时加载
+    import pandas as pd
+
     try:
         current_app.logger.info('开始处理员工导入请求')
         
@@ -993,6 +1047,9 @@ def import_employees():
 @bp.route('/import-template', methods=['GET'])
 def get_import_template():
     """获取员工导入模板"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill
+
     try:
         # 创建工作簿
         wb = Workbook()
@@ -1061,45 +1118,13 @@ def get_import_template():
 def get_employee_stats():
     """获取员工统计信息"""
     try:
-        # 获取员工状态统计
-        status_stats = db.session.query(
-            Employee.employment_status,
-            db.func.count(Employee.id)
-        ).group_by(Employee.employment_status).all()
-        
-        # 获取员工类型统计
-        type_stats = db.session.query(
-            Employee.employee_type,
-            db.func.count(Employee.id)
-        ).group_by(Employee.employee_type).all()
-        
-        # 格式化状态统计结果
-        status_count = {
-            'active': 0,
-            'suspended': 0,
-            'resigned': 0,
-            'total': 0
-        }
-        for status, count in status_stats:
-            if status in status_count:
-                status_count[status] = count
-                status_count['total'] += count
-                
-        # 格式化类型统计结果
-        type_count = {
-            'intern': 0,
-            'probation': 0,
-            'regular': 0
-        }
-        for emp_type, count in type_stats:
-            if emp_type in type_count:
-                type_count[emp_type] = count
-        
+        stats = OrgStatsService.get_stats()
+
         return jsonify({
             'code': 200,
             'data': {
-                'status': status_count,
-                'type': type_count
+                'status': OrgStatsService.status_counts(stats),
+                'type': OrgStatsService.type_counts(stats)
             },
             'msg': '获取员工统计信息成功'
         })
@@ -2,20 +2,25 @@
 假期管理相关API
 """
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from datetime import datetime, date
-from sqlalchemy import and_, or_
-from app.models.holiday import HolidayType, HolidayRequest, HolidayBalance
+from app.models.holiday import HolidayType, HolidayRequest, HolidayBalance, HolidayAccrualRun
 from app.models.employee import Employee
-from app.models.user import User
 from app import db
-from app.utils.validators import validate_date_range
-from app.utils.auth import admin_required
+from app.utils.auth import admin_required, get_current_principal
+from app.utils.interval_index import range_condition
+from app.services.absence_index_service import AbsenceIndexService
+from app.services.leave_duration_service import LeaveDurationService
+from app.services.holiday_accrual_service import HolidayAccrualService
+from app.utils.http_cache import cached_response
+from app.utils.export_stream import export_format, stream_rows
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('holiday', __name__, url_prefix='/api/holiday')
 
 @bp.route('/types', methods=['GET'])
 @jwt_required()
+@cached_response('holiday_types')
 def get_holiday_types():
     """获取假期类型列表
     
@@ -47,7 +52,7 @@ def get_holiday_types():
 
 @bp.route('/types', methods=['POST'])
 @jwt_required()
-@admin_required
+@admin_required()
 def create_holiday_type():
     """创建假期类型
     
@@ -61,6 +66,7 @@ def create_holiday_type():
             'annual_quota': 年度配额,
             'min_duration': 最小请假时长,
             'max_duration': 最大请假时长,
+            'max_carry_over': 可结转到下一年的最大天数,
             'requires_proof': 是否需要证明材料,
             'description': 描述
         }
@@ -89,6 +95,7 @@ def create_holiday_type():
             annual_quota=data.get('annual_quota'),
             min_duration=data.get('min_duration'),
             max_duration=data.get('max_duration'),
+            max_carry_over=data.get('max_carry_over'),
             requires_proof=data.get('requires_proof', False),
             description=data.get('description')
         )
@@ -108,7 +115,7 @@ def create_holiday_type():
 
 @bp.route('/types/<int:type_id>', methods=['PUT'])
 @jwt_required()
-@admin_required
+@admin_required()
 def update_holiday_type(type_id):
     """更新假期类型
     
@@ -121,6 +128,7 @@ def update_holiday_type(type_id):
             'annual_quota': 年度配额,
             'min_duration': 最小请假时长,
             'max_duration': 最大请假时长,
+            'max_carry_over': 可结转到下一年的最大天数,
             'requires_proof': 是否需要证明材料,
             'description': 描述,
             'is_active': 是否启用
@@ -146,6 +154,8 @@ def update_holiday_type(type_id):
             holiday_type.min_duration = data['min_duration']
         if 'max_duration' in data:
             holiday_type.max_duration = data['max_duration']
+        if 'max_carry_over' in data:
+            holiday_type.max_carry_over = data['max_carry_over']
         if 'requires_proof' in data:
             holiday_type.requires_proof = data['requires_proof']
         if 'description' in data:
@@ -175,6 +185,7 @@ def get_holiday_requests():
         - status: 状态（可选）
         - start_date: 开始日期 (YYYY-MM-DD)（可选）
         - end_date: 结束日期 (YYYY-MM-DD)（可选）
+        - range_mode: overlap-与日期范围有重叠（默认），within-完全落在日期范围内（可选）
         
     权限：
         - 普通用户只能查看自己的假期申请
@@ -186,7 +197,7 @@ def get_holiday_requests():
     """
     try:
         # 获取当前用户
-        current_user = User.query.get(get_jwt_identity())
+        current_user = get_current_principal()
         if not current_user:
             return jsonify({'code': 401, 'msg': '用户未登录'}), 401
         
@@ -195,7 +206,7 @@ def get_holiday_requests():
         
         # 如果不是管理员，只能查看自己的假期申请
         if not current_user.is_admin:
-            query = query.filter_by(employee_id=current_user.employee.id)
+            query = query.filter_by(employee_id=current_user.employee_id)
         else:
             # 管理员可以按员工ID筛选
             employee_id = request.args.get('employee_id', type=int)
@@ -207,26 +218,36 @@ def get_holiday_requests():
         if status:
             query = query.filter_by(status=status)
         
-        # 按日期范围筛选
+        # 按日期范围筛选：默认返回与范围有重叠的申请（包括跨越整个范围的申请），range_mode=within 只返回完全落在范围内的申请
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        if start_date and end_date:
+        if start_date or end_date:
             try:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                query = query.filter(
-                    or_(
-                        and_(HolidayRequest.start_date >= start_date,
-                             HolidayRequest.start_date <= end_date),
-                        and_(HolidayRequest.end_date >= start_date,
-                             HolidayRequest.end_date <= end_date)
-                    )
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+                condition = range_condition(
+                    HolidayRequest.start_date, HolidayRequest.end_date,
+                    start_date, end_date, request.args.get('range_mode', 'overlap')
                 )
             except ValueError:
-                return jsonify({'code': 400, 'msg': '日期格式错误'}), 400
+                return jsonify({'code': 400, 'msg': '日期格式或范围过滤方式错误'}), 400
+            query = query.filter(condition)
+        
+        query = query.options(
+            joinedload(HolidayRequest.employee).joinedload(Employee.department),
+            joinedload(HolidayRequest.employee).joinedload(Employee.position),
+            joinedload(HolidayRequest.employee).joinedload(Employee.user_account),
+            joinedload(HolidayRequest.holiday_type),
+            joinedload(HolidayRequest.approver)
+        ).order_by(HolidayRequest.created_at.desc())
+        
+        # 流式导出：?format=ndjson|csv
+        fmt = export_format()
+        if fmt:
+            return stream_rows(query, lambda hr: hr.to_dict(), fmt, 'holiday_requests')
         
         # 获取结果
-        holiday_requests = query.order_by(HolidayRequest.created_at.desc()).all()
+        holiday_requests = query.all()
         
         return jsonify({
             'code': 200,
@@ -247,7 +268,8 @@ def create_holiday_request():
             'holiday_type_id': 假期类型ID,
             'start_date': 开始日期 (YYYY-MM-DD),
             'end_date': 结束日期 (YYYY-MM-DD),
-            'duration': 请假天数,
+            'start_period': 开始日时段 full/pm（可选，pm 表示下午开始）,
+            'end_period': 结束日时段 full/am（可选，am 表示上午结束）,
             'reason': 请假原因,
             'proof_url': 证明材料URL（可选）
         }
@@ -255,17 +277,19 @@ def create_holiday_request():
     返回：
         - 成功: {'code': 200, 'data': 假期申请信息, 'msg': '申请提交成功'}
         - 失败: {'code': 4xx/5xx, 'msg': 错误信息}
+
+    请假天数由服务端按工作日历（周末、法定节假日、调休）计算，不再使用客户端传入的值
     """
     try:
         # 获取当前用户
-        current_user = User.query.get(get_jwt_identity())
-        if not current_user or not current_user.employee:
+        current_user = get_current_principal()
+        if not current_user or not current_user.employee_id:
             return jsonify({'code': 401, 'msg': '用户未登录或不是员工'}), 401
         
         data = request.get_json()
         
         # 验证必填字段
-        required_fields = ['holiday_type_id', 'start_date', 'end_date', 'duration', 'reason']
+        required_fields = ['holiday_type_id', 'start_date', 'end_date', 'reason']
         for field in required_fields:
             if field not in data:
                 return jsonify({'code': 400, 'msg': f'缺少必填字段: {field}'}), 400
@@ -288,42 +312,43 @@ def create_holiday_request():
         except ValueError:
             return jsonify({'code': 400, 'msg': '日期格式错误'}), 400
         
-        # 验证请假时长
-        duration = float(data['duration'])
+        # 按工作日历计算请假时长（跨年的申请按年度拆分）
+        start_period = data.get('start_period', 'full')
+        end_period = data.get('end_period', 'full')
+        try:
+            days_by_year = LeaveDurationService.days_by_year(
+                current_user.employee_id, start_date, end_date, start_period, end_period
+            )
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
+        duration = sum(days_by_year.values())
+        if duration <= 0:
+            return jsonify({'code': 400, 'msg': '所选日期范围内没有工作日'}), 400
         if holiday_type.min_duration and duration < holiday_type.min_duration:
             return jsonify({'code': 400, 'msg': f'请假时长不能少于{holiday_type.min_duration}天'}), 400
         if holiday_type.max_duration and duration > holiday_type.max_duration:
             return jsonify({'code': 400, 'msg': f'请假时长不能超过{holiday_type.max_duration}天'}), 400
-        
-        # 检查是否有足够的假期余额
-        if holiday_type.annual_quota:
-            balance = HolidayBalance.query.filter_by(
-                employee_id=current_user.employee.id,
-                holiday_type_id=holiday_type.id,
-                year=date.today().year
-            ).first()
-            
-            if not balance:
-                # 创建新的假期余额记录
-                balance = HolidayBalance(
-                    employee_id=current_user.employee.id,
-                    holiday_type_id=holiday_type.id,
-                    year=date.today().year,
-                    total_days=holiday_type.annual_quota,
-                    used_days=0,
-                    remaining_days=holiday_type.annual_quota
-                )
-                db.session.add(balance)
-            
-            if duration > balance.remaining_days:
-                return jsonify({'code': 400, 'msg': f'假期余额不足，剩余{balance.remaining_days}天'}), 400
+
+        # 检查是否与已有请假、加班、假期申请冲突
+        try:
+            AbsenceIndexService.check_conflicts(current_user.employee_id, start_date, end_date)
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
+
+        # 检查各年度是否有足够的假期余额
+        for year, days in days_by_year.items():
+            balance = LeaveDurationService.get_or_create_balance(current_user.employee_id, holiday_type, year)
+            if balance and days > balance.remaining_days:
+                return jsonify({'code': 400, 'msg': f'{year}年假期余额不足，剩余{balance.remaining_days}天'}), 400
         
         # 创建假期申请
         holiday_request = HolidayRequest(
-            employee_id=current_user.employee.id,
+            employee_id=current_user.employee_id,
             holiday_type_id=holiday_type.id,
             start_date=start_date,
             end_date=end_date,
+            start_period=start_period,
+            end_period=end_period,
             duration=duration,
             reason=data['reason'],
             proof_url=data.get('proof_url'),
@@ -345,7 +370,7 @@ def create_holiday_request():
 
 @bp.route('/requests/<int:request_id>/approve', methods=['POST'])
 @jwt_required()
-@admin_required
+@admin_required()
 def approve_holiday_request(request_id):
     """审批假期申请
     
@@ -361,8 +386,8 @@ def approve_holiday_request(request_id):
     """
     try:
         # 获取当前用户
-        current_user = User.query.get(get_jwt_identity())
-        if not current_user or not current_user.employee:
+        current_user = get_current_principal()
+        if not current_user or not current_user.employee_id:
             return jsonify({'code': 401, 'msg': '用户未登录或不是员工'}), 401
         
         # 获取假期申请
@@ -381,21 +406,15 @@ def approve_holiday_request(request_id):
         
         # 更新申请状态
         holiday_request.status = 'approved' if action == 'approve' else 'rejected'
-        holiday_request.approver_id = current_user.employee.id
+        holiday_request.approver_id = current_user.employee_id
         holiday_request.approval_time = datetime.utcnow()
         holiday_request.approval_comment = data.get('comment')
         
-        # 如果批准申请，更新假期余额
-        if action == 'approve' and holiday_request.holiday_type.annual_quota:
-            balance = HolidayBalance.query.filter_by(
-                employee_id=holiday_request.employee_id,
-                holiday_type_id=holiday_request.holiday_type_id,
-                year=holiday_request.start_date.year
-            ).first()
-            
-            if balance:
-                balance.used_days += holiday_request.duration
-                balance.remaining_days = balance.total_days - balance.used_days
+        # 如果批准申请，按年度原子扣减假期余额，余额不足时拒绝批准
+        if action == 'approve':
+            if not LeaveDurationService.charge_request(holiday_request):
+                db.session.rollback()
+                return jsonify({'code': 400, 'msg': '假期余额不足，无法批准'}), 400
         
         db.session.commit()
         
@@ -416,7 +435,7 @@ def cancel_holiday_request(request_id):
     
     权限：
         - 只能取消自己的申请
-        - 只能取消待审批的申请
+        - 可以取消待审批的申请，以及尚未开始的已批准申请（退回已扣减的假期余额）
         
     返回：
         - 成功: {'code': 200, 'data': 假期申请信息, 'msg': '取消成功'}
@@ -424,8 +443,8 @@ def cancel_holiday_request(request_id):
     """
     try:
         # 获取当前用户
-        current_user = User.query.get(get_jwt_identity())
-        if not current_user or not current_user.employee:
+        current_user = get_current_principal()
+        if not current_user or not current_user.employee_id:
             return jsonify({'code': 401, 'msg': '用户未登录或不是员工'}), 401
         
         # 获取假期申请
@@ -434,12 +453,16 @@ def cancel_holiday_request(request_id):
             return jsonify({'code': 404, 'msg': '假期申请不存在'}), 404
         
         # 检查权限
-        if holiday_request.employee_id != current_user.employee.id:
+        if holiday_request.employee_id != current_user.employee_id:
             return jsonify({'code': 403, 'msg': '无权取消他人的申请'}), 403
         
         # 检查状态
-        if holiday_request.status != 'pending':
-            return jsonify({'code': 400, 'msg': '只能取消待审批的申请'}), 400
+        if holiday_request.status == 'approved':
+            if holiday_request.start_date <= date.today():
+                return jsonify({'code': 400, 'msg': '已开始的假期不能取消'}), 400
+            LeaveDurationService.refund_request(holiday_request)
+        elif holiday_request.status != 'pending':
+            return jsonify({'code': 400, 'msg': '只能取消待审批或尚未开始的已批准申请'}), 400
         
         # 更新状态
         holiday_request.status = 'cancelled'
@@ -455,6 +478,49 @@ def cancel_holiday_request(request_id):
         current_app.logger.error(f'取消假期申请失败: {str(e)}')
         return jsonify({'code': 500, 'msg': '系统错误'}), 500
 
+@bp.route('/duration', methods=['GET'])
+@jwt_required()
+def get_holiday_duration():
+    """预览假期申请时长
+    
+    URL参数：
+        - start_date: 开始日期 (YYYY-MM-DD)
+        - end_date: 结束日期 (YYYY-MM-DD)
+        - start_period: 开始日时段 full/pm（可选）
+        - end_period: 结束日时段 full/am（可选）
+        - employee_id: 员工ID（可选，仅管理员可指定）
+        
+    返回：
+        - 成功: {'code': 200, 'data': {'days': 天数, 'hours': 工时, 'working_days': 工作日数}, 'msg': 'success'}
+        - 失败: {'code': 4xx/5xx, 'msg': 错误信息}
+    """
+    try:
+        current_user = get_current_principal()
+        if not current_user:
+            return jsonify({'code': 401, 'msg': '用户未登录'}), 401
+        
+        employee_id = current_user.employee_id
+        if current_user.is_admin and request.args.get('employee_id', type=int):
+            employee_id = request.args.get('employee_id', type=int)
+        
+        try:
+            start_date = datetime.strptime(request.args.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.args.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'code': 400, 'msg': '日期格式错误'}), 400
+        try:
+            duration = LeaveDurationService.calculate_days(
+                employee_id, start_date, end_date,
+                request.args.get('start_period', 'full'), request.args.get('end_period', 'full')
+            )
+        except ValueError as e:
+            return jsonify({'code': 400, 'msg': str(e)}), 400
+        
+        return jsonify({'code': 200, 'data': duration.to_dict(), 'msg': 'success'})
+    except Exception as e:
+        current_app.logger.error(f'计算假期时长失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '系统错误'}), 500
+
 @bp.route('/balances', methods=['GET'])
 @jwt_required()
 def get_holiday_balances():
@@ -474,8 +540,8 @@ def get_holiday_balances():
     """
     try:
         # 获取当前用户
-        current_user = User.query.get(get_jwt_identity())
-        if not current_user or not current_user.employee:
+        current_user = get_current_principal()
+        if not current_user or not current_user.employee_id:
             return jsonify({'code': 401, 'msg': '用户未登录或不是员工'}), 401
         
         # 构建查询
@@ -483,7 +549,7 @@ def get_holiday_balances():
         
         # 如果不是管理员，只能查看自己的假期余额
         if not current_user.is_admin:
-            query = query.filter_by(employee_id=current_user.employee.id)
+            query = query.filter_by(employee_id=current_user.employee_id)
         else:
             # 管理员可以按员工ID筛选
             employee_id = request.args.get('employee_id', type=int)
@@ -505,3 +571,61 @@ def get_holiday_balances():
     except Exception as e:
         current_app.logger.error(f'获取假期余额失败: {str(e)}')
         return jsonify({'code': 500, 'msg': '系统错误'}), 500
+
+@bp.route('/balances/accrue', methods=['POST'])
+@jwt_required()
+@admin_required()
+def accrue_holiday_balances():
+    """批量发放年度假期余额
+    
+    权限：
+        - 仅管理员可以操作
+        
+    请求体：
+        {
+            'year': 发放年份（可选，默认当年，应在上一年结束后执行）
+        }
+        
+    为所有在职员工和所有有年度配额的假期类型生成余额（当年入职按月折算，含上年结转），
+    已存在的余额记录跳过，尚未使用的按上一年的最新剩余天数重新计算结转，可重复执行
+        
+    返回：
+        - 成功: {'code': 200, 'data': {'year', 'created', 'existing', 'refreshed', 'elapsed_ms', 'rows_per_second'}, 'msg': '发放成功'}
+        - 失败: {'code': 4xx/5xx, 'msg': 错误信息}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            year = int(data.get('year') or date.today().year)
+        except (TypeError, ValueError):
+            return jsonify({'code': 400, 'msg': '年份格式错误'}), 400
+        
+        stats = HolidayAccrualService.run(year)
+        return jsonify({'code': 200, 'data': stats, 'msg': '发放成功'})
+    except Exception as e:
+        current_app.logger.error(f'发放假期余额失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '系统错误'}), 500
+
+@bp.route('/balances/accrual-runs', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_holiday_accrual_runs():
+    """获取假期余额发放记录（最近的在前）
+    
+    URL参数：
+        - year: 发放年份（可选）
+        
+    返回：
+        - 成功: {'code': 200, 'data': [发放记录列表], 'msg': 'success'}
+        - 失败: {'code': 4xx/5xx, 'msg': 错误信息}
+    """
+    try:
+        query = HolidayAccrualRun.query
+        year = request.args.get('year', type=int)
+        if year:
+            query = query.filter_by(year=year)
+        runs = query.order_by(HolidayAccrualRun.created_at.desc()).limit(50).all()
+        return jsonify({'code': 200, 'data': [run.to_dict() for run in runs], 'msg': 'success'})
+    except Exception as e:
+        current_app.logger.error(f'获取假期余额发放记录失败: {str(e)}')
+        return jsonify({'code': 500, 'msg': '系统错误'}), 500
@@ -4,7 +4,7 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from app.models.employee import Employee, PositionChangeHistory
-from app.models.intern_status import InternStatus, InternEvaluation
+from app.models.intern_status import InternStatus, InternEvaluation, load_profile
 from app.models.department import Department
 from app.models.position import Position
 from app import db
@@ -12,6 +12,8 @@ from datetime import datetime
 from sqlalchemy import and_, or_
 from flask_jwt_extended import jwt_required
 from app.services.employee_service import EmployeeService
+from app.services.intern_service import InternService
+from app.utils.auth import admin_required
 
 bp = Blueprint('intern', __name__, url_prefix='/api/intern')
 
@@ -27,8 +29,8 @@ def get_intern_status_list():
         status = request.args.get('status')
         keyword = request.args.get('keyword')
         
-        # 构建查询
-        query = InternStatus.query
+        # 构建查询（员工、导师、部门、职位随列表一次加载）
+        query = InternStatus.query.options(*load_profile('intern_status'))
         
         # 部门筛选
         if department_id:
@@ -76,7 +78,7 @@ def get_intern_status_list():
 def get_intern_status(id):
     """获取实习状态详情"""
     try:
-        status = InternStatus.query.get(id)
+        status = InternStatus.query.options(*load_profile('intern_status')).get(id)
         if not status:
             return jsonify({
                 'code': 404,
@@ -335,12 +337,44 @@ def create_evaluation():
             'msg': f'创建实习评估失败: {str(e)}'
         })
 
+@bp.route('/evaluations/batch', methods=['POST'])
+@jwt_required()
+@admin_required()
+def batch_create_evaluations():
+    """批量创建实习评估并处理转正（整批校验通过后在同一事务中写入）"""
+    try:
+        result, errors = InternService.bulk_evaluate(request.get_json() or {})
+        if errors:
+            return jsonify({
+                'code': 400,
+                'msg': f'{len(errors)} 条评估校验失败，未写入任何数据',
+                'data': {'errors': errors}
+            }), 400
+
+        return jsonify({
+            'code': 200,
+            'data': result,
+            'msg': '批量评估成功'
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f"批量评估失败: {str(e)}")
+        return jsonify({
+            'code': 500,
+            'msg': f'批量评估失败: {str(e)}'
+        })
+
 @bp.route('/evaluations/<int:id>', methods=['GET'])
 @jwt_required()
 def get_evaluation(id):
     """获取评估详情"""
     try:
-        evaluation = InternEvaluation.query.get(id)
+        evaluation = InternEvaluation.query.options(*load_profile('intern_evaluation')).get(id)
         if not evaluation:
             return jsonify({
                 'code': 404,
@@ -365,7 +399,7 @@ def get_evaluation(id):
 def get_status_evaluations(status_id):
     """获取实习状态的所有评估"""
     try:
-        evaluations = InternEvaluation.query.filter_by(
+        evaluations = InternEvaluation.query.options(*load_profile('intern_evaluation')).filter_by(
             intern_status_id=status_id
         ).order_by(InternEvaluation.evaluation_date.desc()).all()
         
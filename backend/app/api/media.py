@@ -0,0 +1,42 @@
+"""
+媒体文件访问API
+文件按内容寻址，URL 对应的内容永不改变，可长期缓存
+"""
+import os
+from flask import Blueprint, jsonify, send_file, current_app
+from app.services.media_service import MediaService
+
+bp = Blueprint('media', __name__, url_prefix='/api/media')
+
+VALID_VARIANTS = {'original', 'avatar', 'list', 'detail'}
+
+@bp.route('/<string:content_hash>/<string:variant>', methods=['GET'])
+def serve_media(content_hash, variant):
+    """
+    提供媒体文件访问
+    ETag 取自数据库中预先计算的值，支持 If-None-Match、Range 请求和 X-Sendfile
+    """
+    if variant not in VALID_VARIANTS or len(content_hash) != 64 or not content_hash.isalnum():
+        return jsonify({'code': 400, 'msg': '无效的文件参数'}), 400
+
+    media = MediaService.get_variant(content_hash, variant)
+    if not media:
+        return jsonify({'code': 404, 'msg': '文件不存在'}), 404
+
+    file_path = MediaService.absolute_path(media)
+    if not os.path.exists(file_path):
+        current_app.logger.error(f'媒体文件丢失: {file_path}')
+        return jsonify({'code': 404, 'msg': '文件不存在'}), 404
+
+    # conditional=True 时 werkzeug 负责处理 304 和 Range 请求，
+    # USE_X_SENDFILE 开启时由前置服务器发送文件内容
+    response = send_file(
+        file_path,
+        mimetype=media.mime_type,
+        etag=media.etag,
+        last_modified=media.created_at,
+        conditional=True,
+        max_age=31536000
+    )
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
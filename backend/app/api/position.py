@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app.models.position import Position
 from app import db
+from app.utils.http_cache import cached_response
 
 bp = Blueprint('position', __name__, url_prefix='/api')
 
 @bp.route('/positions', methods=['GET'])
+@cached_response('positions', 'departments')
 def get_positions():
     """获取职位列表"""
     try:
@@ -1,13 +1,21 @@
 from flask import Blueprint, request, jsonify
 import logging
+from sqlalchemy.orm import joinedload, selectinload
 from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.tax import TaxYtdState
 from app.models.salary_structure_assignment import SalaryStructureAssignment
 from app.models.employee import Employee
 from app.models.department import Department
 from app import db
 from datetime import datetime
 from app.services.salary_service import SalaryService
+from app.services.payroll_input_service import PayrollInputService
+from app.services.tax_service import TaxService
+from app.services.payroll_simulation_service import PayrollSimulationService
 from decimal import Decimal
+from app.utils.http_cache import cached_response
+from app.utils.json_provider import Deferred, StreamedArray, stream_json
+from app.utils.export_stream import export_format, stream_rows
 
 # 创建蓝图，使用 url_prefix='/api'
 bp = Blueprint('salary', __name__, url_prefix='/api')
@@ -16,6 +24,7 @@ bp = Blueprint('salary', __name__, url_prefix='/api')
 # bp = Blueprint('salary', __name__)
 
 @bp.route('/salary/structures', methods=['GET', 'POST', 'OPTIONS'])
+@cached_response('salary_structures', 'employees')
 def get_salary_structures():
     """获取工资结构列表"""
     # 处理 OPTIONS 请求
@@ -121,10 +130,14 @@ def get_salary_structure(id):
             })
         elif request.method == 'DELETE':
             try:
-                # 检查是否有工资记录使用此结构（通过基本工资和其他字段匹配）
+                # 检查是否有工资记录使用此结构（早期记录没有结构ID，通过基本工资和其他字段匹配）
                 records = SalaryRecord.query.filter(
-                    SalaryRecord.basic_salary == structure.basic_salary,
-                    SalaryRecord.allowances == (structure.housing_allowance + structure.transport_allowance + structure.meal_allowance)
+                    (SalaryRecord.salary_structure_id == structure.id) |
+                    (
+                        SalaryRecord.salary_structure_id.is_(None) &
+                        (SalaryRecord.basic_salary == structure.basic_salary) &
+                        (SalaryRecord.allowances == (structure.housing_allowance + structure.transport_allowance + structure.meal_allowance))
+                    )
                 ).first()
                 
                 if records:
@@ -154,6 +167,50 @@ def get_salary_structure(id):
             'msg': f'获取工资结构失败: {str(e)}'
         })
 
+# 分组统计的发放状态
+STATISTIC_STATUSES = ('pending', 'approved', 'paid')
+
+# 统计的金额字段（与 statistics 中的 total_xxx 对应）
+STATISTIC_FIELDS = (
+    ('total_basic', 'basic_salary'),          # 基本工资总额
+    ('total_allowances', 'allowances'),       # 补贴总额
+    ('total_overtime', 'overtime_pay'),       # 加班费总额
+    ('total_bonus', 'bonus'),                 # 奖金总额
+    ('total_tax', 'tax'),                     # 个税总额
+    ('total_net', 'net_salary'),              # 实发总额
+    ('total_gross', 'gross_salary')           # 应发总额
+)
+
+class _SalaryStatistics:
+    """按发放状态累加工资记录金额（逐条累加，不保留记录）"""
+    
+    def __init__(self):
+        self.groups = {name: self._empty() for name in ('total', *STATISTIC_STATUSES)}
+    
+    @staticmethod
+    def _empty():
+        return {'total_count': 0, **{key: 0.0 for key, _ in STATISTIC_FIELDS}}
+    
+    def add(self, record):
+        groups = [self.groups['total']]
+        if record.payment_status in STATISTIC_STATUSES:
+            groups.append(self.groups[record.payment_status])
+        for key, field in STATISTIC_FIELDS:
+            amount = float(getattr(record, field))
+            for group in groups:
+                group[key] += amount
+        for group in groups:
+            group['total_count'] += 1
+    
+    def to_dict(self):
+        """
+        返回:
+            包含 total（合计）、pending（待发放）、approved（已审批）、paid（已发放）统计的字典
+        """
+        total = dict(self.groups['total'], approved_count=self.groups['approved']['total_count'],
+                     paid_count=self.groups['paid']['total_count'])
+        return {'total': total, **{status: dict(self.groups[status]) for status in STATISTIC_STATUSES}}
+
 @bp.route('/salary/records', methods=['GET', 'POST', 'OPTIONS'])
 def get_salary_records():
     """获取工资记录列表"""
@@ -172,6 +229,8 @@ def get_salary_records():
             month = request.args.get('month', type=int) or current_date.month
             department_id = request.args.get('department_id', type=int)
             payment_status = request.args.get('payment_status')
+            # 计算明细按需返回：?include=components
+            include_components = request.args.get('include') == 'components'
             
             print(f"查询参数 - 年份: {year}, 月份: {month}, 部门ID: {department_id}, 支付状态: {payment_status}")
             
@@ -204,56 +263,49 @@ def get_salary_records():
             # 应用所有筛选条件
             if conditions:
                 base_query = base_query.filter(*conditions)
+            if include_components:
+                base_query = base_query.options(selectinload(SalaryRecord.components))
+            
+            # 员工、部门、职位随记录一起加载（to_dict 需要）
+            base_query = base_query.options(
+                joinedload(SalaryRecord.employee).joinedload(Employee.department),
+                joinedload(SalaryRecord.employee).joinedload(Employee.position)
+            )
+            
+            # 流式导出：?format=ndjson|csv，只输出记录
+            fmt = export_format()
+            if fmt:
+                return stream_rows(
+                    base_query, lambda record: record.to_dict(include_components=include_components),
+                    fmt, f'salary_records_{year}{month:02d}'
+                )
+            
+            # 流式输出：?stream=1，逐批查询和序列化，统计数据在记录之后输出
+            if request.args.get('stream') == '1':
+                totals = _SalaryStatistics()
+                
+                def serialize(record):
+                    totals.add(record)
+                    return record.to_dict(include_components=include_components)
+                
+                return stream_json({
+                    'code': 200,
+                    'message': '获取成功',
+                    'data': {
+                        'records': StreamedArray(base_query.yield_per(500), serialize),
+                        'statistics': Deferred(totals.to_dict)
+                    }
+                })
             
             # 获取记录列表
             records = base_query.all()
             print(f"找到 {len(records)} 条工资记录")
             
             # 计算统计数据
-            total_count = len(records)
-            paid_count = sum(1 for r in records if r.payment_status == 'paid')
-            total_basic = sum(float(r.basic_salary) for r in records)
-            total_allowances = sum(float(r.allowances) for r in records)
-            total_overtime = sum(float(r.overtime_pay) for r in records)
-            total_bonus = sum(float(r.bonus) for r in records)
-            total_tax = sum(float(r.tax) for r in records)
-            total_net = sum(float(r.net_salary) for r in records)
-            total_gross = sum(float(r.gross_salary) for r in records)
-            
-            # 构建统计数据
-            statistics = {
-                'total': {  # 合计统计
-                    'total_count': total_count,          # 本月记录数
-                    'paid_count': paid_count,            # 已发放记录数
-                    'total_basic': total_basic,          # 基本工资总额
-                    'total_allowances': total_allowances,# 补贴总额
-                    'total_overtime': total_overtime,    # 加班费总额
-                    'total_bonus': total_bonus,          # 奖金总额
-                    'total_tax': total_tax,              # 个税总额
-                    'total_net': total_net,              # 本月实发总额
-                    'total_gross': total_gross           # 本月应发总额
-                },
-                'pending': {  # 待发放统计
-                    'total_count': sum(1 for r in records if r.payment_status == 'pending'),
-                    'total_basic': sum(float(r.basic_salary) for r in records if r.payment_status == 'pending'),
-                    'total_allowances': sum(float(r.allowances) for r in records if r.payment_status == 'pending'),
-                    'total_overtime': sum(float(r.overtime_pay) for r in records if r.payment_status == 'pending'),
-                    'total_bonus': sum(float(r.bonus) for r in records if r.payment_status == 'pending'),
-                    'total_tax': sum(float(r.tax) for r in records if r.payment_status == 'pending'),
-                    'total_net': sum(float(r.net_salary) for r in records if r.payment_status == 'pending'),
-                    'total_gross': sum(float(r.gross_salary) for r in records if r.payment_status == 'pending')
-                },
-                'paid': {  # 已发放统计
-                    'total_count': paid_count,
-                    'total_basic': sum(float(r.basic_salary) for r in records if r.payment_status == 'paid'),
-                    'total_allowances': sum(float(r.allowances) for r in records if r.payment_status == 'paid'),
-                    'total_overtime': sum(float(r.overtime_pay) for r in records if r.payment_status == 'paid'),
-                    'total_bonus': sum(float(r.bonus) for r in records if r.payment_status == 'paid'),
-                    'total_tax': sum(float(r.tax) for r in records if r.payment_status == 'paid'),
-                    'total_net': sum(float(r.net_salary) for r in records if r.payment_status == 'paid'),
-                    'total_gross': sum(float(r.gross_salary) for r in records if r.payment_status == 'paid')
-                }
-            }
+            totals = _SalaryStatistics()
+            for record in records:
+                totals.add(record)
+            statistics = totals.to_dict()
             
             print(f"统计数据: {statistics}")
             
@@ -261,7 +313,7 @@ def get_salary_records():
                 'code': 200,
                 'message': '获取成功',
                 'data': {
-                    'records': [record.to_dict() for record in records],
+                    'records': [record.to_dict(include_components=include_components) for record in records],
                     'statistics': statistics
                 }
             })
@@ -357,7 +409,7 @@ def get_salary_record(id):
         if request.method == 'GET':
             return jsonify({
                 'code': 200,
-                'data': record.to_dict(),
+                'data': record.to_dict(include_components=True),
                 'msg': '获取工资记录成功'
             })
         elif request.method == 'PUT':
@@ -528,6 +580,164 @@ def batch_generate_salary_records():
             'data': None
         }), 500
 
+@bp.route('/salary/payroll-inputs', methods=['GET'])
+def get_payroll_inputs():
+    """
+    预览指定月份的薪资输入（批量生成工资记录时使用的考勤汇总）
+    
+    查询参数:
+        year: 年份 (必需)
+        month: 月份 (必需)
+        employee_ids: 逗号分隔的员工ID列表 (可选，默认所有在职员工)
+    """
+    try:
+        year = request.args.get('year', type=int)
+        month = request.args.get('month', type=int)
+        if not year or not month or not (1 <= month <= 12):
+            return jsonify({
+                'code': 400,
+                'message': '请提供有效的年份和月份',
+                'data': None
+            }), 400
+        
+        employees = None
+        employee_ids = request.args.get('employee_ids')
+        if employee_ids:
+            try:
+                ids = [int(id) for id in employee_ids.split(',') if id.strip()]
+            except ValueError:
+                return jsonify({
+                    'code': 400,
+                    'message': 'employee_ids列表中的所有ID必须是有效的整数',
+                    'data': None
+                }), 400
+            employees = Employee.query.filter(Employee.id.in_(ids)).all()
+        
+        inputs = PayrollInputService.aggregate(year, month, employees)
+        return jsonify({
+            'code': 200,
+            'message': '获取薪资输入成功',
+            'data': [payroll_input.to_dict() for payroll_input in inputs.values()]
+        })
+    except Exception as e:
+        logging.error(f"获取薪资输入时发生错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'code': 500,
+            'message': f'获取薪资输入失败: {str(e)}',
+            'data': None
+        }), 500
+
+@bp.route('/salary/tax/ytd', methods=['GET'])
+def get_tax_ytd_states():
+    """
+    获取个税年度累计状态
+    
+    查询参数:
+        year: 年份 (必需)
+        employee_id: 员工ID (可选)
+    """
+    try:
+        year = request.args.get('year', type=int)
+        if not year:
+            return jsonify({
+                'code': 400,
+                'message': '请提供有效的年份',
+                'data': None
+            }), 400
+        query = TaxYtdState.query.filter(TaxYtdState.year == year)
+        employee_id = request.args.get('employee_id', type=int)
+        if employee_id:
+            query = query.filter(TaxYtdState.employee_id == employee_id)
+        return jsonify({
+            'code': 200,
+            'message': '获取个税累计状态成功',
+            'data': [state.to_dict() for state in query.order_by(TaxYtdState.employee_id).all()]
+        })
+    except Exception as e:
+        logging.error(f"获取个税累计状态时发生错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'code': 500,
+            'message': f'获取个税累计状态失败: {str(e)}',
+            'data': None
+        }), 500
+
+@bp.route('/salary/tax/recompute', methods=['POST'])
+def recompute_tax():
+    """
+    按年重建个税累计状态并重算待发放工资记录的个税
+    
+    请求体参数:
+        year: 年份 (必需)
+        employee_ids: 员工ID列表 (可选，默认全部员工)
+    """
+    try:
+        data = request.get_json() or {}
+        year = data.get('year')
+        if not isinstance(year, int):
+            return jsonify({
+                'code': 400,
+                'message': '请提供有效的年份',
+                'data': None
+            }), 400
+        result = TaxService.recompute_year(year, data.get('employee_ids'))
+        return jsonify({
+            'code': 200,
+            'message': f"已重建 {result['employees']} 名员工的个税累计状态，重算 {result['updated']} 条待发放工资记录",
+            'data': result
+        })
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"重算个税时发生错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'code': 500,
+            'message': f'重算个税失败: {str(e)}',
+            'data': None
+        }), 500
+
+@bp.route('/salary/simulate', methods=['POST'])
+def simulate_payroll():
+    """
+    按建议的工资结构、结构分配或个税税率表模拟某月工资（不写入工资记录）
+    
+    请求体参数:
+        year: 年份 (必需)
+        month: 月份 (必需)
+        structures: {工资结构ID: {basic_salary, housing_allowance, transport_allowance, meal_allowance}} (可选)
+        assignments: [{employee_id|department_id|is_default, salary_structure_id}] (可选)
+        tax: {brackets: [[上限, 税率, 速算扣除数], ...], monthly_exemption} (可选)
+        refresh: 是否重新加载员工和考勤快照 (可选)
+    """
+    try:
+        data = request.get_json() or {}
+        year = data.get('year')
+        month = data.get('month')
+        if not isinstance(year, int) or not isinstance(month, int) or not (1 <= month <= 12):
+            return jsonify({
+                'code': 400,
+                'message': '请提供有效的年份和月份',
+                'data': None
+            }), 400
+        
+        result = PayrollSimulationService.simulate(year, month, data, refresh=bool(data.get('refresh')))
+        return jsonify({
+            'code': 200,
+            'message': '模拟完成',
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'message': str(e),
+            'data': None
+        }), 400
+    except Exception as e:
+        logging.error(f"薪资模拟时发生错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'code': 500,
+            'message': f'薪资模拟失败: {str(e)}',
+            'data': None
+        }), 500
+
 @bp.route('/salary/statistics', methods=['GET', 'OPTIONS'])
 def get_salary_statistics():
     """获取薪资统计数据"""
@@ -1011,6 +1221,47 @@ def manage_salary_structure_assignment(id):
             'msg': f'管理工资结构分配记录失败: {str(e)}'
         })
 
+@bp.route('/salary/records/transition', methods=['POST', 'OPTIONS'])
+def transition_salary_records():
+    """
+    批量流转工资记录发放状态（待发放 -> 已审核 -> 已发放）
+    
+    请求体参数:
+        action: approve(审核)/pay(发放)/revoke(撤回审核) (必需)
+        record_ids: 工资记录ID列表 (与 year/month 二选一)
+        year, month: 按月份整体流转
+        payment_date: 发放日期，格式 YYYY-MM-DD (可选，默认当前时间)
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+        
+    try:
+        data = request.get_json() or {}
+        payment_date = data.get('payment_date')
+        result = SalaryService.transition_salary_records(
+            action=data.get('action'),
+            record_ids=data.get('record_ids'),
+            year=data.get('year'),
+            month=data.get('month'),
+            payment_date=datetime.strptime(payment_date, '%Y-%m-%d') if payment_date else None
+        )
+        return jsonify({
+            'code': 200,
+            'data': result,
+            'msg': f"已更新 {result['affected']} 条工资记录，{len(result['conflicts'])} 条状态冲突"
+        })
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"批量流转工资记录状态时发生错误: {str(e)}", exc_info=True)
+        return jsonify({
+            'code': 500,
+            'msg': f'批量流转工资记录状态失败: {str(e)}'
+        }), 500
+
 @bp.route('/salary/records/batch', methods=['PUT', 'DELETE', 'OPTIONS'])
 def batch_manage_salary_records():
     """批量管理工资记录"""
@@ -1060,6 +1311,11 @@ def batch_manage_salary_records():
                 'msg': '批量删除工资记录完成'
             })
             
+    except ValueError as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        })
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -5,12 +5,15 @@ from flask import Blueprint, request, jsonify
 from app.models.statutory_holiday import StatutoryHoliday
 from app import db
 from datetime import datetime
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.user import User
+from flask_jwt_extended import jwt_required
+from app.utils.auth import get_current_principal
+from app.services.leave_duration_service import LeaveDurationService
+from app.utils.http_cache import cached_response
 
 bp = Blueprint('statutory_holiday', __name__, url_prefix='/api/statutory-holidays')
 
 @bp.route('', methods=['GET'])
+@cached_response('statutory_holidays')
 def get_statutory_holidays():
     """获取法定节假日列表
     
@@ -49,8 +52,7 @@ def create_statutory_holiday():
     """
     try:
         # 检查用户权限
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         if not user or user.role != 'admin':
             return jsonify({
                 'code': 403,
@@ -104,6 +106,7 @@ def create_statutory_holiday():
         
         db.session.add(holiday)
         db.session.commit()
+        LeaveDurationService.invalidate_calendar()
         
         return jsonify({
             'code': 200,
@@ -123,8 +126,7 @@ def update_statutory_holiday(id):
     """更新法定节假日"""
     try:
         # 检查用户权限
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         if not user or user.role != 'admin':
             return jsonify({
                 'code': 403,
@@ -179,6 +181,7 @@ def update_statutory_holiday(id):
             holiday.description = data['description']
         
         db.session.commit()
+        LeaveDurationService.invalidate_calendar()
         
         return jsonify({
             'code': 200,
@@ -198,8 +201,7 @@ def delete_statutory_holiday(id):
     """删除法定节假日"""
     try:
         # 检查用户权限
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         if not user or user.role != 'admin':
             return jsonify({
                 'code': 403,
@@ -215,6 +217,7 @@ def delete_statutory_holiday(id):
         
         db.session.delete(holiday)
         db.session.commit()
+        LeaveDurationService.invalidate_calendar()
         
         return jsonify({
             'code': 200,
@@ -0,0 +1,6 @@
+"""
+flask 命令行命令
+    - maintenance：数据初始化和定期维护任务
+    - bench：性能测量
+每个模块的 COMMANDS 由 create_app 中的 register_commands 注册；命令用到的服务在执行时才导入，不增加启动耗时。
+"""
@@ -0,0 +1,144 @@
+"""性能测量命令"""
+
+import os
+import threading
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from app.models import Employee, Department, Position, SalaryRecord
+
+@click.command('bench-audit')
+@click.option('--rows', type=int, default=1000, help='每轮修改的员工数')
+@click.option('--rounds', type=int, default=3, help='轮数，取最快一轮')
+@with_appcontext
+def bench_audit(rows, rounds):
+    """
+    测量审计日志对提交耗时的影响
+    所有修改在一个事务中进行，每次单行提交以保存点代替，结束时整体回滚，不改动数据库
+    """
+    from app.models.audit_log import AuditLog
+    config = current_app.config
+    previous = config['AUDIT_ENABLED']
+    timings = {False: [], True: []}
+    try:
+        config['AUDIT_ENABLED'] = False
+        employees = [Employee(employee_id=f'BENCH{i}', name=f'bench{i}') for i in range(rows)]
+        db.session.add_all(employees)
+        db.session.flush()
+        ids = [employee.id for employee in employees]
+        db.session.expunge_all()
+        # 交替测量，每次只修改一行并释放保存点，会话中只保留当前对象
+        for round_no in range(rounds):
+            for enabled in (False, True):
+                config['AUDIT_ENABLED'] = enabled
+                started = time.perf_counter()
+                for employee_id in ids:
+                    with db.session.begin_nested():
+                        employee = db.session.get(Employee, employee_id)
+                        employee.phone = f'{round_no}{enabled:d}{employee_id:09d}'
+                    db.session.expunge(employee)
+                timings[enabled].append(time.perf_counter() - started)
+        # 事务未提交，审计记录仍在会话中，按后台线程的方式批量写入（随后回滚）
+        audit_rows = db.session.info.pop('audit_rows', [])
+        started = time.perf_counter()
+        if audit_rows:
+            db.session.execute(AuditLog.__table__.insert(), audit_rows)
+        flush_time = time.perf_counter() - started
+        written = len(audit_rows)
+    finally:
+        db.session.rollback()
+        config['AUDIT_ENABLED'] = previous
+    disabled, enabled = min(timings[False]), min(timings[True])
+    print(f"{rows} 次单行提交（{rounds} 轮取最快）：关闭审计 {disabled * 1000:.0f} ms，开启审计 {enabled * 1000:.0f} ms，"
+          f"每次提交增加 {(enabled - disabled) / rows * 1e6:.1f} µs")
+    print(f"批量写入 {written} 条审计日志 {flush_time * 1000:.1f} ms（{written / max(flush_time, 1e-9):.0f} 条/秒）")
+
+@click.command('bench-json')
+@click.option('--rows', type=int, default=2000, help='工资记录条数')
+@click.option('--rounds', type=int, default=5, help='轮数，取最快一轮')
+@with_appcontext
+def bench_json(rows, rounds):
+    """比较工资记录列表响应在标准库/orjson 序列化和 gzip/br 压缩下的字节数与耗时（不访问数据库）"""
+    from flask.json.provider import DefaultJSONProvider
+    from app.utils.compression import Compression
+    from app.utils.json_provider import OrjsonProvider, orjson
+
+    app = current_app._get_current_object()
+    now = datetime.now()
+    department = Department(name='研发中心')
+    position = Position(name='高级工程师')
+    records = []
+    for i in range(rows):
+        employee = Employee(employee_id=f'E{i:05d}', name=f'员工{i}', department=department, position=position)
+        records.append(SalaryRecord(
+            id=i + 1, employee=employee, employee_id=i + 1, year=now.year, month=now.month,
+            basic_salary=8000 + i % 50 * 100, allowances=1200, overtime_pay=i % 7 * 150, bonus=500,
+            deductions=0, social_insurance=880, special_deduction=1000, gross_salary=9700, tax=45,
+            net_salary=8775, payment_status='pending', remark='本月考勤正常，绩效评定为良好，按制度发放季度绩效奖金。' * 4,
+            created_at=now, updated_at=now
+        ).to_dict())
+    payload = {'code': 200, 'message': '获取成功', 'data': {'records': records}}
+
+    def measure(fn):
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        return result, min(timings) * 1000
+
+    providers = [('标准库 json', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    print(f'{rows} 条工资记录（{rounds} 轮取最快）：')
+    with app.test_request_context():
+        for label, provider in providers:
+            body, elapsed = measure(lambda: provider.response(payload).get_data())
+            print(f'  {label}: {len(body) / 1024:.1f} KB，序列化 {elapsed:.1f} ms')
+        for encoding in Compression.encodings():
+            compressed, elapsed = measure(lambda: Compression.compress(body, encoding))
+            print(f'  {providers[-1][0]} + {encoding}: {len(compressed) / 1024:.1f} KB，压缩 {elapsed:.1f} ms')
+
+@click.command('bench-login')
+@click.option('--seconds', type=float, default=5.0, help='压测时长（秒）')
+@click.option('--clients', type=int, default=None, help='并发登录线程数，默认为校验线程数的 4 倍')
+@with_appcontext
+def bench_login(seconds, clients):
+    """按当前密码哈希配置压测密码校验吞吐量（次/秒、每核次/秒）"""
+    from app.services.password_service import PasswordService, PasswordBusyError
+    app = current_app._get_current_object()
+    workers = app.config['PASSWORD_VERIFY_WORKERS']
+    clients = clients or workers * 4
+    stored_hash = PasswordService.hash('benchmark-password')
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        with app.app_context():
+            while time.monotonic() < deadline:
+                try:
+                    PasswordService.verify(stored_hash, 'benchmark-password')
+                    key = 'ok'
+                except PasswordBusyError:
+                    key = 'busy'
+                with lock:
+                    counts[key] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    cores = min(workers, os.cpu_count() or 1)
+    rate = counts['ok'] / elapsed
+    print(f"哈希方法 {PasswordService.method()}，校验线程 {workers}，并发 {clients}，耗时 {elapsed:.1f} 秒")
+    print(f"成功校验 {counts['ok']} 次，拒绝 {counts['busy']} 次，"
+          f"{rate:.1f} 次/秒，每核 {rate / cores:.1f} 次/秒")
+
+COMMANDS = (bench_audit, bench_json, bench_login)
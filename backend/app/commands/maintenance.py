@@ -0,0 +1,73 @@
+"""数据初始化和定期维护命令"""
+
+from datetime import date
+import click
+from flask.cli import with_appcontext
+
+@click.command('init-default-data')
+@with_appcontext
+def init_default_data():
+    """初始化系统默认数据（默认考勤规则等）"""
+    from app.utils.init_data import init_default_attendance_rule
+    if init_default_attendance_rule():
+        print('默认数据初始化完成')
+    else:
+        print('默认数据初始化失败')
+
+@click.command('cleanup-uploads')
+@click.option('--hours', default=24, help='清理超过指定小时数未完成的分片上传')
+@with_appcontext
+def cleanup_uploads(hours):
+    """清理超时未完成的分片上传"""
+    from app.services.upload_service import UploadService
+    count = UploadService.cleanup_expired(hours)
+    print(f'已清理 {count} 个未完成的上传')
+
+@click.command('recalc-payroll')
+@click.option('--all', 'process_all', is_flag=True, help='忽略防抖时间，立即处理所有待重算标记')
+@with_appcontext
+def recalc_payroll(process_all):
+    """重算受变更影响的待发放工资记录"""
+    from app.services.payroll_recalc_service import PayrollRecalcService
+    result = PayrollRecalcService.process_pending(debounce=0 if process_all else None)
+    print(f"已处理 {result['processed']} 条标记，重算 {result['updated']} 条工资记录，剩余 {result['remaining']} 条")
+
+@click.command('recompute-tax')
+@click.option('--year', type=int, required=True, help='要重算的年份')
+@with_appcontext
+def recompute_tax(year):
+    """重建个税年度累计状态并重算待发放工资记录的个税"""
+    from app.services.tax_service import TaxService
+    result = TaxService.recompute_year(year)
+    print(f"已重建 {result['employees']} 名员工的个税累计状态，重算 {result['updated']} 条待发放工资记录")
+
+@click.command('accrue-holidays')
+@click.option('--year', type=int, default=None, help='发放年份，默认为当年（上一年结束后执行）')
+@with_appcontext
+def accrue_holidays(year):
+    """为所有在职员工批量发放年度假期余额（含上年结转，可重复执行）"""
+    from app.services.holiday_accrual_service import HolidayAccrualService
+    stats = HolidayAccrualService.run(year or date.today().year)
+    print(f"{stats['year']} 年新生成 {stats['created']} 条假期余额，已存在 {stats['existing']} 条，"
+          f"耗时 {stats['elapsed_ms']} ms（{stats['rows_per_second']} 条/秒）")
+
+@click.command('prune-change-events')
+@click.option('--days', type=int, default=30, help='保留最近多少天的变更事件')
+@with_appcontext
+def prune_change_events(days):
+    """清理过期的数据变更事件"""
+    from app.services.change_capture_service import ChangeCaptureService
+    print(f'已删除 {ChangeCaptureService.prune(days)} 条 {days} 天前的变更事件')
+
+@click.command('audit-partitions')
+@click.option('--ahead', type=int, default=3, help='预先创建之后几个月的分区')
+@click.option('--retain', type=int, default=None, help='保留最近几个月的审计日志，默认不删除')
+@with_appcontext
+def audit_partitions(ahead, retain):
+    """维护审计日志的月份分区（MySQL），删除过期的审计日志"""
+    from app.services.audit_service import AuditService
+    result = AuditService.maintain_partitions(ahead, retain)
+    print(f"新建分区: {', '.join(result['created']) or '无'}；删除: {', '.join(map(str, result['dropped'])) or '无'}")
+
+COMMANDS = (init_default_data, cleanup_uploads, recalc_payroll, recompute_tax, accrue_holidays,
+            prune_change_events, audit_partitions)
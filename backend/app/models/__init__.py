@@ -3,10 +3,17 @@ from .user import User
 from .employee import Employee, EducationHistory, WorkHistory
 from .department import Department
 from .position import Position
-from .salary import SalaryStructure, SalaryRecord
+from .salary import SalaryStructure, SalaryRecord, SalaryRecordComponent
 from .attendance import Attendance, Leave, Overtime, AttendanceRule, AttendanceLocation
 from .salary_structure_assignment import SalaryStructureAssignment
 from .statutory_holiday import StatutoryHoliday
+from .holiday import HolidayType, HolidayRequest, HolidayBalance, HolidayRequestCharge, HolidayAccrualRun
+from .media import MediaFile
+from .upload_session import UploadSession
+from .payroll_recalc import PayrollRecalcMark
+from .tax import TaxYtdState
+from .change_event import ChangeEvent
+from .audit_log import AuditLog
 
 __all__ = [
     'User',
@@ -15,6 +22,7 @@ __all__ = [
     'Position',
     'SalaryStructure',
     'SalaryRecord',
+    'SalaryRecordComponent',
     'Attendance',
     'Leave',
     'Overtime',
@@ -23,5 +31,15 @@ __all__ = [
     'EducationHistory',
     'WorkHistory',
     'SalaryStructureAssignment',
-    'StatutoryHoliday'
+    'StatutoryHoliday',
+    'HolidayType',
+    'HolidayRequest',
+    'HolidayBalance',
+    'HolidayAccrualRun',
+    'MediaFile',
+    'UploadSession',
+    'PayrollRecalcMark',
+    'TaxYtdState',
+    'ChangeEvent',
+    'AuditLog'
 ]
@@ -12,6 +12,7 @@ class Attendance(db.Model):
     check_out = db.Column(db.DateTime, comment='下班打卡时间')
     status = db.Column(db.String(20), comment='考勤状态(normal/late/early/absent)')
     remark = db.Column(db.String(200), comment='备注')
+    location_id = db.Column(db.Integer, db.ForeignKey('attendance_locations.id'), nullable=True, comment='最近一次打卡匹配的打卡地点ID')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -29,6 +30,7 @@ class Attendance(db.Model):
             'check_out': self.check_out.strftime('%Y-%m-%d %H:%M:%S') if self.check_out else None,
             'status': self.status,
             'remark': self.remark,
+            'location_id': self.location_id,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
@@ -36,12 +38,17 @@ class Attendance(db.Model):
 class Leave(db.Model):
     """请假记录表"""
     __tablename__ = 'leaves'
+    __table_args__ = (
+        db.Index('ix_leaves_employee_period', 'employee_id', 'start_date', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, comment='员工ID')
     leave_type = db.Column(db.String(20), nullable=False, comment='请假类型(sick/annual/personal/other)')
     start_date = db.Column(db.DateTime, nullable=False, comment='开始时间')
     end_date = db.Column(db.DateTime, nullable=False, comment='结束时间')
+    duration = db.Column(db.Float, comment='请假天数（按工作日历计算）')
+    hours = db.Column(db.Float, comment='请假工时（扣除非工作时间和午休）')
     reason = db.Column(db.String(200), comment='请假原因')
     status = db.Column(db.String(20), default='pending', comment='状态(pending/approved/rejected)')
     approved_by = db.Column(db.Integer, db.ForeignKey('employees.id'), comment='审批人ID')
@@ -61,6 +68,8 @@ class Leave(db.Model):
             'leave_type': self.leave_type,
             'start_date': self.start_date.strftime('%Y-%m-%d %H:%M:%S'),
             'end_date': self.end_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': self.duration,
+            'hours': self.hours,
             'reason': self.reason,
             'status': self.status,
             'approved_by': self.approved_by,
@@ -72,6 +81,9 @@ class Leave(db.Model):
 class Overtime(db.Model):
     """加班记录表"""
     __tablename__ = 'overtimes'
+    __table_args__ = (
+        db.Index('ix_overtimes_employee_period', 'employee_id', 'start_time', 'end_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, comment='员工ID')
@@ -0,0 +1,36 @@
+"""
+审计日志模型
+记录员工、薪资、规则、分配等数据每次变更前后的字段值，只追加不修改。
+MySQL 下按月份（partition_month）范围分区，按月删除过期分区；查询按（实体, 实体ID, 时间）索引
+"""
+import json
+from app import db
+from datetime import datetime
+
+class AuditLog(db.Model):
+    """审计日志表"""
+    __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_entity', 'entity', 'entity_id', 'created_at'),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    partition_month = db.Column(db.Integer, nullable=False, comment='分区月份(YYYYMM)')
+    entity = db.Column(db.String(64), nullable=False, comment='实体(表名)')
+    entity_id = db.Column(db.String(64), nullable=False, comment='实体主键')
+    action = db.Column(db.String(10), nullable=False, comment='操作(insert/update/delete)')
+    changes = db.Column(db.Text, comment='字段变更 JSON：{字段: [变更前, 变更后]}')
+    user_id = db.Column(db.Integer, comment='操作用户ID')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True, comment='变更时间')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'action': self.action,
+            'changes': json.loads(self.changes) if self.changes else {},
+            'user_id': self.user_id,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
@@ -0,0 +1,29 @@
+"""
+数据变更事件模型
+会话提交时把本次事务中各表的新增、修改、删除记录为紧凑的变更事件（表名、主键、修改的字段），
+与业务数据在同一事务中写入，只追加不修改，供缓存、统计、搜索索引等派生数据增量更新
+"""
+from app import db
+from datetime import datetime
+
+class ChangeEvent(db.Model):
+    """数据变更事件表（outbox）"""
+    __tablename__ = 'change_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    table_name = db.Column(db.String(64), nullable=False, index=True, comment='表名')
+    pk = db.Column(db.String(64), nullable=False, comment='主键（复合主键以逗号分隔）')
+    operation = db.Column(db.String(10), nullable=False, comment='操作(insert/update/delete)')
+    changed_columns = db.Column(db.Text, comment='修改的字段（逗号分隔，仅 update）')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='记录时间')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'table': self.table_name,
+            'pk': self.pk,
+            'operation': self.operation,
+            'changed_columns': self.changed_columns.split(',') if self.changed_columns else [],
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
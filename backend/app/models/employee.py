@@ -25,6 +25,7 @@ class Employee(db.Model):
     employment_status = db.Column(db.String(20), default='active', nullable=False)
     employee_type = db.Column(db.String(20), default='regular', nullable=False)  # 添加员工类型字段：实习生(intern)、试用期(probation)、正式(regular)
     photo_url = db.Column(db.String(255))
+    photo_hash = db.Column(db.String(64), comment='照片内容哈希(media_files)')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -71,6 +72,10 @@ class Employee(db.Model):
             'employee_type': self.employee_type,
             'employment_status': self.employment_status,
             'photo_url': self.photo_url,
+            'photo_thumbnails': {
+                variant: f'/api/media/{self.photo_hash}/{variant}'
+                for variant in ('avatar', 'list', 'detail')
+            } if self.photo_hash else None,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
@@ -138,6 +143,8 @@ class ContractAttachment(db.Model):
     file_name = db.Column(db.String(255), nullable=False)
     file_url = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(50))
+    content_hash = db.Column(db.String(64), index=True, comment='文件内容哈希(media_files)')
+    file_size = db.Column(db.Integer, comment='文件大小(字节)')
     upload_time = db.Column(db.DateTime, default=datetime.utcnow)
     
     employee = db.relationship('Employee', back_populates='contract_attachments')
@@ -149,6 +156,8 @@ class ContractAttachment(db.Model):
             'file_name': self.file_name,
             'file_url': self.file_url,
             'file_type': self.file_type,
+            'file_size': self.file_size,
+            'thumbnail_url': f'/api/employees/contracts/{self.id}/thumbnail' if (self.file_type or '').lower() == 'pdf' else None,
             'upload_time': self.upload_time.strftime('%Y-%m-%d %H:%M:%S')
         }
 
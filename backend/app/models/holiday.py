@@ -2,7 +2,7 @@
 假期管理相关模型
 """
 from datetime import datetime
-from app.extensions import db
+from app import db
 
 class HolidayType(db.Model):
     """假期类型模型"""
@@ -14,6 +14,7 @@ class HolidayType(db.Model):
     annual_quota = db.Column(db.Float, nullable=True, comment='年度配额（天）')
     min_duration = db.Column(db.Float, nullable=True, comment='最小请假时长（天）')
     max_duration = db.Column(db.Float, nullable=True, comment='最大请假时长（天）')
+    max_carry_over = db.Column(db.Float, nullable=True, comment='可结转到下一年的最大天数（为空表示不结转）')
     requires_proof = db.Column(db.Boolean, default=False, comment='是否需要证明材料')
     description = db.Column(db.String(200), nullable=True, comment='描述')
     is_active = db.Column(db.Boolean, default=True, comment='是否启用')
@@ -36,6 +37,7 @@ class HolidayType(db.Model):
             'annual_quota': self.annual_quota,
             'min_duration': self.min_duration,
             'max_duration': self.max_duration,
+            'max_carry_over': self.max_carry_over,
             'requires_proof': self.requires_proof,
             'description': self.description,
             'is_active': self.is_active,
@@ -46,12 +48,17 @@ class HolidayType(db.Model):
 class HolidayRequest(db.Model):
     """假期申请模型"""
     __tablename__ = 'holiday_requests'
+    __table_args__ = (
+        db.Index('ix_holiday_requests_employee_period', 'employee_id', 'start_date', 'end_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
     holiday_type_id = db.Column(db.Integer, db.ForeignKey('holiday_types.id'), nullable=False)
     start_date = db.Column(db.Date, nullable=False, comment='开始日期')
     end_date = db.Column(db.Date, nullable=False, comment='结束日期')
+    start_period = db.Column(db.String(10), nullable=False, default='full', server_default='full', comment='开始日时段：full-全天，pm-下午开始')
+    end_period = db.Column(db.String(10), nullable=False, default='full', server_default='full', comment='结束日时段：full-全天，am-上午结束')
     duration = db.Column(db.Float, nullable=False, comment='请假天数')
     reason = db.Column(db.String(500), nullable=False, comment='请假原因')
     proof_url = db.Column(db.String(255), nullable=True, comment='证明材料URL')
@@ -66,6 +73,7 @@ class HolidayRequest(db.Model):
     employee = db.relationship('Employee', foreign_keys=[employee_id], backref=db.backref('holiday_requests', lazy='dynamic'))
     holiday_type = db.relationship('HolidayType', back_populates='holiday_requests')
     approver = db.relationship('Employee', foreign_keys=[approver_id], backref=db.backref('approved_holiday_requests', lazy='dynamic'))
+    charges = db.relationship('HolidayRequestCharge', back_populates='holiday_request', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<HolidayRequest {self.employee.name} - {self.holiday_type.name}>'
@@ -78,6 +86,8 @@ class HolidayRequest(db.Model):
             'holiday_type': self.holiday_type.to_dict() if self.holiday_type else None,
             'start_date': self.start_date.isoformat() if self.start_date else None,
             'end_date': self.end_date.isoformat() if self.end_date else None,
+            'start_period': self.start_period,
+            'end_period': self.end_period,
             'duration': self.duration,
             'reason': self.reason,
             'proof_url': self.proof_url,
@@ -92,6 +102,9 @@ class HolidayRequest(db.Model):
 class HolidayBalance(db.Model):
     """假期余额模型"""
     __tablename__ = 'holiday_balances'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'holiday_type_id', 'year', name='uq_holiday_balance_employee_type_year'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
@@ -100,6 +113,7 @@ class HolidayBalance(db.Model):
     total_days = db.Column(db.Float, nullable=False, default=0, comment='总天数')
     used_days = db.Column(db.Float, nullable=False, default=0, comment='已使用天数')
     remaining_days = db.Column(db.Float, nullable=False, default=0, comment='剩余天数')
+    carried_over_days = db.Column(db.Float, nullable=False, default=0, comment='上一年结转天数（已计入总天数）')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -120,6 +134,48 @@ class HolidayBalance(db.Model):
             'total_days': self.total_days,
             'used_days': self.used_days,
             'remaining_days': self.remaining_days,
+            'carried_over_days': self.carried_over_days,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class HolidayRequestCharge(db.Model):
+    """假期申请批准时按年度实际扣减的余额（取消时按此退回）"""
+    __tablename__ = 'holiday_request_charges'
+
+    id = db.Column(db.Integer, primary_key=True)
+    holiday_request_id = db.Column(db.Integer, db.ForeignKey('holiday_requests.id', ondelete='CASCADE'), nullable=False, index=True, comment='假期申请ID')
+    holiday_balance_id = db.Column(db.Integer, db.ForeignKey('holiday_balances.id'), nullable=False, comment='扣减的余额ID')
+    days = db.Column(db.Float, nullable=False, comment='扣减天数')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # 关联关系
+    holiday_request = db.relationship('HolidayRequest', back_populates='charges')
+    holiday_balance = db.relationship('HolidayBalance')
+
+    def __repr__(self):
+        return f'<HolidayRequestCharge {self.holiday_request_id} - {self.days}>'
+
+class HolidayAccrualRun(db.Model):
+    """假期余额年度发放记录（每次批量发放的数量和耗时）"""
+    __tablename__ = 'holiday_accrual_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False, index=True, comment='发放年份')
+    created_count = db.Column(db.Integer, nullable=False, default=0, comment='新生成的余额记录数')
+    existing_count = db.Column(db.Integer, nullable=False, default=0, comment='已存在而跳过的余额记录数')
+    elapsed_ms = db.Column(db.Integer, nullable=False, default=0, comment='耗时（毫秒）')
+    rows_per_second = db.Column(db.Float, nullable=False, default=0, comment='吞吐量（条/秒）')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'year': self.year,
+            'created_count': self.created_count,
+            'existing_count': self.existing_count,
+            'elapsed_ms': self.elapsed_ms,
+            'rows_per_second': self.rows_per_second,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -5,6 +5,7 @@
 from app import db
 from datetime import datetime
 from sqlalchemy import ForeignKey
+from sqlalchemy.orm import joinedload
 
 class InternStatus(db.Model):
     """实习状态表 - 用于跟踪员工的实习和转正状态"""
@@ -111,3 +112,22 @@ class InternEvaluation(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
         }
+
+# 预加载方案：按接口序列化时用到的关联一次性加载（多对一关联使用 JOIN），
+# 列表页的查询次数与每页条数无关
+LOAD_PROFILES = {
+    'intern_status': (
+        joinedload(InternStatus.employee),
+        joinedload(InternStatus.mentor),
+        joinedload(InternStatus.department),
+        joinedload(InternStatus.position)
+    ),
+    'intern_evaluation': (
+        joinedload(InternEvaluation.evaluator),
+        joinedload(InternEvaluation.recommended_position)
+    )
+}
+
+def load_profile(name):
+    """获取指定预加载方案的查询选项"""
+    return LOAD_PROFILES[name]
@@ -0,0 +1,43 @@
+"""
+媒体文件模型
+上传的图片按内容哈希存储，原图和各尺寸缩略图各占一行
+"""
+from app import db
+from datetime import datetime
+
+class MediaFile(db.Model):
+    """媒体文件表 - 按内容哈希存储的原图及缩略图"""
+    __tablename__ = 'media_files'
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'variant', name='uq_media_hash_variant'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True, comment='原文件SHA-256哈希')
+    variant = db.Column(db.String(20), nullable=False, default='original', comment='规格(original/avatar/list/detail)')
+    file_path = db.Column(db.String(255), nullable=False, comment='相对上传目录的存储路径')
+    mime_type = db.Column(db.String(50), nullable=False, comment='MIME类型')
+    file_size = db.Column(db.Integer, nullable=False, comment='文件大小(字节)')
+    etag = db.Column(db.String(100), nullable=False, comment='预先计算的ETag')
+    width = db.Column(db.Integer, comment='图片宽度')
+    height = db.Column(db.Integer, comment='图片高度')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def url(self):
+        """访问地址"""
+        return f'/api/media/{self.content_hash}/{self.variant}'
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'variant': self.variant,
+            'url': self.url,
+            'mime_type': self.mime_type,
+            'file_size': self.file_size,
+            'width': self.width,
+            'height': self.height,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
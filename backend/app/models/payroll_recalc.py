@@ -0,0 +1,34 @@
+"""
+薪资重算标记模型
+工资结构、结构分配、加班或请假变更时，记录受影响的（员工, 月份），
+由后台任务合并后只重算这些待发放的工资记录
+"""
+from app import db
+from datetime import datetime
+
+class PayrollRecalcMark(db.Model):
+    """薪资待重算标记表"""
+    __tablename__ = 'payroll_recalc_marks'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'year', 'month', name='uq_payroll_recalc_employee_month'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, comment='员工ID')
+    year = db.Column(db.Integer, nullable=False, comment='年份')
+    month = db.Column(db.Integer, nullable=False, comment='月份')
+    reason = db.Column(db.String(50), comment='最近一次触发重算的变更(表名)')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='最近一次标记时间，用于防抖')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'year': self.year,
+            'month': self.month,
+            'reason': self.reason,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
+        }
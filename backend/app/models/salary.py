@@ -54,10 +54,16 @@ class SalaryRecord(db.Model):
     overtime_pay = db.Column(db.Numeric(10, 2), default=0, comment='加班费')
     bonus = db.Column(db.Numeric(10, 2), default=0, comment='奖金')
     deductions = db.Column(db.Numeric(10, 2), default=0, comment='扣除项(请假等)')
+    # 手工修改加班费/扣除项时记录与考勤计算值的差额，按考勤重算后仍叠加保留
+    overtime_adjustment = db.Column(db.Numeric(10, 2), nullable=False, default=0, server_default='0', comment='加班费手工调整(叠加在考勤计算值之上)')
+    deduction_adjustment = db.Column(db.Numeric(10, 2), nullable=False, default=0, server_default='0', comment='扣除项手工调整(叠加在考勤计算值之上)')
+    social_insurance = db.Column(db.Numeric(10, 2), default=0, comment='社保公积金个人缴纳部分(税前扣除)')
+    special_deduction = db.Column(db.Numeric(10, 2), default=0, comment='专项附加扣除(仅用于计税)')
     gross_salary = db.Column(db.Numeric(10, 2), nullable=False, comment='应发总额')
     tax = db.Column(db.Numeric(10, 2), default=0, comment='个人所得税')
     net_salary = db.Column(db.Numeric(10, 2), nullable=False, comment='实发工资')
-    payment_status = db.Column(db.String(20), default='pending', comment='发放状态(pending/paid)')
+    salary_structure_id = db.Column(db.Integer, db.ForeignKey('salary_structures.id'), comment='计算时使用的工资结构ID')
+    payment_status = db.Column(db.String(20), default='pending', comment='发放状态(pending/approved/paid)')
     payment_date = db.Column(db.DateTime, comment='发放日期')
     remark = db.Column(db.String(1000), comment='备注')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -65,11 +71,21 @@ class SalaryRecord(db.Model):
     
     # 关系
     employee = db.relationship('Employee', backref=db.backref('salary_records', lazy='dynamic'))
+    salary_structure = db.relationship('SalaryStructure')
+    components = db.relationship(
+        'SalaryRecordComponent',
+        backref='salary_record',
+        cascade='all, delete-orphan',
+        order_by='SalaryRecordComponent.id'
+    )
 
-    def to_dict(self):
+    def to_dict(self, include_components=False):
         """
         转换工资记录为字典格式
         
+        参数:
+            include_components: 是否包含计算明细（列表接口按需返回）
+        
         返回:
             dict: 包含以下字段的字典:
                 - id: 工资记录ID
@@ -83,12 +99,18 @@ class SalaryRecord(db.Model):
                 - overtime_pay: 加班费
                 - bonus: 奖金
                 - deductions: 扣除
+                - overtime_adjustment: 加班费手工调整（已包含在加班费中）
+                - deduction_adjustment: 扣除项手工调整（已包含在扣除中）
+                - social_insurance: 社保公积金个人缴纳部分
+                - special_deduction: 专项附加扣除
                 - gross_salary: 应发总额
                 - tax: 个人所得税
                 - net_salary: 实发工资
                 - payment_status: 发放状态
                 - payment_date: 发放日期
                 - remark: 备注
+                - salary_structure_id: 计算时使用的工资结构ID
+                - components: 计算明细（仅 include_components=True 时返回）
                 - created_at: 创建时间
                 - updated_at: 更新时间
         """
@@ -99,7 +121,7 @@ class SalaryRecord(db.Model):
             'position': self.employee.position.name if self.employee and self.employee.position else None
         }
         
-        return {
+        result = {
             'id': self.id,
             'employee_id': self.employee_id,
             'employee_name': employee_info['name'],  # 直接提供员工姓名
@@ -113,12 +135,71 @@ class SalaryRecord(db.Model):
             'overtime_pay': float(self.overtime_pay),
             'bonus': float(self.bonus),
             'deductions': float(self.deductions),
+            'overtime_adjustment': float(self.overtime_adjustment or 0),
+            'deduction_adjustment': float(self.deduction_adjustment or 0),
+            'social_insurance': float(self.social_insurance or 0),
+            'special_deduction': float(self.special_deduction or 0),
             'gross_salary': float(self.gross_salary),
             'tax': float(self.tax),
             'net_salary': float(self.net_salary),
             'payment_status': self.payment_status,
             'payment_date': self.payment_date.strftime('%Y-%m-%d %H:%M:%S') if self.payment_date else None,
             'remark': self.remark,
+            'salary_structure_id': self.salary_structure_id,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
+        if include_components:
+            result['components'] = [component.to_dict() for component in self.components]
+        return result
+
+# 工资发放状态流转：操作 -> (允许的当前状态, 目标状态)
+PAYMENT_TRANSITIONS = {
+    'approve': (('pending',), 'approved'),     # 审核
+    'pay': (('pending', 'approved'), 'paid'),  # 发放（可跳过审核直接发放）
+    'revoke': (('approved',), 'pending')       # 撤回审核
+}
+
+# 工资明细项目：代码 -> (名称, 类别)，类别为 earning(应发)/deduction(扣除)/tax(个税)
+SALARY_COMPONENT_TYPES = {
+    'basic_salary': ('基本工资', 'earning'),
+    'housing_allowance': ('住房补贴', 'earning'),
+    'transport_allowance': ('交通补贴', 'earning'),
+    'meal_allowance': ('餐饮补贴', 'earning'),
+    'allowances': ('补贴', 'earning'),
+    'overtime': ('加班费', 'earning'),
+    'overtime_weekday': ('工作日加班费', 'earning'),
+    'overtime_weekend': ('周末加班费', 'earning'),
+    'overtime_holiday': ('节假日加班费', 'earning'),
+    'overtime_adjustment': ('加班费调整', 'earning'),
+    'bonus': ('奖金', 'earning'),
+    'leave_deduction': ('无薪假扣款', 'deduction'),
+    'absence_deduction': ('缺勤扣款', 'deduction'),
+    'other_deduction': ('其他扣除', 'deduction'),
+    'deduction_adjustment': ('扣款调整', 'deduction'),
+    'social_insurance': ('社保公积金', 'deduction'),
+    'tax': ('个人所得税', 'tax')
+}
+
+class SalaryRecordComponent(db.Model):
+    """工资计算明细表 - 每条工资记录的各项收入和扣除"""
+    __tablename__ = 'salary_record_components'
+
+    id = db.Column(db.Integer, primary_key=True)
+    salary_record_id = db.Column(db.Integer, db.ForeignKey('salary_records.id', ondelete='CASCADE'), nullable=False, index=True, comment='工资记录ID')
+    code = db.Column(db.String(30), nullable=False, comment='项目代码')
+    amount = db.Column(db.Numeric(10, 2), nullable=False, comment='金额')
+    quantity = db.Column(db.Float, comment='数量(加班小时/请假天数)')
+    rate = db.Column(db.Float, comment='倍率')
+
+    def to_dict(self):
+        """转换为字典"""
+        label, kind = SALARY_COMPONENT_TYPES.get(self.code, (self.code, 'earning'))
+        return {
+            'code': self.code,
+            'name': label,
+            'kind': kind,
+            'amount': float(self.amount),
+            'quantity': self.quantity,
+            'rate': self.rate
+        }
@@ -0,0 +1,42 @@
+"""
+个税累计状态模型
+每位员工每年一条，记录已发放月份的累计收入、累计扣除和累计已预扣税额，
+按累计预扣法计算当月个税时直接读取，无需扫描历史工资记录
+"""
+from app import db
+from datetime import datetime
+
+class TaxYtdState(db.Model):
+    """个税年度累计状态表"""
+    __tablename__ = 'tax_ytd_states'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'year', name='uq_tax_ytd_employee_year'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, comment='员工ID')
+    year = db.Column(db.Integer, nullable=False, comment='年份')
+    months = db.Column(db.Integer, nullable=False, default=0, comment='已发放月份数(累计减除费用按此计算)')
+    last_month = db.Column(db.Integer, nullable=False, default=0, comment='最近一个已发放月份')
+    income = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='累计收入(应发总额-扣除项)')
+    deductions = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='累计专项扣除和专项附加扣除')
+    taxable_income = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='累计应纳税所得额')
+    tax_withheld = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='累计已预扣税额')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    employee = db.relationship('Employee')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'year': self.year,
+            'months': self.months,
+            'last_month': self.last_month,
+            'income': float(self.income),
+            'deductions': float(self.deductions),
+            'taxable_income': float(self.taxable_income),
+            'tax_withheld': float(self.tax_withheld),
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
+        }
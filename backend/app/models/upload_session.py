@@ -0,0 +1,39 @@
+"""
+分片上传会话模型
+记录断点续传的上传进度，分片直接写入磁盘临时文件
+"""
+from app import db
+from datetime import datetime
+
+class UploadSession(db.Model):
+    """分片上传会话表"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True, comment='上传会话ID')
+    upload_type = db.Column(db.String(20), nullable=False, comment='上传类型(contract/photo)')
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False, comment='员工ID')
+    file_name = db.Column(db.String(255), nullable=False, comment='原始文件名')
+    total_size = db.Column(db.BigInteger, nullable=False, comment='文件总大小(字节)')
+    received_size = db.Column(db.BigInteger, nullable=False, default=0, comment='已接收大小(字节)')
+    checksum = db.Column(db.String(64), comment='客户端提供的SHA-256校验值')
+    status = db.Column(db.String(20), nullable=False, default='uploading', comment='状态(uploading/completed/aborted)')
+    result_id = db.Column(db.Integer, comment='完成后生成的记录ID(合同附件ID/员工ID)')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    employee = db.relationship('Employee')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'upload_id': self.id,
+            'upload_type': self.upload_type,
+            'employee_id': self.employee_id,
+            'file_name': self.file_name,
+            'total_size': self.total_size,
+            'received_size': self.received_size,
+            'status': self.status,
+            'result_id': self.result_id,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
+        }
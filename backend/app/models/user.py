@@ -1,6 +1,5 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
     """用户表 - 存储系统用户信息"""
@@ -33,12 +32,14 @@ class User(db.Model):
     account_locked_until = db.Column(db.DateTime, comment='账户锁定截止时间')
 
     def set_password(self, password):
-        """设置密码"""
-        self.password = generate_password_hash(password)
+        """设置密码（按 PASSWORD_HASH_METHOD 配置的算法和代价）"""
+        from app.services.password_service import PasswordService
+        self.password = PasswordService.hash(password)
 
     def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password, password)
+        """验证密码（在密码校验线程池中执行，排队已满时抛出 PasswordBusyError）"""
+        from app.services.password_service import PasswordService
+        return PasswordService.verify(self.password, password)
 
     @property
     def is_admin(self):
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from app.services.auth_service import AuthService
+from app.services.password_service import PasswordBusyError
 from app.models import User, Employee
 
 # 创建认证蓝图
@@ -96,6 +97,13 @@ def login():
                 'user': user_info
             }
         })
+    except PasswordBusyError as e:
+        # 密码校验排队已满时返回 503，客户端可稍后重试
+        return jsonify({
+            'code': 503,
+            'message': str(e),
+            'data': None
+        }), 503
     except Exception as e:
         print(f"登录错误: {str(e)}")
         return jsonify({
@@ -1,8 +1,7 @@
 from flask import Blueprint, request, jsonify
+from app import db
 from app.services.leave_service import LeaveService
-from app.utils.auth import login_required
-from flask_jwt_extended import get_jwt_identity
-from app.models import User
+from app.utils.auth import login_required, get_current_principal
 
 # 创建蓝图
 leave_bp = Blueprint('leave', __name__)
@@ -56,22 +55,27 @@ def get_leave(leave_id):
 def create_leave():
     """创建请假记录"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or not user.employee:
+        user = get_current_principal()
+        if not user or not user.employee_id:
             return jsonify({
                 'code': 400,
                 'message': '未找到员工信息'
             })
             
         data = request.get_json()
-        data['employee_id'] = user.employee.id
+        data['employee_id'] = user.employee_id
         leave = LeaveService.create_leave(data)
         return jsonify({
             'code': 200,
             'message': '创建请假记录成功',
             'data': leave.to_dict()
         })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        })
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -83,8 +87,7 @@ def create_leave():
 def update_leave(leave_id):
     """更新请假记录"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_principal()
         if not user:
             return jsonify({
                 'code': 401,
@@ -101,7 +104,7 @@ def update_leave(leave_id):
             })
             
         # 只允许本人或管理员修改
-        if leave.employee_id != user.employee.id and user.role != 'admin':
+        if leave.employee_id != user.employee_id and user.role != 'admin':
             return jsonify({
                 'code': 403,
                 'message': '无权修改此请假记录'
@@ -113,6 +116,12 @@ def update_leave(leave_id):
             'message': '更新请假记录成功',
             'data': leave.to_dict()
         })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'code': 400,
+            'message': str(e)
+        })
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -124,8 +133,7 @@ def update_leave(leave_id):
 def delete_leave(leave_id):
     """删除请假记录"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_principal()
         if not user:
             return jsonify({
                 'code': 401,
@@ -141,7 +149,7 @@ def delete_leave(leave_id):
             })
             
         # 只允许本人或管理员删除
-        if leave.employee_id != user.employee.id and user.role != 'admin':
+        if leave.employee_id != user.employee_id and user.role != 'admin':
             return jsonify({
                 'code': 403,
                 'message': '无权删除此请假记录'
@@ -168,8 +176,7 @@ def delete_leave(leave_id):
 def approve_leave(leave_id):
     """审批请假申请"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_principal()
         if not user:
             return jsonify({
                 'code': 401,
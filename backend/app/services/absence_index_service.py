@@ -0,0 +1,220 @@
+"""
+请假/加班/假期申请冲突索引服务模块
+把待审批和已批准的请假（Leave）、加班（Overtime）、假期申请（HolidayRequest）
+统一为员工的时间区间（半开区间 [开始, 结束)，按天的假期申请覆盖整天）：
+    - 冲突校验：按员工查询三张表的（员工, 开始, 结束）复合索引，以数据库为准，多进程下也不会漏判
+    - “谁不在岗”：今天前后 ABSENCE_INDEX_WINDOW_DAYS 天内的区间构建为内存区间索引，查询耗时与命中数量相关，
+      超出该范围的查询直接查数据库；本进程提交相关变更后立即失效，
+      其他进程的变更在 ABSENCE_INDEX_CACHE_TTL 秒内生效
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from flask import current_app
+from app import db
+from app.models.attendance import Leave, Overtime
+from app.models.holiday import HolidayRequest, HolidayType
+from app.services.change_capture_service import ChangeCaptureService
+from app.utils.interval_index import IntervalIndex
+
+# 参与冲突校验和不在岗统计的状态
+ACTIVE_STATUSES = ('pending', 'approved')
+
+ABSENCE_KINDS = ('leave', 'overtime', 'holiday')
+
+KIND_LABELS = {'leave': '请假', 'overtime': '加班', 'holiday': '假期申请'}
+
+def _as_datetime(value, end: bool = False) -> datetime:
+    """日期转换为区间边界：开始为当天 0 点，结束为次日 0 点"""
+    if isinstance(value, datetime):
+        return value
+    if end:
+        value = value + timedelta(days=1)
+    return datetime.combine(value, datetime.min.time())
+
+class Absence:
+    """员工的一段请假/加班/假期申请区间"""
+
+    __slots__ = ('kind', 'id', 'employee_id', 'start', 'end', 'status', 'type')
+
+    def __init__(self, kind: str, id: int, employee_id: int, start, end, status: str, type: Optional[str] = None):
+        self.kind = kind
+        self.id = id
+        self.employee_id = employee_id
+        self.start = _as_datetime(start)
+        self.end = _as_datetime(end, end=True)
+        self.status = status
+        self.type = type
+
+    def describe(self) -> str:
+        if self.kind == 'holiday':
+            last_day = self.end - timedelta(days=1)
+            return f"{KIND_LABELS[self.kind]}（{self.start.strftime('%Y-%m-%d')} 至 {last_day.strftime('%Y-%m-%d')}）"
+        return f"{KIND_LABELS[self.kind]}（{self.start.strftime('%Y-%m-%d %H:%M')} 至 {self.end.strftime('%Y-%m-%d %H:%M')}）"
+
+    def to_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'start': self.start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': self.end.strftime('%Y-%m-%d %H:%M:%S'),
+            'status': self.status,
+            'type': self.type
+        }
+
+class AbsenceIndexService:
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """订阅数据变更：本进程提交相关变更后使内存索引失效"""
+        ChangeCaptureService.subscribe(
+            AbsenceIndexService._on_change,
+            [Leave.__tablename__, Overtime.__tablename__, HolidayRequest.__tablename__],
+            sync=True
+        )
+
+    @staticmethod
+    def _on_change(changes) -> None:
+        AbsenceIndexService.invalidate()
+
+    # ---------- 数据库查询 ----------
+
+    @staticmethod
+    def _query(start: datetime, end: datetime, employee_ids: Optional[Iterable[int]] = None,
+               statuses: Iterable[str] = ACTIVE_STATUSES) -> List[Absence]:
+        """查询与 [start, end) 重叠的三类区间，指定员工时走（员工, 开始, 结束）复合索引"""
+        statuses = list(statuses)
+        employee_ids = None if employee_ids is None else list(employee_ids)
+
+        def scoped(query, model):
+            query = query.filter(model.status.in_(statuses))
+            if employee_ids is not None:
+                query = query.filter(model.employee_id.in_(employee_ids))
+            return query
+
+        absences = []
+        leaves = scoped(db.session.query(
+            Leave.id, Leave.employee_id, Leave.start_date, Leave.end_date, Leave.status, Leave.leave_type
+        ), Leave).filter(Leave.start_date < end, Leave.end_date > start)
+        absences.extend(Absence('leave', *row) for row in leaves)
+
+        overtimes = scoped(db.session.query(
+            Overtime.id, Overtime.employee_id, Overtime.start_time, Overtime.end_time, Overtime.status
+        ), Overtime).filter(Overtime.start_time < end, Overtime.end_time > start)
+        absences.extend(Absence('overtime', *row) for row in overtimes)
+
+        # 假期申请按天存储，结束日期当天整天计入
+        holidays = scoped(db.session.query(
+            HolidayRequest.id, HolidayRequest.employee_id, HolidayRequest.start_date, HolidayRequest.end_date,
+            HolidayRequest.status, HolidayType.code
+        ).join(HolidayType, HolidayRequest.holiday_type_id == HolidayType.id), HolidayRequest).filter(
+            HolidayRequest.start_date <= (end - timedelta(microseconds=1)).date(),
+            HolidayRequest.end_date >= start.date()
+        )
+        absences.extend(Absence('holiday', *row) for row in holidays)
+        return absences
+
+    @staticmethod
+    def find_conflicts(employee_id: int, start, end, exclude: Optional[Tuple[str, int]] = None) -> List[Absence]:
+        """
+        查找员工与 [start, end) 重叠的待审批/已批准的请假、加班和假期申请
+
+        参数：
+            employee_id: 员工ID
+            start, end: 日期或时间；日期表示整天（end 当天包含在内）
+            exclude: (类型, ID)，修改记录时排除自身
+
+        返回：
+            按开始时间排序的冲突区间列表
+        """
+        start, end = _as_datetime(start), _as_datetime(end, end=True)
+        conflicts = [
+            absence for absence in AbsenceIndexService._query(start, end, [employee_id])
+            if exclude is None or (absence.kind, absence.id) != tuple(exclude)
+        ]
+        return sorted(conflicts, key=lambda absence: absence.start)
+
+    @staticmethod
+    def check_conflicts(employee_id: int, start, end, exclude: Optional[Tuple[str, int]] = None) -> None:
+        """
+        校验员工在 [start, end) 没有其他待审批/已批准的请假、加班或假期申请
+
+        异常：
+            ValueError: 存在冲突时抛出，消息中包含第一条冲突
+        """
+        conflicts = AbsenceIndexService.find_conflicts(employee_id, start, end, exclude)
+        if conflicts:
+            raise ValueError(f'与已有{conflicts[0].describe()}冲突')
+
+    # ---------- 内存区间索引 ----------
+
+    @staticmethod
+    def invalidate() -> None:
+        """清除内存区间索引"""
+        with AbsenceIndexService._lock:
+            current_app.extensions.pop('absence_index', None)
+
+    @staticmethod
+    def index_window() -> Tuple[datetime, datetime]:
+        """内存区间索引覆盖的时间范围 [开始, 结束)"""
+        days = current_app.config['ABSENCE_INDEX_WINDOW_DAYS']
+        today = date.today()
+        return _as_datetime(today - timedelta(days=days)), _as_datetime(today + timedelta(days=days), end=True)
+
+    @staticmethod
+    def get_index() -> Tuple[datetime, datetime, IntervalIndex]:
+        """
+        获取索引范围内待审批/已批准区间的内存索引（缓存 ABSENCE_INDEX_CACHE_TTL 秒）
+
+        返回：
+            (范围开始, 范围结束, 区间索引)
+        """
+        with AbsenceIndexService._lock:
+            entry = current_app.extensions.get('absence_index')
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        window_start, window_end = AbsenceIndexService.index_window()
+        absences = AbsenceIndexService._query(window_start, window_end)
+        index = IntervalIndex((absence.start, absence.end, absence) for absence in absences)
+        entry = (window_start, window_end, index)
+        with AbsenceIndexService._lock:
+            current_app.extensions['absence_index'] = (
+                time.monotonic() + current_app.config['ABSENCE_INDEX_CACHE_TTL'], entry
+            )
+        return entry
+
+    @staticmethod
+    def who_is_out(start, end, employee_ids: Optional[Iterable[int]] = None,
+                   kinds: Iterable[str] = ('leave', 'holiday'), statuses: Iterable[str] = ACTIVE_STATUSES) -> List[Absence]:
+        """
+        查询 [start, end) 内不在岗（请假/假期申请）的区间
+
+        参数：
+            start, end: 日期或时间；日期表示整天（end 当天包含在内）
+            employee_ids: 限定员工范围（如某个部门的员工）
+            kinds: 统计的区间类型，默认不含加班
+            statuses: 统计的状态，默认待审批和已批准
+        """
+        start, end = _as_datetime(start), _as_datetime(end, end=True)
+        kinds, statuses = set(kinds), set(statuses)
+        employee_ids = None if employee_ids is None else set(employee_ids)
+
+        candidates = None
+        window_start, window_end = AbsenceIndexService.index_window()
+        if start >= window_start and end <= window_end and statuses <= set(ACTIVE_STATUSES):
+            window_start, window_end, index = AbsenceIndexService.get_index()
+            # 跨日后缓存的索引范围可能与当前范围略有偏差
+            if start >= window_start and end <= window_end:
+                candidates = index.overlapping(start, end)
+        if candidates is None:
+            # 超出索引范围或查询其他状态时直接查数据库
+            candidates = AbsenceIndexService._query(start, end, employee_ids, statuses)
+        return [
+            absence for absence in candidates
+            if absence.kind in kinds and absence.status in statuses
+            and (employee_ids is None or absence.employee_id in employee_ids)
+        ]
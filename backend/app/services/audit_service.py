@@ -0,0 +1,334 @@
+"""
+审计日志服务模块
+    - after_flush：对 AUDIT_TABLES 中的表，记录新增、修改、删除对象的字段变更前后值（排除 AUDIT_EXCLUDED_COLUMNS）
+    - after_commit：提交成功的审计记录放入内存缓冲区，不在请求线程中写库
+    - 后台线程每 AUDIT_FLUSH_INTERVAL 秒，或缓冲区达到 AUDIT_BATCH_SIZE 条时，用一条批量 INSERT 写入 audit_logs；
+      写入失败时放回缓冲区重试，缓冲区超过 AUDIT_BUFFER_MAX_ROWS 条时丢弃最早的记录并记录警告
+    - 批量 INSERT/UPDATE/DELETE 语句不经过会话对象，由调用方通过 record 记录
+    - 查询前先写入缓冲区，按（实体, 实体ID, 时间）索引和月份分区检索
+修改前的值取自已加载的属性：对象提交后过期、未重新加载就直接修改时，变更前的值记为 null。
+进程异常退出时缓冲区中未写入的记录会丢失（正常退出时会写入）。
+"""
+
+import atexit
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, inspect, text
+from app import db
+from app.models.audit_log import AuditLog
+from app.utils.session_state import pop_committed, track
+
+def _json_value(value):
+    """字段值转换为可序列化的 JSON 值"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return None
+    return value
+
+def _month(value: datetime) -> int:
+    return value.year * 100 + value.month
+
+class AuditBuffer:
+    """审计记录内存缓冲区和后台写入线程（每个应用一个）"""
+
+    def __init__(self, app):
+        self.app = app
+        self.rows: List[Dict] = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.written = 0
+
+    def _trim(self) -> int:
+        """缓冲区超过上限时丢弃最早的记录（调用方持有锁），返回丢弃条数"""
+        dropped = len(self.rows) - self.app.config['AUDIT_BUFFER_MAX_ROWS']
+        if dropped <= 0:
+            return 0
+        del self.rows[:dropped]
+        return dropped
+
+    def _warn_dropped(self, dropped: int) -> None:
+        if dropped:
+            self.app.logger.warning(f'审计日志缓冲区已满，丢弃最早的 {dropped} 条记录')
+
+    def append(self, rows: List[Dict]) -> None:
+        with self.lock:
+            self.rows.extend(rows)
+            dropped = self._trim()
+            size = len(self.rows)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self.thread.start()
+        self._warn_dropped(dropped)
+        if size >= self.app.config['AUDIT_BATCH_SIZE']:
+            self.wakeup.set()
+
+    def flush(self) -> int:
+        """把缓冲区写入数据库（独立连接和事务），返回写入条数"""
+        with self.lock:
+            rows, self.rows = self.rows, []
+        if not rows:
+            return 0
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(AuditLog.__table__.insert(), rows)
+        except Exception as e:
+            # 写入失败时放回缓冲区，下次重试（不超过缓冲区上限）
+            with self.lock:
+                self.rows[:0] = rows
+                dropped = self._trim()
+            self.app.logger.error(f'写入审计日志失败: {str(e)}')
+            self._warn_dropped(dropped)
+            return 0
+        self.written += len(rows)
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.app.config['AUDIT_FLUSH_INTERVAL'])
+            self.wakeup.clear()
+            self.flush()
+
+class AuditService:
+    @staticmethod
+    def init_app(app) -> None:
+        """注册会话事件监听，创建应用的审计缓冲区"""
+        buffer = AuditBuffer(app)
+        app.extensions['audit_buffer'] = buffer
+        atexit.register(buffer.flush)
+        if not event.contains(db.session, 'after_flush', AuditService._after_flush):
+            event.listen(db.session, 'after_flush', AuditService._after_flush)
+            event.listen(db.session, 'after_commit', AuditService._after_commit)
+        track('audit_rows')
+
+    @staticmethod
+    def buffer() -> AuditBuffer:
+        return current_app.extensions['audit_buffer']
+
+    # ---------- 变更捕获 ----------
+
+    @staticmethod
+    def _actor() -> Optional[int]:
+        """当前请求的操作用户ID"""
+        if not has_request_context():
+            return None
+        principal = g.get('principal')
+        if principal is not None:
+            return principal.id
+        try:
+            from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+            return int(identity) if identity is not None else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def _diff(state, action: str, excluded: set) -> Dict:
+        """字段变更：{字段: [变更前, 变更后]}"""
+        changes = {}
+        for attr in state.mapper.column_attrs:
+            key = attr.key
+            if key in excluded:
+                continue
+            # 只读取已加载的值，不触发额外查询
+            if action == 'insert':
+                value = state.dict.get(key)
+                if value is not None:
+                    changes[key] = [None, _json_value(value)]
+                continue
+            if action == 'delete':
+                value = state.committed_state.get(key, state.dict.get(key))
+                if value is not None:
+                    changes[key] = [_json_value(value), None]
+                continue
+            history = state.attrs[key].history
+            if history.has_changes():
+                before = history.deleted[0] if history.deleted else None
+                after = history.added[0] if history.added else None
+                if before != after:
+                    changes[key] = [_json_value(before), _json_value(after)]
+        return changes
+
+    @staticmethod
+    def _row(table: str, identity: Iterable, action: str, changes: Dict, actor: Optional[int], now: datetime) -> Dict:
+        return {
+            'partition_month': _month(now),
+            'entity': table,
+            'entity_id': ','.join(str(value) for value in identity),
+            'action': action,
+            'changes': json.dumps(changes, ensure_ascii=False, separators=(',', ':')),
+            'user_id': actor,
+            'created_at': now
+        }
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        config = current_app.config
+        if not config['AUDIT_ENABLED']:
+            return
+        tables = set(config['AUDIT_TABLES'])
+        excluded = set(config['AUDIT_EXCLUDED_COLUMNS'])
+        now = datetime.utcnow()
+        actor = resolved = None
+        rows = []
+        for action, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for obj in objects:
+                state = inspect(obj)
+                table = state.mapper.local_table.name
+                if table not in tables:
+                    continue
+                changes = AuditService._diff(state, action, excluded)
+                if action == 'update' and not changes:
+                    continue
+                if not resolved:
+                    actor, resolved = AuditService._actor(), True
+                identity = state.identity or state.mapper.primary_key_from_instance(obj)
+                rows.append(AuditService._row(table, identity, action, changes, actor, now))
+        if rows:
+            session.info.setdefault('audit_rows', []).extend(rows)
+
+    @staticmethod
+    def snapshot(values: Mapping[str, Any], action: str) -> Dict:
+        """
+        新增或删除的整行记录转换为字段变更（只包含非空字段）
+
+        参数：
+            values: 字段值（字典或 Core 查询结果行的 _mapping）
+            action: insert（[None, 值]）或 delete（[值, None]）
+        """
+        if action == 'insert':
+            return {key: [None, value] for key, value in values.items() if value is not None}
+        return {key: [value, None] for key, value in values.items() if value is not None}
+
+    @staticmethod
+    def record(session, table: str, action: str, entries: Iterable[Tuple[Any, Dict]]) -> None:
+        """
+        手动记录批量语句产生的审计记录（与业务数据同一事务，提交后放入缓冲区）
+
+        参数：
+            table: 表名，不在 AUDIT_TABLES 中时忽略
+            action: insert/update/delete
+            entries: [(主键, {字段: [变更前, 变更后]})]，复合主键传元组
+        """
+        config = current_app.config
+        if not config['AUDIT_ENABLED'] or table not in config['AUDIT_TABLES']:
+            return
+        excluded = set(config['AUDIT_EXCLUDED_COLUMNS'])
+        now = datetime.utcnow()
+        actor = AuditService._actor()
+        rows = []
+        for pk, changes in entries:
+            changes = {key: [_json_value(before), _json_value(after)] for key, (before, after) in changes.items()
+                       if key not in excluded and before != after}
+            if action == 'update' and not changes:
+                continue
+            rows.append(AuditService._row(table, pk if isinstance(pk, tuple) else (pk,), action, changes, actor, now))
+        if rows:
+            session.info.setdefault('audit_rows', []).extend(rows)
+
+    @staticmethod
+    def _after_commit(session):
+        rows = pop_committed(session, 'audit_rows')
+        if rows:
+            AuditService.buffer().append(rows)
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def query(entity: Optional[str] = None, entity_id: Optional[str] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None, page: int = 1, per_page: int = 50):
+        """
+        按实体和时间范围查询审计日志（先写入缓冲区中的记录）
+
+        参数：
+            entity: 实体(表名)
+            entity_id: 实体主键，需同时指定 entity
+            start, end: 时间范围 [start, end)
+
+        返回：
+            分页对象，按时间倒序
+        """
+        AuditService.buffer().flush()
+        query = AuditLog.query
+        if entity:
+            query = query.filter(AuditLog.entity == entity)
+            if entity_id is not None:
+                query = query.filter(AuditLog.entity_id == str(entity_id))
+        if start:
+            # 分区字段条件用于 MySQL 分区裁剪
+            query = query.filter(AuditLog.created_at >= start, AuditLog.partition_month >= _month(start))
+        if end:
+            query = query.filter(AuditLog.created_at < end, AuditLog.partition_month <= _month(end))
+        return query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+    # ---------- 分区维护 ----------
+
+    @staticmethod
+    def maintain_partitions(months_ahead: int = 3, retain_months: Optional[int] = None) -> Dict[str, list]:
+        """
+        MySQL：按月拆分 p_max 分区并删除过期分区；其他数据库：只删除过期记录
+
+        参数：
+            months_ahead: 预先创建当前月之后多少个月的分区
+            retain_months: 保留最近多少个月，None 表示不删除
+
+        返回：
+            包含 created、dropped 分区（或删除月份）的字典
+        """
+        today = date.today()
+
+        def shift(months: int) -> int:
+            index = today.year * 12 + today.month - 1 + months
+            return (index // 12) * 100 + index % 12 + 1
+
+        result = {'created': [], 'dropped': []}
+        if db.engine.dialect.name != 'mysql':
+            if retain_months is not None:
+                deleted = AuditLog.query.filter(AuditLog.partition_month < shift(-retain_months + 1)).delete(
+                    synchronize_session=False
+                )
+                db.session.commit()
+                result['dropped'].append(deleted)
+            return result
+
+        existing = {
+            row[0] for row in db.session.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_logs' AND PARTITION_NAME IS NOT NULL"
+            ))
+        }
+        # 只能从 p_max 拆出比已有分区更晚的月份
+        highest = max((int(name[1:]) for name in existing if name != 'p_max'), default=0)
+        missing = [month for month in (shift(offset) for offset in range(months_ahead + 1)) if month > highest]
+        if missing:
+            # 每个分区存放 partition_month 小于下一个月的记录
+            definitions = ', '.join(
+                f"PARTITION p{month} VALUES LESS THAN ({month + 1 if month % 100 < 12 else month + 89})"
+                for month in missing
+            )
+            db.session.execute(text(
+                f"ALTER TABLE audit_logs REORGANIZE PARTITION p_max INTO "
+                f"({definitions}, PARTITION p_max VALUES LESS THAN MAXVALUE)"
+            ))
+            result['created'] = [f'p{month}' for month in missing]
+        if retain_months is not None:
+            cutoff = shift(-retain_months + 1)
+            expired = sorted(name for name in existing if name != 'p_max' and int(name[1:]) < cutoff)
+            if expired:
+                db.session.execute(text(f"ALTER TABLE audit_logs DROP PARTITION {', '.join(expired)}"))
+                result['dropped'] = expired
+        db.session.commit()
+        return result
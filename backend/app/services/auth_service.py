@@ -6,6 +6,8 @@ import string
 from flask import current_app
 from flask_jwt_extended import create_access_token
 from .email_service import EmailService
+from .identity_service import IdentityService, Principal
+from .password_service import PasswordService, PasswordBusyError
 
 class AuthService:
     @staticmethod
@@ -51,6 +53,7 @@ class AuthService:
         :param username: 用户名
         :param password: 密码
         :return: (user, error) 元组，user为用户对象，error为错误信息
+        :raises PasswordBusyError: 密码校验排队已满（不计入失败次数）
         """
         try:
             # 查找用户
@@ -100,6 +103,9 @@ class AuthService:
                     user.login_attempts = 0
                     user.last_failed_login = None
                     user.account_locked_until = None
+                    # 哈希算法或代价已调整时，用本次登录的密码重新哈希
+                    if PasswordService.needs_rehash(user.password):
+                        user.set_password(password)
                     db.session.commit()
                 except Exception as e:
                     # 如果重置计数器失败，记录错误但允许用户登录
@@ -108,6 +114,9 @@ class AuthService:
                 
                 return user, None
             
+            except PasswordBusyError:
+                # 密码校验排队已满，不计入失败次数，由调用方返回 503
+                raise
             except Exception as e:
                 # 如果在处理登录尝试限制时发生错误，回退到基本的密码验证
                 current_app.logger.error(f"处理登录尝试限制时发生错误: {str(e)}")
@@ -117,6 +126,8 @@ class AuthService:
                     return None, "账户已被禁用"
                 return user, None
                 
+        except PasswordBusyError:
+            raise
         except Exception as e:
             current_app.logger.error(f"认证错误: {str(e)}")
             return None, "认证过程中发生错误"
@@ -128,6 +139,7 @@ class AuthService:
         :param username: 用户名
         :param password: 密码
         :return: 用户对象或None
+        :raises PasswordBusyError: 密码校验排队已满
         """
         try:
             # 添加登录尝试日志
@@ -139,12 +151,12 @@ class AuthService:
                 return None, error
                 
             # 生成访问令牌
+            # 角色和员工ID写入令牌声明，身份信息同时放入缓存
+            principal = Principal.from_user(user)
+            IdentityService.cache().put(user.id, principal)
             access_token = create_access_token(
                 identity=user.id,
-                additional_claims={
-                    'username': user.username,
-                    'role': user.role
-                }
+                additional_claims=principal.claims()
             )
             
             current_app.logger.info(f"用户登录成功 - 用户名: {username}")
@@ -153,6 +165,8 @@ class AuthService:
                 'access_token': access_token
             }, None
             
+        except PasswordBusyError:
+            raise
         except Exception as e:
             error_msg = f"登录服务错误 - 用户名: {username}, 错误: {str(e)}"
             current_app.logger.error(error_msg, exc_info=True)
@@ -178,6 +192,7 @@ class AuthService:
             user.set_password(new_password)  # 使用User模型的set_password方法
             user.updated_at = datetime.utcnow()
             db.session.commit()
+            IdentityService.invalidate(user.id)
             return True, None
         except Exception as e:
             db.session.rollback()
@@ -274,6 +289,7 @@ class AuthService:
             user.reset_code_expires = None
             user.updated_at = datetime.utcnow()
             db.session.commit()
+            IdentityService.invalidate(user.id)
 
             return True, "密码重置成功"
 
@@ -299,6 +315,7 @@ class AuthService:
             user.set_password('123456')  # 使用User模型的set_password方法
             user.updated_at = datetime.utcnow()
             db.session.commit()
+            IdentityService.invalidate(user.id)
             
             return True, None
         except Exception as e:
@@ -0,0 +1,215 @@
+"""
+数据变更捕获（CDC）服务模块
+    - after_flush：收集本次刷新中新增、修改、删除的对象，以（表名, 主键, 操作, 修改的字段）形式
+      批量写入 change_events 表，与业务数据处于同一事务，回滚时一起撤销
+    - after_commit：按表名通知进程内的订阅者；同步订阅者（各内存缓存的失效）在提交线程中立即执行，
+      其他订阅者交给后台派发线程异步执行，请求线程不等待
+其他进程可按 change_events.id 增量读取（read_since）；通过 insert()/update() 语句批量写入的数据
+不经过会话对象，需要调用 record 手动记录。
+CDC_ENABLED 关闭时只停止写入 change_events，进程内订阅者仍会收到通知。
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import event, inspect
+from app import db
+from app.models.change_event import ChangeEvent
+from app.utils.session_state import pop_committed, track
+
+class Change:
+    """一条数据变更（bulk 表示由批量语句手动记录，不是会话中的对象）"""
+
+    __slots__ = ('table', 'pk', 'operation', 'columns', 'bulk')
+
+    def __init__(self, table: str, pk: str, operation: str, columns: Optional[List[str]] = None, bulk: bool = False):
+        self.table = table
+        self.pk = pk
+        self.operation = operation
+        self.columns = columns or []
+        self.bulk = bulk
+
+    def row(self, now: datetime) -> dict:
+        return {
+            'table_name': self.table,
+            'pk': self.pk,
+            'operation': self.operation,
+            'changed_columns': ','.join(self.columns) or None,
+            'created_at': now
+        }
+
+    def to_dict(self) -> dict:
+        return {'table': self.table, 'pk': self.pk, 'operation': self.operation, 'columns': self.columns}
+
+def _pk(identity) -> str:
+    return ','.join(str(value) for value in identity)
+
+class ChangeCaptureService:
+    # 订阅者：[(回调, 关注的表名集合或 None, 是否同步)]
+    _subscribers = []
+    _queue = None
+    _worker = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """注册会话事件监听"""
+        if not event.contains(db.session, 'after_flush', ChangeCaptureService._after_flush):
+            event.listen(db.session, 'after_flush', ChangeCaptureService._after_flush)
+            event.listen(db.session, 'after_commit', ChangeCaptureService._after_commit)
+        track('cdc_changes')
+
+    # ---------- 变更捕获 ----------
+
+    @staticmethod
+    def _excluded() -> set:
+        return {ChangeEvent.__tablename__, *current_app.config['CDC_EXCLUDED_TABLES']}
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        changes = []
+        for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for obj in objects:
+                state = inspect(obj)
+                table = state.mapper.local_table.name
+                # 新增对象在 after_flush 时尚未登记 identity，从主键属性读取
+                identity = state.identity or state.mapper.primary_key_from_instance(obj)
+                columns = None
+                if operation == 'update':
+                    columns = [attr.key for attr in state.mapper.column_attrs
+                               if state.attrs[attr.key].history.has_changes()]
+                    if not columns:
+                        continue
+                changes.append(Change(table, _pk(identity), operation, columns))
+        ChangeCaptureService._write(session, changes)
+
+    @staticmethod
+    def _write(session, changes: List[Change]) -> None:
+        """在当前事务中写入变更事件（排除 CDC_EXCLUDED_TABLES），并登记到会话，提交后通知订阅者"""
+        if not changes:
+            return
+        if current_app.config['CDC_ENABLED']:
+            excluded = ChangeCaptureService._excluded()
+            now = datetime.utcnow()
+            rows = [change.row(now) for change in changes if change.table not in excluded]
+            if rows:
+                session.connection().execute(ChangeEvent.__table__.insert(), rows)
+        session.info.setdefault('cdc_changes', []).extend(changes)
+
+    @staticmethod
+    def record(session, table: str, pks: Iterable, operation: str, columns: Optional[Iterable[str]] = None) -> None:
+        """
+        手动记录批量语句产生的变更（与业务数据同一事务，提交后派发）
+
+        参数：
+            table: 表名
+            pks: 主键列表（复合主键传元组）
+            operation: insert/update/delete
+            columns: 修改的字段（update）
+        """
+        columns = list(columns) if columns else None
+        ChangeCaptureService._write(session, [
+            Change(table, _pk(pk if isinstance(pk, tuple) else (pk,)), operation, columns, bulk=True) for pk in pks
+        ])
+
+    @staticmethod
+    def _after_commit(session):
+        changes = pop_committed(session, 'cdc_changes')
+        if not changes:
+            return
+        subscribers = list(ChangeCaptureService._subscribers)
+        for callback, tables, sync in subscribers:
+            if sync:
+                ChangeCaptureService._notify(current_app, callback, tables, changes)
+        if any(not sync for _, _, sync in subscribers):
+            ChangeCaptureService._dispatch(current_app._get_current_object(), changes)
+
+    # ---------- 进程内订阅 ----------
+
+    @staticmethod
+    def subscribe(callback: Callable[[List[Change]], None], tables: Optional[Iterable[str]] = None,
+                  sync: bool = False) -> None:
+        """
+        订阅数据变更，每次提交调用一次；同一回调重复订阅时替换原有订阅
+
+        参数：
+            callback: 接收本次提交中相关变更列表的函数
+            tables: 关注的表名，None 表示所有表
+            sync: True 时在提交线程中立即执行（只适合清除缓存等轻量操作，不能访问数据库），
+                  否则在后台派发线程（带应用上下文）中执行
+        """
+        entry = (callback, set(tables) if tables is not None else None, sync)
+        with ChangeCaptureService._lock:
+            ChangeCaptureService._subscribers = [
+                item for item in ChangeCaptureService._subscribers if item[0] is not callback
+            ] + [entry]
+
+    @staticmethod
+    def unsubscribe(callback: Callable) -> None:
+        """取消订阅"""
+        with ChangeCaptureService._lock:
+            ChangeCaptureService._subscribers = [
+                entry for entry in ChangeCaptureService._subscribers if entry[0] is not callback
+            ]
+
+    @staticmethod
+    def _dispatch(app, changes: List[Change]) -> None:
+        with ChangeCaptureService._lock:
+            if ChangeCaptureService._worker is None:
+                ChangeCaptureService._queue = queue.Queue()
+                ChangeCaptureService._worker = threading.Thread(
+                    target=ChangeCaptureService._run, name='change-capture', daemon=True
+                )
+                ChangeCaptureService._worker.start()
+        ChangeCaptureService._queue.put((app, changes))
+
+    @staticmethod
+    def _notify(app, callback: Callable, tables: Optional[set], changes: List[Change]) -> None:
+        """把相关的变更交给一个订阅者，出错时只记录日志"""
+        relevant = changes if tables is None else [change for change in changes if change.table in tables]
+        if not relevant:
+            return
+        try:
+            callback(relevant)
+        except Exception as e:
+            app.logger.error(f'变更订阅者处理失败: {getattr(callback, "__name__", callback)}: {str(e)}')
+
+    @staticmethod
+    def _run():
+        """后台派发线程：逐批通知异步订阅者，单个订阅者出错不影响其他订阅者"""
+        while True:
+            app, changes = ChangeCaptureService._queue.get()
+            try:
+                with app.app_context():
+                    for callback, tables, sync in list(ChangeCaptureService._subscribers):
+                        if not sync:
+                            ChangeCaptureService._notify(app, callback, tables, changes)
+                    db.session.remove()
+            finally:
+                ChangeCaptureService._queue.task_done()
+
+    @staticmethod
+    def wait() -> None:
+        """等待已提交的变更派发完毕（用于测试和命令行任务）"""
+        if ChangeCaptureService._queue is not None:
+            ChangeCaptureService._queue.join()
+
+    # ---------- outbox 读取与清理 ----------
+
+    @staticmethod
+    def read_since(after_id: int = 0, limit: int = 500, tables: Optional[Iterable[str]] = None) -> List[Dict]:
+        """按 ID 增量读取变更事件（供其他进程消费）"""
+        query = ChangeEvent.query.filter(ChangeEvent.id > after_id)
+        if tables:
+            query = query.filter(ChangeEvent.table_name.in_(list(tables)))
+        return [change.to_dict() for change in query.order_by(ChangeEvent.id).limit(limit)]
+
+    @staticmethod
+    def prune(days: int) -> int:
+        """删除早于指定天数的变更事件，返回删除数量"""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = ChangeEvent.query.filter(ChangeEvent.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
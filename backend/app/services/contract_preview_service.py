@@ -0,0 +1,244 @@
+"""
+合同预览服务模块
+在后台线程中将 PDF 合同渲染为首页缩略图和逐页图片，缓存在磁盘上，
+缓存总大小受限，超出时按最近最少使用(LRU)顺序淘汰
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from flask import current_app
+from app.models.employee import ContractAttachment
+from app.services.media_service import MediaService
+
+# 合同文件默认存储目录（非分片上传的文件）
+CONTRACTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'static', 'uploads', 'contracts')
+
+def contract_file_path(contract: ContractAttachment) -> Optional[str]:
+    """获取合同文件路径：分片上传的文件按内容哈希存储，其余按上传时间命名"""
+    if contract.content_hash:
+        media = MediaService.get_variant(contract.content_hash, 'original')
+        return MediaService.absolute_path(media) if media else None
+    return os.path.join(CONTRACTS_FOLDER, f"{contract.employee_id}_{contract.upload_time.strftime('%Y%m%d_%H%M%S')}_{contract.file_name}")
+
+class PreviewCache:
+    """磁盘预览图缓存，总大小超过上限时淘汰最久未访问的文件"""
+
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 文件名 -> 大小，按访问顺序排列
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """启动时按修改时间恢复访问顺序"""
+        files = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+
+    def get(self, name: str) -> Optional[str]:
+        """获取缓存文件路径，命中时刷新访问顺序"""
+        path = os.path.join(self.folder, name)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._total -= self._entries.pop(name)
+                return None
+            self._entries.move_to_end(name)
+        return path
+
+    def put(self, name: str, tmp_path: str) -> str:
+        """将渲染好的临时文件放入缓存并按需淘汰"""
+        path = os.path.join(self.folder, name)
+        # 文件替换、大小统计和淘汰在同一把锁内完成，避免并发淘汰删除刚写入的文件或重复计数
+        with self._lock:
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+            self._total -= self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_name, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                try:
+                    os.remove(os.path.join(self.folder, old_name))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def tmp_path(self, name: str) -> str:
+        """渲染用的临时文件路径（以点开头，不计入缓存）"""
+        return os.path.join(self.folder, f'.{name}.{threading.get_ident()}.tmp')
+
+class ContractPreviewService:
+    _executor = None
+    _pending = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def cache() -> PreviewCache:
+        """当前应用的预览缓存"""
+        cache = current_app.extensions.get('contract_preview_cache')
+        if cache is None:
+            # 并发的首次请求只创建一个缓存实例，共用同一份淘汰记录
+            with ContractPreviewService._lock:
+                cache = current_app.extensions.get('contract_preview_cache')
+                if cache is None:
+                    cache = PreviewCache(
+                        current_app.config['CONTRACT_PREVIEW_FOLDER'],
+                        current_app.config['CONTRACT_PREVIEW_CACHE_MAX_BYTES']
+                    )
+                    current_app.extensions['contract_preview_cache'] = cache
+        return cache
+
+    @staticmethod
+    def cache_key(contract: ContractAttachment) -> str:
+        """按内容哈希缓存，相同文件的不同附件共用预览图"""
+        return contract.content_hash or f'contract{contract.id}_{contract.upload_time.strftime("%Y%m%d%H%M%S")}'
+
+    @staticmethod
+    def thumbnail_name(key: str) -> str:
+        return f'{key}_thumb.png'
+
+    @staticmethod
+    def page_name(key: str, page: int) -> str:
+        return f'{key}_p{page}.png'
+
+    @staticmethod
+    def meta_name(key: str) -> str:
+        return f'{key}.json'
+
+    @staticmethod
+    def is_supported(contract: ContractAttachment) -> bool:
+        """目前只支持渲染 PDF"""
+        return (contract.file_type or '').lower() == 'pdf'
+
+    @staticmethod
+    def get_thumbnail(contract: ContractAttachment) -> Optional[str]:
+        """获取首页缩略图路径，未缓存时提交后台渲染并返回 None"""
+        key = ContractPreviewService.cache_key(contract)
+        path = ContractPreviewService.cache().get(ContractPreviewService.thumbnail_name(key))
+        if path is None:
+            ContractPreviewService.schedule(contract)
+        return path
+
+    @staticmethod
+    def get_page(contract: ContractAttachment, page: int) -> Optional[str]:
+        """获取指定页图片路径（页码从1开始），未缓存时提交后台渲染并返回 None"""
+        key = ContractPreviewService.cache_key(contract)
+        cache = ContractPreviewService.cache()
+        path = cache.get(ContractPreviewService.page_name(key, page))
+        if path is None:
+            # 已渲染完成但页码超出范围时不再重复渲染
+            meta_path = cache.get(ContractPreviewService.meta_name(key))
+            if meta_path is not None:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    if page > json.load(f)['rendered_pages']:
+                        raise ValueError('页码超出范围')
+            ContractPreviewService.schedule(contract)
+        return path
+
+    @staticmethod
+    def get_info(contract: ContractAttachment) -> dict:
+        """获取预览信息（页数、是否已生成）"""
+        key = ContractPreviewService.cache_key(contract)
+        meta_path = ContractPreviewService.cache().get(ContractPreviewService.meta_name(key))
+        if meta_path is None:
+            ContractPreviewService.schedule(contract)
+            return {'status': 'pending', 'page_count': None}
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return {'status': 'ready', 'page_count': meta['page_count'], 'rendered_pages': meta['rendered_pages']}
+
+    @staticmethod
+    def schedule(contract: ContractAttachment) -> bool:
+        """
+        提交后台渲染任务，同一文件同时只渲染一次
+
+        返回：
+            是否提交了新任务
+        """
+        if not ContractPreviewService.is_supported(contract):
+            return False
+        key = ContractPreviewService.cache_key(contract)
+        source_path = contract_file_path(contract)
+        if not source_path or not os.path.exists(source_path):
+            return False
+
+        with ContractPreviewService._lock:
+            if key in ContractPreviewService._pending:
+                return False
+            ContractPreviewService._pending.add(key)
+            if ContractPreviewService._executor is None:
+                ContractPreviewService._executor = ThreadPoolExecutor(
+                    max_workers=current_app.config['CONTRACT_PREVIEW_WORKERS'],
+                    thread_name_prefix='contract-preview'
+                )
+
+        app = current_app._get_current_object()
+        ContractPreviewService._executor.submit(ContractPreviewService._render_job, app, key, source_path)
+        return True
+
+    @staticmethod
+    def _render_job(app, key: str, source_path: str):
+        """后台线程入口"""
+        try:
+            with app.app_context():
+                ContractPreviewService.render(key, source_path)
+        except Exception as e:
+            app.logger.error(f'渲染合同预览失败: key={key}, error={str(e)}')
+        finally:
+            with ContractPreviewService._lock:
+                ContractPreviewService._pending.discard(key)
+
+    @staticmethod
+    def render(key: str, source_path: str) -> None:
+        """渲染首页缩略图和各页图片，写入缓存"""
+        try:
+            import pymupdf
+        except ImportError:
+            current_app.logger.warning('未安装 PyMuPDF，无法生成合同预览')
+            return
+
+        cache = ContractPreviewService.cache()
+        page_width = current_app.config['CONTRACT_PREVIEW_PAGE_WIDTH']
+        thumb_width = current_app.config['CONTRACT_PREVIEW_THUMBNAIL_WIDTH']
+        max_pages = current_app.config['CONTRACT_PREVIEW_MAX_PAGES']
+
+        with pymupdf.open(source_path) as doc:
+            page_count = doc.page_count
+            rendered_pages = min(page_count, max_pages)
+            for index in range(rendered_pages):
+                page = doc.load_page(index)
+                widths = [(ContractPreviewService.page_name(key, index + 1), page_width)]
+                if index == 0:
+                    widths.append((ContractPreviewService.thumbnail_name(key), thumb_width))
+                for name, width in widths:
+                    zoom = width / page.rect.width
+                    pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom))
+                    tmp_path = cache.tmp_path(name)
+                    pixmap.save(tmp_path, output='png')
+                    cache.put(name, tmp_path)
+
+        # 元数据最后写入，存在即表示渲染完成
+        meta_name = ContractPreviewService.meta_name(key)
+        tmp_path = cache.tmp_path(meta_name)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'page_count': page_count, 'rendered_pages': rendered_pages}, f)
+        cache.put(meta_name, tmp_path)
@@ -110,4 +110,5 @@ class DepartmentService:
     @staticmethod
     def get_total_count():
         """获取部门总数"""
-        return Department.query.filter_by(is_deleted=False).count()
+        from app.services.org_stats_service import OrgStatsService
+        return OrgStatsService.get_stats()['totals']['departments']
@@ -1,4 +1,3 @@
-import pandas as pd
 from io import BytesIO
 from datetime import datetime
 from app.models import Employee, Department, Position
@@ -10,6 +9,8 @@ class ExportService:
         将员工数据导出为Excel文件
         :return: Excel文件的二进制数据
         """
+        import pandas as pd  # 延迟加载，避免拖慢应用启动
+
         try:
             # 获取所有员工数据
             employees = Employee.query.all()
@@ -56,6 +57,8 @@ class ExportService:
         :param file_data: Excel文件数据
         :return: 解析后的员工数据列表
         """
+        import pandas as pd  # 延迟加载，避免拖慢应用启动
+
         try:
             print("开始读取Excel文件")  # 添加日志
             # 读取Excel文件
@@ -202,6 +205,8 @@ class ExportService:
         生成导入模板
         :return: Excel模板文件的二进制数据
         """
+        import pandas as pd  # 延迟加载，避免拖慢应用启动
+
         try:
             # 获取可用的部门和职位
             departments = [dept.name.strip() for dept in Department.query.all()]
@@ -0,0 +1,217 @@
+"""
+打卡地理围栏服务模块
+把启用的打卡地点（中心经纬度 + 半径）放入内存网格索引：
+    - 网格边长取最大打卡半径，每个地点登记到其外接矩形覆盖的所有网格；经度方向的网格绕地球一周，
+      跨越 ±180° 经线的地点按列号取模登记，靠近极点、跨越经度网格过多的地点登记到整行
+    - 校验一个坐标只需定位所在网格，对其中少量候选地点先做矩形粗筛，再用 haversine 公式计算距离
+    - 批量校验时同一网格的打卡共用候选列表，每个坐标的三角函数只计算一次
+索引按 GEOFENCE_CACHE_TTL 秒缓存，本进程提交打卡地点变更后立即重建。
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from app import db
+from app.models.attendance import AttendanceLocation
+from app.services.change_capture_service import ChangeCaptureService
+
+# 地球平均半径（米）
+EARTH_RADIUS = 6371008.8
+
+# 同一球面上纬度方向 1 度对应的距离（米），与 haversine 使用的半径一致
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+# 网格最小边长（米），避免半径很小时网格过密
+MIN_CELL_METERS = 100.0
+
+# 一个地点在一行中最多登记的经度网格数，超过时（靠近极点）登记到整行
+MAX_SITE_COLUMNS = 64
+
+class GeofenceMatch:
+    """坐标匹配到的打卡地点"""
+
+    __slots__ = ('location_id', 'distance')
+
+    def __init__(self, location_id: int, distance: float):
+        self.location_id = location_id
+        self.distance = distance
+
+    def to_dict(self) -> dict:
+        return {'location_id': self.location_id, 'distance': round(self.distance, 1)}
+
+class GeofenceIndex:
+    """打卡地点网格索引"""
+
+    __slots__ = ('cell', 'columns', 'cells', 'rows', 'size')
+
+    def __init__(self, locations: Iterable[Tuple[int, float, float, float]]):
+        """
+        参数：
+            locations: (地点ID, 纬度, 经度, 半径米) 列表
+        """
+        locations = list(locations)
+        self.size = len(locations)
+        max_radius = max((radius for _, _, _, radius in locations), default=0)
+        # 网格边长（度）；经度方向的网格数取整，使网格恰好绕地球一周（经度边长不小于纬度边长）
+        self.cell = max(max_radius, MIN_CELL_METERS) / METERS_PER_DEGREE
+        self.columns = max(int(360 / self.cell), 1)
+        self.cells: Dict[Tuple[int, int], list] = defaultdict(list)
+        self.rows: Dict[int, list] = defaultdict(list)
+
+        for location_id, latitude, longitude, radius in locations:
+            cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+            lat_delta = radius / METERS_PER_DEGREE
+            # 经度跨度按外接矩形靠近极点一侧的纬度计算，保证圆完全落在矩形内；圆包含极点时覆盖全部经度
+            edge_cos = max(math.cos(math.radians(min(abs(latitude) + lat_delta, 90.0))), 1e-6)
+            lon_delta = min(radius / (METERS_PER_DEGREE * edge_cos), 180.0)
+            site = (
+                location_id, math.radians(latitude), math.radians(longitude), cos_lat, radius,
+                latitude - lat_delta, latitude + lat_delta, longitude, lon_delta
+            )
+            first, last = self._column(longitude - lon_delta), self._column(longitude + lon_delta)
+            whole_row = last - first + 1 > min(MAX_SITE_COLUMNS, self.columns)
+            for row in range(self._row(site[5]), self._row(site[6]) + 1):
+                if whole_row:
+                    self.rows[row].append(site)
+                    continue
+                for col in range(first, last + 1):
+                    self.cells[(row, col % self.columns)].append(site)
+
+    def _row(self, latitude: float) -> int:
+        return math.floor(latitude / self.cell)
+
+    def _column(self, longitude: float) -> int:
+        """经度所在的网格列（未取模，相差 360° 的经度列号相差 columns）"""
+        return math.floor(longitude * self.columns / 360)
+
+    def _key(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return self._row(latitude), self._column(longitude) % self.columns
+
+    def _candidates(self, key: Tuple[int, int]) -> list:
+        return self.cells.get(key, []) + self.rows.get(key[0], [])
+
+    @staticmethod
+    def _nearest(candidates: list, latitude: float, longitude: float,
+                 lat_rad: float, lon_rad: float, cos_lat: float) -> Optional[GeofenceMatch]:
+        best = None
+        for location_id, site_lat, site_lon, site_cos, radius, min_lat, max_lat, center_lon, lon_delta in candidates:
+            # 外接矩形粗筛（经度差按跨越 ±180° 经线后的较短一侧计算）
+            if not (min_lat <= latitude <= max_lat and abs((longitude - center_lon + 180) % 360 - 180) <= lon_delta):
+                continue
+            # haversine 距离
+            h = math.sin((lat_rad - site_lat) / 2) ** 2 + cos_lat * site_cos * math.sin((lon_rad - site_lon) / 2) ** 2
+            distance = 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(h)))
+            if distance <= radius and (best is None or distance < best.distance):
+                best = GeofenceMatch(location_id, distance)
+        return best
+
+    def match(self, latitude: float, longitude: float) -> Optional[GeofenceMatch]:
+        """返回坐标所在的最近打卡地点，不在任何地点范围内时返回 None"""
+        candidates = self._candidates(self._key(latitude, longitude))
+        if not candidates:
+            return None
+        lat_rad = math.radians(latitude)
+        return self._nearest(candidates, latitude, longitude, lat_rad, math.radians(longitude), math.cos(lat_rad))
+
+    def match_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[GeofenceMatch]]:
+        """批量校验坐标，按输入顺序返回匹配结果"""
+        points = list(points)
+        results: List[Optional[GeofenceMatch]] = [None] * len(points)
+        by_cell = defaultdict(list)
+        for i, (latitude, longitude) in enumerate(points):
+            by_cell[self._key(latitude, longitude)].append(i)
+        for key, indexes in by_cell.items():
+            candidates = self._candidates(key)
+            if not candidates:
+                continue
+            for i in indexes:
+                latitude, longitude = points[i]
+                lat_rad = math.radians(latitude)
+                results[i] = self._nearest(
+                    candidates, latitude, longitude, lat_rad, math.radians(longitude), math.cos(lat_rad)
+                )
+        return results
+
+class GeofenceService:
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """订阅数据变更：本进程提交打卡地点变更后重建索引"""
+        # attendance_locations 表有两个映射类（models.attendance / models.attendance_location），按表名订阅
+        ChangeCaptureService.subscribe(GeofenceService._on_change, [AttendanceLocation.__tablename__], sync=True)
+
+    @staticmethod
+    def _on_change(changes) -> None:
+        GeofenceService.invalidate()
+
+    @staticmethod
+    def invalidate() -> None:
+        """清除打卡地点索引"""
+        with GeofenceService._lock:
+            current_app.extensions.pop('geofence_index', None)
+
+    @staticmethod
+    def get_index() -> GeofenceIndex:
+        """获取启用的打卡地点索引（缓存 GEOFENCE_CACHE_TTL 秒）"""
+        with GeofenceService._lock:
+            entry = current_app.extensions.get('geofence_index')
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        rows = db.session.query(
+            AttendanceLocation.id, AttendanceLocation.latitude, AttendanceLocation.longitude, AttendanceLocation.radius
+        ).filter(AttendanceLocation.is_active.is_(True)).all()
+        index = GeofenceIndex((row.id, row.latitude, row.longitude, row.radius or 0) for row in rows)
+        with GeofenceService._lock:
+            current_app.extensions['geofence_index'] = (
+                time.monotonic() + current_app.config['GEOFENCE_CACHE_TTL'], index
+            )
+        return index
+
+    @staticmethod
+    def parse_point(data: dict) -> Optional[Tuple[float, float]]:
+        """
+        从请求数据中读取坐标
+
+        返回：
+            (纬度, 经度)，未提供坐标时返回 None
+
+        异常：
+            ValueError: 坐标格式错误或超出范围
+        """
+        if data.get('latitude') is None and data.get('longitude') is None:
+            return None
+        try:
+            latitude, longitude = float(data['latitude']), float(data['longitude'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('经纬度格式错误')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('经纬度超出范围')
+        return latitude, longitude
+
+    @staticmethod
+    def validate(latitude: float, longitude: float) -> Optional[GeofenceMatch]:
+        """
+        校验打卡坐标是否在启用的打卡地点范围内
+
+        返回：
+            匹配到的最近打卡地点；未配置任何启用的打卡地点时返回 None（不限制打卡位置）
+
+        异常：
+            ValueError: 已配置打卡地点但坐标不在任何地点范围内
+        """
+        index = GeofenceService.get_index()
+        if not index.size:
+            return None
+        matched = index.match(latitude, longitude)
+        if matched is None:
+            raise ValueError('当前位置不在允许的打卡范围内')
+        return matched
+
+    @staticmethod
+    def validate_many(points: Iterable[Tuple[float, float]]) -> List[Optional[GeofenceMatch]]:
+        """批量校验打卡坐标，按输入顺序返回匹配结果（不在范围内为 None）"""
+        return GeofenceService.get_index().match_many(points)
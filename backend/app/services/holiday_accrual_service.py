@@ -0,0 +1,233 @@
+"""
+假期余额年度发放服务模块
+为所有在职员工和所有有年度配额的假期类型批量生成某一年的假期余额：
+    总天数 = 年度配额（当年入职按入职月份折算，按半天取整） + 上一年结转天数
+    结转天数 = min(上一年剩余天数, 假期类型的最大结转天数)，不结转负数
+生成过程是一条 INSERT ... SELECT 语句，已存在的余额记录跳过，可重复执行；
+已存在但尚未使用的余额按上一年当前的剩余天数重新计算结转（提前生成后上一年又有请假时），
+已开始使用的余额不再变动。应在上一年结束后执行，每次批量发放记录生成数量、耗时和吞吐量。
+"""
+
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, exists, extract, func, insert, literal, or_, select, true, update
+from app import db
+from app.models.employee import Employee
+from app.models.holiday import HolidayAccrualRun, HolidayBalance, HolidayType
+from app.services.audit_service import AuditService
+from app.services.change_capture_service import ChangeCaptureService
+from app.utils.bulk_insert import last_id
+
+class HolidayAccrualService:
+    @staticmethod
+    def _carried_over(types, prev):
+        """结转天数 = min(上一年剩余天数, 最大结转天数)，不结转负数"""
+        cap = func.coalesce(types.c.max_carry_over, 0)
+        prev_remaining = func.coalesce(prev.c.remaining_days, 0)
+        return case(
+            (prev_remaining <= 0, 0),
+            (prev_remaining > cap, cap),
+            else_=prev_remaining
+        )
+
+    @staticmethod
+    def _refresh_carry_over(year: int, employee_ids: Optional[Iterable[int]] = None,
+                            holiday_type_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        按上一年当前的剩余天数重新计算尚未使用的余额的结转天数
+
+        一次查询找出结转天数已变化的余额，再用一条 executemany 的 UPDATE 更新；
+        UPDATE 同样带 used_days = 0 条件，期间已开始使用的余额不受影响。
+
+        返回：
+            更新的余额记录数
+        """
+        balances = HolidayBalance.__table__
+        types = HolidayType.__table__
+        prev = balances.alias('prev')
+        carried_over = HolidayAccrualService._carried_over(types, prev)
+
+        query = select(balances.c.id, balances.c.total_days, balances.c.remaining_days, balances.c.carried_over_days,
+                       carried_over.label('carried_over')).select_from(
+            balances.join(types, types.c.id == balances.c.holiday_type_id).outerjoin(prev, and_(
+                prev.c.employee_id == balances.c.employee_id,
+                prev.c.holiday_type_id == balances.c.holiday_type_id,
+                prev.c.year == year - 1
+            ))
+        ).where(balances.c.year == year, balances.c.used_days == 0)
+        if employee_ids is not None:
+            query = query.where(balances.c.employee_id.in_(list(employee_ids)))
+        if holiday_type_ids is not None:
+            query = query.where(balances.c.holiday_type_id.in_(list(holiday_type_ids)))
+
+        now = datetime.utcnow()
+        rows = [row for row in db.session.execute(query) if row.carried_over != row.carried_over_days]
+        if not rows:
+            return 0
+        changes = [{
+            'balance_id': row.id,
+            'total': row.total_days - row.carried_over_days + row.carried_over,
+            'carried': row.carried_over,
+            'now': now
+        } for row in rows]
+
+        db.session.execute(update(balances).where(
+            balances.c.id == bindparam('balance_id'),
+            balances.c.used_days == 0
+        ).values(
+            total_days=bindparam('total'),
+            remaining_days=bindparam('total'),
+            carried_over_days=bindparam('carried'),
+            updated_at=bindparam('now')
+        ), changes)
+        ChangeCaptureService.record(db.session, balances.name, [change['balance_id'] for change in changes], 'update',
+                                    ['total_days', 'remaining_days', 'carried_over_days', 'updated_at'])
+        AuditService.record(db.session, balances.name, 'update', [(row.id, {
+            'total_days': [row.total_days, change['total']],
+            'remaining_days': [row.remaining_days, change['total']],
+            'carried_over_days': [row.carried_over_days, change['carried']]
+        }) for row, change in zip(rows, changes)])
+        return len(changes)
+
+    @staticmethod
+    def _candidates(year: int, employee_ids: Optional[Iterable[int]] = None,
+                    holiday_type_ids: Optional[Iterable[int]] = None):
+        """
+        构建（员工, 假期类型）待发放余额的查询
+
+        指定员工时不限制在职状态（用于单个员工按需补发）
+        """
+        employees = Employee.__table__
+        types = HolidayType.__table__
+        prev = HolidayBalance.__table__.alias('prev')
+
+        # 当年入职的员工按剩余月份折算配额，按半天取整
+        months = case(
+            (extract('year', employees.c.hire_date) == year, 13 - extract('month', employees.c.hire_date)),
+            else_=12
+        )
+        quota = func.round(types.c.annual_quota * months / 12.0 * 2) / 2
+
+        carried_over = HolidayAccrualService._carried_over(types, prev)
+
+        conditions = [
+            types.c.is_active.is_(True),
+            types.c.annual_quota.isnot(None),
+            or_(employees.c.hire_date.is_(None), employees.c.hire_date <= date(year, 12, 31))
+        ]
+        if employee_ids is None:
+            conditions.append(employees.c.employment_status == 'active')
+        else:
+            conditions.append(employees.c.id.in_(list(employee_ids)))
+        if holiday_type_ids is not None:
+            conditions.append(types.c.id.in_(list(holiday_type_ids)))
+
+        source = employees.join(types, true()).outerjoin(prev, and_(
+            prev.c.employee_id == employees.c.id,
+            prev.c.holiday_type_id == types.c.id,
+            prev.c.year == year - 1
+        ))
+        return source, conditions, quota + carried_over, carried_over
+
+    @staticmethod
+    def accrue(year: int, employee_ids: Optional[Iterable[int]] = None,
+               holiday_type_ids: Optional[Iterable[int]] = None, record: bool = True) -> Dict:
+        """
+        批量生成某一年的假期余额（不提交事务）
+
+        参数：
+            year: 发放年份
+            employee_ids: 员工ID列表，默认为所有在职员工
+            holiday_type_ids: 假期类型ID列表，默认为所有启用且有年度配额的类型
+            record: 是否记录本次发放的数量和吞吐量
+
+        返回：
+            包含 year、created、existing、refreshed（重新计算结转的数量）、elapsed_ms、rows_per_second 的字典
+        """
+        started = time.perf_counter()
+        source, conditions, total_days, carried_over = HolidayAccrualService._candidates(
+            year, employee_ids, holiday_type_ids
+        )
+        employees = Employee.__table__
+        types = HolidayType.__table__
+        balances = HolidayBalance.__table__
+
+        candidates = db.session.execute(
+            select(func.count()).select_from(source).where(*conditions)
+        ).scalar()
+
+        already_exists = exists().where(
+            balances.c.employee_id == employees.c.id,
+            balances.c.holiday_type_id == types.c.id,
+            balances.c.year == year
+        )
+        now = datetime.utcnow()
+        rows = select(
+            employees.c.id,
+            types.c.id,
+            literal(year),
+            total_days,
+            literal(0.0),
+            total_days,
+            carried_over,
+            literal(now),
+            literal(now)
+        ).select_from(source).where(*conditions, ~already_exists)
+
+        # 锁定插入前最大的ID，用于读回本次插入的记录
+        after_id = last_id(balances)
+        result = db.session.execute(insert(balances).from_select([
+            'employee_id', 'holiday_type_id', 'year', 'total_days', 'used_days',
+            'remaining_days', 'carried_over_days', 'created_at', 'updated_at'
+        ], rows))
+        created = max(result.rowcount or 0, 0)
+        if created:
+            # INSERT ... SELECT 不经过会话事件，读回新记录手动记录变更和审计日志
+            inserted = select(balances).where(balances.c.id > after_id, balances.c.year == year)
+            if employee_ids is not None:
+                inserted = inserted.where(balances.c.employee_id.in_(list(employee_ids)))
+            if holiday_type_ids is not None:
+                inserted = inserted.where(balances.c.holiday_type_id.in_(list(holiday_type_ids)))
+            inserted = db.session.execute(inserted).all()
+            ChangeCaptureService.record(db.session, balances.name, [row.id for row in inserted], 'insert')
+            AuditService.record(db.session, balances.name, 'insert', [
+                (row.id, AuditService.snapshot(row._mapping, 'insert')) for row in inserted
+            ])
+        refreshed = HolidayAccrualService._refresh_carry_over(year, employee_ids, holiday_type_ids)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            'year': year,
+            'created': created,
+            'existing': max(candidates - created, 0),
+            'refreshed': refreshed,
+            'elapsed_ms': int(elapsed * 1000),
+            'rows_per_second': round(created / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        if record:
+            db.session.add(HolidayAccrualRun(
+                year=year,
+                created_count=stats['created'],
+                existing_count=stats['existing'],
+                elapsed_ms=stats['elapsed_ms'],
+                rows_per_second=stats['rows_per_second']
+            ))
+            current_app.logger.info(
+                f"假期余额发放完成: {year} 年新生成 {created} 条, 已存在 {stats['existing']} 条"
+                f"(重新计算结转 {refreshed} 条), "
+                f"耗时 {stats['elapsed_ms']} ms ({stats['rows_per_second']} 条/秒)"
+            )
+        return stats
+
+    @staticmethod
+    def run(year: int) -> Dict:
+        """为所有在职员工发放某一年的假期余额并提交"""
+        try:
+            stats = HolidayAccrualService.accrue(year)
+            db.session.commit()
+            return stats
+        except Exception:
+            db.session.rollback()
+            raise
@@ -0,0 +1,166 @@
+"""
+身份解析服务模块
+将 JWT 中的用户ID解析为当前用户的身份信息（角色、关联员工ID等），
+结果缓存在进程内的短期 LRU 缓存中，避免每个请求都查询用户表和员工表。
+通过 AuthService 修改密码、重置密码等操作时会主动清除对应缓存。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from flask import current_app, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from app.models import User
+
+class Principal:
+    """当前用户的身份信息（只读快照，不绑定数据库会话）"""
+
+    __slots__ = ('id', 'username', 'role', 'employee_id', 'is_active', 'version')
+
+    def __init__(self, id, username, role, employee_id, is_active, version):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.employee_id = employee_id
+        self.is_active = is_active
+        self.version = version
+
+    @classmethod
+    def from_user(cls, user: User) -> 'Principal':
+        version = int(user.updated_at.timestamp()) if user.updated_at else 0
+        return cls(user.id, user.username, user.role, user.employee_id, bool(user.is_active), version)
+
+    @property
+    def is_admin(self) -> bool:
+        """判断是否为管理员"""
+        return self.role == 'admin'
+
+    @property
+    def is_manager(self) -> bool:
+        """判断是否为管理者（管理员或经理）"""
+        return self.role in ('admin', 'manager')
+
+    def claims(self) -> dict:
+        """写入访问令牌的附加声明"""
+        return {
+            'username': self.username,
+            'role': self.role,
+            'employee_id': self.employee_id,
+            'ver': self.version
+        }
+
+class IdentityCache:
+    """带过期时间的 LRU 缓存，键为用户ID"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # 用户ID -> (过期时间, Principal)
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def put(self, user_id, principal: Principal) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class IdentityService:
+    @staticmethod
+    def cache() -> IdentityCache:
+        """当前应用的身份缓存"""
+        cache = current_app.extensions.get('identity_cache')
+        if cache is None:
+            cache = IdentityCache(
+                current_app.config['IDENTITY_CACHE_SIZE'],
+                current_app.config['IDENTITY_CACHE_TTL']
+            )
+            current_app.extensions['identity_cache'] = cache
+        return cache
+
+    @staticmethod
+    def _normalize(user_id):
+        """JWT 中的 identity 可能是字符串，统一为整数作为缓存键"""
+        try:
+            return int(user_id)
+        except (TypeError, ValueError):
+            return user_id
+
+    @staticmethod
+    def get_principal(user_id) -> Optional[Principal]:
+        """
+        按用户ID获取身份信息，优先读取缓存
+
+        参数：
+            user_id: 用户ID
+
+        返回：
+            Principal 对象，用户不存在时返回 None
+        """
+        if user_id is None:
+            return None
+        user_id = IdentityService._normalize(user_id)
+        cache = IdentityService.cache()
+        principal = cache.get(user_id)
+        if principal is None:
+            user = User.query.get(user_id)
+            if not user:
+                return None
+            principal = Principal.from_user(user)
+            cache.put(user_id, principal)
+        return principal
+
+    @staticmethod
+    def current() -> Optional[Principal]:
+        """
+        获取当前请求的用户身份（需要有效的 JWT）
+
+        同一请求内多次调用只解析一次；已禁用的账户视为未登录。
+        令牌版本比缓存新时（其他进程修改过用户后重新签发了令牌）重新加载。
+        """
+        if 'principal' not in g:
+            verify_jwt_in_request()
+            user_id = get_jwt_identity()
+            principal = IdentityService.get_principal(user_id)
+            if principal and get_jwt().get('ver', 0) > principal.version:
+                IdentityService.cache().invalidate(IdentityService._normalize(user_id))
+                principal = IdentityService.get_principal(user_id)
+            g.principal = principal if principal and principal.is_active else None
+        return g.principal
+
+    @staticmethod
+    def invalidate(user_id) -> None:
+        """用户信息变更后清除缓存"""
+        if user_id is None:
+            return
+        user_id = IdentityService._normalize(user_id)
+        IdentityService.cache().invalidate(user_id)
+        principal = g.get('principal')
+        if principal is not None and principal.id == user_id:
+            g.pop('principal')
+
+    @staticmethod
+    def clear() -> None:
+        """清空全部身份缓存"""
+        IdentityService.cache().clear()
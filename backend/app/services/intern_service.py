@@ -0,0 +1,312 @@
+"""
+实习批量评估服务模块
+实习批次结束时一次提交整批评估：
+    - 校验阶段按批次一次性查询实习状态、员工、职位、评估人和工资结构，收集所有错误，有错误时不写入任何数据
+    - 写入阶段在同一事务中用批量 INSERT/UPDATE 写入评估、转正状态、员工类型/职位和职位变更历史
+    - 可选为转正员工创建员工专属的工资结构分配，并标记受影响的待发放工资记录重算
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from app import db
+from app.models.employee import Employee, PositionChangeHistory
+from app.models.intern_status import InternStatus, InternEvaluation
+from app.models.position import Position
+from app.models.salary import SalaryStructure
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.services.audit_service import AuditService
+from app.services.change_capture_service import ChangeCaptureService
+from app.utils.bulk_insert import last_id
+
+# 单次批量评估的最大条数
+MAX_BATCH_SIZE = 1000
+
+# 评分项（1-5分）
+SCORE_FIELDS = ('work_performance', 'learning_ability', 'communication_skill', 'professional_skill', 'attendance')
+
+EVALUATION_TYPES = ('monthly', 'final')
+
+# 转正评估推荐通过后的下一个状态
+NEXT_STATUS = {
+    'intern': 'probation',
+    'probation': 'regular'
+}
+
+def _parse_date(value, field: str):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} 格式错误，应为 YYYY-MM-DD')
+
+class InternService:
+    @staticmethod
+    def bulk_evaluate(data: dict) -> Tuple[Optional[Dict], List[Dict]]:
+        """
+        批量创建实习评估并处理转正
+
+        参数：
+            data: {
+                evaluation_date, evaluation_type, evaluator_id: 各条评估的默认值,
+                salary_assignment: 可选 {salary_structure_id, effective_date, expiry_date}，为转正员工创建工资结构分配,
+                items: [{intern_status_id, 各评分项, conversion_recommended, recommended_position_id,
+                         recommended_salary, conversion_comments, evaluation_content, improvement_suggestions,
+                         salary_structure_id（覆盖默认工资结构）, ...}]
+            }
+
+        返回：
+            (统计结果, 错误列表)；有错误时统计结果为 None，且不写入任何数据
+
+        异常：
+            ValueError: 批次级参数错误（条目为空、超过上限、默认日期格式错误等）
+        """
+        items = data.get('items') or []
+        if not items:
+            raise ValueError('评估列表不能为空')
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValueError(f'单次最多批量评估 {MAX_BATCH_SIZE} 条')
+
+        started = time.perf_counter()
+        salary_options = data.get('salary_assignment') or None
+        if salary_options:
+            effective_date = _parse_date(salary_options.get('effective_date'), 'salary_assignment.effective_date')
+            expiry_date = (_parse_date(salary_options['expiry_date'], 'salary_assignment.expiry_date')
+                           if salary_options.get('expiry_date') else None)
+
+        # ---------- 批量加载引用数据 ----------
+        status_ids = {item.get('intern_status_id') for item in items}
+        statuses = {
+            row.id: row for row in db.session.query(
+                InternStatus.id, InternStatus.status, InternStatus.employee_id, InternStatus.department_id,
+                InternStatus.actual_end_date, Employee.employee_type, Employee.position_id, Employee.department_id.label('employee_department_id')
+            ).join(Employee, InternStatus.employee_id == Employee.id).filter(InternStatus.id.in_(status_ids))
+        }
+        position_ids = {item['recommended_position_id'] for item in items if item.get('recommended_position_id')}
+        positions = {row.id for row in db.session.query(Position.id).filter(Position.id.in_(position_ids))}
+        evaluator_ids = {item.get('evaluator_id', data.get('evaluator_id')) for item in items}
+        evaluators = {row.id for row in db.session.query(Employee.id).filter(Employee.id.in_(evaluator_ids))}
+        structures = set()
+        if salary_options:
+            structure_ids = {item.get('salary_structure_id', salary_options.get('salary_structure_id')) for item in items}
+            structures = {
+                row.id for row in db.session.query(SalaryStructure.id).filter(
+                    SalaryStructure.id.in_(structure_ids), SalaryStructure.is_active.is_(True)
+                )
+            }
+
+        # ---------- 逐条校验 ----------
+        errors = []
+        evaluations = []
+        conversions = []
+        seen = set()
+        for index, item in enumerate(items):
+            status_id = item.get('intern_status_id')
+
+            def fail(msg):
+                errors.append({'index': index, 'intern_status_id': status_id, 'msg': msg})
+
+            status = statuses.get(status_id)
+            if status is None:
+                fail('实习状态记录不存在')
+                continue
+            if status_id in seen:
+                fail('同一实习状态在批次中重复')
+                continue
+            seen.add(status_id)
+            if status.employee_type != status.status:
+                fail(f'员工状态不匹配：系统状态为{status.employee_type}，实习状态为{status.status}')
+                continue
+
+            scores = [item.get(field) for field in SCORE_FIELDS]
+            # bool 是 int 的子类，JSON 中的 true/false 不能当作 1/0 分
+            if not all(isinstance(score, int) and not isinstance(score, bool) and 1 <= score <= 5 for score in scores):
+                fail('评分项必须为 1-5 的整数')
+                continue
+            evaluation_type = item.get('evaluation_type', data.get('evaluation_type'))
+            if evaluation_type not in EVALUATION_TYPES:
+                fail('评估类型无效')
+                continue
+            try:
+                evaluation_date = _parse_date(item.get('evaluation_date', data.get('evaluation_date')), 'evaluation_date')
+            except ValueError as e:
+                fail(str(e))
+                continue
+            evaluator_id = item.get('evaluator_id', data.get('evaluator_id'))
+            if evaluator_id not in evaluators:
+                fail('评估人不存在')
+                continue
+            recommended_position_id = item.get('recommended_position_id')
+            if recommended_position_id and recommended_position_id not in positions:
+                fail('建议转正职位不存在')
+                continue
+
+            recommended = bool(item.get('conversion_recommended', False))
+            evaluations.append({
+                'intern_status_id': status_id,
+                'evaluation_date': evaluation_date,
+                'evaluation_type': evaluation_type,
+                **{field: item[field] for field in SCORE_FIELDS},
+                'total_score': sum(scores),
+                'evaluation_content': item.get('evaluation_content'),
+                'improvement_suggestions': item.get('improvement_suggestions'),
+                'conversion_recommended': recommended,
+                'recommended_position_id': recommended_position_id,
+                'recommended_salary': item.get('recommended_salary'),
+                'conversion_comments': item.get('conversion_comments'),
+                'evaluator_id': evaluator_id
+            })
+
+            next_status = NEXT_STATUS.get(status.status)
+            if evaluation_type != 'final' or not recommended or not next_status:
+                continue
+            department_id = status.employee_department_id or status.department_id
+            if recommended_position_id and recommended_position_id != status.position_id and not department_id:
+                fail('员工未分配部门，无法记录职位变更')
+                continue
+            structure_id = None
+            if salary_options:
+                structure_id = item.get('salary_structure_id', salary_options.get('salary_structure_id'))
+                if structure_id not in structures:
+                    fail('工资结构不存在或未启用')
+                    continue
+            conversions.append({
+                'status': status,
+                'next_status': next_status,
+                'date': evaluation_date,
+                'position_id': recommended_position_id,
+                'department_id': department_id,
+                'comments': item.get('conversion_comments'),
+                'salary_structure_id': structure_id
+            })
+
+        if errors:
+            return None, errors
+
+        # ---------- 批量写入 ----------
+        now = datetime.utcnow()
+        position_changes = []
+        assignments = []
+        try:
+            # 使用表级 INSERT：ORM 批量插入会按值为 None 的字段拆分批次，空值交替时退化为逐条插入
+            for evaluation in evaluations:
+                evaluation['created_at'] = now
+            InternService._insert(InternEvaluation.__table__, 'intern_status_id', evaluations)
+
+            if conversions:
+                # 按主键批量更新（executemany）
+                db.session.execute(update(InternStatus), [{
+                    'id': conversion['status'].id,
+                    'status': conversion['next_status'],
+                    'actual_end_date': conversion['date'],
+                    'updated_at': now
+                } for conversion in conversions])
+                db.session.execute(update(Employee), [{
+                    'id': conversion['status'].employee_id,
+                    'employee_type': conversion['next_status'],
+                    'position_id': conversion['position_id'] or conversion['status'].position_id,
+                    'updated_at': now
+                } for conversion in conversions])
+
+                position_changes = [{
+                    'employee_id': conversion['status'].employee_id,
+                    'old_department_id': conversion['department_id'],
+                    'new_department_id': conversion['department_id'],
+                    'old_position_id': conversion['status'].position_id,
+                    'new_position_id': conversion['position_id'],
+                    'change_date': conversion['date'],
+                    'change_reason': f"{conversion['status'].status}转{conversion['next_status']}职位调整 - "
+                                     f"{conversion['comments'] or '无'}",
+                    'created_at': now
+                } for conversion in conversions
+                    if conversion['position_id'] and conversion['position_id'] != conversion['status'].position_id]
+                ChangeCaptureService.record(db.session, InternStatus.__tablename__,
+                                            [conversion['status'].id for conversion in conversions],
+                                            'update', ['status', 'actual_end_date', 'updated_at'])
+                ChangeCaptureService.record(db.session, Employee.__tablename__,
+                                            [conversion['status'].employee_id for conversion in conversions],
+                                            'update', ['employee_type', 'position_id', 'updated_at'])
+                AuditService.record(db.session, InternStatus.__tablename__, 'update', [(conversion['status'].id, {
+                    'status': [conversion['status'].status, conversion['next_status']],
+                    'actual_end_date': [conversion['status'].actual_end_date, conversion['date']]
+                }) for conversion in conversions])
+                AuditService.record(db.session, Employee.__tablename__, 'update', [(conversion['status'].employee_id, {
+                    'employee_type': [conversion['status'].employee_type, conversion['next_status']],
+                    'position_id': [conversion['status'].position_id,
+                                    conversion['position_id'] or conversion['status'].position_id]
+                }) for conversion in conversions])
+
+                if position_changes:
+                    InternService._insert(PositionChangeHistory.__table__, 'employee_id', position_changes)
+
+                if salary_options:
+                    assignments = InternService._salary_assignments(conversions, effective_date, expiry_date)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        elapsed = time.perf_counter() - started
+        return {
+            'evaluated': len(evaluations),
+            'converted': len(conversions),
+            'position_changes': len(position_changes),
+            'salary_assignments': len(assignments),
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }, []
+
+    @staticmethod
+    def _insert(table, column: str, rows: List[Dict]) -> None:
+        """
+        批量插入，并手动记录数据变更和审计日志（批量语句不经过会话事件）
+
+        插入前锁定表中最大的ID，按 ID 大于该值且所属记录（column，批次内唯一）在本批次中读回新记录的ID
+        """
+        after_id = last_id(table)
+        db.session.execute(table.insert(), rows)
+        ids = dict(db.session.execute(select(table.c[column], table.c.id).where(
+            table.c.id > after_id,
+            table.c[column].in_([row[column] for row in rows])
+        )).all())
+        ChangeCaptureService.record(db.session, table.name, list(ids.values()), 'insert')
+        AuditService.record(db.session, table.name, 'insert', [
+            (ids[row[column]], AuditService.snapshot(row, 'insert')) for row in rows if row[column] in ids
+        ])
+
+    @staticmethod
+    def _salary_assignments(conversions: List[Dict], effective_date, expiry_date) -> List[Dict]:
+        """为转正员工批量创建员工专属工资结构分配（已有相同结构的有效分配时跳过），并标记工资重算"""
+        from app.services.payroll_recalc_service import PayrollRecalcService, RecalcScope
+
+        employee_ids = [conversion['status'].employee_id for conversion in conversions]
+        existing = set(db.session.query(
+            SalaryStructureAssignment.employee_id, SalaryStructureAssignment.salary_structure_id
+        ).filter(
+            SalaryStructureAssignment.employee_id.in_(employee_ids),
+            SalaryStructureAssignment.is_active.is_(True),
+            db.or_(SalaryStructureAssignment.expiry_date.is_(None),
+                   SalaryStructureAssignment.expiry_date >= effective_date)
+        ))
+        # created_at 与模型默认值一致使用本地时间
+        created_at = datetime.now()
+        assignments = [{
+            'salary_structure_id': conversion['salary_structure_id'],
+            'employee_id': conversion['status'].employee_id,
+            'department_id': None,
+            'is_default': False,
+            'effective_date': effective_date,
+            'expiry_date': expiry_date,
+            'is_active': True,
+            'created_at': created_at
+        } for conversion in conversions
+            if (conversion['status'].employee_id, conversion['salary_structure_id']) not in existing]
+        if not assignments:
+            return []
+
+        InternService._insert(SalaryStructureAssignment.__table__, 'employee_id', assignments)
+        PayrollRecalcService.mark(db.session, [RecalcScope(
+            'salary_structure_assignments', effective_date, expiry_date,
+            [assignment['employee_id'] for assignment in assignments]
+        )])
+        return assignments
@@ -0,0 +1,377 @@
+"""
+请假时长计算服务模块
+根据工作日历（周末、法定节假日、调休工作日）和员工适用考勤规则的上下班时间、
+午休时间，在服务端计算请假/假期申请的工作日天数和工时，支持半天；
+同时负责假期余额的原子扣减。
+工作日历按年份缓存，法定节假日变更时主动失效。
+"""
+
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.employee import Employee
+from app.models.holiday import HolidayBalance, HolidayRequestCharge, HolidayType
+from app.services.absence_index_service import AbsenceIndexService
+from app.services.audit_service import AuditService
+from app.services.change_capture_service import ChangeCaptureService
+from app.services.holiday_accrual_service import HolidayAccrualService
+from app.services.payroll_input_service import PayrollInputService
+
+# 半天：开始日可从下午开始，结束日可在上午结束
+START_PERIODS = ('full', 'pm')
+END_PERIODS = ('full', 'am')
+
+# 扣减/退回余额时修改的字段
+BALANCE_COLUMNS = ('used_days', 'remaining_days', 'updated_at')
+
+class WorkSchedule:
+    """每日工作时间（来自考勤规则）"""
+
+    __slots__ = ('work_start', 'work_end', 'break_start', 'break_end')
+
+    def __init__(self, work_start: dt_time, work_end: dt_time,
+                 break_start: Optional[dt_time] = None, break_end: Optional[dt_time] = None):
+        self.work_start = work_start
+        self.work_end = work_end
+        self.break_start = break_start
+        self.break_end = break_end
+
+    @classmethod
+    def from_rule(cls, rule) -> 'WorkSchedule':
+        if rule is None:
+            return DEFAULT_SCHEDULE
+        return cls(rule.work_start_time, rule.work_end_time, rule.break_start_time, rule.break_end_time)
+
+    @staticmethod
+    def _hours(start: datetime, end: datetime) -> float:
+        return max((end - start).total_seconds(), 0) / 3600
+
+    def hours_between(self, day: date, start: Optional[dt_time] = None, end: Optional[dt_time] = None) -> float:
+        """某个工作日内 [start, end] 与工作时间重叠的小时数（扣除午休）"""
+        window_start = datetime.combine(day, max(start or self.work_start, self.work_start))
+        window_end = datetime.combine(day, min(end or self.work_end, self.work_end))
+        if window_end <= window_start:
+            return 0.0
+        hours = self._hours(window_start, window_end)
+        if self.break_start and self.break_end:
+            overlap_start = max(window_start, datetime.combine(day, self.break_start))
+            overlap_end = min(window_end, datetime.combine(day, self.break_end))
+            hours -= self._hours(overlap_start, overlap_end)
+        return hours
+
+    @property
+    def daily_hours(self) -> float:
+        return self.hours_between(date.today()) or 8.0
+
+DEFAULT_SCHEDULE = WorkSchedule(dt_time(9, 0), dt_time(18, 0), dt_time(12, 0), dt_time(13, 0))
+
+class LeaveDuration:
+    """请假时长计算结果"""
+
+    __slots__ = ('days', 'hours', 'working_days')
+
+    def __init__(self, days: float, hours: float, working_days: int):
+        self.days = days
+        self.hours = hours
+        self.working_days = working_days
+
+    def to_dict(self) -> dict:
+        return {'days': self.days, 'hours': self.hours, 'working_days': self.working_days}
+
+class LeaveDurationService:
+    _lock = threading.Lock()
+
+    # ---------- 工作日历 ----------
+
+    @staticmethod
+    def _calendar_cache() -> dict:
+        cache = current_app.extensions.get('work_calendar')
+        if cache is None:
+            cache = {}
+            current_app.extensions['work_calendar'] = cache
+        return cache
+
+    @staticmethod
+    def get_calendar(year: int) -> Tuple[Set[date], Set[date]]:
+        """
+        获取某年的法定节假日和调休工作日（缓存 WORK_CALENDAR_CACHE_TTL 秒）
+
+        返回：
+            (节假日集合, 调休工作日集合)
+        """
+        cache = LeaveDurationService._calendar_cache()
+        with LeaveDurationService._lock:
+            entry = cache.get(year)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1], entry[2]
+        holidays, workdays = PayrollInputService.get_calendar(date(year, 1, 1), date(year, 12, 31))
+        with LeaveDurationService._lock:
+            cache[year] = (time.monotonic() + current_app.config['WORK_CALENDAR_CACHE_TTL'], holidays, workdays)
+        return holidays, workdays
+
+    @staticmethod
+    def invalidate_calendar() -> None:
+        """法定节假日变更后清除工作日历缓存"""
+        with LeaveDurationService._lock:
+            LeaveDurationService._calendar_cache().clear()
+
+    @staticmethod
+    def is_workday(day: date) -> bool:
+        holidays, workdays = LeaveDurationService.get_calendar(day.year)
+        return PayrollInputService.day_category(day, holidays, workdays) == 'weekday'
+
+    @staticmethod
+    def get_schedule(employee_id: int, start: date, end: date) -> WorkSchedule:
+        """员工在日期范围内适用的每日工作时间，没有考勤规则时为 9:00-18:00、午休 12:00-13:00"""
+        employee = Employee.query.get(employee_id)
+        if employee is None:
+            return DEFAULT_SCHEDULE
+        rule = PayrollInputService.get_attendance_rules([employee], start, end)[employee.id]
+        return WorkSchedule.from_rule(rule)
+
+    # ---------- 时长计算 ----------
+
+    @staticmethod
+    def calculate_days(employee_id: int, start_date: date, end_date: date,
+                       start_period: str = 'full', end_period: str = 'full') -> LeaveDuration:
+        """
+        按天计算假期时长（假期申请）
+
+        参数：
+            employee_id: 员工ID
+            start_date: 开始日期
+            end_date: 结束日期
+            start_period: full(全天) / pm(开始日下午开始)
+            end_period: full(全天) / am(结束日上午结束)
+
+        返回：
+            LeaveDuration，天数按工作日计算，半天计 0.5 天
+        """
+        if start_date > end_date:
+            raise ValueError('开始日期不能晚于结束日期')
+        if start_period not in START_PERIODS or end_period not in END_PERIODS:
+            raise ValueError('无效的半天设置')
+        if start_date == end_date and start_period == 'pm' and end_period == 'am':
+            raise ValueError('同一天不能同时从下午开始并在上午结束')
+
+        days = 0.0
+        working_days = 0
+        day = start_date
+        while day <= end_date:
+            if LeaveDurationService.is_workday(day):
+                working_days += 1
+                portion = 1.0
+                if day == start_date and start_period == 'pm':
+                    portion -= 0.5
+                if day == end_date and end_period == 'am':
+                    portion -= 0.5
+                days += portion
+            day += timedelta(days=1)
+
+        schedule = LeaveDurationService.get_schedule(employee_id, start_date, end_date)
+        return LeaveDuration(days, round(days * schedule.daily_hours, 2), working_days)
+
+    @staticmethod
+    def calculate_hours(employee_id: int, start: datetime, end: datetime) -> LeaveDuration:
+        """
+        按工时计算请假时长（请假记录，精确到时间）
+
+        只统计工作日内与上下班时间重叠的部分并扣除午休，天数 = 工时 / 每日工时
+        """
+        if start >= end:
+            raise ValueError('开始时间必须早于结束时间')
+
+        schedule = LeaveDurationService.get_schedule(employee_id, start.date(), end.date())
+        hours = 0.0
+        working_days = 0
+        day = start.date()
+        while day <= end.date():
+            if LeaveDurationService.is_workday(day):
+                day_hours = schedule.hours_between(
+                    day,
+                    start.time() if day == start.date() else None,
+                    end.time() if day == end.date() else None
+                )
+                if day_hours > 0:
+                    working_days += 1
+                    hours += day_hours
+            day += timedelta(days=1)
+
+        return LeaveDuration(round(hours / schedule.daily_hours, 2), round(hours, 2), working_days)
+
+    @staticmethod
+    def days_by_year(employee_id: int, start_date: date, end_date: date,
+                     start_period: str = 'full', end_period: str = 'full') -> Dict[int, float]:
+        """
+        按自然年拆分假期时长，跨年的申请分别计入各年度的余额
+
+        返回：
+            年份 -> 天数的字典（不含没有工作日的年份）
+        """
+        result = {}
+        for year in range(start_date.year, end_date.year + 1):
+            segment_start = max(start_date, date(year, 1, 1))
+            segment_end = min(end_date, date(year, 12, 31))
+            days = LeaveDurationService.calculate_days(
+                employee_id, segment_start, segment_end,
+                start_period if segment_start == start_date else 'full',
+                end_period if segment_end == end_date else 'full'
+            ).days
+            if days > 0:
+                result[year] = days
+        return result
+
+    # ---------- 请假记录 ----------
+
+    @staticmethod
+    def apply_to_leave(leave) -> LeaveDuration:
+        """
+        计算请假记录的天数和工时并写入记录，同时校验与已有请假、加班、假期申请的冲突
+
+        异常：
+            ValueError: 时间范围无效、不含工作时间或存在冲突
+        """
+        duration = LeaveDurationService.calculate_hours(leave.employee_id, leave.start_date, leave.end_date)
+        if duration.hours <= 0:
+            raise ValueError('所选时间范围内没有工作时间')
+        AbsenceIndexService.check_conflicts(
+            leave.employee_id, leave.start_date, leave.end_date,
+            exclude=('leave', leave.id) if leave.id else None
+        )
+        leave.duration = duration.days
+        leave.hours = duration.hours
+        return duration
+
+    # ---------- 假期余额 ----------
+
+    @staticmethod
+    def get_or_create_balance(employee_id: int, holiday_type: HolidayType, year: int) -> Optional[HolidayBalance]:
+        """
+        获取员工某类假期某年的余额（无配额的假期类型返回 None）
+
+        余额通常由年度批量发放生成，尚未生成时按同样的规则（入职折算、上年结转）为该员工补发
+        （在保存点中执行，并发补发产生唯一约束冲突时重新查询）
+        """
+        if not holiday_type.annual_quota:
+            return None
+        query = HolidayBalance.query.filter_by(
+            employee_id=employee_id,
+            holiday_type_id=holiday_type.id,
+            year=year
+        )
+        balance = query.first()
+        if balance is None:
+            # 并发请求同时补发时由唯一约束兜底，失败的一方回滚保存点后读取对方生成的余额
+            try:
+                with db.session.begin_nested():
+                    HolidayAccrualService.accrue(year, [employee_id], [holiday_type.id], record=False)
+            except IntegrityError:
+                pass
+            balance = query.first()
+        return balance
+
+    @staticmethod
+    def consume_balance(balance_id: int, days: float) -> bool:
+        """
+        原子扣减假期余额：单条带余额条件的 UPDATE，并发审批时不会扣成负数
+
+        返回：
+            是否扣减成功（余额不足时返回 False）
+        """
+        before = LeaveDurationService._locked_balance(balance_id)
+        if before is None or before.remaining_days < days:
+            return False
+        count = HolidayBalance.query.filter(
+            HolidayBalance.id == balance_id,
+            HolidayBalance.remaining_days >= days
+        ).update({
+            HolidayBalance.used_days: HolidayBalance.used_days + days,
+            HolidayBalance.remaining_days: HolidayBalance.remaining_days - days,
+            HolidayBalance.updated_at: datetime.utcnow()
+        }, synchronize_session='fetch')
+        if count != 1:
+            return False
+        LeaveDurationService._record_balance_change(balance_id, before, days)
+        return True
+
+    @staticmethod
+    def release_balance(balance_id: int, days: float) -> None:
+        """撤销已批准的申请时原子退回假期余额"""
+        before = LeaveDurationService._locked_balance(balance_id)
+        if before is None:
+            return
+        HolidayBalance.query.filter(HolidayBalance.id == balance_id).update({
+            HolidayBalance.used_days: HolidayBalance.used_days - days,
+            HolidayBalance.remaining_days: HolidayBalance.remaining_days + days,
+            HolidayBalance.updated_at: datetime.utcnow()
+        }, synchronize_session='fetch')
+        LeaveDurationService._record_balance_change(balance_id, before, -days)
+
+    @staticmethod
+    def _locked_balance(balance_id: int):
+        """锁定余额记录并读取修改前的已用/剩余天数"""
+        return db.session.query(HolidayBalance.used_days, HolidayBalance.remaining_days).filter(
+            HolidayBalance.id == balance_id
+        ).with_for_update().first()
+
+    @staticmethod
+    def _record_balance_change(balance_id: int, before, days: float) -> None:
+        """批量语句不经过会话事件，手动记录余额变更和审计日志"""
+        ChangeCaptureService.record(db.session, HolidayBalance.__tablename__, [balance_id], 'update', BALANCE_COLUMNS)
+        AuditService.record(db.session, HolidayBalance.__tablename__, 'update', [(balance_id, {
+            'used_days': [before.used_days, before.used_days + days],
+            'remaining_days': [before.remaining_days, before.remaining_days - days]
+        })])
+
+    @staticmethod
+    def request_days_by_year(holiday_request) -> Dict[int, float]:
+        """假期申请按年度拆分的天数"""
+        return LeaveDurationService.days_by_year(
+            holiday_request.employee_id, holiday_request.start_date, holiday_request.end_date,
+            holiday_request.start_period or 'full', holiday_request.end_period or 'full'
+        )
+
+    @staticmethod
+    def charge_request(holiday_request) -> bool:
+        """
+        批准假期申请时按年度扣减余额，并记录每个年度实际扣减的天数（不提交事务）
+
+        返回：
+            是否全部扣减成功（任一年度余额不足时返回 False，调用方应回滚）
+        """
+        for year, days in LeaveDurationService.request_days_by_year(holiday_request).items():
+            balance = LeaveDurationService.get_or_create_balance(
+                holiday_request.employee_id, holiday_request.holiday_type, year
+            )
+            if balance is None:
+                continue
+            if not LeaveDurationService.consume_balance(balance.id, days):
+                return False
+            holiday_request.charges.append(HolidayRequestCharge(holiday_balance_id=balance.id, days=days))
+        return True
+
+    @staticmethod
+    def refund_request(holiday_request) -> None:
+        """
+        取消已批准的假期申请时退回批准时实际扣减的天数（不提交事务）
+
+        批准后法定节假日、调休或考勤规则发生变化时，按当前日历重新计算的天数会与扣减时不同，
+        因此按扣减记录退回；没有扣减记录（记录扣减明细之前批准）的申请按当前日历计算。
+        """
+        if holiday_request.charges:
+            for charge in holiday_request.charges:
+                LeaveDurationService.release_balance(charge.holiday_balance_id, charge.days)
+            holiday_request.charges = []
+            return
+        for year, days in LeaveDurationService.request_days_by_year(holiday_request).items():
+            balance = HolidayBalance.query.filter_by(
+                employee_id=holiday_request.employee_id,
+                holiday_type_id=holiday_request.holiday_type_id,
+                year=year
+            ).first()
+            if balance:
+                LeaveDurationService.release_balance(balance.id, days)
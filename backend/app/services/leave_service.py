@@ -3,6 +3,7 @@ from sqlalchemy import and_
 from app import db
 from app.models.attendance import Leave
 from app.models.employee import Employee
+from app.services.leave_duration_service import LeaveDurationService
 
 class LeaveService:
     @staticmethod
@@ -44,6 +45,9 @@ class LeaveService:
             
         Returns:
             Leave: 创建的请假记录对象
+            
+        Raises:
+            ValueError: 时间范围无效或与已有请假重叠
         """
         # 转换日期时间字符串为datetime对象
         if isinstance(leave_data.get('start_date'), str):
@@ -51,7 +55,12 @@ class LeaveService:
         if isinstance(leave_data.get('end_date'), str):
             leave_data['end_date'] = datetime.strptime(leave_data['end_date'], '%Y-%m-%d %H:%M:%S')
             
+        # 天数和工时由服务端按工作日历计算
+        leave_data.pop('duration', None)
+        leave_data.pop('hours', None)
         leave = Leave(**leave_data)
+        with db.session.no_autoflush:
+            LeaveDurationService.apply_to_leave(leave)
         db.session.add(leave)
         db.session.commit()
         return leave
@@ -66,6 +75,9 @@ class LeaveService:
             
         Returns:
             Leave: 更新后的请假记录对象
+            
+        Raises:
+            ValueError: 时间范围无效或与已有请假重叠
         """
         leave = Leave.query.get(leave_id)
         if leave:
@@ -75,8 +87,13 @@ class LeaveService:
             if 'end_date' in leave_data and isinstance(leave_data['end_date'], str):
                 leave_data['end_date'] = datetime.strptime(leave_data['end_date'], '%Y-%m-%d %H:%M:%S')
                 
+            leave_data.pop('duration', None)
+            leave_data.pop('hours', None)
             for key, value in leave_data.items():
                 setattr(leave, key, value)
+            if {'employee_id', 'start_date', 'end_date'} & set(leave_data):
+                with db.session.no_autoflush:
+                    LeaveDurationService.apply_to_leave(leave)
             db.session.commit()
         return leave
 
@@ -108,6 +125,9 @@ class LeaveService:
             
         Returns:
             Leave: 更新后的请假记录对象
+            
+        Raises:
+            ValueError: 时间范围无效或与已有请假重叠
         """
         leave = Leave.query.get(leave_id)
         if leave:
@@ -0,0 +1,202 @@
+"""
+媒体文件服务模块
+上传文件按内容哈希存储（相同内容只保存一份），上传时一次性生成缩略图，
+ETag 和文件大小写入数据库，访问时无需再读取文件计算哈希
+"""
+
+import os
+import hashlib
+import uuid
+from typing import Optional, Tuple
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.media import MediaFile
+
+# 读取上传流的块大小
+CHUNK_SIZE = 64 * 1024
+
+IMAGE_MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif'
+}
+
+class MediaService:
+    @staticmethod
+    def media_folder() -> str:
+        """媒体文件根目录"""
+        return current_app.config['MEDIA_FOLDER']
+
+    @staticmethod
+    def relative_path(content_hash: str, variant: str, ext: str) -> str:
+        """按哈希前两位分目录，避免单目录文件过多"""
+        return os.path.join(content_hash[:2], f'{content_hash}_{variant}.{ext}')
+
+    @staticmethod
+    def absolute_path(media: MediaFile) -> str:
+        """媒体文件的绝对路径"""
+        return os.path.join(MediaService.media_folder(), media.file_path)
+
+    @staticmethod
+    def make_etag(content_hash: str, variant: str) -> str:
+        """内容寻址的文件内容不会变化，哈希加规格即可作为强 ETag"""
+        return f'{content_hash[:32]}-{variant}'
+
+    @staticmethod
+    def write_stream(stream, dest_dir: str) -> Tuple[str, str, int]:
+        """
+        将上传流分块写入临时文件，同时计算 SHA-256
+
+        返回：
+            (内容哈希, 临时文件路径, 文件大小)
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        tmp_path = os.path.join(dest_dir, f'.upload_{uuid.uuid4().hex}')
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                chunk = stream.read(CHUNK_SIZE)
+                while chunk:
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                    chunk = stream.read(CHUNK_SIZE)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256.hexdigest(), tmp_path, size
+
+    @staticmethod
+    def get_variant(content_hash: str, variant: str) -> Optional[MediaFile]:
+        """
+        获取指定规格的文件，缩略图不存在时（如未安装 Pillow）回退到原图
+        """
+        media = MediaFile.query.filter_by(content_hash=content_hash, variant=variant).first()
+        if media is None and variant != 'original':
+            media = MediaFile.query.filter_by(content_hash=content_hash, variant='original').first()
+        return media
+
+    @staticmethod
+    def store_image(file_storage) -> MediaFile:
+        """
+        保存上传的图片并生成缩略图
+
+        参数：
+            file_storage: werkzeug FileStorage 对象
+
+        返回：
+            原图对应的 MediaFile（调用方负责提交事务）
+        """
+        filename = file_storage.filename or ''
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if ext not in IMAGE_MIME_TYPES:
+            raise ValueError('不支持的文件类型')
+        if ext == 'jpeg':
+            ext = 'jpg'
+
+        media_folder = MediaService.media_folder()
+        content_hash, tmp_path, size = MediaService.write_stream(file_storage.stream, media_folder)
+        return MediaService.store_file(tmp_path, content_hash, size, ext, IMAGE_MIME_TYPES[ext])
+
+    @staticmethod
+    def file_sha256(file_path: str) -> str:
+        """分块读取文件计算 SHA-256"""
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            chunk = f.read(CHUNK_SIZE)
+            while chunk:
+                sha256.update(chunk)
+                chunk = f.read(CHUNK_SIZE)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def store_file(tmp_path: str, content_hash: str, size: int, ext: str, mime_type: str) -> MediaFile:
+        """
+        将已写入磁盘的临时文件移动到内容寻址位置
+
+        相同内容已存在时删除临时文件并复用已有记录；图片会同时生成缩略图。
+        调用方负责提交事务。
+
+        参数：
+            tmp_path: 临时文件路径（需与媒体目录位于同一文件系统）
+            content_hash: 文件 SHA-256
+            size: 文件大小
+            ext: 扩展名
+            mime_type: MIME类型
+
+        返回：
+            原文件对应的 MediaFile
+        """
+        existing = MediaFile.query.filter_by(content_hash=content_hash, variant='original').first()
+        if existing:
+            os.remove(tmp_path)
+            return existing
+
+        relative_path = MediaService.relative_path(content_hash, 'original', ext)
+        final_path = os.path.join(MediaService.media_folder(), relative_path)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+
+        original = MediaFile(
+            content_hash=content_hash,
+            variant='original',
+            file_path=relative_path,
+            mime_type=mime_type,
+            file_size=size,
+            etag=MediaService.make_etag(content_hash, 'original')
+        )
+        try:
+            # 在保存点中写入：并发上传相同内容时，后写入的一方只回滚媒体记录，改用已有记录
+            with db.session.begin_nested():
+                db.session.add(original)
+                if mime_type.startswith('image/'):
+                    MediaService.generate_thumbnails(original, final_path)
+        except IntegrityError:
+            existing = MediaFile.query.filter_by(content_hash=content_hash, variant='original').first()
+            if existing is None:
+                raise
+            return existing
+        return original
+
+    @staticmethod
+    def generate_thumbnails(original: MediaFile, source_path: str) -> None:
+        """按配置的尺寸生成缩略图，未安装 Pillow 时跳过"""
+        try:
+            from PIL import Image
+        except ImportError:
+            current_app.logger.warning('未安装 Pillow，跳过缩略图生成')
+            return
+
+        try:
+            with Image.open(source_path) as image:
+                original.width, original.height = image.size
+                image.load()
+                has_alpha = image.mode in ('RGBA', 'LA', 'P')
+                ext, fmt, mime_type = ('png', 'PNG', 'image/png') if has_alpha else ('jpg', 'JPEG', 'image/jpeg')
+                base = image.convert('RGBA' if has_alpha else 'RGB')
+
+                for variant, max_size in current_app.config['MEDIA_THUMBNAIL_SIZES'].items():
+                    thumbnail = base.copy()
+                    thumbnail.thumbnail((max_size, max_size))
+                    relative_path = MediaService.relative_path(original.content_hash, variant, ext)
+                    thumb_path = os.path.join(MediaService.media_folder(), relative_path)
+                    save_kwargs = {'quality': 85, 'optimize': True} if fmt == 'JPEG' else {'optimize': True}
+                    thumbnail.save(thumb_path, fmt, **save_kwargs)
+
+                    db.session.add(MediaFile(
+                        content_hash=original.content_hash,
+                        variant=variant,
+                        file_path=relative_path,
+                        mime_type=mime_type,
+                        file_size=os.path.getsize(thumb_path),
+                        etag=MediaService.make_etag(original.content_hash, variant),
+                        width=thumbnail.width,
+                        height=thumbnail.height
+                    ))
+        except Exception as e:
+            # 缩略图失败不影响原图保存，访问时会回退到原图
+            current_app.logger.error(f'生成缩略图失败: hash={original.content_hash}, error={str(e)}')
@@ -0,0 +1,123 @@
+"""
+组织统计服务模块
+员工按部门、职位、在职状态、员工类型、学历的分布，每种分布一条 GROUP BY 查询，
+查询次数与部门、职位数量无关；仪表盘和各统计接口都从这里读取。
+结果按 ORG_STATS_CACHE_TTL 秒缓存（为 0 时不缓存），本进程提交员工、部门、职位变更后立即失效。
+"""
+
+import threading
+import time
+from typing import Dict, List
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.position import Position
+from app.services.change_capture_service import ChangeCaptureService
+
+EMPLOYMENT_STATUSES = ('active', 'suspended', 'resigned')
+EMPLOYEE_TYPES = ('intern', 'probation', 'regular')
+
+class OrgStatsService:
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """订阅数据变更：本进程提交员工、部门、职位变更后使缓存失效"""
+        ChangeCaptureService.subscribe(
+            OrgStatsService._on_change,
+            [Employee.__tablename__, Department.__tablename__, Position.__tablename__],
+            sync=True
+        )
+
+    @staticmethod
+    def _on_change(changes) -> None:
+        OrgStatsService.invalidate()
+
+    @staticmethod
+    def invalidate() -> None:
+        """清除统计缓存"""
+        with OrgStatsService._lock:
+            current_app.extensions.pop('org_stats', None)
+
+    @staticmethod
+    def get_stats(refresh: bool = False) -> Dict:
+        """
+        获取组织统计（读取缓存）
+
+        参数：
+            refresh: 是否忽略缓存重新统计
+
+        返回：
+            包含 totals、departments、positions、status、type、education 的字典
+        """
+        ttl = current_app.config['ORG_STATS_CACHE_TTL']
+        if ttl and not refresh:
+            with OrgStatsService._lock:
+                entry = current_app.extensions.get('org_stats')
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+        stats = OrgStatsService.compute()
+        if ttl:
+            with OrgStatsService._lock:
+                current_app.extensions['org_stats'] = (time.monotonic() + ttl, stats)
+        return stats
+
+    @staticmethod
+    def compute() -> Dict:
+        """统计各维度的员工分布（每个维度一条分组查询）"""
+        departments = [
+            {'id': id, 'name': name, 'value': count}
+            for id, name, count in db.session.query(
+                Department.id, Department.name, func.count(Employee.id)
+            ).outerjoin(Employee, Employee.department_id == Department.id)
+             .group_by(Department.id, Department.name).order_by(Department.id)
+        ]
+        positions = [
+            {'id': id, 'name': name, 'value': count}
+            for id, name, count in db.session.query(
+                Position.id, Position.name, func.count(Employee.id)
+            ).outerjoin(Employee, Employee.position_id == Position.id)
+             .group_by(Position.id, Position.name).order_by(Position.id)
+        ]
+        status = OrgStatsService._group(Employee.employment_status)
+        types = OrgStatsService._group(Employee.employee_type)
+        education = OrgStatsService._group(Employee.education)
+
+        return {
+            'totals': {
+                'employees': sum(status.values()),
+                'departments': len(departments),
+                'positions': len(positions)
+            },
+            'departments': departments,
+            'positions': positions,
+            'status': status,
+            'type': types,
+            'education': [
+                {'name': name or '未填写', 'value': count}
+                for name, count in sorted(education.items(), key=lambda item: -item[1])
+            ]
+        }
+
+    @staticmethod
+    def _group(column) -> Dict:
+        return dict(db.session.query(column, func.count(Employee.id)).group_by(column).all())
+
+    @staticmethod
+    def status_counts(stats: Dict) -> Dict[str, int]:
+        """在职状态统计（固定包含 active/suspended/resigned 和 total）"""
+        counts = {status: stats['status'].get(status, 0) for status in EMPLOYMENT_STATUSES}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    @staticmethod
+    def type_counts(stats: Dict) -> Dict[str, int]:
+        """员工类型统计（固定包含 intern/probation/regular）"""
+        return {employee_type: stats['type'].get(employee_type, 0) for employee_type in EMPLOYEE_TYPES}
+
+    @staticmethod
+    def distribution(stats: Dict, key: str) -> List[Dict]:
+        """部门或职位分布，返回 [{'name', 'value'}]"""
+        return [{'name': item['name'], 'value': item['value']} for item in stats[key]]
@@ -3,6 +3,7 @@ from sqlalchemy import and_
 from app import db
 from app.models.attendance import Overtime
 from app.models.employee import Employee
+from app.services.absence_index_service import AbsenceIndexService
 
 class OvertimeService:
     @staticmethod
@@ -44,6 +45,9 @@ class OvertimeService:
             
         Returns:
             Overtime: 创建的加班记录对象
+            
+        Raises:
+            ValueError: 与已有请假、加班或假期申请冲突
         """
         # 转换日期时间字符串为datetime对象
         if isinstance(overtime_data.get('start_time'), str):
@@ -52,6 +56,7 @@ class OvertimeService:
             overtime_data['end_time'] = datetime.strptime(overtime_data['end_time'], '%Y-%m-%d %H:%M:%S')
             
         overtime = Overtime(**overtime_data)
+        AbsenceIndexService.check_conflicts(overtime.employee_id, overtime.start_time, overtime.end_time)
         db.session.add(overtime)
         db.session.commit()
         return overtime
@@ -66,6 +71,9 @@ class OvertimeService:
             
         Returns:
             Overtime: 更新后的加班记录对象
+            
+        Raises:
+            ValueError: 与已有请假、加班或假期申请冲突
         """
         overtime = Overtime.query.get(overtime_id)
         if overtime:
@@ -77,6 +85,12 @@ class OvertimeService:
                 
             for key, value in overtime_data.items():
                 setattr(overtime, key, value)
+            if {'employee_id', 'start_time', 'end_time'} & set(overtime_data):
+                with db.session.no_autoflush:
+                    AbsenceIndexService.check_conflicts(
+                        overtime.employee_id, overtime.start_time, overtime.end_time,
+                        exclude=('overtime', overtime.id)
+                    )
             db.session.commit()
         return overtime
 
@@ -108,6 +122,9 @@ class OvertimeService:
             
         Returns:
             Overtime: 更新后的加班记录对象
+            
+        Raises:
+            ValueError: 与已有请假、加班或假期申请冲突
         """
         overtime = Overtime.query.get(overtime_id)
         if overtime:
@@ -0,0 +1,104 @@
+"""
+密码哈希服务模块
+    - 哈希算法和代价由 PASSWORD_HASH_METHOD 配置（werkzeug 格式，如 scrypt:32768:8:1、pbkdf2:sha256:600000）
+    - 已存储的哈希与当前配置不一致时，登录成功后用明文密码重新哈希（needs_rehash）
+    - 哈希计算在专用线程池中执行（hashlib 计算期间释放 GIL），同时进行的计算不超过
+      PASSWORD_VERIFY_WORKERS 个，排队超过 PASSWORD_VERIFY_QUEUE 个时直接拒绝，
+      登录高峰期不会占满全部 CPU 而拖慢其他接口
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug 各算法省略参数时使用的默认值
+DEFAULT_METHOD_PARAMS = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256': 'pbkdf2:sha256:1000000'
+}
+
+# 校验线程池排队已满时的提示
+BUSY_MESSAGE = '登录请求过多，请稍后重试'
+
+class PasswordBusyError(RuntimeError):
+    """密码校验线程池已满或等待超时"""
+
+    def __init__(self, message: str = BUSY_MESSAGE):
+        super().__init__(message)
+
+class PasswordService:
+    _executor = None
+    _slots = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def method() -> str:
+        """当前配置的哈希方法（补全默认参数）"""
+        method = current_app.config['PASSWORD_HASH_METHOD']
+        return DEFAULT_METHOD_PARAMS.get(method, method)
+
+    @staticmethod
+    def _submit(fn, *args):
+        """在校验线程池中执行哈希计算，等待结果"""
+        with PasswordService._lock:
+            if PasswordService._executor is None:
+                workers = current_app.config['PASSWORD_VERIFY_WORKERS']
+                PasswordService._executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix='password-verify'
+                )
+                PasswordService._slots = threading.BoundedSemaphore(
+                    workers + current_app.config['PASSWORD_VERIFY_QUEUE']
+                )
+        slots = PasswordService._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordBusyError()
+        try:
+            future = PasswordService._executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=current_app.config['PASSWORD_VERIFY_TIMEOUT'])
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordBusyError()
+
+    @staticmethod
+    def hash(password: str) -> str:
+        """按当前配置生成密码哈希"""
+        if not has_app_context():
+            return generate_password_hash(password)
+        return PasswordService._submit(generate_password_hash, password, PasswordService.method())
+
+    @staticmethod
+    def verify(stored_hash: str, password: str) -> bool:
+        """
+        校验密码
+
+        异常：
+            PasswordBusyError: 线程池排队已满或等待超时
+        """
+        if not stored_hash:
+            return False
+        if not has_app_context():
+            return check_password_hash(stored_hash, password)
+        return PasswordService._submit(check_password_hash, stored_hash, password)
+
+    @staticmethod
+    def needs_rehash(stored_hash: str) -> bool:
+        """已存储哈希的算法或代价与当前配置不一致"""
+        stored_method = stored_hash.split('$', 1)[0] if stored_hash else ''
+        return DEFAULT_METHOD_PARAMS.get(stored_method, stored_method) != PasswordService.method()
+
+    @staticmethod
+    def shutdown() -> None:
+        """关闭校验线程池（配置变更后重新创建）"""
+        with PasswordService._lock:
+            if PasswordService._executor is not None:
+                PasswordService._executor.shutdown(wait=True)
+            PasswordService._executor = None
+            PasswordService._slots = None
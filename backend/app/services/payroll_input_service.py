@@ -0,0 +1,259 @@
+"""
+薪资输入汇总服务模块
+按月汇总每位员工已批准的加班时长（按工作日/周末/节假日区分倍率）、
+无薪假天数和缺勤次数，作为批量生成工资记录的输入，无需人工整理考勤数据。
+所有数据按员工分组一次性查询，查询次数与员工数量无关。
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import func, or_
+from app import db
+from app.models.attendance import Attendance, Leave, Overtime, AttendanceRule, employee_attendance_rules
+from app.models.employee import Employee
+from app.models.holiday import HolidayRequest, HolidayType
+from app.models.statutory_holiday import StatutoryHoliday
+
+# 计薪天数（与 SalaryService.calculate_overtime_pay 保持一致）
+MONTHLY_PAY_DAYS = Decimal('21.75')
+
+OVERTIME_CATEGORIES = ('weekday', 'weekend', 'holiday')
+
+# 没有适用考勤规则时使用的默认倍率（与 AttendanceRule 字段默认值一致）
+DEFAULT_OVERTIME_RATES = {'weekday': 1.5, 'weekend': 2.0, 'holiday': 3.0}
+
+class PayrollInput:
+    """单个员工某月的薪资输入"""
+
+    def __init__(self, employee_id: int, rates: Dict[str, float]):
+        self.employee_id = employee_id
+        self.overtime_hours = {category: 0.0 for category in OVERTIME_CATEGORIES}
+        self.overtime_rates = dict(rates)
+        self.unpaid_leave_days = 0.0
+        self.absence_days = 0
+
+    @property
+    def total_overtime_hours(self) -> float:
+        return round(sum(self.overtime_hours.values()), 2)
+
+    @staticmethod
+    def daily_wage(basic_salary: Decimal) -> Decimal:
+        """日工资（基本工资 / 计薪天数）"""
+        return Decimal(basic_salary) / MONTHLY_PAY_DAYS
+
+    def category_overtime_pay(self, basic_salary: Decimal, category: str) -> Decimal:
+        """某一类加班（工作日/周末/节假日）的加班费"""
+        from app.services.salary_service import SalaryService
+        hours = self.overtime_hours[category]
+        if not hours:
+            return Decimal('0')
+        return SalaryService.calculate_overtime_pay(basic_salary, hours, self.overtime_rates[category])
+
+    def overtime_pay(self, basic_salary: Decimal) -> Decimal:
+        """按各类加班时长和对应倍率计算加班费"""
+        total = sum((self.category_overtime_pay(basic_salary, category) for category in OVERTIME_CATEGORIES), Decimal('0'))
+        return total.quantize(Decimal('0.01'))
+
+    def leave_deduction(self, basic_salary: Decimal) -> Decimal:
+        """无薪假按日工资扣除"""
+        days = Decimal(str(self.unpaid_leave_days))
+        return (PayrollInput.daily_wage(basic_salary) * days).quantize(Decimal('0.01'))
+
+    def absence_deduction(self, basic_salary: Decimal) -> Decimal:
+        """缺勤按日工资扣除"""
+        return (PayrollInput.daily_wage(basic_salary) * Decimal(self.absence_days)).quantize(Decimal('0.01'))
+
+    def deductions(self, basic_salary: Decimal) -> Decimal:
+        """无薪假和缺勤扣款合计"""
+        return self.leave_deduction(basic_salary) + self.absence_deduction(basic_salary)
+
+    def to_dict(self) -> dict:
+        return {
+            'employee_id': self.employee_id,
+            'overtime_hours': {k: round(v, 2) for k, v in self.overtime_hours.items()},
+            'overtime_rates': self.overtime_rates,
+            'total_overtime_hours': self.total_overtime_hours,
+            'unpaid_leave_days': round(self.unpaid_leave_days, 2),
+            'absence_days': self.absence_days
+        }
+
+class PayrollInputService:
+    @staticmethod
+    def month_range(year: int, month: int) -> Tuple[date, date]:
+        """月份的首日和末日"""
+        return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+    @staticmethod
+    def get_calendar(start: date, end: date) -> Tuple[Set[date], Set[date]]:
+        """
+        获取日期范围内的法定节假日和调休工作日
+
+        返回：
+            (节假日集合, 调休工作日集合)
+        """
+        rows = db.session.query(StatutoryHoliday.date, StatutoryHoliday.holiday_type).filter(
+            StatutoryHoliday.date.between(start, end)
+        ).all()
+        holidays = {row.date for row in rows if row.holiday_type == 'holiday'}
+        workdays = {row.date for row in rows if row.holiday_type == 'workday'}
+        return holidays, workdays
+
+    @staticmethod
+    def day_category(day: date, holidays: Set[date], workdays: Set[date]) -> str:
+        """判断日期属于工作日、周末还是节假日"""
+        if day in holidays:
+            return 'holiday'
+        if day.weekday() >= 5 and day not in workdays:
+            return 'weekend'
+        return 'weekday'
+
+    @staticmethod
+    def working_days(start: date, end: date, holidays: Set[date], workdays: Set[date]) -> int:
+        """统计日期范围内（含首尾）的工作日天数"""
+        days = 0
+        day = start
+        while day <= end:
+            if PayrollInputService.day_category(day, holidays, workdays) == 'weekday':
+                days += 1
+            day += timedelta(days=1)
+        return days
+
+    @staticmethod
+    def get_attendance_rules(employees: List[Employee], start: date, end: date) -> Dict[int, Optional[AttendanceRule]]:
+        """
+        获取每位员工在日期范围内适用的考勤规则（查询次数与员工数量无关）
+
+        优先级：员工指定的考勤规则 > 部门规则 > 默认规则，同级按优先级取最高者
+        """
+        rules = AttendanceRule.query.filter(
+            AttendanceRule.effective_start_date <= end,
+            or_(AttendanceRule.effective_end_date.is_(None), AttendanceRule.effective_end_date >= start)
+        ).order_by(AttendanceRule.priority.desc(), AttendanceRule.id.desc()).all()
+        rules_by_id = {rule.id: rule for rule in rules}
+
+        department_rules = {}
+        default_rule = None
+        for rule in rules:
+            if rule.department_id and rule.department_id not in department_rules:
+                department_rules[rule.department_id] = rule
+            if rule.is_default and default_rule is None:
+                default_rule = rule
+
+        employee_rules = {}
+        employee_ids = [employee.id for employee in employees]
+        if employee_ids and rules_by_id:
+            links = db.session.query(
+                employee_attendance_rules.c.employee_id,
+                employee_attendance_rules.c.rule_id
+            ).filter(employee_attendance_rules.c.employee_id.in_(employee_ids)).all()
+            for employee_id, rule_id in links:
+                rule = rules_by_id.get(rule_id)
+                current = employee_rules.get(employee_id)
+                if rule and (current is None or (rule.priority or 0) > (current.priority or 0)):
+                    employee_rules[employee_id] = rule
+
+        return {
+            employee.id: employee_rules.get(employee.id) or department_rules.get(employee.department_id) or default_rule
+            for employee in employees
+        }
+
+    @staticmethod
+    def get_overtime_rates(employees: List[Employee], start: date, end: date) -> Dict[int, Dict[str, float]]:
+        """获取每位员工适用的加班倍率"""
+        rules = PayrollInputService.get_attendance_rules(employees, start, end)
+        rates = {}
+        for employee in employees:
+            rule = rules[employee.id]
+            if rule:
+                rates[employee.id] = {
+                    'weekday': rule.overtime_rate or DEFAULT_OVERTIME_RATES['weekday'],
+                    'weekend': rule.weekend_overtime_rate or DEFAULT_OVERTIME_RATES['weekend'],
+                    'holiday': rule.holiday_overtime_rate or DEFAULT_OVERTIME_RATES['holiday']
+                }
+            else:
+                rates[employee.id] = dict(DEFAULT_OVERTIME_RATES)
+        return rates
+
+    @staticmethod
+    def aggregate(year: int, month: int, employees: Optional[List[Employee]] = None) -> Dict[int, PayrollInput]:
+        """
+        汇总指定月份的薪资输入
+
+        参数：
+            year: 年份
+            month: 月份
+            employees: 员工列表，默认为所有在职员工
+
+        返回：
+            员工ID -> PayrollInput 的字典
+        """
+        start, end = PayrollInputService.month_range(year, month)
+        month_start = datetime.combine(start, datetime.min.time())
+        next_month = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+        if employees is None:
+            employees = Employee.query.filter(Employee.employment_status == 'active').all()
+        employee_ids = [employee.id for employee in employees]
+        if not employee_ids:
+            return {}
+
+        holidays, workdays = PayrollInputService.get_calendar(start, end)
+        rates = PayrollInputService.get_overtime_rates(employees, start, end)
+        inputs = {employee_id: PayrollInput(employee_id, rates[employee_id]) for employee_id in employee_ids}
+        unpaid_types = current_app.config['PAYROLL_UNPAID_LEAVE_TYPES']
+
+        # 已批准的加班，按开始日期归属月份和类别
+        overtimes = db.session.query(Overtime.employee_id, Overtime.start_time, Overtime.end_time).filter(
+            Overtime.employee_id.in_(employee_ids),
+            Overtime.status == 'approved',
+            Overtime.start_time >= month_start,
+            Overtime.start_time < next_month
+        ).all()
+        for employee_id, start_time, end_time in overtimes:
+            hours = max((end_time - start_time).total_seconds(), 0) / 3600
+            category = PayrollInputService.day_category(start_time.date(), holidays, workdays)
+            inputs[employee_id].overtime_hours[category] += hours
+
+        # 已批准的无薪请假，只统计落在本月的工作日
+        leaves = db.session.query(Leave.employee_id, Leave.start_date, Leave.end_date).filter(
+            Leave.employee_id.in_(employee_ids),
+            Leave.status == 'approved',
+            Leave.leave_type.in_(unpaid_types),
+            Leave.start_date < next_month,
+            Leave.end_date >= month_start
+        ).all()
+        for employee_id, leave_start, leave_end in leaves:
+            inputs[employee_id].unpaid_leave_days += PayrollInputService.working_days(
+                max(leave_start.date(), start), min(leave_end.date(), end), holidays, workdays
+            )
+
+        # 假期申请中的无薪假：完全落在本月时使用申请天数（可含半天），跨月时按本月工作日计算
+        holiday_requests = db.session.query(
+            HolidayRequest.employee_id, HolidayRequest.start_date, HolidayRequest.end_date, HolidayRequest.duration
+        ).join(HolidayType, HolidayRequest.holiday_type_id == HolidayType.id).filter(
+            HolidayRequest.employee_id.in_(employee_ids),
+            HolidayRequest.status == 'approved',
+            HolidayType.code.in_(unpaid_types),
+            HolidayRequest.start_date <= end,
+            HolidayRequest.end_date >= start
+        ).all()
+        for employee_id, request_start, request_end, duration in holiday_requests:
+            if request_start >= start and request_end <= end:
+                days = duration or 0
+            else:
+                days = PayrollInputService.working_days(max(request_start, start), min(request_end, end), holidays, workdays)
+            inputs[employee_id].unpaid_leave_days += days
+
+        # 缺勤次数
+        absences = db.session.query(Attendance.employee_id, func.count(Attendance.id)).filter(
+            Attendance.employee_id.in_(employee_ids),
+            Attendance.status == 'absent',
+            Attendance.date.between(start, end)
+        ).group_by(Attendance.employee_id).all()
+        for employee_id, count in absences:
+            inputs[employee_id].absence_days = count
+
+        return inputs
@@ -0,0 +1,313 @@
+"""
+薪资增量重算服务模块
+监听工资结构、结构分配、加班、请假、假期申请和缺勤的变更，在同一事务中记录受影响的
+（员工, 月份）待重算标记；提交后由防抖的后台任务合并处理，
+只重算这些员工在这些月份待发放的工资记录，而不是重新生成整月工资。
+"""
+
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import event, inspect
+from app import db
+from app.models.attendance import Attendance, Leave, Overtime
+from app.models.employee import Employee
+from app.models.holiday import HolidayRequest, HolidayType
+from app.models.payroll_recalc import PayrollRecalcMark
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.services.salary_service import SalaryService
+from app.utils.session_state import pop_committed, track
+
+# 影响工资计算的工资结构字段
+STRUCTURE_AMOUNT_FIELDS = ('basic_salary', 'housing_allowance', 'transport_allowance', 'meal_allowance', 'is_active')
+
+# 影响无薪假扣款的假期申请字段
+HOLIDAY_REQUEST_FIELDS = ('employee_id', 'holiday_type_id', 'start_date', 'end_date', 'start_period', 'end_period',
+                          'duration', 'status')
+
+# 影响缺勤扣款的考勤字段
+ATTENDANCE_FIELDS = ('employee_id', 'date', 'status')
+
+def _history_values(obj, attr: str, skip_none: bool = True) -> list:
+    """属性的当前值和本次刷新前的旧值（提交后已过期、未重新加载的属性读取当前值）"""
+    history = inspect(obj).attrs[attr].history
+    values = list(history.added) + list(history.unchanged) + list(history.deleted)
+    if not values:
+        values = [getattr(obj, attr)]
+    return [value for value in values if value is not None] if skip_none else values
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+def _changed(session, obj, fields) -> bool:
+    """新增、删除的对象，或修改了指定字段的对象"""
+    if obj in session.new or obj in session.deleted:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+class RecalcScope:
+    """一次变更影响的员工范围和日期范围"""
+
+    def __init__(self, reason: str, start: Optional[date], end: Optional[date],
+                 employee_ids: Iterable[int] = (), department_ids: Iterable[int] = (), all_employees: bool = False):
+        self.reason = reason
+        self.start = start
+        self.end = end
+        self.employee_ids = set(employee_ids)
+        self.department_ids = set(department_ids)
+        self.all_employees = all_employees
+
+class PayrollRecalcService:
+    _timer = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """注册会话事件监听"""
+        if not event.contains(db.session, 'before_flush', PayrollRecalcService._before_flush):
+            event.listen(db.session, 'before_flush', PayrollRecalcService._before_flush)
+            event.listen(db.session, 'after_commit', PayrollRecalcService._after_commit)
+        track('payroll_recalc_marks', 'payroll_recalc_scheduled')
+
+    # ---------- 变更跟踪 ----------
+
+    @staticmethod
+    def _scopes_for(session, obj) -> list:
+        """根据变更的对象计算影响范围"""
+        if isinstance(obj, Overtime):
+            times = _history_values(obj, 'start_time') + _history_values(obj, 'end_time')
+            if not times:
+                return []
+            dates = [_as_date(value) for value in times]
+            return [RecalcScope('overtimes', min(dates), max(dates), _history_values(obj, 'employee_id'))]
+
+        if isinstance(obj, Leave):
+            times = _history_values(obj, 'start_date') + _history_values(obj, 'end_date')
+            if not times:
+                return []
+            dates = [_as_date(value) for value in times]
+            return [RecalcScope('leaves', min(dates), max(dates), _history_values(obj, 'employee_id'))]
+
+        if isinstance(obj, HolidayRequest):
+            # 只有已批准（或从已批准变为其他状态）的无薪假期申请影响扣款
+            if not _changed(session, obj, HOLIDAY_REQUEST_FIELDS) or 'approved' not in _history_values(obj, 'status'):
+                return []
+            unpaid_types = current_app.config['PAYROLL_UNPAID_LEAVE_TYPES']
+            with session.no_autoflush:
+                unpaid = session.query(HolidayType.id).filter(
+                    HolidayType.id.in_(_history_values(obj, 'holiday_type_id')), HolidayType.code.in_(unpaid_types)
+                ).first()
+            dates = _history_values(obj, 'start_date') + _history_values(obj, 'end_date')
+            if unpaid is None or not dates:
+                return []
+            return [RecalcScope('holiday_requests', min(dates), max(dates), _history_values(obj, 'employee_id'))]
+
+        if isinstance(obj, Attendance):
+            # 只有缺勤（或从缺勤改为其他状态）的考勤记录影响扣款
+            if not _changed(session, obj, ATTENDANCE_FIELDS) or 'absent' not in _history_values(obj, 'status'):
+                return []
+            dates = _history_values(obj, 'date')
+            if not dates:
+                return []
+            return [RecalcScope('attendances', min(dates), max(dates), _history_values(obj, 'employee_id'))]
+
+        if isinstance(obj, SalaryStructureAssignment):
+            starts = _history_values(obj, 'effective_date')
+            # 任意一个版本无失效日期即视为不封顶
+            expiries = _history_values(obj, 'expiry_date', skip_none=False)
+            employee_ids = _history_values(obj, 'employee_id')
+            department_ids = _history_values(obj, 'department_id')
+            return [RecalcScope(
+                'salary_structure_assignments',
+                min(starts) if starts else None,
+                None if not expiries or None in expiries else max(expiries),
+                employee_ids,
+                department_ids,
+                all_employees=not employee_ids and not department_ids
+            )]
+
+        if isinstance(obj, SalaryStructure):
+            if obj in session.dirty and not any(inspect(obj).attrs[field].history.has_changes()
+                                               for field in STRUCTURE_AMOUNT_FIELDS):
+                return []
+            if obj.id is None:
+                return []
+            # 结构金额变化影响所有引用该结构的分配
+            scopes = []
+            with session.no_autoflush:
+                assignments = SalaryStructureAssignment.query.filter_by(salary_structure_id=obj.id).all()
+            for assignment in assignments:
+                scopes.append(RecalcScope(
+                    'salary_structures',
+                    assignment.effective_date,
+                    assignment.expiry_date,
+                    [assignment.employee_id] if assignment.employee_id else (),
+                    [assignment.department_id] if assignment.department_id else (),
+                    all_employees=not assignment.employee_id and not assignment.department_id
+                ))
+            return scopes
+
+        return []
+
+    @staticmethod
+    def _affected_months(session, scope: RecalcScope) -> Set[Tuple[int, int, int]]:
+        """查找范围内待发放的工资记录，返回 (员工ID, 年, 月) 集合"""
+        if not scope.all_employees and not scope.employee_ids and not scope.department_ids:
+            return set()
+
+        query = session.query(SalaryRecord.employee_id, SalaryRecord.year, SalaryRecord.month).filter(
+            SalaryRecord.payment_status == 'pending'
+        )
+        if not scope.all_employees:
+            conditions = []
+            if scope.employee_ids:
+                conditions.append(SalaryRecord.employee_id.in_(scope.employee_ids))
+            if scope.department_ids:
+                department_members = session.query(Employee.id).filter(Employee.department_id.in_(scope.department_ids))
+                conditions.append(SalaryRecord.employee_id.in_(department_members))
+            query = query.filter(db.or_(*conditions))
+
+        month_key = SalaryRecord.year * 100 + SalaryRecord.month
+        if scope.start:
+            query = query.filter(month_key >= scope.start.year * 100 + scope.start.month)
+        if scope.end:
+            query = query.filter(month_key <= scope.end.year * 100 + scope.end.month)
+
+        with session.no_autoflush:
+            return {(row.employee_id, row.year, row.month) for row in query.all()}
+
+    @staticmethod
+    def _before_flush(session, flush_context, instances):
+        """刷新前收集变更对象，在同一事务中写入待重算标记"""
+        tracked = (Overtime, Leave, HolidayRequest, Attendance, SalaryStructureAssignment, SalaryStructure)
+        changed = [obj for obj in list(session.new) + list(session.deleted) if isinstance(obj, tracked)]
+        changed += [obj for obj in session.dirty
+                    if isinstance(obj, tracked) and session.is_modified(obj, include_collections=False)]
+        if not changed:
+            return
+        scopes = [scope for obj in changed for scope in PayrollRecalcService._scopes_for(session, obj)]
+        PayrollRecalcService.mark(session, scopes)
+
+    @staticmethod
+    def mark(session, scopes: Iterable[RecalcScope]) -> None:
+        """
+        在当前事务中为影响范围内待发放的工资记录写入待重算标记
+
+        会话刷新时自动调用；绕过 ORM 对象直接批量写入（如 insert()/update() 语句）时需手动调用。
+        """
+        affected = {}
+        for scope in scopes:
+            for key in PayrollRecalcService._affected_months(session, scope):
+                affected[key] = scope.reason
+        if not affected:
+            return
+
+        now = datetime.utcnow()
+        pending = session.info.setdefault('payroll_recalc_marks', {})
+        with session.no_autoflush:
+            employee_ids = {employee_id for employee_id, _, _ in affected}
+            existing = {
+                (mark.employee_id, mark.year, mark.month): mark
+                for mark in PayrollRecalcMark.query.filter(PayrollRecalcMark.employee_id.in_(employee_ids)).all()
+            }
+        for key, reason in affected.items():
+            mark = pending.get(key) or existing.get(key)
+            if mark is None:
+                mark = PayrollRecalcMark(employee_id=key[0], year=key[1], month=key[2])
+                session.add(mark)
+                pending[key] = mark
+            mark.reason = reason
+            mark.updated_at = now
+        session.info['payroll_recalc_scheduled'] = True
+
+    @staticmethod
+    def _after_commit(session):
+        pop_committed(session, 'payroll_recalc_marks')
+        if pop_committed(session, 'payroll_recalc_scheduled', False):
+            PayrollRecalcService.schedule()
+
+    # ---------- 后台重算 ----------
+
+    @staticmethod
+    def schedule(app=None) -> bool:
+        """
+        安排一次防抖的后台重算，已有待执行的任务时不重复安排
+
+        返回：
+            是否安排了新任务
+        """
+        app = app or current_app._get_current_object()
+        if not app.config['PAYROLL_RECALC_AUTO']:
+            return False
+        with PayrollRecalcService._lock:
+            if PayrollRecalcService._timer is not None:
+                return False
+            timer = threading.Timer(app.config['PAYROLL_RECALC_DEBOUNCE'], PayrollRecalcService._run, args=(app,))
+            timer.daemon = True
+            PayrollRecalcService._timer = timer
+        timer.start()
+        return True
+
+    @staticmethod
+    def _run(app):
+        """后台线程入口：处理已过防抖期的标记，仍有剩余时再次安排"""
+        with PayrollRecalcService._lock:
+            PayrollRecalcService._timer = None
+        remaining = 0
+        with app.app_context():
+            try:
+                result = PayrollRecalcService.process_pending()
+                remaining = result['remaining']
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f'薪资增量重算失败: {str(e)}')
+            finally:
+                db.session.remove()
+        if remaining:
+            PayrollRecalcService.schedule(app)
+
+    @staticmethod
+    def process_pending(debounce: Optional[int] = None, limit: int = 500) -> Dict[str, int]:
+        """
+        重算已过防抖期的待重算标记
+
+        同一月份的员工合并为一次考勤汇总；处理期间被再次标记的（员工, 月份）保留到下一轮。
+
+        参数：
+            debounce: 防抖秒数，默认取配置 PAYROLL_RECALC_DEBOUNCE
+            limit: 单次最多处理的标记数量
+
+        返回：
+            包含 processed、updated、remaining 数量的字典
+        """
+        if debounce is None:
+            debounce = current_app.config['PAYROLL_RECALC_DEBOUNCE']
+        cutoff = datetime.utcnow() - timedelta(seconds=debounce)
+
+        marks = PayrollRecalcMark.query.filter(
+            PayrollRecalcMark.updated_at <= cutoff
+        ).order_by(PayrollRecalcMark.updated_at).limit(limit).all()
+
+        by_month = defaultdict(list)
+        for mark in marks:
+            by_month[(mark.year, mark.month)].append(mark.employee_id)
+
+        updated = 0
+        for (year, month), employee_ids in sorted(by_month.items()):
+            updated += SalaryService.recalculate_salary_records(year, month, employee_ids)['updated']
+
+        if marks:
+            PayrollRecalcMark.query.filter(
+                PayrollRecalcMark.id.in_([mark.id for mark in marks]),
+                PayrollRecalcMark.updated_at <= cutoff
+            ).delete(synchronize_session=False)
+        db.session.commit()
+
+        remaining = PayrollRecalcMark.query.count()
+        if marks:
+            current_app.logger.info(f'薪资增量重算完成: 处理标记 {len(marks)} 条, 重算工资记录 {updated} 条')
+        return {'processed': len(marks), 'updated': updated, 'remaining': remaining}
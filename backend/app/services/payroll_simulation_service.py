@@ -0,0 +1,340 @@
+"""
+薪资模拟服务模块
+在调整工资结构、结构分配或个税税率表之前，按建议方案在内存中重新计算全公司工资，
+返回各部门应发、个税、实发的变化，不写入工资记录。
+员工、结构分配、考勤汇总和个税累计值按月份缓存为快照，基准结果只计算一次，
+之后每次调整方案只需在内存中重新计算。
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import or_
+from app import db
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.services.payroll_input_service import PayrollInputService
+from app.services.tax_service import TaxService, ANNUAL_TAX_BRACKETS
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+# 可在模拟中覆盖的工资结构字段
+STRUCTURE_FIELDS = ('basic_salary', 'housing_allowance', 'transport_allowance', 'meal_allowance')
+
+# 快照缓存保留的月份数
+SNAPSHOT_CACHE_SIZE = 4
+
+class PayrollSnapshot:
+    """某月的薪资计算输入快照（只包含普通数据，不绑定数据库会话）"""
+
+    def __init__(self, year: int, month: int):
+        self.year = year
+        self.month = month
+        self.created_at = time.monotonic()
+        self.employees: List[Tuple[int, Optional[int]]] = []          # (员工ID, 部门ID)
+        self.departments: Dict[int, str] = {}
+        self.structures: Dict[int, Dict[str, Decimal]] = {}
+        self.employee_assignments: Dict[int, int] = {}                # 员工ID -> 工资结构ID
+        self.department_assignments: Dict[int, int] = {}              # 部门ID -> 工资结构ID
+        self.default_structure_id: Optional[int] = None
+        self.inputs = {}                                              # 员工ID -> PayrollInput
+        self.extras: Dict[int, Tuple[Decimal, Decimal, Decimal]] = {}  # 员工ID -> (奖金, 社保公积金, 专项附加扣除)
+        self.prior_totals = {}                                        # 员工ID -> YtdTotals
+        self.baseline: Dict[int, Optional[Tuple[Decimal, Decimal, Decimal]]] = {}  # 员工ID -> (应发, 个税, 实发)
+
+    def resolve_structure(self, employee_id: int, department_id: Optional[int],
+                          employee_overrides: Dict[int, int], department_overrides: Dict[int, int],
+                          default_override: Optional[int]) -> Optional[int]:
+        """按 员工专属 > 部门 > 全局默认 的优先级确定工资结构（方案中的分配优先于现有分配）"""
+        if employee_id in employee_overrides:
+            return employee_overrides[employee_id]
+        if employee_id in self.employee_assignments:
+            return self.employee_assignments[employee_id]
+        if department_id is not None:
+            if department_id in department_overrides:
+                return department_overrides[department_id]
+            if department_id in self.department_assignments:
+                return self.department_assignments[department_id]
+        return default_override if default_override is not None else self.default_structure_id
+
+class PayrollSimulationService:
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _cache() -> OrderedDict:
+        cache = current_app.extensions.get('payroll_simulation_snapshots')
+        if cache is None:
+            cache = OrderedDict()
+            current_app.extensions['payroll_simulation_snapshots'] = cache
+        return cache
+
+    @staticmethod
+    def get_snapshot(year: int, month: int, refresh: bool = False) -> PayrollSnapshot:
+        """获取某月的快照，超过 PAYROLL_SIMULATION_CACHE_TTL 秒或 refresh=True 时重新加载"""
+        cache = PayrollSimulationService._cache()
+        ttl = current_app.config['PAYROLL_SIMULATION_CACHE_TTL']
+        with PayrollSimulationService._lock:
+            snapshot = cache.get((year, month))
+            if snapshot is not None and not refresh and time.monotonic() - snapshot.created_at < ttl:
+                cache.move_to_end((year, month))
+                return snapshot
+
+        snapshot = PayrollSimulationService.build_snapshot(year, month)
+        with PayrollSimulationService._lock:
+            cache[(year, month)] = snapshot
+            cache.move_to_end((year, month))
+            while len(cache) > SNAPSHOT_CACHE_SIZE:
+                cache.popitem(last=False)
+        return snapshot
+
+    @staticmethod
+    def build_snapshot(year: int, month: int) -> PayrollSnapshot:
+        """一次性加载某月计算工资所需的全部数据，并计算基准结果"""
+        snapshot = PayrollSnapshot(year, month)
+        check_date = date(year, month, 1)
+
+        employees = Employee.query.filter(Employee.employment_status == 'active').all()
+        snapshot.employees = [(employee.id, employee.department_id) for employee in employees]
+        snapshot.departments = dict(db.session.query(Department.id, Department.name).all())
+
+        for structure in SalaryStructure.query.all():
+            snapshot.structures[structure.id] = {
+                field: Decimal(getattr(structure, field) or 0) for field in STRUCTURE_FIELDS
+            }
+
+        # 有效分配按生效日期从早到晚覆盖，同级取最近生效的一条
+        assignments = SalaryStructureAssignment.query.filter(
+            SalaryStructureAssignment.is_active == True,
+            SalaryStructureAssignment.effective_date <= check_date,
+            or_(SalaryStructureAssignment.expiry_date.is_(None), SalaryStructureAssignment.expiry_date >= check_date)
+        ).order_by(SalaryStructureAssignment.effective_date, SalaryStructureAssignment.id).all()
+        for assignment in assignments:
+            if assignment.employee_id:
+                snapshot.employee_assignments[assignment.employee_id] = assignment.salary_structure_id
+            elif assignment.department_id:
+                snapshot.department_assignments[assignment.department_id] = assignment.salary_structure_id
+            elif assignment.is_default:
+                snapshot.default_structure_id = assignment.salary_structure_id
+
+        snapshot.inputs = PayrollInputService.aggregate(year, month, employees)
+
+        # 已有工资记录中录入的奖金、社保公积金和专项附加扣除
+        rows = db.session.query(
+            SalaryRecord.employee_id, SalaryRecord.bonus, SalaryRecord.social_insurance, SalaryRecord.special_deduction
+        ).filter(SalaryRecord.year == year, SalaryRecord.month == month).all()
+        for row in rows:
+            snapshot.extras[row.employee_id] = (
+                Decimal(row.bonus or 0), Decimal(row.social_insurance or 0), Decimal(row.special_deduction or 0)
+            )
+
+        snapshot.prior_totals = TaxService.prior_totals([employee_id for employee_id, _ in snapshot.employees], year, month)
+
+        exemption = Decimal(current_app.config['TAX_MONTHLY_EXEMPTION'])
+        for employee_id, department_id in snapshot.employees:
+            structure = snapshot.structures.get(snapshot.resolve_structure(employee_id, department_id, {}, {}, None))
+            snapshot.baseline[employee_id] = PayrollSimulationService._compute(
+                snapshot, employee_id, structure, ANNUAL_TAX_BRACKETS, exemption
+            )
+        return snapshot
+
+    @staticmethod
+    def _compute(snapshot: PayrollSnapshot, employee_id: int, structure: Optional[Dict[str, Decimal]],
+                 brackets: list, exemption: Decimal) -> Optional[Tuple[Decimal, Decimal, Decimal]]:
+        """按工资结构计算一名员工的 (应发, 个税, 实发)，与批量生成工资记录的计算一致"""
+        if structure is None:
+            return None
+        basic_salary = structure['basic_salary']
+        payroll_input = snapshot.inputs[employee_id]
+        bonus, social_insurance, special_deduction = snapshot.extras.get(employee_id, (ZERO, ZERO, ZERO))
+
+        gross = (
+            basic_salary + structure['housing_allowance'] + structure['transport_allowance'] + structure['meal_allowance'] +
+            payroll_input.overtime_pay(basic_salary) + bonus
+        ).quantize(CENT)
+        deductions = payroll_input.deductions(basic_salary)
+        tax = TaxService.month_tax(
+            snapshot.prior_totals[employee_id], gross - deductions, social_insurance + special_deduction,
+            brackets, exemption
+        )
+        return gross, tax, (gross - tax - deductions - social_insurance).quantize(CENT)
+
+    # ---------- 方案解析 ----------
+
+    @staticmethod
+    def _decimal(value, name: str) -> Decimal:
+        try:
+            result = Decimal(str(value))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f'{name} 必须是数字')
+        if result < 0:
+            raise ValueError(f'{name} 不能为负数')
+        return result
+
+    @staticmethod
+    def _parse_structures(snapshot: PayrollSnapshot, overrides: Dict) -> Dict[int, Dict[str, Decimal]]:
+        """合并现有工资结构和方案中的调整（方案中可以新增结构，新增时必须提供基本工资）"""
+        structures = dict(snapshot.structures)
+        for key, fields in (overrides or {}).items():
+            try:
+                structure_id = int(key)
+            except (TypeError, ValueError):
+                raise ValueError(f'无效的工资结构ID: {key}')
+            unknown = set(fields) - set(STRUCTURE_FIELDS)
+            if unknown:
+                raise ValueError(f"不支持调整的工资结构字段: {', '.join(sorted(unknown))}")
+            base = structures.get(structure_id)
+            if base is None:
+                if 'basic_salary' not in fields:
+                    raise ValueError(f'新增工资结构({structure_id})必须提供基本工资')
+                base = {field: ZERO for field in STRUCTURE_FIELDS}
+            structures[structure_id] = dict(base, **{
+                field: PayrollSimulationService._decimal(value, field) for field, value in fields.items()
+            })
+        return structures
+
+    @staticmethod
+    def _parse_assignments(assignments: List[Dict]) -> Tuple[Dict[int, int], Dict[int, int], Optional[int]]:
+        """方案中的结构分配：员工专属、部门、全局默认"""
+        employee_overrides, department_overrides, default_override = {}, {}, None
+        for assignment in assignments or []:
+            structure_id = assignment.get('salary_structure_id')
+            if not isinstance(structure_id, int):
+                raise ValueError('结构分配必须指定工资结构ID')
+            if assignment.get('employee_id'):
+                employee_overrides[int(assignment['employee_id'])] = structure_id
+            elif assignment.get('department_id'):
+                department_overrides[int(assignment['department_id'])] = structure_id
+            elif assignment.get('is_default'):
+                default_override = structure_id
+            else:
+                raise ValueError('结构分配必须指定员工、部门或设为默认')
+        return employee_overrides, department_overrides, default_override
+
+    @staticmethod
+    def _parse_tax(tax: Dict) -> Tuple[list, Decimal]:
+        """方案中的预扣率表和每月减除费用"""
+        tax = tax or {}
+        exemption = Decimal(current_app.config['TAX_MONTHLY_EXEMPTION'])
+        if tax.get('monthly_exemption') is not None:
+            exemption = PayrollSimulationService._decimal(tax['monthly_exemption'], 'monthly_exemption')
+
+        brackets = ANNUAL_TAX_BRACKETS
+        if tax.get('brackets'):
+            brackets = []
+            for bracket in tax['brackets']:
+                if len(bracket) != 3:
+                    raise ValueError('税率表每一档必须为 [上限, 税率, 速算扣除数]')
+                upper, rate, quick_deduction = bracket
+                brackets.append((
+                    None if upper is None else PayrollSimulationService._decimal(upper, '上限'),
+                    PayrollSimulationService._decimal(rate, '税率'),
+                    PayrollSimulationService._decimal(quick_deduction, '速算扣除数')
+                ))
+            uppers = [upper for upper, _, _ in brackets[:-1]]
+            if brackets[-1][0] is not None or None in uppers or uppers != sorted(uppers):
+                raise ValueError('税率表上限必须递增，且最后一档上限为空')
+        return brackets, exemption
+
+    # ---------- 模拟 ----------
+
+    @staticmethod
+    def simulate(year: int, month: int, scenario: Optional[Dict] = None, refresh: bool = False) -> Dict:
+        """
+        按建议方案模拟某月工资，返回与现状相比各部门的变化
+
+        参数：
+            year: 年份
+            month: 月份
+            scenario: 方案，可包含：
+                structures: {工资结构ID: {basic_salary, housing_allowance, transport_allowance, meal_allowance}}
+                assignments: [{employee_id|department_id|is_default, salary_structure_id}]
+                tax: {brackets: [[上限, 税率, 速算扣除数], ...], monthly_exemption}
+            refresh: 是否重新加载快照
+
+        返回：
+            包含 departments（各部门基准、方案和差额）、total（合计）、
+            changed_employees（工资有变化的员工数）、unassigned（没有工资结构的员工数）的字典
+        """
+        scenario = scenario or {}
+        snapshot = PayrollSimulationService.get_snapshot(year, month, refresh)
+        structures = PayrollSimulationService._parse_structures(snapshot, scenario.get('structures'))
+        employee_overrides, department_overrides, default_override = \
+            PayrollSimulationService._parse_assignments(scenario.get('assignments'))
+        brackets, exemption = PayrollSimulationService._parse_tax(scenario.get('tax'))
+        missing = {structure_id for structure_id in list(employee_overrides.values()) + list(department_overrides.values()) +
+                   ([default_override] if default_override is not None else []) if structure_id not in structures}
+        if missing:
+            raise ValueError(f"工资结构不存在: {', '.join(str(structure_id) for structure_id in sorted(missing))}")
+
+        # 只调整了结构或分配时，未受影响的员工直接复用基准结果
+        tax_changed = bool(scenario.get('tax'))
+        changed_structures = {int(key) for key in (scenario.get('structures') or {})}
+
+        departments = defaultdict(lambda: {'employees': 0, 'baseline': [ZERO, ZERO, ZERO], 'scenario': [ZERO, ZERO, ZERO]})
+        changed_employees = 0
+        unassigned = 0
+        for employee_id, department_id in snapshot.employees:
+            baseline = snapshot.baseline[employee_id]
+            structure_id = snapshot.resolve_structure(
+                employee_id, department_id, employee_overrides, department_overrides, default_override
+            )
+            baseline_structure_id = snapshot.resolve_structure(employee_id, department_id, {}, {}, None)
+            if not tax_changed and structure_id == baseline_structure_id and structure_id not in changed_structures:
+                result = baseline
+            else:
+                result = PayrollSimulationService._compute(
+                    snapshot, employee_id, structures.get(structure_id), brackets, exemption
+                )
+            if baseline is None and result is None:
+                unassigned += 1
+                continue
+            if result != baseline:
+                changed_employees += 1
+
+            summary = departments[department_id]
+            summary['employees'] += 1
+            for index, value in enumerate(baseline or (ZERO, ZERO, ZERO)):
+                summary['baseline'][index] += value
+            for index, value in enumerate(result or (ZERO, ZERO, ZERO)):
+                summary['scenario'][index] += value
+
+        def amounts(values):
+            return {'gross': float(values[0]), 'tax': float(values[1]), 'net': float(values[2])}
+
+        department_results = []
+        total = {'employees': 0, 'baseline': [ZERO, ZERO, ZERO], 'scenario': [ZERO, ZERO, ZERO]}
+        for department_id, summary in sorted(departments.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+            delta = [scenario_value - baseline_value
+                     for scenario_value, baseline_value in zip(summary['scenario'], summary['baseline'])]
+            department_results.append({
+                'department_id': department_id,
+                'department_name': snapshot.departments.get(department_id, '未分配'),
+                'employees': summary['employees'],
+                'baseline': amounts(summary['baseline']),
+                'scenario': amounts(summary['scenario']),
+                'delta': amounts(delta)
+            })
+            total['employees'] += summary['employees']
+            for key in ('baseline', 'scenario'):
+                total[key] = [a + b for a, b in zip(total[key], summary[key])]
+
+        return {
+            'year': year,
+            'month': month,
+            'departments': department_results,
+            'total': {
+                'employees': total['employees'],
+                'baseline': amounts(total['baseline']),
+                'scenario': amounts(total['scenario']),
+                'delta': amounts([s - b for s, b in zip(total['scenario'], total['baseline'])])
+            },
+            'changed_employees': changed_employees,
+            'unassigned': unassigned
+        }
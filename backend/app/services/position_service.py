@@ -139,15 +139,5 @@ class PositionService:
     @staticmethod
     def get_employee_distribution():
         """获取各职位员工数量分布"""
-        positions = Position.query.filter_by(is_deleted=False).all()
-        stats = []
-        for pos in positions:
-            employee_count = Employee.query.filter_by(
-                position_id=pos.id,
-                is_deleted=False
-            ).count()
-            stats.append({
-                'name': pos.name,
-                'value': employee_count
-            })
-        return stats
+        from app.services.org_stats_service import OrgStatsService
+        return OrgStatsService.distribution(OrgStatsService.get_stats(), 'positions')
@@ -6,13 +6,19 @@
 from datetime import datetime
 from decimal import Decimal
 from typing import List, Dict, Optional
-from sqlalchemy import and_, func, or_, case
+from sqlalchemy import and_, func, or_, case, select
 from app import db
-from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary import SalaryStructure, SalaryRecord, SalaryRecordComponent, PAYMENT_TRANSITIONS
 from app.models.salary_structure_assignment import SalaryStructureAssignment
 from app.models.employee import Employee
+from app.services.audit_service import AuditService
+from app.services.change_capture_service import ChangeCaptureService
 from app.services.email_service import EmailService
-from app.utils.pdf_generator import generate_pdf
+from app.services.payroll_input_service import PayrollInputService, PayrollInput, OVERTIME_CATEGORIES
+from app.services.tax_service import TaxService
+
+# 批量语句每次处理的记录ID数量（避免 IN 列表超过数据库参数上限）
+BULK_CHUNK_SIZE = 1000
 
 class SalaryService:
     @staticmethod
@@ -214,26 +220,30 @@ class SalaryService:
         employee_id: int,
         year: int,
         month: int,
-        overtime_hours: int = 0,
-        bonus: Decimal = Decimal('0'),
-        deductions: Decimal = Decimal('0'),
+        overtime_hours: Optional[float] = None,
+        bonus: Optional[Decimal] = None,
+        deductions: Optional[Decimal] = None,
         remark: str = '',
         force_update: bool = False,
-        check_date: datetime = None  # 新增参数，用于指定检查工资结构的日期
+        check_date: datetime = None,  # 新增参数，用于指定检查工资结构的日期
+        payroll_input: Optional[PayrollInput] = None
     ) -> Optional[SalaryRecord]:
         """
         生成工资记录
         
+        加班费和扣除项按考勤汇总（加班、无薪假、缺勤）计算，手工调整叠加在考勤计算值之上。
+        
         参数：
             employee_id: 员工ID
             year: 年份
             month: 月份
-            overtime_hours: 加班小时数
-            bonus: 奖金
-            deductions: 扣除项
+            overtime_hours: 考勤之外补记的加班小时数（按1.5倍计入加班费调整），None 表示保留已有调整
+            bonus: 奖金，None 表示保留已有奖金
+            deductions: 考勤之外的扣除项（计入扣除项调整），None 表示保留已有调整
             remark: 备注
             force_update: 是否强制更新已存在的记录
             check_date: 指定检查工资结构的日期，默认为工资月份的1号
+            payroll_input: 该员工本月的考勤汇总，未提供时单独汇总
             
         返回：
             生成的工资记录对象，如果生成失败则返回None
@@ -264,87 +274,62 @@ class SalaryService:
             
             # 获取工资结构
             salary_structure = salary_assignment.salary_structure
+            basic_salary = salary_structure.basic_salary
             
-            # 计算加班费
-            overtime_pay = SalaryService.calculate_overtime_pay(
-                salary_structure.basic_salary,
-                overtime_hours
-            )
+            # 加班费和扣款来自考勤汇总
+            if payroll_input is None:
+                payroll_input = PayrollInputService.aggregate(year, month, [employee])[employee_id]
+            
+            record = existing_record
+            if record is None:
+                record = SalaryRecord(
+                    employee_id=employee_id,
+                    year=year,
+                    month=month,
+                    bonus=Decimal('0'),
+                    overtime_adjustment=Decimal('0'),
+                    deduction_adjustment=Decimal('0'),
+                    payment_status='pending'  # 设置初始状态为待发放
+                )
+            
+            # 未指定的调整和奖金保留记录中已有的值
+            if overtime_hours is not None:
+                record.overtime_adjustment = SalaryService.calculate_overtime_pay(basic_salary, overtime_hours)
+            if deductions is not None:
+                record.deduction_adjustment = deductions
+            if bonus is not None:
+                record.bonus = bonus
             
+            record.basic_salary = basic_salary
             # 计算补贴总额
-            allowances = (
+            record.allowances = (
                 salary_structure.housing_allowance +
                 salary_structure.transport_allowance +
                 salary_structure.meal_allowance
             )
+            record.overtime_pay = payroll_input.overtime_pay(basic_salary) + (record.overtime_adjustment or 0)
+            record.deductions = payroll_input.deductions(basic_salary) + (record.deduction_adjustment or 0)
             
             # 计算总应发金额和实发工资
             salary_calc = SalaryService.calculate_net_salary(
-                salary_structure.basic_salary,  # 基本工资
-                allowances,                     # 补贴总额
-                overtime_pay,                   # 加班费
-                bonus,                         # 奖金
-                deductions                     # 扣除项
+                record.basic_salary,
+                record.allowances,
+                record.overtime_pay,
+                record.bonus,
+                record.deductions
             )
+            record.gross_salary = salary_calc['gross_salary']  # 总应发金额
+            record.tax = salary_calc['tax']
+            record.net_salary = salary_calc['net_salary']
+            if remark:
+                record.remark = remark
             
-            # 获取计算结果
-            gross_salary = salary_calc['gross_salary']  # 总应发金额
-            tax = salary_calc['tax']                    # 个人所得税
-            net_salary = salary_calc['net_salary']      # 实发工资
-            
-            # 准备工资结构信息的备注
-            structure_info = (
-                f"\n[工资结构信息]\n"
-                f"名称: {salary_structure.name}\n"
-                f"基本工资: {salary_structure.basic_salary}\n"
-                f"住房补贴: {salary_structure.housing_allowance}\n"
-                f"交通补贴: {salary_structure.transport_allowance}\n"
-                f"餐饮补贴: {salary_structure.meal_allowance}\n"
-                f"生效日期: {salary_structure.effective_date}\n"
-                f"\n[工资计算明细]\n"
-                f"基本工资: {salary_structure.basic_salary}\n"
-                f"补贴总额: {allowances}\n"
-                f"加班费: {overtime_pay}\n"
-                f"奖金: {bonus}\n"
-                f"应发总额: {gross_salary}\n"
-                f"个人所得税: {tax}\n"
-                f"其他扣除项: {deductions}\n"
-                f"实发工资: {net_salary}\n"
-            )
-            
-            # 如果是更新已存在的记录
-            if existing_record and force_update:
-                existing_record.basic_salary = salary_structure.basic_salary
-                existing_record.allowances = allowances
-                existing_record.overtime_pay = overtime_pay
-                existing_record.bonus = bonus
-                existing_record.deductions = deductions
-                existing_record.gross_salary = gross_salary  # 添加总应发金额
-                existing_record.tax = tax
-                existing_record.net_salary = net_salary
-                # 在备注中添加更新信息和工资结构信息
-                update_info = f'{remark}\n[更新于 {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}]'
-                existing_record.remark = update_info + structure_info
-                return existing_record
-            
-            # 创建新的工资记录
-            record = SalaryRecord(
-                employee_id=employee_id,
-                year=year,
-                month=month,
-                basic_salary=salary_structure.basic_salary,
-                allowances=allowances,
-                overtime_pay=overtime_pay,
-                bonus=bonus,
-                deductions=deductions,
-                gross_salary=gross_salary,  # 添加总应发金额
-                tax=tax,
-                net_salary=net_salary,
-                payment_status='pending',  # 设置初始状态为待发放
-                remark=remark + structure_info  # 在备注中添加工资结构信息
-            )
+            # 个税按累计预扣法计算
+            TaxService.apply([record])
+            SalaryService.set_components(record, salary_structure, payroll_input)
             
-            db.session.add(record)
+            if existing_record is None:
+                db.session.add(record)
             return record
             
         except Exception as e:
@@ -387,6 +372,11 @@ class SalaryService:
                 'message': '未找到有效的员工记录'
             }
             
+        # 一次性汇总所有员工本月的加班、无薪假和缺勤数据
+        payroll_inputs = PayrollInputService.aggregate(year, month, employees)
+        # 一次性读取所有员工之前月份的个税累计值
+        tax_totals = TaxService.prior_totals([employee.id for employee in employees], year, month)
+            
         # 批量处理每个员工
         for employee in employees:
             try:
@@ -426,16 +416,20 @@ class SalaryService:
                     salary_assignment.salary_structure.meal_allowance
                 )
                 
+                # 加班费和扣款来自考勤汇总
+                basic_salary = salary_assignment.salary_structure.basic_salary
+                payroll_input = payroll_inputs[employee.id]
+                
                 # 生成工资记录
                 record = SalaryRecord(
                     employee_id=employee.id,
                     year=year,
                     month=month,
-                    basic_salary=salary_assignment.salary_structure.basic_salary,
+                    basic_salary=basic_salary,
                     allowances=total_allowances,
-                    overtime_pay=Decimal('0'),
+                    overtime_pay=payroll_input.overtime_pay(basic_salary),
                     bonus=Decimal('0'),
-                    deductions=Decimal('0'),
+                    deductions=payroll_input.deductions(basic_salary),
                     payment_status='pending'
                 )
                 
@@ -448,21 +442,12 @@ class SalaryService:
                     record.deductions
                 )
                 
-                # 更新所有金额字段
+                # 更新所有金额字段，个税按累计预扣法计算
                 record.gross_salary = salary_calc['gross_salary']  # 更新总应发金额
-                record.tax = salary_calc['tax']
-                record.net_salary = salary_calc['net_salary']
+                TaxService.withhold(record, tax_totals[employee.id])
                 
-                # 添加工资结构信息到备注
-                record.remark = (
-                    f"[工资结构信息]\n"
-                    f"名称: {salary_assignment.salary_structure.name}\n"
-                    f"基本工资: {salary_assignment.salary_structure.basic_salary:.2f}\n"
-                    f"住房补贴: {salary_assignment.salary_structure.housing_allowance:.2f}\n"
-                    f"交通补贴: {salary_assignment.salary_structure.transport_allowance:.2f}\n"
-                    f"餐饮补贴: {salary_assignment.salary_structure.meal_allowance:.2f}\n"
-                    f"生效日期: {salary_assignment.salary_structure.effective_date}\n"
-                )
+                # 记录计算明细
+                SalaryService.set_components(record, salary_assignment.salary_structure, payroll_input)
                 
                 # 保存记录
                 db.session.add(record)
@@ -476,6 +461,9 @@ class SalaryService:
                     'salary_structure': salary_assignment.salary_structure.name,
                     'basic_salary': float(record.basic_salary),
                     'allowances': float(record.allowances),
+                    'overtime_pay': float(record.overtime_pay),
+                    'deductions': float(record.deductions),
+                    'payroll_input': payroll_input.to_dict(),
                     'tax': float(record.tax),
                     'net_salary': float(record.net_salary)
                 })
@@ -507,200 +495,158 @@ class SalaryService:
         return result
 
     @staticmethod
-    def batch_update_salary_records(
-        year: int,
-        month: int,
-        employee_ids: List[int] = None
-    ) -> Dict[str, List]:
+    def set_components(
+        record: SalaryRecord,
+        salary_structure: SalaryStructure,
+        payroll_input: Optional[PayrollInput] = None,
+        overtime_hours: float = 0
+    ) -> None:
         """
-        批量更新工资记录
+        生成工资记录的计算明细，替换原有明细
+        
+        记录金额字段需已计算完毕；金额为0的项目（基本工资和个税除外）不保存。
+        
+        参数：
+            record: 工资记录
+            salary_structure: 计算使用的工资结构
+            payroll_input: 考勤汇总，提供时加班费按类别、扣除项按无薪假/缺勤拆分
+            overtime_hours: 未提供考勤汇总时的加班小时数
+        """
+        basic_salary = salary_structure.basic_salary
+        items = [
+            ('basic_salary', basic_salary, None, None),
+            ('housing_allowance', salary_structure.housing_allowance, None, None),
+            ('transport_allowance', salary_structure.transport_allowance, None, None),
+            ('meal_allowance', salary_structure.meal_allowance, None, None)
+        ]
+        if payroll_input:
+            for category in OVERTIME_CATEGORIES:
+                items.append((
+                    f'overtime_{category}',
+                    payroll_input.category_overtime_pay(basic_salary, category),
+                    round(payroll_input.overtime_hours[category], 2),
+                    payroll_input.overtime_rates[category]
+                ))
+            items.append(('overtime_adjustment', record.overtime_adjustment, None, None))
+        else:
+            items.append(('overtime', record.overtime_pay, overtime_hours or None, 1.5 if overtime_hours else None))
+        items.append(('bonus', record.bonus, None, None))
+        if payroll_input:
+            items.append(('leave_deduction', payroll_input.leave_deduction(basic_salary), round(payroll_input.unpaid_leave_days, 2), None))
+            items.append(('absence_deduction', payroll_input.absence_deduction(basic_salary), payroll_input.absence_days, None))
+            items.append(('deduction_adjustment', record.deduction_adjustment, None, None))
+        else:
+            items.append(('other_deduction', record.deductions, None, None))
+        items.append(('social_insurance', record.social_insurance, None, None))
+        items.append(('tax', record.tax, None, None))
+        
+        record.salary_structure_id = salary_structure.id
+        record.components = [
+            SalaryRecordComponent(code=code, amount=amount or Decimal('0'), quantity=quantity, rate=rate)
+            for code, amount, quantity, rate in items
+            if amount or code in ('basic_salary', 'tax')
+        ]
+
+    @staticmethod
+    def sync_components(record: SalaryRecord, changed_fields: List[str]) -> None:
+        """
+        手动修改金额后同步计算明细：被修改字段的明细合并为一项，个税按新值更新
+        
+        参数：
+            record: 工资记录（金额已重新计算）
+            changed_fields: 被修改的金额字段
+        """
+        groups = {
+            'basic_salary': ('basic_salary', ('basic_salary',)),
+            'allowances': ('allowances', ('housing_allowance', 'transport_allowance', 'meal_allowance', 'allowances')),
+            'overtime_pay': ('overtime', ('overtime', 'overtime_adjustment') + tuple(f'overtime_{category}' for category in OVERTIME_CATEGORIES)),
+            'bonus': ('bonus', ('bonus',)),
+            'deductions': ('other_deduction', ('leave_deduction', 'absence_deduction', 'deduction_adjustment', 'other_deduction')),
+            'social_insurance': ('social_insurance', ('social_insurance',))
+        }
+        replaced = {}
+        for field in changed_fields:
+            code, codes = groups[field]
+            replaced.update({old_code: code for old_code in codes})
+        
+        components = [component for component in record.components
+                      if component.code not in replaced and component.code != 'tax']
+        for field in changed_fields:
+            code = groups[field][0]
+            amount = getattr(record, field)
+            if amount or code == 'basic_salary':
+                components.append(SalaryRecordComponent(code=code, amount=amount))
+        components.append(SalaryRecordComponent(code='tax', amount=record.tax))
+        record.components = components
+
+    @staticmethod
+    def recalculate_salary_records(year: int, month: int, employee_ids: List[int]) -> Dict[str, int]:
+        """
+        重算指定员工某月待发放的工资记录
+        
+        按当前工资结构分配和考勤汇总重新计算基本工资、补贴、加班费、扣除项和个税，
+        保留已录入的奖金；加班费和扣除项的手工调整叠加在考勤计算值之上保留。
+        已发放的记录不做修改。调用方负责提交事务。
         
         参数：
             year: 年份
             month: 月份
-            employee_ids: 员工ID列表，如果为None则更新所有员工
+            employee_ids: 员工ID列表
             
         返回：
-            包含更新成功和失败记录的字典
+            包含 updated（已重算）和 skipped（无待发放记录或无工资结构）数量的字典
         """
-        success_records = []
-        failed_records = []
+        records = SalaryRecord.query.filter(
+            SalaryRecord.employee_id.in_(employee_ids),
+            SalaryRecord.year == year,
+            SalaryRecord.month == month,
+            SalaryRecord.payment_status == 'pending'
+        ).all()
+        if not records:
+            return {'updated': 0, 'skipped': len(employee_ids)}
         
-        try:
-            print(f'开始批量更新{year}年{month}月的工资记录...')
-            
-            # 验证是否提供了员工ID列表
-            if not employee_ids:
-                print('未指定要更新工资记录的员工')
-                return {
-                    'success': [],
-                    'failed': [{
-                        'employee_id': None,
-                        'employee_name': None,
-                        'department_name': None,
-                        'reason': '请指定要更新工资记录的员工'
-                    }]
-                }
-            
-            # 获取指定的员工信息
-            print(f'查询指定的{len(employee_ids)}名员工...')
-            employees = Employee.query.filter(
-                Employee.id.in_(employee_ids)
-            ).all()
-            
-            if not employees:
-                print('未找到指定的员工')
-                return {
-                    'success': [],
-                    'failed': [{
-                        'employee_id': None,
-                        'employee_name': None,
-                        'department_name': None,
-                        'reason': '未找到指定的员工'
-                    }]
-                }
-            
-            print(f'找到{len(employees)}名员工')
-            
-            # 检查每个员工的工资结构分配情况
-            check_date = datetime(year, month, 1)
-            for emp in employees:
-                try:
-                    print(f'\n处理员工{emp.name}(ID:{emp.id})的工资记录...')
-                    
-                    # 检查是否已存在工资记录
-                    existing_record = SalaryRecord.query.filter_by(
-                        employee_id=emp.id,
-                        year=year,
-                        month=month
-                    ).first()
-                    
-                    if existing_record:
-                        print(f'员工{emp.name}已存在{year}年{month}月的工资记录')
-                        failed_records.append({
-                            'employee_id': emp.id,
-                            'employee_name': emp.name,
-                            'department_name': emp.department.name if emp.department else '未分配',
-                            'reason': '已存在工资记录'
-                        })
-                        continue
-                    
-                    # 检查员工工资结构分配
-                    salary_structure = SalaryService.get_salary_structure_assignment(emp.id, check_date)
-                    if not salary_structure:
-                        print(f'员工{emp.name}没有有效的工资结构分配')
-                        failed_records.append({
-                            'employee_id': emp.id,
-                            'employee_name': emp.name,
-                            'department_name': emp.department.name if emp.department else '未分配',
-                            'reason': f'未找到{year}年{month}月的有效工资结构分配'
-                        })
-                        continue
-                    
-                    # 生成工资记录
-                    print(f'开始生成员工{emp.name}的工资记录...')
-                    record = SalaryRecord(
-                        employee_id=emp.id,
-                        year=year,
-                        month=month,
-                        basic_salary=salary_structure.salary_structure.basic_salary,
-                        allowances=(
-                            salary_structure.salary_structure.housing_allowance +
-                            salary_structure.salary_structure.transport_allowance +
-                            salary_structure.salary_structure.meal_allowance
-                        ),
-                        overtime_pay=Decimal('0'),
-                        bonus=Decimal('0'),
-                        deductions=Decimal('0'),
-                        payment_status='pending'
-                    )
-                    
-                    # 计算税收和实发工资
-                    salary_calc = SalaryService.calculate_net_salary(
-                        record.basic_salary,
-                        record.allowances,
-                        record.overtime_pay,
-                        record.bonus,
-                        record.deductions
-                    )
-                    record.tax = salary_calc['tax']
-                    record.net_salary = salary_calc['net_salary']
-                    record.gross_salary = salary_calc['gross_salary']  # 添加总应发金额
-                    
-                    # 添加工资结构信息到备注
-                    record.remark = (
-                        f"[工资结构信息]\n"
-                        f"名称: {salary_structure.salary_structure.name}\n"
-                        f"基本工资: {salary_structure.salary_structure.basic_salary:.2f}\n"
-                        f"住房补贴: {salary_structure.salary_structure.housing_allowance:.2f}\n"
-                        f"交通补贴: {salary_structure.salary_structure.transport_allowance:.2f}\n"
-                        f"餐饮补贴: {salary_structure.salary_structure.meal_allowance:.2f}\n"
-                        f"生效日期: {salary_structure.salary_structure.effective_date}\n"
-                    )
-                    
-                    db.session.add(record)
-                    success_records.append(record)
-                    print(f'成功生成员工{emp.name}的工资记录')
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    print(f'为员工{emp.name}生成工资记录失败: {error_msg}')
-                    failed_records.append({
-                        'employee_id': emp.id,
-                        'employee_name': emp.name,
-                        'department_name': emp.department.name if emp.department else '未分配',
-                        'reason': error_msg
-                    })
-            
-            # 批量保存成功的记录
-            if success_records:
-                try:
-                    print(f'正在保存{len(success_records)}条工资记录...')
-                    db.session.commit()
-                    print('保存成功')
-                except Exception as e:
-                    db.session.rollback()
-                    error_msg = f'批量保存工资记录失败: {str(e)}'
-                    print(error_msg)
-                    # 将保存失败的记录移到失败列表
-                    for record in success_records:
-                        emp = next((e for e in employees if e.id == record.employee_id), None)
-                        if emp:
-                            failed_records.append({
-                                'employee_id': emp.id,
-                                'employee_name': emp.name,
-                                'department_name': emp.department.name if emp.department else '未分配',
-                                'reason': error_msg
-                            })
-                    success_records = []
-            
-            print('\n工资记录生成完成')
-            print(f'成功: {len(success_records)}条')
-            print(f'失败: {len(failed_records)}条')
+        check_date = datetime(year, month, 1)
+        employees = [record.employee for record in records]
+        payroll_inputs = PayrollInputService.aggregate(year, month, employees)
+        tax_totals = TaxService.prior_totals([record.employee_id for record in records], year, month)
+        
+        updated = 0
+        for record in records:
+            salary_assignment = SalaryService.get_salary_structure_assignment(record.employee_id, check_date)
+            if not salary_assignment:
+                continue
+            salary_structure = salary_assignment.salary_structure
+            payroll_input = payroll_inputs[record.employee_id]
             
-            return {
-                'success': [record.to_dict() for record in success_records],
-                'failed': failed_records
-            }
+            record.basic_salary = salary_structure.basic_salary
+            record.allowances = (
+                salary_structure.housing_allowance +
+                salary_structure.transport_allowance +
+                salary_structure.meal_allowance
+            )
+            record.overtime_pay = payroll_input.overtime_pay(salary_structure.basic_salary) + (record.overtime_adjustment or 0)
+            record.deductions = payroll_input.deductions(salary_structure.basic_salary) + (record.deduction_adjustment or 0)
             
-        except Exception as e:
-            print(f'批量生成工资记录时发生错误: {str(e)}')
-            return {
-                'success': [],
-                'failed': [{
-                    'employee_id': None,
-                    'employee_name': None,
-                    'department_name': None,
-                    'reason': f'批量生成工资记录失败: {str(e)}'
-                }]
-            }
+            salary_calc = SalaryService.calculate_net_salary(
+                record.basic_salary,
+                record.allowances,
+                record.overtime_pay,
+                record.bonus or Decimal('0'),
+                record.deductions
+            )
+            record.gross_salary = salary_calc['gross_salary']
+            TaxService.withhold(record, tax_totals[record.employee_id])
+            SalaryService.set_components(record, salary_structure, payroll_input)
+            updated += 1
+        
+        return {'updated': updated, 'skipped': len(employee_ids) - updated}
 
     @staticmethod
     def get_salary_statistics(
         year: int = None,
         month: int = None,
         department_id: int = None,
-        payment_status: str = None  # 支付状态（pending-待发放, paid-已发放）
+        payment_status: str = None  # 支付状态（pending-待发放, approved-已审批, paid-已发放）
     ) -> Dict:
         """
         获取薪资统计数据
@@ -711,12 +657,14 @@ class SalaryService:
             department_id: 部门ID（可选）
             payment_status: 支付状态，可选值：
                 - pending: 待发放
+                - approved: 已审批
                 - paid: 已发放
                 - None: 不筛选支付状态，返回所有记录的统计
             
         返回：
             统计数据字典，包含：
             - total_count: 记录总数（本月记录数）
+            - approved_count: 已审批待发放记录数
             - paid_count: 已发放记录数
             - total_basic: 基本工资总额
             - total_allowances: 补贴总额
@@ -744,6 +692,7 @@ class SalaryService:
             # 构建基础查询
             query = db.session.query(
                 func.count(SalaryRecord.id).label('total_count'),
+                func.sum(case((SalaryRecord.payment_status == 'approved', 1), else_=0)).label('approved_count'),
                 func.sum(case((SalaryRecord.payment_status == 'paid', 1), else_=0)).label('paid_count'),
                 func.coalesce(func.sum(SalaryRecord.basic_salary), 0).label('total_basic'),
                 func.coalesce(func.sum(SalaryRecord.allowances), 0).label('total_allowances'),
@@ -776,6 +725,7 @@ class SalaryService:
                 print("未找到任何记录")
                 return {
                     'total_count': 0,
+                    'approved_count': 0,
                     'paid_count': 0,
                     'total_basic': 0.0,
                     'total_allowances': 0.0,
@@ -789,6 +739,7 @@ class SalaryService:
             # 处理结果
             result = {
                 'total_count': summary.total_count or 0,
+                'approved_count': summary.approved_count or 0,
                 'paid_count': summary.paid_count or 0,
                 'total_basic': float(summary.total_basic or 0),
                 'total_allowances': float(summary.total_allowances or 0),
@@ -808,6 +759,7 @@ class SalaryService:
             # 发生错误时返回空结果
             return {
                 'total_count': 0,
+                'approved_count': 0,
                 'paid_count': 0,
                 'total_basic': 0.0,
                 'total_allowances': 0.0,
@@ -840,7 +792,8 @@ class SalaryService:
             if not employee or not employee.email:
                 raise ValueError(f'员工邮箱不存在(ID:{record.employee_id})')
             
-            # 生成PDF工资条
+            # 生成PDF工资条（reportlab 较重，按需加载）
+            from app.utils.pdf_generator import generate_pdf
             pdf_path = generate_pdf(record)
             
             # 发送邮件
@@ -938,6 +891,13 @@ class SalaryService:
             # 检查支付状态
             if check_payment_status and record.payment_status == 'paid':
                 raise ValueError('已支付的工资记录不能修改')
+            
+            # 发放状态只能按 PAYMENT_TRANSITIONS 流转
+            new_status = data.get('payment_status', record.payment_status)
+            if new_status != record.payment_status:
+                SalaryService.check_transition(record.payment_status, new_status)
+                if new_status == 'paid' and not data.get('payment_date'):
+                    record.payment_date = datetime.now()
                 
             # 记录原始值，用于记录变更
             original_basic_salary = float(record.basic_salary)
@@ -952,17 +912,29 @@ class SalaryService:
             # 更新基本信息
             allowed_fields = [
                 'basic_salary', 'allowances', 'overtime_pay',
-                'bonus', 'deductions', 'payment_status',
-                'payment_date', 'remark'
+                'bonus', 'deductions', 'social_insurance', 'special_deduction',
+                'payment_status', 'payment_date', 'remark'
             ]
             
+            amount_fields = ['basic_salary', 'allowances', 'overtime_pay', 'bonus', 'deductions', 'social_insurance']
+            changed_fields = [
+                field for field in amount_fields
+                if field in data and Decimal(str(data[field])) != Decimal(getattr(record, field) or 0)
+            ]
+            
+            # 手工修改加班费/扣除项时累计差额，重算时叠加在考勤计算值之上
+            if 'overtime_pay' in changed_fields:
+                record.overtime_adjustment = (record.overtime_adjustment or 0) + Decimal(str(data['overtime_pay'])) - record.overtime_pay
+            if 'deductions' in changed_fields:
+                record.deduction_adjustment = (record.deduction_adjustment or 0) + Decimal(str(data['deductions'])) - record.deductions
+            
             # 更新各个字段的值
             for field in allowed_fields:
                 if field in data:
                     if field == 'payment_date' and data[field]:
                         # 处理日期字段
                         setattr(record, field, datetime.strptime(data[field], '%Y-%m-%d'))
-                    elif field in ['basic_salary', 'allowances', 'overtime_pay', 'bonus', 'deductions']:
+                    elif field in ['basic_salary', 'allowances', 'overtime_pay', 'bonus', 'deductions', 'social_insurance', 'special_deduction']:
                         # 处理金额字段，确保转换为Decimal类型
                         setattr(record, field, Decimal(str(data[field])))
                     else:
@@ -981,6 +953,10 @@ class SalaryService:
             record.gross_salary = salary_details['gross_salary']  # 更新总应发金额
             record.tax = salary_details['tax']  # 更新个人所得税
             record.net_salary = salary_details['net_salary']  # 更新实发工资
+            # 个税按累计预扣法计算
+            TaxService.apply([record])
+            if changed_fields:
+                SalaryService.sync_components(record, changed_fields)
             
             # 生成变更记录
             changes = []
@@ -1042,6 +1018,121 @@ class SalaryService:
             db.session.rollback()
             raise e
 
+    @staticmethod
+    def _chunks(record_ids: List[int]) -> List[List[int]]:
+        """去重后按 BULK_CHUNK_SIZE 分批"""
+        ids = list(dict.fromkeys(int(record_id) for record_id in record_ids))
+        return [ids[i:i + BULK_CHUNK_SIZE] for i in range(0, len(ids), BULK_CHUNK_SIZE)]
+
+    @staticmethod
+    def check_transition(from_status: str, to_status: str) -> str:
+        """
+        检查发放状态变更是否允许
+
+        返回：
+            对应的操作名（approve/pay/revoke），不允许时抛出 ValueError
+        """
+        for action, (from_statuses, target) in PAYMENT_TRANSITIONS.items():
+            if target == to_status and from_status in from_statuses:
+                return action
+        raise ValueError(f'发放状态不能从 {from_status} 变更为 {to_status}')
+
+    @staticmethod
+    def transition_salary_records(
+        action: str,
+        record_ids: List[int] = None,
+        year: int = None,
+        month: int = None,
+        payment_date: datetime = None
+    ) -> Dict:
+        """
+        批量流转工资记录发放状态（待发放 -> [已审核 ->] 已发放）
+        
+        每批记录先锁定读取（ID, 状态），再用一条带状态前置条件的 UPDATE 语句完成，不加载 ORM 对象；
+        当前状态不满足前置条件的记录保持不变并在冲突列表中返回，已处于目标状态的记录视为无需处理。
+        不指定记录ID时按年月整体流转。
+        
+        参数：
+            action: 操作，approve(审核)/pay(发放)/revoke(撤回审核)
+            record_ids: 工资记录ID列表
+            year: 年份（不指定记录ID时必需）
+            month: 月份（不指定记录ID时必需）
+            payment_date: 发放日期，发放时默认为当前时间
+            
+        返回：
+            包含 status（目标状态）、affected（更新数量）、unchanged（已处于目标状态的数量）
+            和 conflicts（[{id, status, reason}]）的字典
+        """
+        if action not in PAYMENT_TRANSITIONS:
+            raise ValueError(f'不支持的操作: {action}')
+        from_statuses, to_status = PAYMENT_TRANSITIONS[action]
+        
+        values = {SalaryRecord.payment_status: to_status, SalaryRecord.updated_at: datetime.utcnow()}
+        if to_status == 'paid':
+            values[SalaryRecord.payment_date] = payment_date or datetime.now()
+        
+        if record_ids:
+            batches = [(SalaryRecord.id.in_(chunk), chunk) for chunk in SalaryService._chunks(record_ids)]
+        elif year and month:
+            batches = [(and_(SalaryRecord.year == year, SalaryRecord.month == month), None)]
+        else:
+            raise ValueError('请提供工资记录ID或年月')
+        
+        try:
+            affected = 0
+            unchanged = 0
+            conflicts = []
+            for condition, chunk in batches:
+                rows = db.session.query(SalaryRecord.id, SalaryRecord.payment_status, SalaryRecord.payment_date).filter(
+                    condition
+                ).with_for_update().all()
+                movable = [row for row in rows if row.payment_status in from_statuses]
+                if movable:
+                    affected += SalaryRecord.query.filter(
+                        condition,
+                        SalaryRecord.payment_status.in_(from_statuses)
+                    ).update(values, synchronize_session=False)
+                    # 批量语句不经过会话事件，手动记录变更和审计日志
+                    ChangeCaptureService.record(db.session, SalaryRecord.__tablename__, [row.id for row in movable],
+                                                'update', [column.key for column in values])
+                    AuditService.record(db.session, SalaryRecord.__tablename__, 'update', [(row.id, {
+                        'payment_status': [row.payment_status, to_status],
+                        **({'payment_date': [row.payment_date, values[SalaryRecord.payment_date]]}
+                           if to_status == 'paid' else {})
+                    }) for row in movable])
+                
+                unchanged += sum(1 for row in rows if row.payment_status == to_status)
+                conflicts.extend({
+                    'id': row.id,
+                    'status': row.payment_status,
+                    'reason': f"当前状态为 {row.payment_status}，只有 {'/'.join(from_statuses)} 状态的记录可以执行该操作"
+                } for row in rows if row.payment_status not in from_statuses and row.payment_status != to_status)
+                if chunk is not None:
+                    found = {row.id for row in rows}
+                    conflicts.extend({'id': record_id, 'status': None, 'reason': '工资记录不存在'}
+                                     for record_id in chunk if record_id not in found)
+            
+            if to_status == 'paid' and affected:
+                # 批量语句不经过会话事件，需要同步更新个税累计状态（同一事务内提交）
+                pairs = set()
+                for condition, _ in batches:
+                    pairs.update(db.session.query(SalaryRecord.employee_id, SalaryRecord.year).filter(
+                        condition, SalaryRecord.payment_status == 'paid'
+                    ).distinct().all())
+                TaxService.refresh_states(pairs)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+        
+        return {
+            'action': action,
+            'status': to_status,
+            'affected': affected,
+            'unchanged': unchanged,
+            'conflicts': conflicts
+        }
+
     @staticmethod
     def batch_update_salary_records(
         record_ids: List[int],
@@ -1051,6 +1142,8 @@ class SalaryService:
         """
         批量更新工资记录
         
+        只修改发放状态（及发放日期）时按状态流转批量处理，否则逐条更新并重新计算工资。
+        
         参数：
             record_ids: 工资记录ID列表
             data: 更新的数据字典
@@ -1059,6 +1152,20 @@ class SalaryService:
         返回：
             包含成功和失败记录的字典
         """
+        if 'payment_status' in data and set(data) <= {'payment_status', 'payment_date'}:
+            action = next((name for name, (_, to_status) in PAYMENT_TRANSITIONS.items()
+                           if to_status == data['payment_status']), None)
+            if action is None:
+                raise ValueError(f"不支持的发放状态: {data['payment_status']}")
+            payment_date = datetime.strptime(data['payment_date'], '%Y-%m-%d') if data.get('payment_date') else None
+            result = SalaryService.transition_salary_records(action, record_ids, payment_date=payment_date)
+            failed_ids = {conflict['id'] for conflict in result['conflicts']}
+            return {
+                'success': [{'id': record_id} for record_id in dict.fromkeys(record_ids) if record_id not in failed_ids],
+                'failed': [{'id': conflict['id'], 'error': conflict['reason']} for conflict in result['conflicts']],
+                'affected': result['affected']
+            }
+        
         results = {
             'success': [],
             'failed': []
@@ -1091,6 +1198,9 @@ class SalaryService:
         """
         批量删除工资记录
         
+        每批记录使用一条 DELETE ... WHERE id IN (...) 语句删除（计算明细同样批量删除），
+        检查支付状态时已发放的记录保持不变并返回失败原因。
+        
         参数：
             record_ids: 工资记录ID列表
             check_payment_status: 是否检查支付状态，默认为True
@@ -1103,24 +1213,55 @@ class SalaryService:
             'failed': []
         }
         
-        for record_id in record_ids:
-            try:
-                success = SalaryService.delete_salary_record(
-                    record_id=record_id,
-                    check_payment_status=check_payment_status
-                )
-                if success:
-                    results['success'].append(record_id)
-            except Exception as e:
-                results['failed'].append({
-                    'id': record_id,
-                    'error': str(e)
-                })
+        try:
+            paid_pairs = set()
+            for chunk in SalaryService._chunks(record_ids):
+                # 读取整行用于审计日志
+                rows = db.session.execute(
+                    select(SalaryRecord.__table__).where(SalaryRecord.id.in_(chunk)).with_for_update()
+                ).all()
+                found = {row.id for row in rows}
+                results['failed'].extend({'id': record_id, 'error': '工资记录不存在'}
+                                         for record_id in chunk if record_id not in found)
+                
+                deletable = []
+                for row in rows:
+                    if row.payment_status == 'paid':
+                        if check_payment_status:
+                            results['failed'].append({'id': row.id, 'error': '已支付的工资记录不能删除'})
+                            continue
+                        paid_pairs.add((row.employee_id, row.year))
+                    deletable.append(row.id)
+                if not deletable:
+                    continue
                 
+                # 记录已锁定，deletable 即实际删除的记录
+                component_ids = [row.id for row in db.session.query(SalaryRecordComponent.id).filter(
+                    SalaryRecordComponent.salary_record_id.in_(deletable)
+                )]
+                SalaryRecordComponent.query.filter(
+                    SalaryRecordComponent.salary_record_id.in_(deletable)
+                ).delete(synchronize_session=False)
+                SalaryRecord.query.filter(SalaryRecord.id.in_(deletable)).delete(synchronize_session=False)
+                ChangeCaptureService.record(db.session, SalaryRecordComponent.__tablename__, component_ids, 'delete')
+                ChangeCaptureService.record(db.session, SalaryRecord.__tablename__, deletable, 'delete')
+                deleted = set(deletable)
+                AuditService.record(db.session, SalaryRecord.__tablename__, 'delete', [
+                    (row.id, AuditService.snapshot(row._mapping, 'delete')) for row in rows if row.id in deleted
+                ])
+                results['success'].extend(deletable)
+            
+            if paid_pairs:
+                TaxService.refresh_states(paid_pairs)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+        
         return results
 
     @staticmethod
-    def batch_update_salary_records(
+    def batch_regenerate_salary_records(
         employee_id: int = None,
         year: int = None,
         month: int = None,
@@ -1128,7 +1269,7 @@ class SalaryService:
         force_update: bool = True
     ) -> Dict[str, List]:
         """
-        批量更新工资记录
+        按当前工资结构批量重新生成工资记录
 
         参数：
             employee_id: 员工ID，如果为None则更新所有员工
@@ -1160,6 +1301,9 @@ class SalaryService:
             success_records = []
             failed_records = []
             
+            # 一次性汇总所有员工本月的加班、无薪假和缺勤数据
+            payroll_inputs = PayrollInputService.aggregate(year, month, employees)
+            
             for employee in employees:
                 try:
                     # 重新生成工资记录
@@ -1168,7 +1312,8 @@ class SalaryService:
                         year=year,
                         month=month,
                         check_date=check_date,
-                        force_update=force_update
+                        force_update=force_update,
+                        payroll_input=payroll_inputs[employee.id]
                     )
                     if record:
                         success_records.append({
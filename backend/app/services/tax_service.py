@@ -0,0 +1,416 @@
+"""
+个税累计预扣服务模块
+按累计预扣法计算工资薪金个人所得税：
+    累计应纳税所得额 = 累计收入 - 累计减除费用(每月5000) - 累计专项扣除和专项附加扣除
+    本月应预扣税额 = 累计应纳税所得额 × 预扣率 - 速算扣除数 - 累计已预扣税额
+每位员工每年维护一条累计状态（TaxYtdState），工资记录发放时在同一事务中增量更新，
+计算当月预扣税额只需读取该状态；按年重算时一次查询全年记录后顺序累加。
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models.salary import SalaryRecord
+from app.models.tax import TaxYtdState
+
+ZERO = Decimal('0')
+
+# 综合所得预扣率表：(累计应纳税所得额上限, 预扣率, 速算扣除数)
+ANNUAL_TAX_BRACKETS = [
+    (Decimal('36000'), Decimal('0.03'), Decimal('0')),
+    (Decimal('144000'), Decimal('0.10'), Decimal('2520')),
+    (Decimal('300000'), Decimal('0.20'), Decimal('16920')),
+    (Decimal('420000'), Decimal('0.25'), Decimal('31920')),
+    (Decimal('660000'), Decimal('0.30'), Decimal('52920')),
+    (Decimal('960000'), Decimal('0.35'), Decimal('85920')),
+    (None, Decimal('0.45'), Decimal('181920'))
+]
+
+# 影响累计状态的工资记录字段
+TAX_FIELDS = ('payment_status', 'gross_salary', 'deductions', 'social_insurance', 'special_deduction', 'tax', 'year', 'month')
+
+class YtdTotals:
+    """某月之前已发放月份的累计值"""
+
+    __slots__ = ('months', 'last_month', 'income', 'deductions', 'tax_withheld')
+
+    def __init__(self, months: int = 0, last_month: int = 0, income: Decimal = ZERO,
+                 deductions: Decimal = ZERO, tax_withheld: Decimal = ZERO):
+        self.months = months
+        self.last_month = last_month
+        self.income = income
+        self.deductions = deductions
+        self.tax_withheld = tax_withheld
+
+    @classmethod
+    def from_state(cls, state: TaxYtdState) -> 'YtdTotals':
+        return cls(state.months, state.last_month, Decimal(state.income), Decimal(state.deductions), Decimal(state.tax_withheld))
+
+    def add(self, record: SalaryRecord, tax: Optional[Decimal] = None) -> 'YtdTotals':
+        """加上一个月的工资记录，返回新的累计值（tax 默认取记录已预扣的个税）"""
+        return YtdTotals(
+            self.months + 1,
+            max(self.last_month, record.month),
+            self.income + TaxService.record_income(record),
+            self.deductions + TaxService.record_deductions(record),
+            self.tax_withheld + (Decimal(record.tax or 0) if tax is None else tax)
+        )
+
+class TaxService:
+    @staticmethod
+    def init_app(app) -> None:
+        """注册会话事件监听，工资记录发放或撤销发放时更新累计状态"""
+        if not event.contains(db.session, 'before_flush', TaxService._before_flush):
+            event.listen(db.session, 'before_flush', TaxService._before_flush)
+            event.listen(db.session, 'after_commit', TaxService._clear_session_states)
+            event.listen(db.session, 'after_soft_rollback', TaxService._clear_session_states)
+
+    # ---------- 计算 ----------
+
+    @staticmethod
+    def cumulative_tax(taxable_income: Decimal, brackets: Optional[list] = None) -> Decimal:
+        """按预扣率表计算累计应纳税额（brackets 默认为 ANNUAL_TAX_BRACKETS）"""
+        if taxable_income <= 0:
+            return ZERO
+        for upper, rate, quick_deduction in brackets or ANNUAL_TAX_BRACKETS:
+            if upper is None or taxable_income <= upper:
+                return (taxable_income * rate - quick_deduction).quantize(Decimal('0.01'))
+        return ZERO
+
+    @staticmethod
+    def record_income(record: SalaryRecord) -> Decimal:
+        """当月计税收入：应发总额扣除请假、缺勤等扣款"""
+        return Decimal(record.gross_salary or 0) - Decimal(record.deductions or 0)
+
+    @staticmethod
+    def record_deductions(record: SalaryRecord) -> Decimal:
+        """当月专项扣除（社保公积金个人部分）和专项附加扣除"""
+        return Decimal(record.social_insurance or 0) + Decimal(record.special_deduction or 0)
+
+    @staticmethod
+    def taxable_income(totals: YtdTotals, monthly_exemption: Optional[Decimal] = None) -> Decimal:
+        """累计应纳税所得额"""
+        if monthly_exemption is None:
+            monthly_exemption = Decimal(current_app.config['TAX_MONTHLY_EXEMPTION'])
+        return max(totals.income - monthly_exemption * totals.months - totals.deductions, ZERO)
+
+    @staticmethod
+    def month_tax(prior: YtdTotals, income: Decimal, deductions: Decimal,
+                  brackets: Optional[list] = None, monthly_exemption: Optional[Decimal] = None) -> Decimal:
+        """
+        根据之前月份的累计值计算当月应预扣税额
+
+        参数：
+            prior: 之前已发放月份的累计值
+            income: 当月计税收入
+            deductions: 当月专项扣除和专项附加扣除
+            brackets: 预扣率表，默认为 ANNUAL_TAX_BRACKETS
+            monthly_exemption: 每月减除费用，默认取配置 TAX_MONTHLY_EXEMPTION
+        """
+        totals = YtdTotals(prior.months + 1, prior.last_month, prior.income + income, prior.deductions + deductions)
+        taxable = TaxService.taxable_income(totals, monthly_exemption)
+        tax = TaxService.cumulative_tax(taxable, brackets) - prior.tax_withheld
+        return max(tax, ZERO).quantize(Decimal('0.01'))
+
+    @staticmethod
+    def withhold(record: SalaryRecord, prior: YtdTotals) -> Decimal:
+        """
+        计算工资记录当月应预扣的个税，并更新记录的个税和实发工资
+
+        参数：
+            record: 工资记录（应发总额、扣除项已计算）
+            prior: 该记录所在月份之前已发放月份的累计值
+
+        返回：
+            当月应预扣税额
+        """
+        tax = TaxService.month_tax(prior, TaxService.record_income(record), TaxService.record_deductions(record))
+        record.tax = tax
+        record.net_salary = (
+            Decimal(record.gross_salary) - tax - Decimal(record.deductions or 0) - Decimal(record.social_insurance or 0)
+        ).quantize(Decimal('0.01'))
+        return tax
+
+    @staticmethod
+    def prior_totals(employee_ids: Iterable[int], year: int, month: int) -> Dict[int, YtdTotals]:
+        """
+        获取多名员工在指定月份之前已发放月份的累计值
+
+        通常直接读取累计状态；没有状态（历史数据）或状态已包含该月及之后月份时，
+        对这些员工合并为一次分组汇总查询。
+
+        返回：
+            员工ID -> YtdTotals 的字典
+        """
+        employee_ids = set(employee_ids)
+        totals = {employee_id: YtdTotals() for employee_id in employee_ids}
+        if not employee_ids:
+            return totals
+
+        states = TaxYtdState.query.filter(
+            TaxYtdState.employee_id.in_(employee_ids),
+            TaxYtdState.year == year
+        ).all()
+        fresh = set()
+        for state in states:
+            if state.last_month < month:
+                totals[state.employee_id] = YtdTotals.from_state(state)
+                fresh.add(state.employee_id)
+
+        stale = employee_ids - fresh
+        if stale:
+            for row in TaxService._paid_totals_query(year).filter(
+                SalaryRecord.employee_id.in_(stale),
+                SalaryRecord.month < month
+            ).all():
+                totals[row.employee_id] = TaxService._totals_from_row(row)
+        return totals
+
+    @staticmethod
+    def apply(records: List[SalaryRecord]) -> None:
+        """按累计预扣法重新计算一批工资记录的个税和实发工资"""
+        by_month = defaultdict(list)
+        for record in records:
+            by_month[(record.year, record.month)].append(record)
+        for (year, month), month_records in by_month.items():
+            prior = TaxService.prior_totals({record.employee_id for record in month_records}, year, month)
+            for record in month_records:
+                TaxService.withhold(record, prior[record.employee_id])
+
+    @staticmethod
+    def _paid_totals_columns() -> list:
+        """已发放工资记录的汇总列"""
+        return [
+            func.count(SalaryRecord.id).label('months'),
+            func.max(SalaryRecord.month).label('last_month'),
+            func.sum(SalaryRecord.gross_salary - func.coalesce(SalaryRecord.deductions, 0)).label('income'),
+            func.sum(func.coalesce(SalaryRecord.social_insurance, 0) + func.coalesce(SalaryRecord.special_deduction, 0)).label('deductions'),
+            func.sum(func.coalesce(SalaryRecord.tax, 0)).label('tax_withheld')
+        ]
+
+    @staticmethod
+    def _paid_totals_query(year: int, session=None):
+        """按员工分组汇总已发放工资记录的查询"""
+        session = session or db.session
+        return session.query(
+            SalaryRecord.employee_id, *TaxService._paid_totals_columns()
+        ).filter(
+            SalaryRecord.year == year,
+            SalaryRecord.payment_status == 'paid'
+        ).group_by(SalaryRecord.employee_id)
+
+    @staticmethod
+    def _totals_from_row(row) -> YtdTotals:
+        return YtdTotals(
+            row.months,
+            row.last_month or 0,
+            Decimal(str(row.income or 0)),
+            Decimal(str(row.deductions or 0)),
+            Decimal(str(row.tax_withheld or 0))
+        )
+
+    @staticmethod
+    def _save_state(session, state: Optional[TaxYtdState], employee_id: int, year: int, totals: YtdTotals) -> TaxYtdState:
+        """将累计值写入状态（不存在时新建）"""
+        if state is None:
+            state = TaxYtdState(employee_id=employee_id, year=year)
+            session.add(state)
+        state.months = totals.months
+        state.last_month = totals.last_month
+        state.income = totals.income
+        state.deductions = totals.deductions
+        state.taxable_income = TaxService.taxable_income(totals)
+        state.tax_withheld = totals.tax_withheld
+        return state
+
+    # ---------- 发放时增量更新 ----------
+
+    @staticmethod
+    def _is_paid_change(session, obj) -> bool:
+        """工资记录的发放状态变化，或已发放记录的计税金额变化"""
+        if obj in session.new:
+            return obj.payment_status == 'paid'
+        state = inspect(obj)
+        history = state.attrs.payment_status.history
+        statuses = list(history.added) + list(history.unchanged) + list(history.deleted)
+        if 'paid' not in statuses:
+            return False
+        if obj in session.deleted:
+            return True
+        return any(state.attrs[field].history.has_changes() for field in TAX_FIELDS)
+
+    @staticmethod
+    def _before_flush(session, flush_context, instances):
+        """刷新前更新受影响员工的累计状态，并重算其后续月份待发放记录的个税"""
+        changed = defaultdict(list)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, SalaryRecord) and TaxService._is_paid_change(session, obj):
+                changed[(obj.employee_id, obj.year)].append(obj)
+        if not changed:
+            return
+
+        cache = session.info.setdefault('tax_ytd_states', {})
+        with session.no_autoflush:
+            for (employee_id, year), records in changed.items():
+                state = cache.get((employee_id, year)) or TaxYtdState.query.filter_by(
+                    employee_id=employee_id, year=year
+                ).first()
+
+                newly_paid = all(
+                    record.payment_status == 'paid' and record not in session.deleted and
+                    (record in session.new or 'paid' not in inspect(record).attrs.payment_status.history.deleted)
+                    for record in records
+                )
+                if state is not None and newly_paid and min(record.month for record in records) > state.last_month:
+                    # 按月份顺序发放：在原有累计值上增量累加
+                    totals = YtdTotals.from_state(state)
+                    for record in sorted(records, key=lambda r: r.month):
+                        totals = totals.add(record)
+                else:
+                    # 撤销发放、删除或补发更早月份：按数据库中其余已发放记录重建
+                    totals = TaxService._rebuild_totals(session, employee_id, year, records)
+                cache[(employee_id, year)] = TaxService._save_state(session, state, employee_id, year, totals)
+
+                # 后续月份待发放记录的个税依赖本次累计值
+                later = SalaryRecord.query.filter(
+                    SalaryRecord.employee_id == employee_id,
+                    SalaryRecord.year == year,
+                    SalaryRecord.month > totals.last_month,
+                    SalaryRecord.payment_status == 'pending'
+                ).all()
+                for record in set(later) | {r for r in records if r.payment_status == 'pending' and r.month > totals.last_month}:
+                    if record in session.deleted:
+                        continue
+                    TaxService.withhold(record, totals)
+                    for component in record.components:
+                        if component.code == 'tax':
+                            component.amount = record.tax
+
+    @staticmethod
+    def _rebuild_totals(session, employee_id: int, year: int, records: List[SalaryRecord]) -> YtdTotals:
+        """本次变更之外的已发放记录从数据库汇总，再加上本次变更后仍为已发放的记录"""
+        excluded = [record.id for record in records if record.id is not None]
+        query = TaxService._paid_totals_query(year, session).filter(SalaryRecord.employee_id == employee_id)
+        if excluded:
+            query = query.filter(SalaryRecord.id.notin_(excluded))
+        row = query.first()
+        totals = TaxService._totals_from_row(row) if row else YtdTotals()
+        for record in sorted(records, key=lambda r: r.month):
+            if record.payment_status == 'paid' and record not in session.deleted:
+                totals = totals.add(record)
+        return totals
+
+    @staticmethod
+    def _clear_session_states(session, *args):
+        session.info.pop('tax_ytd_states', None)
+
+    # ---------- 批量语句之后刷新 ----------
+
+    @staticmethod
+    def refresh_states(pairs: Iterable) -> int:
+        """
+        批量 UPDATE/DELETE 修改已发放记录后刷新累计状态（不提交事务，由调用方统一提交）
+
+        所有受影响的（员工, 年份）合并为一次分组汇总查询和一次状态查询，
+        再一次查询取出其后续月份的待发放记录重算个税，与发放时的增量更新规则一致。
+
+        参数：
+            pairs: (员工ID, 年份) 的集合
+
+        返回：
+            重算的待发放记录数
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return 0
+        employee_ids = {employee_id for employee_id, _ in pairs}
+        years = {year for _, year in pairs}
+
+        rows = db.session.query(
+            SalaryRecord.employee_id, SalaryRecord.year, *TaxService._paid_totals_columns()
+        ).filter(
+            SalaryRecord.employee_id.in_(employee_ids),
+            SalaryRecord.year.in_(years),
+            SalaryRecord.payment_status == 'paid'
+        ).group_by(SalaryRecord.employee_id, SalaryRecord.year).all()
+        totals = {(row.employee_id, row.year): TaxService._totals_from_row(row) for row in rows}
+
+        states = {(state.employee_id, state.year): state for state in TaxYtdState.query.filter(
+            TaxYtdState.employee_id.in_(employee_ids),
+            TaxYtdState.year.in_(years)
+        ).all()}
+        for employee_id, year in pairs:
+            totals.setdefault((employee_id, year), YtdTotals())
+            TaxService._save_state(db.session, states.get((employee_id, year)), employee_id, year,
+                                   totals[(employee_id, year)])
+
+        pending = SalaryRecord.query.options(selectinload(SalaryRecord.components)).filter(
+            SalaryRecord.employee_id.in_(employee_ids),
+            SalaryRecord.year.in_(years),
+            SalaryRecord.payment_status == 'pending'
+        ).all()
+        updated = 0
+        for record in pending:
+            prior = totals.get((record.employee_id, record.year)) if (record.employee_id, record.year) in pairs else None
+            if prior is None or record.month <= prior.last_month:
+                continue
+            TaxService.withhold(record, prior)
+            for component in record.components:
+                if component.code == 'tax':
+                    component.amount = record.tax
+            updated += 1
+        return updated
+
+    # ---------- 按年重算 ----------
+
+    @staticmethod
+    def recompute_year(year: int, employee_ids: Optional[List[int]] = None) -> Dict[str, int]:
+        """
+        按年重建累计状态并重算待发放记录的个税
+
+        一次查询取出全年工资记录（按员工、月份排序）顺序累加：已发放记录累加到累计值，
+        待发放记录按其之前已发放月份的累计值计算预扣税额。
+
+        参数：
+            year: 年份
+            employee_ids: 员工ID列表，默认为全部员工
+
+        返回：
+            包含 employees（员工数）和 updated（重算的待发放记录数）的字典
+        """
+        query = SalaryRecord.query.options(selectinload(SalaryRecord.components)).filter(SalaryRecord.year == year)
+        state_query = TaxYtdState.query.filter(TaxYtdState.year == year)
+        if employee_ids:
+            query = query.filter(SalaryRecord.employee_id.in_(employee_ids))
+            state_query = state_query.filter(TaxYtdState.employee_id.in_(employee_ids))
+        records = query.order_by(SalaryRecord.employee_id, SalaryRecord.month).all()
+        states = {state.employee_id: state for state in state_query.all()}
+
+        by_employee = defaultdict(list)
+        for record in records:
+            by_employee[record.employee_id].append(record)
+
+        updated = 0
+        for employee_id, employee_records in by_employee.items():
+            totals = YtdTotals()
+            for record in employee_records:
+                if record.payment_status == 'paid':
+                    totals = totals.add(record)
+                elif record.payment_status == 'pending':
+                    TaxService.withhold(record, totals)
+                    for component in record.components:
+                        if component.code == 'tax':
+                            component.amount = record.tax
+                    updated += 1
+            TaxService._save_state(db.session, states.pop(employee_id, None), employee_id, year, totals)
+
+        # 当年已没有工资记录的员工
+        for state in states.values():
+            db.session.delete(state)
+
+        db.session.commit()
+        return {'employees': len(by_employee), 'updated': updated}
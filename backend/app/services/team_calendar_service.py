@@ -0,0 +1,338 @@
+"""
+团队考勤日历服务模块
+按部门子树和月份汇总每天的请假、假期申请、加班、缺勤、迟到人数，以及每位员工的请假/加班/缺勤区间：
+    - 加班、缺勤、迟到按天 GROUP BY 统计；跨天的请假和假期申请只查询与当月重叠的区间，按天展开计数
+    - 结果按（部门, 年, 月）缓存 TEAM_CALENDAR_CACHE_TTL 秒；本进程提交相关变更后，
+      只清除变更日期所在月份的缓存，员工调动部门或部门结构变化时清除全部缓存
+"""
+
+import calendar
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from app import db
+from app.models.attendance import Attendance, Leave, Overtime
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.holiday import HolidayRequest, HolidayType
+from app.services.change_capture_service import ChangeCaptureService
+from app.utils.session_state import track
+
+# 计入日历的申请状态
+ACTIVE_STATUSES = ('pending', 'approved')
+
+# 单次查询最多跨越的月份数
+MAX_CALENDAR_MONTHS = 3
+
+DAY_COUNTERS = ('leave', 'holiday', 'overtime', 'absent', 'late', 'out')
+
+def _months_of(values) -> Set[Tuple[int, int]]:
+    """日期/时间（可含区间两端）覆盖的月份"""
+    values = [value.date() if isinstance(value, datetime) else value for value in values if value is not None]
+    if not values:
+        return set()
+    start, end = min(values), max(values)
+    months = set()
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.add((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def _history(obj, *attrs) -> list:
+    """属性的当前值和本次刷新前的旧值"""
+    values = []
+    state = inspect(obj)
+    for attr in attrs:
+        history = state.attrs[attr].history
+        values.extend(list(history.added) + list(history.unchanged) + list(history.deleted))
+    return values
+
+class TeamCalendarService:
+    _lock = threading.Lock()
+
+    @staticmethod
+    def init_app(app) -> None:
+        """
+        订阅数据变更：本进程提交相关变更后清除受影响月份的缓存
+        变更的月份需要字段的修改前后值，由 after_flush 收集；批量语句记录的变更没有这些信息，清除全部缓存
+        """
+        if not event.contains(db.session, 'after_flush', TeamCalendarService._after_flush):
+            event.listen(db.session, 'after_flush', TeamCalendarService._after_flush)
+        track('team_calendar_months')
+        ChangeCaptureService.subscribe(TeamCalendarService._on_change, [
+            model.__tablename__ for model in (Leave, HolidayRequest, Overtime, Attendance, Department, Employee)
+        ], sync=True)
+
+    # ---------- 缓存失效 ----------
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        affected = session.info.setdefault('team_calendar_months', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, (Leave, HolidayRequest)):
+                affected.update(_months_of(_history(obj, 'start_date', 'end_date')))
+            elif isinstance(obj, Overtime):
+                affected.update(_months_of(_history(obj, 'start_time', 'end_time')))
+            elif isinstance(obj, Attendance):
+                affected.update(_months_of(_history(obj, 'date')))
+            elif isinstance(obj, (Department, Employee)):
+                # 部门结构或员工所属部门变化时影响所有部门子树的缓存
+                attr = 'parent_id' if isinstance(obj, Department) else 'department_id'
+                if obj in session.new or obj in session.deleted or inspect(obj).attrs[attr].history.has_changes():
+                    affected.add('all')
+        if not affected:
+            session.info.pop('team_calendar_months', None)
+
+    @staticmethod
+    def _on_change(changes) -> None:
+        affected = db.session.info.pop('team_calendar_months', None) or set()
+        if any(change.bulk for change in changes):
+            affected.add('all')
+        if affected:
+            TeamCalendarService.invalidate(None if 'all' in affected else affected)
+
+    @staticmethod
+    def _cache() -> dict:
+        cache = current_app.extensions.get('team_calendar')
+        if cache is None:
+            cache = {}
+            current_app.extensions['team_calendar'] = cache
+        return cache
+
+    @staticmethod
+    def invalidate(months: Optional[Set[Tuple[int, int]]] = None) -> None:
+        """清除指定月份（默认全部）的日历缓存"""
+        with TeamCalendarService._lock:
+            cache = TeamCalendarService._cache()
+            if months is None:
+                cache.clear()
+                return
+            for key in [key for key in cache if (key[1], key[2]) in months]:
+                del cache[key]
+
+    # ---------- 部门子树 ----------
+
+    @staticmethod
+    def department_subtree(department_id: int) -> List[int]:
+        """部门及其所有下级部门的ID（一次查询全部部门的上下级关系）"""
+        children = defaultdict(list)
+        exists = False
+        for id, parent_id in db.session.query(Department.id, Department.parent_id):
+            children[parent_id].append(id)
+            exists = exists or id == department_id
+        if not exists:
+            raise ValueError('部门不存在')
+        result, stack = [], [department_id]
+        while stack:
+            current = stack.pop()
+            if current in result:
+                continue
+            result.append(current)
+            stack.extend(children.get(current, ()))
+        return result
+
+    # ---------- 按月汇总 ----------
+
+    @staticmethod
+    def get_month(department_id: int, year: int, month: int) -> dict:
+        """获取部门子树某月的日历（按（部门, 年, 月）缓存）"""
+        key = (department_id, year, month)
+        with TeamCalendarService._lock:
+            entry = TeamCalendarService._cache().get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        data = TeamCalendarService.build_month(department_id, year, month)
+        with TeamCalendarService._lock:
+            TeamCalendarService._cache()[key] = (
+                time.monotonic() + current_app.config['TEAM_CALENDAR_CACHE_TTL'], data
+            )
+        return data
+
+    @staticmethod
+    def build_month(department_id: int, year: int, month: int) -> dict:
+        """
+        汇总部门子树某月每天的人数和每位员工的区间
+
+        返回：
+            {
+                'department_ids': 子树部门ID列表,
+                'headcount': 在职人数,
+                'days': {日期: {leave, holiday, overtime, absent, late, out}},
+                'employees': {员工ID: {'employee_id', 'name', 'department_id', 'spans': [...]}}
+            }
+        """
+        department_ids = TeamCalendarService.department_subtree(department_id)
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        month_start = datetime.combine(first, datetime.min.time())
+        next_month = datetime.combine(last + timedelta(days=1), datetime.min.time())
+
+        members = db.session.query(Employee.id).filter(Employee.department_id.in_(department_ids))
+        headcount = db.session.query(func.count(Employee.id)).filter(
+            Employee.department_id.in_(department_ids),
+            Employee.employment_status == 'active'
+        ).scalar()
+
+        days = {}
+        day = first
+        while day <= last:
+            days[day] = dict.fromkeys(DAY_COUNTERS, 0)
+            day += timedelta(days=1)
+        out_by_day = defaultdict(set)
+        spans = defaultdict(list)
+
+        def add_span(employee_id, kind, start, end, status, type=None):
+            spans[employee_id].append({'kind': kind, 'start': start, 'end': end, 'status': status, 'type': type})
+
+        # 请假：与当月重叠的区间，按天展开（同一员工同一天只计一次）
+        leaves = db.session.query(
+            Leave.employee_id, Leave.start_date, Leave.end_date, Leave.status, Leave.leave_type
+        ).filter(
+            Leave.employee_id.in_(members),
+            Leave.status.in_(ACTIVE_STATUSES),
+            Leave.start_date < next_month,
+            Leave.end_date >= month_start
+        )
+        for employee_id, start, end, status, leave_type in leaves:
+            add_span(employee_id, 'leave', start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'), status, leave_type)
+            TeamCalendarService._spread(days, out_by_day, 'leave', employee_id, max(start.date(), first), min(end.date(), last))
+
+        # 假期申请：按天存储，结束日期当天计入
+        holidays = db.session.query(
+            HolidayRequest.employee_id, HolidayRequest.start_date, HolidayRequest.end_date,
+            HolidayRequest.status, HolidayType.code
+        ).join(HolidayType, HolidayRequest.holiday_type_id == HolidayType.id).filter(
+            HolidayRequest.employee_id.in_(members),
+            HolidayRequest.status.in_(ACTIVE_STATUSES),
+            HolidayRequest.start_date <= last,
+            HolidayRequest.end_date >= first
+        )
+        for employee_id, start, end, status, code in holidays:
+            add_span(employee_id, 'holiday', start.isoformat(), end.isoformat(), status, code)
+            TeamCalendarService._spread(days, out_by_day, 'holiday', employee_id, max(start, first), min(end, last))
+
+        # 加班：按开始日期分组统计人数
+        overtime_day = func.date(Overtime.start_time)
+        overtime_counts = db.session.query(overtime_day, func.count(func.distinct(Overtime.employee_id))).filter(
+            Overtime.employee_id.in_(members),
+            Overtime.status.in_(ACTIVE_STATUSES),
+            Overtime.start_time >= month_start,
+            Overtime.start_time < next_month
+        ).group_by(overtime_day)
+        for day, count in overtime_counts:
+            days[TeamCalendarService._as_date(day)]['overtime'] = count
+        overtimes = db.session.query(
+            Overtime.employee_id, Overtime.start_time, Overtime.end_time, Overtime.status
+        ).filter(
+            Overtime.employee_id.in_(members),
+            Overtime.status.in_(ACTIVE_STATUSES),
+            Overtime.start_time >= month_start,
+            Overtime.start_time < next_month
+        )
+        for employee_id, start, end, status in overtimes:
+            add_span(employee_id, 'overtime', start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'), status)
+
+        # 缺勤、迟到：按日期和状态分组统计
+        attendance_counts = db.session.query(Attendance.date, Attendance.status, func.count(Attendance.id)).filter(
+            Attendance.employee_id.in_(members),
+            Attendance.status.in_(('absent', 'late')),
+            Attendance.date.between(first, last)
+        ).group_by(Attendance.date, Attendance.status)
+        for day, status, count in attendance_counts:
+            days[day][status] = count
+        absences = db.session.query(Attendance.employee_id, Attendance.date).filter(
+            Attendance.employee_id.in_(members),
+            Attendance.status == 'absent',
+            Attendance.date.between(first, last)
+        )
+        for employee_id, day in absences:
+            add_span(employee_id, 'absent', day.isoformat(), day.isoformat(), 'absent')
+
+        for day, employee_ids in out_by_day.items():
+            days[day]['out'] = len(employee_ids)
+
+        employees = {}
+        if spans:
+            for id, name, employee_department_id in db.session.query(
+                Employee.id, Employee.name, Employee.department_id
+            ).filter(Employee.id.in_(list(spans))):
+                employees[id] = {
+                    'employee_id': id,
+                    'name': name,
+                    'department_id': employee_department_id,
+                    'spans': sorted(spans[id], key=lambda span: span['start'])
+                }
+
+        return {'department_ids': department_ids, 'headcount': headcount, 'days': days, 'employees': employees}
+
+    @staticmethod
+    def _as_date(value) -> date:
+        """func.date 在不同数据库下返回 date 或字符串"""
+        if isinstance(value, str):
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        return value.date() if isinstance(value, datetime) else value
+
+    @staticmethod
+    def _spread(days: Dict[date, dict], out_by_day: Dict[date, set], kind: str, employee_id: int,
+                start: date, end: date) -> None:
+        """把区间逐天计入对应类型的人数和不在岗人数"""
+        day = start
+        while day <= end:
+            if employee_id not in out_by_day[day]:
+                out_by_day[day].add(employee_id)
+                days[day][kind] += 1
+            day += timedelta(days=1)
+
+    # ---------- 对外查询 ----------
+
+    @staticmethod
+    def get_calendar(department_id: int, start_date: date, end_date: date) -> dict:
+        """
+        获取部门子树在日期范围内的日历
+
+        参数：
+            department_id: 部门ID（包含所有下级部门）
+            start_date: 开始日期
+            end_date: 结束日期（最多跨越 MAX_CALENDAR_MONTHS 个月）
+
+        返回：
+            包含 headcount、每天人数 days、员工区间 employees 的字典
+        """
+        if start_date > end_date:
+            raise ValueError('开始日期不能晚于结束日期')
+        months = sorted(_months_of([start_date, end_date]))
+        if len(months) > MAX_CALENDAR_MONTHS:
+            raise ValueError(f'日期范围不能超过{MAX_CALENDAR_MONTHS}个月')
+
+        headcount = 0
+        days = []
+        employees = {}
+        for year, month in months:
+            data = TeamCalendarService.get_month(department_id, year, month)
+            headcount = data['headcount']
+            days.extend(
+                dict(counts, date=day.isoformat())
+                for day, counts in sorted(data['days'].items())
+                if start_date <= day <= end_date
+            )
+            for employee_id, employee in data['employees'].items():
+                merged = employees.setdefault(employee_id, dict(employee, spans=[]))
+                for span in employee['spans']:
+                    # 跨月的区间在每个月都会出现，只保留一次
+                    if span['start'][:10] <= end_date.isoformat() and span['end'][:10] >= start_date.isoformat() \
+                            and span not in merged['spans']:
+                        merged['spans'].append(span)
+
+        return {
+            'department_id': department_id,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'headcount': headcount,
+            'days': days,
+            'employees': [employee for employee in employees.values() if employee['spans']]
+        }
@@ -0,0 +1,231 @@
+"""
+分片上传服务模块
+提供断点续传的上传协议：创建会话 -> 按偏移量写入分片 -> 校验并完成
+分片直接写入磁盘临时文件，完成时按内容哈希去重
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import current_app
+from app import db
+from app.models.employee import Employee, ContractAttachment
+from app.models.upload_session import UploadSession
+from app.services.media_service import MediaService, CHUNK_SIZE, IMAGE_MIME_TYPES
+from app.services.contract_preview_service import ContractPreviewService
+
+CONTRACT_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+UPLOAD_TYPES = {
+    'contract': CONTRACT_MIME_TYPES,
+    'photo': IMAGE_MIME_TYPES
+}
+
+class UploadService:
+    @staticmethod
+    def part_path(upload_id: str) -> str:
+        """分片临时文件路径，与媒体目录位于同一文件系统以便完成时直接移动"""
+        return os.path.join(MediaService.media_folder(), '.partial', f'{upload_id}.part')
+
+    @staticmethod
+    def get_session(upload_id: str) -> UploadSession:
+        """获取上传会话"""
+        session = UploadSession.query.get(upload_id)
+        if not session:
+            raise ValueError('上传会话不存在')
+        return session
+
+    @staticmethod
+    def create_session(data: dict) -> UploadSession:
+        """
+        创建上传会话
+
+        参数：
+            data: 包含 upload_type、employee_id、file_name、total_size，可选 checksum
+
+        返回：
+            新建的上传会话
+        """
+        upload_type = data.get('upload_type')
+        if upload_type not in UPLOAD_TYPES:
+            raise ValueError('不支持的上传类型')
+
+        file_name = (data.get('file_name') or '').strip()
+        ext = file_name.rsplit('.', 1)[1].lower() if '.' in file_name else ''
+        if ext not in UPLOAD_TYPES[upload_type]:
+            raise ValueError('不支持的文件类型')
+
+        try:
+            total_size = int(data.get('total_size'))
+        except (TypeError, ValueError):
+            raise ValueError('文件大小无效')
+        if total_size <= 0 or total_size > current_app.config['CHUNKED_UPLOAD_MAX_SIZE']:
+            raise ValueError('文件大小超过限制')
+
+        employee_id = data.get('employee_id')
+        if not employee_id or not Employee.query.get(employee_id):
+            raise ValueError('员工不存在')
+
+        checksum = (data.get('checksum') or '').lower() or None
+
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            upload_type=upload_type,
+            employee_id=employee_id,
+            file_name=file_name,
+            total_size=total_size,
+            received_size=0,
+            checksum=checksum,
+            status='uploading'
+        )
+        part_path = UploadService.part_path(session.id)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        open(part_path, 'wb').close()
+
+        db.session.add(session)
+        db.session.commit()
+        return session
+
+    @staticmethod
+    def write_chunk(upload_id: str, offset: int, stream) -> UploadSession:
+        """
+        将分片写入临时文件
+
+        只允许从已接收的位置（或之前的位置，用于重传）继续写入，不允许留下空洞。
+        请求体按块读取后直接写盘，不在内存中缓存整个分片。
+
+        参数：
+            upload_id: 上传会话ID
+            offset: 分片在文件中的起始偏移量
+            stream: 请求体输入流
+
+        返回：
+            更新后的上传会话
+        """
+        session = UploadService.get_session(upload_id)
+        if session.status != 'uploading':
+            raise ValueError('上传会话已结束')
+        if offset < 0 or offset > session.received_size:
+            raise ValueError(f'偏移量无效，应从 {session.received_size} 继续上传')
+
+        position = offset
+        with open(UploadService.part_path(upload_id), 'r+b') as f:
+            f.seek(offset)
+            chunk = stream.read(CHUNK_SIZE)
+            while chunk:
+                position += len(chunk)
+                if position > session.total_size:
+                    raise ValueError('上传数据超过声明的文件大小')
+                f.write(chunk)
+                chunk = stream.read(CHUNK_SIZE)
+
+        session.received_size = max(session.received_size, position)
+        db.session.commit()
+        return session
+
+    @staticmethod
+    def finalize(upload_id: str, checksum: Optional[str] = None) -> dict:
+        """
+        校验文件并完成上传
+
+        计算整个文件的 SHA-256 与客户端校验值比对，按哈希去重存储；
+        合同附件/员工照片信息与会话状态在同一事务中提交。
+
+        返回：
+            包含上传会话及生成记录的字典
+        """
+        session = UploadService.get_session(upload_id)
+        if session.status == 'completed':
+            raise ValueError('上传已完成')
+        if session.status != 'uploading':
+            raise ValueError('上传会话已结束')
+        if session.received_size != session.total_size:
+            raise ValueError(f'文件未上传完整: {session.received_size}/{session.total_size}')
+
+        part_path = UploadService.part_path(upload_id)
+        content_hash = MediaService.file_sha256(part_path)
+        expected = (checksum or session.checksum or '').lower()
+        if expected and expected != content_hash:
+            raise ValueError('文件校验失败，请重新上传')
+
+        ext = session.file_name.rsplit('.', 1)[1].lower()
+        mime_type = UPLOAD_TYPES[session.upload_type][ext]
+        if ext == 'jpeg':
+            ext = 'jpg'
+
+        try:
+            media = MediaService.store_file(part_path, content_hash, session.total_size, ext, mime_type)
+            result = {}
+
+            if session.upload_type == 'contract':
+                contract = ContractAttachment(
+                    employee_id=session.employee_id,
+                    file_name=session.file_name,
+                    file_url=media.url,
+                    file_type=ext,
+                    content_hash=content_hash,
+                    file_size=session.total_size,
+                    upload_time=datetime.now()
+                )
+                db.session.add(contract)
+                db.session.flush()
+                session.result_id = contract.id
+                result['contract'] = contract.to_dict()
+            else:
+                employee = Employee.query.get(session.employee_id)
+                employee.photo_url = media.url
+                employee.photo_hash = content_hash
+                session.result_id = employee.id
+                result['photo_url'] = media.url
+
+            session.checksum = content_hash
+            session.status = 'completed'
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if session.upload_type == 'contract':
+            # 后台生成预览图
+            ContractPreviewService.schedule(contract)
+
+        result['upload'] = session.to_dict()
+        return result
+
+    @staticmethod
+    def abort(upload_id: str) -> None:
+        """取消上传并删除临时文件"""
+        session = UploadService.get_session(upload_id)
+        if session.status == 'completed':
+            raise ValueError('上传已完成，无法取消')
+        part_path = UploadService.part_path(upload_id)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        session.status = 'aborted'
+        db.session.commit()
+
+    @staticmethod
+    def cleanup_expired(max_age_hours: int = 24) -> int:
+        """
+        清理超时未完成的上传会话
+
+        返回：
+            清理的会话数量
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        sessions = UploadSession.query.filter(
+            UploadSession.status == 'uploading',
+            UploadSession.updated_at < cutoff
+        ).all()
+        for session in sessions:
+            part_path = UploadService.part_path(session.id)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            session.status = 'aborted'
+        db.session.commit()
+        return len(sessions)
@@ -1,17 +1,15 @@
 from functools import wraps
 from flask import jsonify, request
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.models import User
+from app.services.identity_service import IdentityService
 
 def admin_required():
     """管理员权限装饰器"""
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or user.role != 'admin':
+            principal = IdentityService.current()
+            if not principal or not principal.is_admin:
                 return jsonify({"msg": "需要管理员权限"}), 403
             return fn(*args, **kwargs)
         return decorator
@@ -22,10 +20,8 @@ def manager_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or user.role not in ['admin', 'manager']:
+            principal = IdentityService.current()
+            if not principal or not principal.is_manager:
                 return jsonify({"msg": "需要管理者权限"}), 403
             return fn(*args, **kwargs)
         return decorator
@@ -35,23 +31,30 @@ def login_required(fn):
     """用户登录装饰器"""
     @wraps(fn)
     def decorator(*args, **kwargs):
-        verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user:
+        if not IdentityService.current():
             return jsonify({"msg": "需要登录"}), 401
         return fn(*args, **kwargs)
     return decorator
 
+def get_current_principal():
+    """获取当前登录用户的身份信息（角色、员工ID），读取身份缓存
+
+    Returns:
+        Principal: 当前用户身份，如果未登录则返回None
+    """
+    try:
+        return IdentityService.current()
+    except:
+        return None
+
 def get_current_user():
     """获取当前登录用户
-    
+
     Returns:
         User: 当前登录的用户对象，如果未登录则返回None
     """
     try:
-        verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        return User.query.get(user_id)
+        principal = IdentityService.current()
+        return User.query.get(principal.id) if principal else None
     except:
         return None
@@ -0,0 +1,19 @@
+"""
+批量 INSERT 语句的辅助函数
+多行 INSERT 和 INSERT ... SELECT 不经过会话对象，MySQL 也不能通过 RETURNING 返回新记录的ID：
+插入前在同一事务中锁定并读取表中最大的ID，插入后按 ID 大于该值（加上本批次的条件）读回新记录。
+"""
+
+from sqlalchemy import select
+from app import db
+
+def last_id(table) -> int:
+    """
+    锁定并读取表中最大的ID（空表返回 0）
+
+    MySQL 可重复读隔离级别下同时锁住最后一条记录之后的间隙，其他事务的插入等待本事务结束，
+    读回时不会混入其他事务同时插入的记录。
+    """
+    return db.session.execute(
+        select(table.c.id).order_by(table.c.id.desc()).limit(1).with_for_update()
+    ).scalar() or 0
@@ -0,0 +1,92 @@
+"""
+响应压缩
+按请求的 Accept-Encoding 协商 br（需安装 brotli）或 gzip：
+    - 只压缩 COMPRESS_MIMETYPES 中的类型，普通响应体不小于 COMPRESS_MIN_SIZE 字节时才压缩
+    - 流式响应（如 stream_json）逐块增量压缩，每块立即刷新，客户端可以边收边解析
+    - 文件下载（direct_passthrough）、部分内容和已指定编码的响应不处理
+压缩后的 ETag 改为弱 ETag（内容相同、编码不同）。
+"""
+
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+def _encoded(chunks):
+    """逐块转为字节串，结束或中断时关闭原响应迭代器（释放 stream_with_context 的请求上下文）"""
+    try:
+        for chunk in chunks:
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def _gzip_stream(chunks, level: int):
+    # wbits=31：输出 gzip 格式
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in _encoded(chunks):
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _brotli_stream(chunks, quality: int):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in _encoded(chunks):
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+class Compression:
+    @staticmethod
+    def init_app(app) -> None:
+        """注册响应压缩"""
+        app.after_request(Compression._after_request)
+
+    @staticmethod
+    def encodings() -> list:
+        """服务端支持的编码，按优先级排列"""
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    @staticmethod
+    def compress(body: bytes, encoding: str) -> bytes:
+        config = current_app.config
+        if encoding == 'br':
+            return brotli.compress(body, quality=config['COMPRESS_BROTLI_QUALITY'])
+        return gzip.compress(body, compresslevel=config['COMPRESS_LEVEL'])
+
+    @staticmethod
+    def _after_request(response):
+        config = current_app.config
+        if (not config['COMPRESS_ENABLED'] or response.mimetype not in config['COMPRESS_MIMETYPES']
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 206, 304)):
+            return response
+
+        # 是否压缩取决于请求头，缓存需要区分
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(Compression.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            chunks = response.response
+            response.response = (_brotli_stream(chunks, config['COMPRESS_BROTLI_QUALITY']) if encoding == 'br'
+                                  else _gzip_stream(chunks, config['COMPRESS_LEVEL']))
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(Compression.compress(body, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,95 @@
+"""
+列表接口的流式导出（?format=ndjson|csv）
+    - 用 yield_per 分批读取查询结果（MySQL 使用服务端游标），逐行序列化，内存占用与结果总数无关
+    - 第一行立即发送，之后每累计约 STREAM_CHUNK_SIZE 字节发送一块
+    - ndjson：每行一个 JSON 对象；csv：UTF-8 带 BOM（Excel 可直接打开），列取自第一行的字段，
+      嵌套的对象和列表写为 JSON 文本，以 = + - @ 等开头的文本前加单引号，防止被表格软件当作公式执行
+导出中途出错时连接直接中断，客户端会收到不完整的分块响应。
+"""
+
+import codecs
+import csv
+import io
+from datetime import datetime
+from typing import Any, Callable, Optional
+from flask import Response, current_app, request, stream_with_context
+from app.utils.json_provider import STREAM_CHUNK_SIZE, json_bytes
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+def export_format() -> Optional[str]:
+    """请求的导出格式，未指定或不支持时返回 None（按原 JSON 格式返回）"""
+    value = (request.args.get('format') or '').lower()
+    return value if value in EXPORT_FORMATS else None
+
+# 表格软件会当作公式解析的起始字符
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        value = json_bytes(value).decode()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _ndjson_writer():
+    return lambda row: json_bytes(row) + b'\n'
+
+def _csv_writer():
+    output = io.StringIO()
+    writer = csv.writer(output)
+    columns = []
+
+    def write(row: dict) -> bytes:
+        if not columns:
+            columns.extend(row)
+            writer.writerow([_csv_cell(column) for column in columns])
+        writer.writerow([_csv_cell(row.get(column)) for column in columns])
+        data = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return data.encode()
+
+    return write
+
+def stream_rows(query, serialize: Callable[[Any], dict], fmt: str, name: str) -> Response:
+    """
+    以 ndjson 或 csv 流式输出查询结果
+
+    参数：
+        query: ORM 查询（需要的关联对象应通过 joinedload 预加载）
+        serialize: 把一条记录转换为字典的函数
+        fmt: export_format() 返回的格式
+        name: 下载文件名前缀
+
+    返回：
+        分块响应，在请求上下文中执行
+    """
+    write = _csv_writer() if fmt == 'csv' else _ndjson_writer()
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def generate():
+        buffer = [codecs.BOM_UTF8] if fmt == 'csv' else []
+        size = 0
+        first = True
+        for record in query.yield_per(batch_size):
+            chunk = write(serialize(record))
+            buffer.append(chunk)
+            size += len(chunk)
+            if first or size >= STREAM_CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer.clear()
+                size = 0
+                first = False
+        if buffer:
+            yield b''.join(buffer)
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
+    filename = f'{name}_{datetime.now().strftime("%Y%m%d%H%M%S")}.{fmt}'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    # 反向代理（nginx）不缓冲，客户端立即收到数据
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,111 @@
+"""
+参考数据接口的条件响应缓存
+    - 每张表维护一个版本号，本进程提交该表的变更后加一
+    - 接口声明依赖的表，按（接口, 查询参数）缓存序列化后的 JSON 响应体和强 ETag（响应体的 SHA-1）
+    - 依赖表的版本号未变且缓存未过期时直接返回缓存的响应体；请求带 If-None-Match 且匹配时返回 304
+    - ETag 由内容计算，不同进程的相同数据得到相同的 ETag；其他进程的变更在 HTTP_CACHE_TTL 秒内生效
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import Response, current_app, request
+from app.services.change_capture_service import ChangeCaptureService
+
+class ResponseCache:
+    """表版本号和响应缓存（每个应用一个）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.versions = {}
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def version(self, tables) -> tuple:
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+    def bump(self, tables) -> None:
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version or entry[1] <= time.monotonic():
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, ttl: int, etag: str, body: bytes) -> None:
+        with self.lock:
+            self.entries[key] = (version, time.monotonic() + ttl, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    @staticmethod
+    def init_app(app) -> None:
+        """创建应用的响应缓存，订阅所有表的数据变更"""
+        app.extensions['response_cache'] = ResponseCache(app.config['HTTP_CACHE_MAX_ENTRIES'])
+        ChangeCaptureService.subscribe(ResponseCache._on_change, sync=True)
+
+    @staticmethod
+    def current() -> 'ResponseCache':
+        return current_app.extensions['response_cache']
+
+    @staticmethod
+    def invalidate(*tables) -> None:
+        """使依赖指定表的缓存失效"""
+        ResponseCache.current().bump(tables)
+
+    @staticmethod
+    def _on_change(changes) -> None:
+        ResponseCache.current().bump({change.table for change in changes})
+
+def _respond(etag: str, body: bytes) -> Response:
+    # 弱比较：压缩后的响应带弱 ETag
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # 浏览器每次都带 If-None-Match 重新验证
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def cached_response(*tables, daily: bool = False):
+    """
+    参考数据 GET 接口的条件响应装饰器（放在权限装饰器之后）
+
+    参数：
+        tables: 响应内容依赖的表名，任一表变更后缓存失效
+        daily: 响应随当天日期变化（如按当前日期筛选生效规则）
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET' or not current_app.config['HTTP_CACHE_ENABLED']:
+                return fn(*args, **kwargs)
+
+            cache = ResponseCache.current()
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))),
+                   date.today() if daily else None)
+            version = cache.version(tables)
+            entry = cache.get(key, version)
+            if entry is not None:
+                return _respond(entry[2], entry[3])
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            # 只缓存成功的 JSON 响应（部分接口出错时 HTTP 状态仍为 200，以 code 区分）
+            if response.status_code != 200 or not response.is_json or (response.get_json() or {}).get('code') != 200:
+                return response
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            cache.put(key, version, current_app.config['HTTP_CACHE_TTL'], etag, body)
+            return _respond(etag, body)
+        return decorated
+    return wrapper
@@ -0,0 +1,91 @@
+"""
+区间索引工具
+IntervalIndex 是一个静态区间索引：区间按开始时间排序后存放在数组中，
+数组本身视为隐式平衡二叉树（区间 [lo, hi) 的根为中点），每个节点记录其子树的最大结束时间。
+查询与 [start, end) 重叠的区间时，跳过最大结束时间不超过 start 的子树和开始时间不早于 end 的右子树，
+耗时与命中数量相关，而不是与索引中的区间总数相关。
+
+range_condition 生成数据库查询用的区间过滤条件（重叠 / 包含）。
+"""
+
+from typing import Any, Generic, Iterable, List, Tuple, TypeVar
+from sqlalchemy import and_
+
+T = TypeVar('T')
+
+# 区间过滤方式：overlap-与查询范围有重叠，within-完全落在查询范围内
+RANGE_MODES = ('overlap', 'within')
+
+class IntervalIndex(Generic[T]):
+    """静态区间索引（半开区间 [start, end)）"""
+
+    __slots__ = ('_starts', '_ends', '_values', '_max_end')
+
+    def __init__(self, items: Iterable[Tuple[Any, Any, T]]):
+        ordered = sorted(items, key=lambda item: item[0])
+        self._starts = [item[0] for item in ordered]
+        self._ends = [item[1] for item in ordered]
+        self._values = [item[2] for item in ordered]
+        self._max_end = list(self._ends)
+        if ordered:
+            self._build(0, len(ordered))
+
+    def _build(self, lo: int, hi: int):
+        """自底向上计算每个节点子树的最大结束时间，返回 [lo, hi) 的最大结束时间"""
+        mid = (lo + hi) // 2
+        result = self._ends[mid]
+        if lo < mid:
+            result = max(result, self._build(lo, mid))
+        if mid + 1 < hi:
+            result = max(result, self._build(mid + 1, hi))
+        self._max_end[mid] = result
+        return result
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def overlapping(self, start, end) -> List[T]:
+        """返回与 [start, end) 重叠的所有区间的值，按开始时间排序"""
+        result = []
+        self._visit(0, len(self._values), start, end, result)
+        return result
+
+    def _visit(self, lo: int, hi: int, start, end, result: list) -> None:
+        # 左子树递归、右子树循环，递归深度为 O(log n)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._max_end[mid] <= start:
+                return
+            self._visit(lo, mid, start, end, result)
+            if self._starts[mid] >= end:
+                return
+            if self._ends[mid] > start:
+                result.append(self._values[mid])
+            lo = mid + 1
+
+def range_condition(start_column, end_column, start=None, end=None, mode: str = 'overlap'):
+    """
+    生成区间过滤条件
+
+    参数：
+        start_column, end_column: 记录的开始/结束列
+        start, end: 查询范围（可只给一端）
+        mode: overlap-与查询范围有重叠（包括跨越整个范围的记录），within-完全落在查询范围内
+
+    返回：
+        SQLAlchemy 条件表达式，没有任何范围时返回 None
+    """
+    if mode not in RANGE_MODES:
+        raise ValueError(f'无效的范围过滤方式: {mode}')
+    conditions = []
+    if mode == 'overlap':
+        if end is not None:
+            conditions.append(start_column <= end)
+        if start is not None:
+            conditions.append(end_column >= start)
+    else:
+        if start is not None:
+            conditions.append(start_column >= start)
+        if end is not None:
+            conditions.append(end_column <= end)
+    return and_(*conditions) if conditions else None
@@ -0,0 +1,126 @@
+"""
+JSON 序列化
+    - OrjsonProvider：基于 orjson 的 Flask JSONProvider，jsonify 和 request.get_json 都经过它；
+      输出 UTF-8（不转义中文），键排序、日期、Decimal 的输出与 Flask 默认实现一致
+    - stream_json：把大列表按批序列化为分块响应，不在内存中拼接整个响应体
+未安装 orjson 或 JSON_FAST_ENCODER 关闭时使用 Flask 默认实现。
+"""
+
+from typing import Any, Callable, Iterable
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 流式输出时每批的大致字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+class OrjsonProvider(DefaultJSONProvider):
+    """基于 orjson 的 JSONProvider（orjson 不支持的输入回退到标准库）"""
+
+    @staticmethod
+    def init_app(app) -> None:
+        """JSON_FAST_ENCODER 开启且已安装 orjson 时替换应用的 JSON 实现"""
+        if app.config['JSON_FAST_ENCODER'] and orjson is not None:
+            app.json = OrjsonProvider(app)
+
+    def _options(self, indent: bool = False) -> int:
+        # 日期交给 default 处理，保持与默认实现相同的 HTTP 日期格式
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumpb(self, obj: Any, indent: bool = False) -> bytes:
+        """序列化为 UTF-8 字节串"""
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except TypeError:
+            # 超出 64 位的整数、非字符串键排序等 orjson 不支持的情况
+            if indent:
+                return super().dumps(obj, ensure_ascii=False, indent=2).encode()
+            return super().dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumpb(obj).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumpb(obj, indent) + b'\n', mimetype=self.mimetype)
+
+def json_bytes(obj: Any) -> bytes:
+    """用当前应用的 JSON 实现序列化为紧凑的 UTF-8 字节串"""
+    provider = current_app.json
+    if isinstance(provider, OrjsonProvider):
+        return provider.dumpb(obj)
+    return provider.dumps(obj, separators=(',', ':')).encode()
+
+class StreamedArray:
+    """stream_json 中按批输出的数组"""
+
+    def __init__(self, items: Iterable, serialize: Callable[[Any], Any] = None):
+        self.items = items
+        self.serialize = serialize
+
+class Deferred:
+    """stream_json 中在此前的数组输出完之后才计算的值（如遍历时累计的统计数据）"""
+
+    def __init__(self, compute: Callable[[], Any]):
+        self.compute = compute
+
+def _stream(value, buffer: list):
+    """按键的插入顺序输出，缓冲区达到 STREAM_CHUNK_SIZE 时产出一块"""
+    if isinstance(value, dict) and any(isinstance(item, (dict, StreamedArray, Deferred)) for item in value.values()):
+        buffer.append(b'{')
+        for index, (key, item) in enumerate(value.items()):
+            buffer.append((b',' if index else b'') + json_bytes(str(key)) + b':')
+            yield from _stream(item, buffer)
+        buffer.append(b'}')
+    elif isinstance(value, StreamedArray):
+        buffer.append(b'[')
+        size = 0
+        for index, item in enumerate(value.items):
+            chunk = json_bytes(value.serialize(item) if value.serialize else item)
+            buffer.append(b',' + chunk if index else chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer.clear()
+                size = 0
+        buffer.append(b']')
+    elif isinstance(value, Deferred):
+        buffer.append(json_bytes(value.compute()))
+    else:
+        buffer.append(json_bytes(value))
+
+def stream_json(payload: dict) -> Response:
+    """
+    分块输出 JSON 响应
+
+    参数：
+        payload: 响应对象，其中的 StreamedArray 逐批序列化输出，Deferred 在之前的内容输出后计算；
+                 包含这两者的对象按键的插入顺序输出，其他值整体序列化
+
+    返回：
+        application/json 的流式响应（在请求上下文中执行，可继续使用数据库会话）
+    """
+    def generate():
+        buffer = []
+        yield from _stream(payload, buffer)
+        buffer.append(b'\n')
+        yield b''.join(buffer)
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
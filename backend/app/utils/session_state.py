@@ -0,0 +1,66 @@
+"""
+会话中按事务收集的数据（session.info 中的键，如审计记录、变更事件、待重算标记）
+    - 释放保存点时 after_commit 也会触发：pop_committed 只在外层事务提交后取出数据
+    - 回滚保存点时撤销该保存点内收集的部分（列表截断到保存点开始时的长度，集合/字典恢复为当时的副本）
+    - 回滚外层事务时丢弃全部收集的数据
+"""
+
+import copy
+from sqlalchemy import event
+from app import db
+
+# 已登记的键
+_keys = set()
+
+# 保存点开始时各键的状态：[(保存点事务, {键: 列表长度或副本})]
+SAVEPOINTS_KEY = 'savepoint_marks'
+
+def _mark(value):
+    return len(value) if isinstance(value, list) else copy.copy(value)
+
+def track(*keys: str) -> None:
+    """登记按事务收集的键，首次调用时注册会话事件监听"""
+    _keys.update(keys)
+    if not event.contains(db.session, 'after_transaction_create', _after_transaction_create):
+        event.listen(db.session, 'after_transaction_create', _after_transaction_create)
+        event.listen(db.session, 'after_transaction_end', _after_transaction_end)
+        event.listen(db.session, 'after_soft_rollback', _after_rollback)
+
+def pop_committed(session, key: str, default=None):
+    """在 after_commit 中取出外层事务提交的数据；释放保存点时返回 default，数据留给外层事务"""
+    if session.in_nested_transaction():
+        return default
+    return session.info.pop(key, default)
+
+def _after_transaction_create(session, transaction):
+    if not transaction.nested:
+        return
+    # 已释放或回滚的保存点不再需要
+    savepoints = [entry for entry in session.info.get(SAVEPOINTS_KEY, []) if entry[0].is_active]
+    marks = {key: _mark(session.info[key]) for key in _keys if key in session.info}
+    savepoints.append((transaction, marks))
+    session.info[SAVEPOINTS_KEY] = savepoints
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(SAVEPOINTS_KEY, None)
+
+def _after_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        for key in _keys:
+            session.info.pop(key, None)
+        return
+    savepoints = session.info.get(SAVEPOINTS_KEY, [])
+    for index, (transaction, marks) in enumerate(savepoints):
+        if transaction is previous_transaction:
+            break
+    else:
+        return
+    del savepoints[index:]
+    for key in _keys:
+        if key not in marks:
+            session.info.pop(key, None)
+        elif isinstance(session.info.get(key), list):
+            del session.info[key][marks[key]:]
+        else:
+            session.info[key] = marks[key]
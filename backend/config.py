@@ -12,6 +12,76 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'dev-jwt-secret'
     JWT_ACCESS_TOKEN_EXPIRES = 24 * 60 * 60  # 24 hours
     
+    # 薪资配置：按日工资扣款的无薪假类型（Leave.leave_type / HolidayType.code）
+    PAYROLL_UNPAID_LEAVE_TYPES = ['personal']
+    # 工资结构/分配/加班/请假/无薪假期申请/缺勤变更后自动重算待发放工资记录，多次变更在防抖时间内合并处理
+    PAYROLL_RECALC_AUTO = True
+    PAYROLL_RECALC_DEBOUNCE = 30  # 秒
+    # 个税累计预扣：每月减除费用（起征点）
+    TAX_MONTHLY_EXEMPTION = 5000
+    # 薪资模拟：员工、结构分配、考勤汇总快照的缓存时间
+    PAYROLL_SIMULATION_CACHE_TTL = 300  # 秒
+    # 请假时长计算：工作日历（法定节假日/调休）缓存时间，节假日变更时主动失效
+    WORK_CALENDAR_CACHE_TTL = 3600  # 秒
+    # 不在岗查询：请假/假期申请内存区间索引的缓存时间（本进程的变更提交后立即失效）
+    ABSENCE_INDEX_CACHE_TTL = 60  # 秒
+    # 内存区间索引只包含今天前后各这么多天内的区间，超出范围的查询直接查数据库
+    ABSENCE_INDEX_WINDOW_DAYS = 180
+    # 团队考勤日历：按（部门, 月份）缓存的时间（本进程的变更提交后清除对应月份）
+    TEAM_CALENDAR_CACHE_TTL = 300  # 秒
+    # 打卡地理围栏：启用的打卡地点网格索引缓存时间（本进程的地点变更提交后立即重建）
+    GEOFENCE_CACHE_TTL = 300  # 秒
+    # 组织统计：部门/职位/状态/类型/学历分布的缓存时间，0 表示不缓存（本进程的变更提交后立即失效）
+    ORG_STATS_CACHE_TTL = 60  # 秒
+    
+    # 身份缓存配置（JWT 用户ID -> 角色/员工ID，修改密码等操作会主动失效）
+    IDENTITY_CACHE_TTL = 60  # 秒
+    IDENTITY_CACHE_SIZE = 4096
+    
+    # 密码哈希配置：算法和代价（werkzeug 格式），修改后用户下次登录时自动重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # 密码校验线程池：同时计算的哈希数量和排队上限，超出时登录返回“请稍后重试”
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get('PASSWORD_VERIFY_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+    PASSWORD_VERIFY_QUEUE = 64
+    PASSWORD_VERIFY_TIMEOUT = 10  # 秒
+    
+    # 数据变更捕获：提交时写入 change_events 并通知订阅者（各内存缓存的失效），高频写入的内部表不写入；
+    # 关闭时只停止写入 change_events，缓存仍会失效
+    CDC_ENABLED = True
+    CDC_EXCLUDED_TABLES = ['upload_sessions', 'payroll_recalc_marks']
+    
+    # 审计日志：记录这些表的字段变更，先缓冲在内存中，按批次或时间间隔写入 audit_logs
+    AUDIT_ENABLED = True
+    AUDIT_TABLES = [
+        'employees', 'departments', 'positions', 'users',
+        'salary_structures', 'salary_structure_assignments', 'salary_records',
+        'attendance_rules', 'holiday_types', 'holiday_balances'
+    ]
+    # 不记录的字段（敏感信息和自动维护的时间戳）
+    AUDIT_EXCLUDED_COLUMNS = ['password', 'reset_code', 'reset_code_expires', 'created_at', 'updated_at']
+    AUDIT_BATCH_SIZE = 500
+    AUDIT_FLUSH_INTERVAL = 5  # 秒
+    # 缓冲区上限（数据库持续不可用时丢弃最早的记录，避免内存无限增长）
+    AUDIT_BUFFER_MAX_ROWS = 100000
+    
+    # 参考数据接口的条件响应缓存（ETag/304），其他进程的变更在 HTTP_CACHE_TTL 秒内生效
+    HTTP_CACHE_ENABLED = True
+    HTTP_CACHE_TTL = 60  # 秒
+    HTTP_CACHE_MAX_ENTRIES = 256
+    
+    # JSON 序列化使用 orjson（未安装时使用 Flask 默认实现）
+    JSON_FAST_ENCODER = True
+    # 响应压缩：按 Accept-Encoding 协商 br（需安装 brotli）或 gzip
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 1024  # 字节，小于该值的响应不压缩
+    COMPRESS_LEVEL = 6  # gzip 压缩级别
+    COMPRESS_BROTLI_QUALITY = 5
+    COMPRESS_MIMETYPES = ['application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+                          'text/html', 'text/css', 'application/javascript']
+    
+    # 列表接口流式导出（?format=ndjson|csv）每批读取的记录数
+    EXPORT_BATCH_SIZE = 1000
+    
     # 文件上传配置
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
@@ -19,6 +89,26 @@ class Config:
     CONTRACTS_FOLDER = os.path.join(UPLOAD_FOLDER, 'contracts')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max-limit
     
+    # 媒体文件配置（按内容哈希存储，上传时生成缩略图）
+    MEDIA_FOLDER = os.path.join(UPLOAD_FOLDER, 'media')
+    MEDIA_THUMBNAIL_SIZES = {
+        'avatar': 64,    # 头像
+        'list': 160,     # 列表页
+        'detail': 480    # 详情页
+    }
+    # 分片上传配置（每个分片受 MAX_CONTENT_LENGTH 限制，整个文件受 CHUNKED_UPLOAD_MAX_SIZE 限制）
+    CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB
+    CHUNKED_UPLOAD_MAX_SIZE = 200 * 1024 * 1024  # 200MB
+    # 合同预览配置（后台渲染 PDF 页面图片，磁盘缓存按 LRU 淘汰）
+    CONTRACT_PREVIEW_FOLDER = os.path.join(UPLOAD_FOLDER, 'previews')
+    CONTRACT_PREVIEW_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+    CONTRACT_PREVIEW_PAGE_WIDTH = 1024
+    CONTRACT_PREVIEW_THUMBNAIL_WIDTH = 200
+    CONTRACT_PREVIEW_MAX_PAGES = 50
+    CONTRACT_PREVIEW_WORKERS = 1
+    # 由前置 Web 服务器(nginx/apache)发送文件时开启
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    
     # CORS配置
     CORS_ORIGINS = ['http://localhost:3000']
     CORS_ALLOW_CREDENTIALS = True
@@ -47,6 +137,13 @@ class TestingConfig(Config):
     TESTING = True
     # 数据库配置
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # 测试中手动调用 PayrollRecalcService.process_pending
+    PAYROLL_RECALC_AUTO = False
+    # 降低密码哈希代价以加快测试
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    # 内存数据库的所有会话共用一个连接，审计日志只在查询时写入
+    AUDIT_BATCH_SIZE = 1000000
+    AUDIT_FLUSH_INTERVAL = 3600
 
 class ProductionConfig(Config):
     DEBUG = False
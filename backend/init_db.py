@@ -13,6 +13,7 @@ if current_dir not in sys.path:
 
 from app import create_app, db
 from app.models import User, Department, Position, Employee, SalaryStructure, SalaryStructureAssignment
+from app.utils.init_data import init_default_attendance_rule
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -409,6 +410,10 @@ def init_db():
             create_salary_structures()
             print("工资结构创建成功")
             
+            # 创建默认考勤规则
+            init_default_attendance_rule()
+            print("默认考勤规则创建成功")
+            
             db.session.commit()
             print("数据库初始化完成")
             
@@ -0,0 +1,27 @@
+"""考勤记录增加打卡匹配的打卡地点ID
+
+Revision ID: add_attendance_location_id
+Revises: add_overtime_period_index
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_attendance_location_id'
+down_revision = 'add_overtime_period_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('attendances', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('location_id', sa.Integer(), nullable=True, comment='最近一次打卡匹配的打卡地点ID'))
+        batch_op.create_foreign_key('fk_attendance_location', 'attendance_locations', ['location_id'], ['id'])
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('attendances', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_attendance_location', type_='foreignkey')
+        batch_op.drop_column('location_id')
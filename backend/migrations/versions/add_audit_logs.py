@@ -0,0 +1,59 @@
+"""增加审计日志表(audit_logs)，MySQL 下按月分区
+
+Revision ID: add_audit_logs
+Revises: add_change_events
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_audit_logs'
+down_revision = 'add_change_events'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    if op.get_bind().dialect.name == 'mysql':
+        # 分区表的主键必须包含分区字段；初始只有 p_max 分区，由 flask audit-partitions 按月拆分
+        op.execute("""
+            CREATE TABLE audit_logs (
+                id BIGINT NOT NULL AUTO_INCREMENT,
+                partition_month INT NOT NULL COMMENT '分区月份(YYYYMM)',
+                entity VARCHAR(64) NOT NULL COMMENT '实体(表名)',
+                entity_id VARCHAR(64) NOT NULL COMMENT '实体主键',
+                action VARCHAR(10) NOT NULL COMMENT '操作(insert/update/delete)',
+                changes TEXT COMMENT '字段变更 JSON：{字段: [变更前, 变更后]}',
+                user_id INT COMMENT '操作用户ID',
+                created_at DATETIME NOT NULL COMMENT '变更时间',
+                PRIMARY KEY (id, partition_month),
+                KEY ix_audit_logs_entity (entity, entity_id, created_at),
+                KEY ix_audit_logs_created_at (created_at)
+            )
+            PARTITION BY RANGE (partition_month) (
+                PARTITION p_max VALUES LESS THAN MAXVALUE
+            )
+        """)
+        return
+
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('partition_month', sa.Integer(), nullable=False, comment='分区月份(YYYYMM)'),
+        sa.Column('entity', sa.String(length=64), nullable=False, comment='实体(表名)'),
+        sa.Column('entity_id', sa.String(length=64), nullable=False, comment='实体主键'),
+        sa.Column('action', sa.String(length=10), nullable=False, comment='操作(insert/update/delete)'),
+        sa.Column('changes', sa.Text(), nullable=True, comment='字段变更 JSON：{字段: [变更前, 变更后]}'),
+        sa.Column('user_id', sa.Integer(), nullable=True, comment='操作用户ID'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, comment='变更时间'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_logs_entity', ['entity', 'entity_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_audit_logs_created_at', ['created_at'], unique=False)
+
+def downgrade():
+    """降级数据库"""
+    op.drop_table('audit_logs')
@@ -0,0 +1,38 @@
+"""增加数据变更事件表(change_events)
+
+Revision ID: add_change_events
+Revises: add_attendance_location_id
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_events'
+down_revision = 'add_attendance_location_id'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table(
+        'change_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(length=64), nullable=False, comment='表名'),
+        sa.Column('pk', sa.String(length=64), nullable=False, comment='主键（复合主键以逗号分隔）'),
+        sa.Column('operation', sa.String(length=10), nullable=False, comment='操作(insert/update/delete)'),
+        sa.Column('changed_columns', sa.Text(), nullable=True, comment='修改的字段（逗号分隔，仅 update）'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='记录时间'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_events', schema=None) as batch_op:
+        batch_op.create_index('ix_change_events_table_name', ['table_name'], unique=False)
+        batch_op.create_index('ix_change_events_created_at', ['created_at'], unique=False)
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('change_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_events_created_at')
+        batch_op.drop_index('ix_change_events_table_name')
+    op.drop_table('change_events')
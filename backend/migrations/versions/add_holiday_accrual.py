@@ -0,0 +1,48 @@
+"""假期余额年度批量发放：余额增加结转天数和唯一约束，假期类型增加最大结转天数，新增发放记录表
+
+Revision ID: add_holiday_accrual
+Revises: add_leave_duration
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_holiday_accrual'
+down_revision = 'add_leave_duration'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('holiday_types', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('max_carry_over', sa.Float(), nullable=True, comment='可结转到下一年的最大天数（为空表示不结转）'))
+
+    with op.batch_alter_table('holiday_balances', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('carried_over_days', sa.Float(), nullable=False, server_default='0', comment='上一年结转天数（已计入总天数）'))
+        batch_op.create_unique_constraint('uq_holiday_balance_employee_type_year', ['employee_id', 'holiday_type_id', 'year'])
+
+    op.create_table('holiday_accrual_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False, comment='发放年份'),
+        sa.Column('created_count', sa.Integer(), nullable=False, comment='新生成的余额记录数'),
+        sa.Column('existing_count', sa.Integer(), nullable=False, comment='已存在而跳过的余额记录数'),
+        sa.Column('elapsed_ms', sa.Integer(), nullable=False, comment='耗时（毫秒）'),
+        sa.Column('rows_per_second', sa.Float(), nullable=False, comment='吞吐量（条/秒）'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_holiday_accrual_runs_year', 'holiday_accrual_runs', ['year'], unique=False)
+
+def downgrade():
+    """降级数据库"""
+    op.drop_index('ix_holiday_accrual_runs_year', table_name='holiday_accrual_runs')
+    op.drop_table('holiday_accrual_runs')
+
+    with op.batch_alter_table('holiday_balances', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_holiday_balance_employee_type_year', type_='unique')
+        batch_op.drop_column('carried_over_days')
+
+    with op.batch_alter_table('holiday_types', schema=None) as batch_op:
+        batch_op.drop_column('max_carry_over')
@@ -0,0 +1,34 @@
+"""添加假期申请扣减明细表，取消申请时按批准时实际扣减的天数退回余额
+
+Revision ID: add_holiday_request_charges
+Revises: add_holiday_request_periods
+Create Date: 2026-10-20 05:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_holiday_request_charges'
+down_revision = 'add_holiday_request_periods'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('holiday_request_charges',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('holiday_request_id', sa.Integer(), nullable=False, comment='假期申请ID'),
+        sa.Column('holiday_balance_id', sa.Integer(), nullable=False, comment='扣减的余额ID'),
+        sa.Column('days', sa.Float(), nullable=False, comment='扣减天数'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['holiday_request_id'], ['holiday_requests.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['holiday_balance_id'], ['holiday_balances.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_holiday_request_charges_holiday_request_id', 'holiday_request_charges', ['holiday_request_id'])
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_index('ix_holiday_request_charges_holiday_request_id', table_name='holiday_request_charges')
+    op.drop_table('holiday_request_charges')
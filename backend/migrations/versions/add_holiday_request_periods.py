@@ -0,0 +1,29 @@
+"""假期申请增加开始日、结束日的半天设置
+
+Revision ID: add_holiday_request_periods
+Revises: add_salary_adjustments
+Create Date: 2026-10-20 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_holiday_request_periods'
+down_revision = 'add_salary_adjustments'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('holiday_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('start_period', sa.String(10), nullable=False, server_default='full',
+                                      comment='开始日时段：full-全天，pm-下午开始'))
+        batch_op.add_column(sa.Column('end_period', sa.String(10), nullable=False, server_default='full',
+                                      comment='结束日时段：full-全天，am-上午结束'))
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('holiday_requests', schema=None) as batch_op:
+        batch_op.drop_column('end_period')
+        batch_op.drop_column('start_period')
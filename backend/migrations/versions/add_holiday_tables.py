@@ -0,0 +1,73 @@
+"""添加假期类型、假期申请和假期余额表
+
+Revision ID: add_holiday_tables
+Revises: add_upload_sessions
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_holiday_tables'
+down_revision = 'add_upload_sessions'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('holiday_types',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False, comment='假期类型名称'),
+        sa.Column('code', sa.String(length=20), nullable=False, comment='假期类型代码'),
+        sa.Column('annual_quota', sa.Float(), nullable=True, comment='年度配额（天）'),
+        sa.Column('min_duration', sa.Float(), nullable=True, comment='最小请假时长（天）'),
+        sa.Column('max_duration', sa.Float(), nullable=True, comment='最大请假时长（天）'),
+        sa.Column('requires_proof', sa.Boolean(), nullable=True, comment='是否需要证明材料'),
+        sa.Column('description', sa.String(length=200), nullable=True, comment='描述'),
+        sa.Column('is_active', sa.Boolean(), nullable=True, comment='是否启用'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code')
+    )
+    op.create_table('holiday_requests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('holiday_type_id', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False, comment='开始日期'),
+        sa.Column('end_date', sa.Date(), nullable=False, comment='结束日期'),
+        sa.Column('duration', sa.Float(), nullable=False, comment='请假天数'),
+        sa.Column('reason', sa.String(length=500), nullable=False, comment='请假原因'),
+        sa.Column('proof_url', sa.String(length=255), nullable=True, comment='证明材料URL'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='状态：pending-待审批，approved-已批准，rejected-已拒绝，cancelled-已取消'),
+        sa.Column('approver_id', sa.Integer(), nullable=True),
+        sa.Column('approval_time', sa.DateTime(), nullable=True, comment='审批时间'),
+        sa.Column('approval_comment', sa.String(length=500), nullable=True, comment='审批意见'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.ForeignKeyConstraint(['holiday_type_id'], ['holiday_types.id']),
+        sa.ForeignKeyConstraint(['approver_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('holiday_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('holiday_type_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False, comment='年份'),
+        sa.Column('total_days', sa.Float(), nullable=False, comment='总天数'),
+        sa.Column('used_days', sa.Float(), nullable=False, comment='已使用天数'),
+        sa.Column('remaining_days', sa.Float(), nullable=False, comment='剩余天数'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.ForeignKeyConstraint(['holiday_type_id'], ['holiday_types.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_table('holiday_balances')
+    op.drop_table('holiday_requests')
+    op.drop_table('holiday_types')
@@ -0,0 +1,35 @@
+"""请假记录增加按工作日历计算的天数和工时，请假/假期申请增加员工+时间段索引
+
+Revision ID: add_leave_duration
+Revises: add_tax_ytd_states
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_leave_duration'
+down_revision = 'add_tax_ytd_states'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('leaves', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration', sa.Float(), nullable=True, comment='请假天数（按工作日历计算）'))
+        batch_op.add_column(sa.Column('hours', sa.Float(), nullable=True, comment='请假工时（扣除非工作时间和午休）'))
+        batch_op.create_index('ix_leaves_employee_period', ['employee_id', 'start_date', 'end_date'], unique=False)
+
+    with op.batch_alter_table('holiday_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_holiday_requests_employee_period', ['employee_id', 'start_date', 'end_date'], unique=False)
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('holiday_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_holiday_requests_employee_period')
+
+    with op.batch_alter_table('leaves', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaves_employee_period')
+        batch_op.drop_column('hours')
+        batch_op.drop_column('duration')
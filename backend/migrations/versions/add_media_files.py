@@ -0,0 +1,42 @@
+"""添加媒体文件表和员工照片哈希
+
+Revision ID: add_media_files
+Revises: check_attendance_locations
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_media_files'
+down_revision = 'check_attendance_locations'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('media_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False, comment='原文件SHA-256哈希'),
+        sa.Column('variant', sa.String(length=20), nullable=False, comment='规格(original/avatar/list/detail)'),
+        sa.Column('file_path', sa.String(length=255), nullable=False, comment='相对上传目录的存储路径'),
+        sa.Column('mime_type', sa.String(length=50), nullable=False, comment='MIME类型'),
+        sa.Column('file_size', sa.Integer(), nullable=False, comment='文件大小(字节)'),
+        sa.Column('etag', sa.String(length=100), nullable=False, comment='预先计算的ETag'),
+        sa.Column('width', sa.Integer(), nullable=True, comment='图片宽度'),
+        sa.Column('height', sa.Integer(), nullable=True, comment='图片高度'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash', 'variant', name='uq_media_hash_variant')
+    )
+    op.create_index('ix_media_files_content_hash', 'media_files', ['content_hash'])
+
+    # 员工照片关联媒体文件哈希
+    op.add_column('employees', sa.Column('photo_hash', sa.String(length=64), nullable=True, comment='照片内容哈希(media_files)'))
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_column('employees', 'photo_hash')
+    op.drop_index('ix_media_files_content_hash', table_name='media_files')
+    op.drop_table('media_files')
@@ -0,0 +1,24 @@
+"""加班记录增加员工+时间段复合索引，用于请假/加班/假期申请冲突校验
+
+Revision ID: add_overtime_period_index
+Revises: add_holiday_accrual
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'add_overtime_period_index'
+down_revision = 'add_holiday_accrual'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('overtimes', schema=None) as batch_op:
+        batch_op.create_index('ix_overtimes_employee_period', ['employee_id', 'start_time', 'end_time'], unique=False)
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('overtimes', schema=None) as batch_op:
+        batch_op.drop_index('ix_overtimes_employee_period')
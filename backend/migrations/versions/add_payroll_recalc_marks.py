@@ -0,0 +1,36 @@
+"""添加薪资待重算标记表
+
+Revision ID: add_payroll_recalc_marks
+Revises: add_holiday_tables
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_payroll_recalc_marks'
+down_revision = 'add_holiday_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('payroll_recalc_marks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False, comment='员工ID'),
+        sa.Column('year', sa.Integer(), nullable=False, comment='年份'),
+        sa.Column('month', sa.Integer(), nullable=False, comment='月份'),
+        sa.Column('reason', sa.String(length=50), nullable=True, comment='最近一次触发重算的变更(表名)'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='最近一次标记时间，用于防抖'),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('employee_id', 'year', 'month', name='uq_payroll_recalc_employee_month')
+    )
+    op.create_index('ix_payroll_recalc_marks_updated_at', 'payroll_recalc_marks', ['updated_at'])
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_index('ix_payroll_recalc_marks_updated_at', table_name='payroll_recalc_marks')
+    op.drop_table('payroll_recalc_marks')
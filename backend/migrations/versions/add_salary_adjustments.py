@@ -0,0 +1,29 @@
+"""工资记录增加加班费和扣除项的手工调整金额
+
+Revision ID: add_salary_adjustments
+Revises: add_audit_logs
+Create Date: 2026-10-20 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_salary_adjustments'
+down_revision = 'add_audit_logs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    with op.batch_alter_table('salary_records', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('overtime_adjustment', sa.Numeric(10, 2), nullable=False, server_default='0',
+                                      comment='加班费手工调整(叠加在考勤计算值之上)'))
+        batch_op.add_column(sa.Column('deduction_adjustment', sa.Numeric(10, 2), nullable=False, server_default='0',
+                                      comment='扣除项手工调整(叠加在考勤计算值之上)'))
+
+def downgrade():
+    """降级数据库"""
+    with op.batch_alter_table('salary_records', schema=None) as batch_op:
+        batch_op.drop_column('deduction_adjustment')
+        batch_op.drop_column('overtime_adjustment')
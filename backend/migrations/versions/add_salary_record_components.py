@@ -0,0 +1,39 @@
+"""添加工资计算明细表，工资记录关联计算时使用的工资结构
+
+Revision ID: add_salary_record_components
+Revises: add_payroll_recalc_marks
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_salary_record_components'
+down_revision = 'add_payroll_recalc_marks'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('salary_record_components',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('salary_record_id', sa.Integer(), nullable=False, comment='工资记录ID'),
+        sa.Column('code', sa.String(length=30), nullable=False, comment='项目代码'),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False, comment='金额'),
+        sa.Column('quantity', sa.Float(), nullable=True, comment='数量(加班小时/请假天数)'),
+        sa.Column('rate', sa.Float(), nullable=True, comment='倍率'),
+        sa.ForeignKeyConstraint(['salary_record_id'], ['salary_records.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_salary_record_components_salary_record_id', 'salary_record_components', ['salary_record_id'])
+
+    op.add_column('salary_records', sa.Column('salary_structure_id', sa.Integer(), nullable=True, comment='计算时使用的工资结构ID'))
+    op.create_foreign_key('fk_salary_records_salary_structure_id', 'salary_records', 'salary_structures', ['salary_structure_id'], ['id'])
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_constraint('fk_salary_records_salary_structure_id', 'salary_records', type_='foreignkey')
+    op.drop_column('salary_records', 'salary_structure_id')
+    op.drop_index('ix_salary_record_components_salary_record_id', table_name='salary_record_components')
+    op.drop_table('salary_record_components')
@@ -0,0 +1,42 @@
+"""添加个税年度累计状态表，工资记录增加社保公积金和专项附加扣除
+
+Revision ID: add_tax_ytd_states
+Revises: add_salary_record_components
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_tax_ytd_states'
+down_revision = 'add_salary_record_components'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('tax_ytd_states',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False, comment='员工ID'),
+        sa.Column('year', sa.Integer(), nullable=False, comment='年份'),
+        sa.Column('months', sa.Integer(), nullable=False, comment='已发放月份数(累计减除费用按此计算)'),
+        sa.Column('last_month', sa.Integer(), nullable=False, comment='最近一个已发放月份'),
+        sa.Column('income', sa.Numeric(precision=12, scale=2), nullable=False, comment='累计收入(应发总额-扣除项)'),
+        sa.Column('deductions', sa.Numeric(precision=12, scale=2), nullable=False, comment='累计专项扣除和专项附加扣除'),
+        sa.Column('taxable_income', sa.Numeric(precision=12, scale=2), nullable=False, comment='累计应纳税所得额'),
+        sa.Column('tax_withheld', sa.Numeric(precision=12, scale=2), nullable=False, comment='累计已预扣税额'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('employee_id', 'year', name='uq_tax_ytd_employee_year')
+    )
+
+    op.add_column('salary_records', sa.Column('social_insurance', sa.Numeric(precision=10, scale=2), nullable=True, server_default='0', comment='社保公积金个人缴纳部分(税前扣除)'))
+    op.add_column('salary_records', sa.Column('special_deduction', sa.Numeric(precision=10, scale=2), nullable=True, server_default='0', comment='专项附加扣除(仅用于计税)'))
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_column('salary_records', 'special_deduction')
+    op.drop_column('salary_records', 'social_insurance')
+    op.drop_table('tax_ytd_states')
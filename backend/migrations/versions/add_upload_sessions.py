@@ -0,0 +1,45 @@
+"""添加分片上传会话表和合同附件哈希
+
+Revision ID: add_upload_sessions
+Revises: add_media_files
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_upload_sessions'
+down_revision = 'add_media_files'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """升级数据库"""
+    op.create_table('upload_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False, comment='上传会话ID'),
+        sa.Column('upload_type', sa.String(length=20), nullable=False, comment='上传类型(contract/photo)'),
+        sa.Column('employee_id', sa.Integer(), nullable=False, comment='员工ID'),
+        sa.Column('file_name', sa.String(length=255), nullable=False, comment='原始文件名'),
+        sa.Column('total_size', sa.BigInteger(), nullable=False, comment='文件总大小(字节)'),
+        sa.Column('received_size', sa.BigInteger(), nullable=False, comment='已接收大小(字节)'),
+        sa.Column('checksum', sa.String(length=64), nullable=True, comment='客户端提供的SHA-256校验值'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='状态(uploading/completed/aborted)'),
+        sa.Column('result_id', sa.Integer(), nullable=True, comment='完成后生成的记录ID(合同附件ID/员工ID)'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # 合同附件记录内容哈希和文件大小
+    op.add_column('contract_attachments', sa.Column('content_hash', sa.String(length=64), nullable=True, comment='文件内容哈希(media_files)'))
+    op.add_column('contract_attachments', sa.Column('file_size', sa.Integer(), nullable=True, comment='文件大小(字节)'))
+    op.create_index('ix_contract_attachments_content_hash', 'contract_attachments', ['content_hash'])
+
+def downgrade():
+    """回滚数据库"""
+    op.drop_index('ix_contract_attachments_content_hash', table_name='contract_attachments')
+    op.drop_column('contract_attachments', 'file_size')
+    op.drop_column('contract_attachments', 'content_hash')
+    op.drop_table('upload_sessions')
@@ -0,0 +1,29 @@
+import os
+import sys
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.holiday import HolidayType
+
+@pytest.fixture
+def app():
+    """一个部门、一个岗位、一种年假类型和一名员工（测试模块可以定义同名 fixture 覆盖）"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        position = Position(name='工程师', department_id=department.id)
+        holiday_type = HolidayType(name='年假', code='annual', annual_quota=5, max_carry_over=3)
+        db.session.add_all([position, holiday_type])
+        db.session.flush()
+        db.session.add(Employee(employee_id='E1', name='张三', department_id=department.id, position_id=position.id,
+                                hire_date=date(2020, 1, 1)))
+        db.session.commit()
+        yield app
+        db.session.remove()
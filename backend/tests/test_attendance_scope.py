@@ -0,0 +1,98 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.attendance import Leave
+from app.models.user import User
+from app.services.absence_index_service import AbsenceIndexService
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        # 总部 -> 研发部 -> 前端组
+        root = Department(name='总部')
+        db.session.add(root)
+        db.session.flush()
+        rd = Department(name='研发部', parent_id=root.id)
+        db.session.add(rd)
+        db.session.flush()
+        frontend = Department(name='前端组', parent_id=rd.id)
+        db.session.add(frontend)
+        db.session.flush()
+        position = Position(name='工程师', department_id=rd.id)
+        db.session.add(position)
+        db.session.flush()
+        for index, department in enumerate((root, rd, frontend)):
+            employee = Employee(employee_id=f'E{index}', name=department.name, department_id=department.id,
+                                position_id=position.id, hire_date=date(2020, 1, 1))
+            db.session.add(employee)
+            db.session.flush()
+            db.session.add(Leave(employee_id=employee.id, leave_type='annual', reason='休假', status='approved',
+                                 start_date=datetime(2026, 10, 20, 9), end_date=datetime(2026, 10, 20, 18)))
+            db.session.add(User(username=f'user{index}', password='x', email=f'user{index}@example.com',
+                                role='employee', employee_id=employee.id))
+        db.session.add(User(username='admin', password='x', email='admin@example.com', role='admin'))
+        db.session.commit()
+    # 请求不能在同一个应用上下文中发出，否则 g 中缓存的当前用户会在请求之间共享
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+def headers(app, username):
+    with app.app_context():
+        user = User.query.filter_by(username=username).one()
+        return {'Authorization': 'Bearer ' + create_access_token(identity=str(user.id))}
+
+def department_id(app, name):
+    with app.app_context():
+        return Department.query.filter_by(name=name).one().id
+
+def absent_names(response):
+    body = response.get_json()
+    assert body['code'] == 200, body
+    return {item['employee_name'] for item in body['data']}
+
+def test_absences_are_scoped_to_own_department_subtree(app):
+    client = app.test_client()
+    url = '/api/attendance/absences?start_date=2026-10-20'
+    assert absent_names(client.get(url, headers=headers(app, 'admin'))) == {'总部', '研发部', '前端组'}
+    assert absent_names(client.get(url, headers=headers(app, 'user1'))) == {'研发部', '前端组'}
+    assert absent_names(client.get(url, headers=headers(app, 'user2'))) == {'前端组'}
+
+    # 不能查看上级部门
+    response = client.get(f"{url}&department_id={department_id(app, '总部')}", headers=headers(app, 'user1'))
+    assert response.get_json()['code'] == 403
+
+def test_calendar_rejects_ancestor_departments(app):
+    client = app.test_client()
+    url = '/api/attendance/calendar?start_date=2026-10-01&department_id='
+    response = client.get(url + str(department_id(app, '总部')), headers=headers(app, 'user1'))
+    assert response.get_json()['code'] == 403
+    response = client.get(url + str(department_id(app, '前端组')), headers=headers(app, 'user1'))
+    assert response.get_json()['code'] == 200
+
+def test_who_is_out_outside_index_window_queries_database(app):
+    with app.app_context():
+        window_start, window_end = AbsenceIndexService.index_window()
+        old_day = window_start - timedelta(days=30)
+        employee = Employee.query.filter_by(name='研发部').one()
+        db.session.add(Leave(employee_id=employee.id, leave_type='annual', reason='休假', status='approved',
+                             start_date=old_day.replace(hour=9), end_date=old_day.replace(hour=18)))
+        db.session.commit()
+
+        # 索引只包含范围内的区间，范围外的查询直接查数据库
+        _, _, index = AbsenceIndexService.get_index()
+        assert all(absence.start >= window_start - timedelta(days=1) for absence in index.overlapping(datetime.min, datetime.max))
+        assert [absence.employee_id for absence in AbsenceIndexService.who_is_out(old_day.date(), old_day.date())] == [employee.id]
+        assert len(AbsenceIndexService.who_is_out(date(2026, 10, 20), date(2026, 10, 20))) == 3
+
+        # 非活动状态不在索引中，同样查数据库
+        assert AbsenceIndexService.who_is_out(date(2026, 10, 20), date(2026, 10, 20), statuses=('rejected',)) == []
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from app.models import Employee
+from app.models.holiday import HolidayBalance
+from app.services.audit_service import AuditService
+from app.services.holiday_accrual_service import HolidayAccrualService
+from app.services.leave_duration_service import LeaveDurationService
+
+def audit_entries(entity):
+    return [(log.action, log.entity_id, json.loads(log.changes))
+            for log in reversed(AuditService.query(entity=entity).items)]
+
+def test_bulk_balance_writes_are_audited(app):
+    with app.app_context():
+        HolidayAccrualService.accrue(2026)
+        db.session.commit()
+        balance = HolidayBalance.query.one()
+        assert LeaveDurationService.consume_balance(balance.id, 2)
+        db.session.commit()
+        LeaveDurationService.release_balance(balance.id, 0.5)
+        db.session.commit()
+
+        entries = audit_entries('holiday_balances')
+        assert [(action, entity_id) for action, entity_id, _ in entries] == [
+            ('insert', str(balance.id)), ('update', str(balance.id)), ('update', str(balance.id))
+        ]
+        assert entries[0][2]['total_days'] == [None, 5]
+        assert entries[1][2] == {'used_days': [0, 2], 'remaining_days': [5, 3]}
+        assert entries[2][2] == {'used_days': [2, 1.5], 'remaining_days': [3, 3.5]}
+
+def test_failed_consume_is_not_audited(app):
+    with app.app_context():
+        HolidayAccrualService.accrue(2026)
+        db.session.commit()
+        assert not LeaveDurationService.consume_balance(HolidayBalance.query.one().id, 10)
+        db.session.commit()
+        assert [action for action, _, _ in audit_entries('holiday_balances')] == ['insert']
+
+def test_rows_wait_for_the_outer_commit(app):
+    with app.app_context():
+        buffer = AuditService.buffer()
+        buffer.flush()
+        with db.session.begin_nested():
+            Employee.query.one().name = '李四'
+        assert buffer.rows == []
+        db.session.rollback()
+        assert buffer.rows == []
+
+        with db.session.begin_nested():
+            Employee.query.one().name = '王五'
+        db.session.commit()
+        assert [row['action'] for row in buffer.rows] == ['update']
+
+def test_buffer_drops_oldest_rows_over_the_limit(app):
+    app.config['AUDIT_BUFFER_MAX_ROWS'] = 3
+    with app.app_context():
+        buffer = AuditService.buffer()
+        buffer.flush()
+        buffer.append([{'entity_id': str(i)} for i in range(5)])
+        assert [row['entity_id'] for row in buffer.rows] == ['2', '3', '4']
+        buffer.rows.clear()
+
+def test_rolled_back_savepoint_is_not_audited(app):
+    with app.app_context():
+        buffer = AuditService.buffer()
+        buffer.flush()
+        employee = Employee.query.one()
+        employee.name = '李四'
+        savepoint = db.session.begin_nested()
+        employee.phone = '111'
+        db.session.flush()
+        savepoint.rollback()
+        db.session.commit()
+        assert [json.loads(row['changes']) for row in buffer.rows] == [{'name': ['张三', '李四']}]
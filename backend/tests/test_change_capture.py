@@ -0,0 +1,82 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from app.models import Employee, Department, Position
+from app.models.change_event import ChangeEvent
+from app.models.holiday import HolidayBalance
+from app.services.change_capture_service import ChangeCaptureService
+from app.services.holiday_accrual_service import HolidayAccrualService
+from app.services.leave_duration_service import LeaveDurationService
+from app.utils.http_cache import ResponseCache
+
+def events(table):
+    return [(event.operation, event.pk) for event in
+            ChangeEvent.query.filter_by(table_name=table).order_by(ChangeEvent.id)]
+
+def test_bulk_balance_writes_are_captured(app):
+    with app.app_context():
+        version = ResponseCache.current().version(['holiday_balances'])
+        HolidayAccrualService.accrue(2026)
+        db.session.commit()
+        balance = HolidayBalance.query.one()
+        assert events('holiday_balances') == [('insert', str(balance.id))]
+        assert ResponseCache.current().version(['holiday_balances']) > version
+
+        assert LeaveDurationService.consume_balance(balance.id, 1)
+        db.session.commit()
+        assert events('holiday_balances')[-1] == ('update', str(balance.id))
+
+def test_caches_are_invalidated_on_commit_only(app):
+    with app.app_context():
+        app.extensions['org_stats'] = (float('inf'), {})
+        db.session.add(Department(name='市场部'))
+        db.session.flush()
+        db.session.rollback()
+        assert 'org_stats' in app.extensions
+
+        db.session.add(Department(name='市场部'))
+        db.session.commit()
+        assert 'org_stats' not in app.extensions
+
+def test_subscribers_are_notified_when_cdc_is_disabled(app):
+    app.config['CDC_ENABLED'] = False
+    with app.app_context():
+        app.extensions['org_stats'] = (float('inf'), {})
+        Employee.query.one().name = '李四'
+        db.session.commit()
+        assert 'org_stats' not in app.extensions
+        assert [operation for operation, _ in events('employees')] == ['insert']
+
+def test_subscribing_twice_replaces_the_subscription(app):
+    received = []
+
+    def callback(changes):
+        received.append([change.table for change in changes])
+
+    ChangeCaptureService.subscribe(callback, ['departments'], sync=True)
+    ChangeCaptureService.subscribe(callback, ['positions'], sync=True)
+    try:
+        with app.app_context():
+            department = Department.query.one()
+            db.session.add(Position(name='产品经理', department_id=department.id))
+            department.name = '研发中心'
+            db.session.commit()
+        assert received == [['positions']]
+    finally:
+        ChangeCaptureService.unsubscribe(callback)
+
+def test_savepoints_wait_for_the_outer_commit(app):
+    with app.app_context():
+        app.extensions['org_stats'] = (float('inf'), {})
+        with db.session.begin_nested():
+            db.session.add(Department(name='市场部'))
+        assert 'org_stats' in app.extensions
+
+        savepoint = db.session.begin_nested()
+        db.session.add(Department(name='销售部'))
+        savepoint.rollback()
+        db.session.commit()
+        assert 'org_stats' not in app.extensions
+        assert [operation for operation, _ in events('departments')] == ['insert', 'insert']
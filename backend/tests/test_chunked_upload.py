@@ -0,0 +1,99 @@
+import hashlib
+import io
+import os
+import sys
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee
+from app.models.employee import ContractAttachment
+from app.services.media_service import MediaService
+from app.services.upload_service import UploadService
+
+CONTENT = b'hello chunked world'
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing')
+    app.config['MEDIA_FOLDER'] = str(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Employee(employee_id='E1', name='张三', hire_date=date(2020, 1, 1)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def create(content=CONTENT, **data):
+    return UploadService.create_session({
+        'upload_type': 'contract',
+        'employee_id': Employee.query.one().id,
+        'file_name': '劳动合同.docx',
+        'total_size': len(content),
+        **data
+    })
+
+def upload(content=CONTENT, chunk_size=5):
+    session = create(content)
+    for offset in range(0, len(content), chunk_size):
+        UploadService.write_chunk(session.id, offset, io.BytesIO(content[offset:offset + chunk_size]))
+    return UploadService.finalize(session.id, hashlib.sha256(content).hexdigest())
+
+def test_chunks_resume_from_received_offset(app):
+    with app.app_context():
+        session = create(checksum=hashlib.sha256(CONTENT).hexdigest())
+        UploadService.write_chunk(session.id, 0, io.BytesIO(CONTENT[:8]))
+        # 重传已接收的部分不会回退进度
+        assert UploadService.write_chunk(session.id, 0, io.BytesIO(CONTENT[:4])).received_size == 8
+        # 不允许留下空洞
+        with pytest.raises(ValueError):
+            UploadService.write_chunk(session.id, 10, io.BytesIO(CONTENT[10:]))
+        with pytest.raises(ValueError):
+            UploadService.finalize(session.id)
+
+        UploadService.write_chunk(session.id, 8, io.BytesIO(CONTENT[8:]))
+        result = UploadService.finalize(session.id)
+        assert result['upload']['status'] == 'completed'
+
+        contract = ContractAttachment.query.one()
+        assert contract.content_hash == hashlib.sha256(CONTENT).hexdigest()
+        assert contract.file_size == len(CONTENT)
+        with open(os.path.join(MediaService.media_folder(), MediaService.relative_path(
+                contract.content_hash, 'original', 'docx')), 'rb') as f:
+            assert f.read() == CONTENT
+        assert not os.path.exists(UploadService.part_path(session.id))
+
+        with pytest.raises(ValueError):
+            UploadService.finalize(session.id)
+
+def test_size_and_checksum_are_enforced(app):
+    with app.app_context():
+        session = create()
+        with pytest.raises(ValueError):
+            UploadService.write_chunk(session.id, 0, io.BytesIO(CONTENT + b'!'))
+
+        UploadService.write_chunk(session.id, 0, io.BytesIO(CONTENT))
+        with pytest.raises(ValueError):
+            UploadService.finalize(session.id, hashlib.sha256(b'other').hexdigest())
+        assert UploadService.get_session(session.id).status == 'uploading'
+
+        with pytest.raises(ValueError):
+            create(file_name='合同.exe')
+
+def test_identical_files_share_storage(app):
+    with app.app_context():
+        first = upload()['contract']
+        second = upload(chunk_size=7)['contract']
+        assert first['id'] != second['id']
+        assert first['file_url'] == second['file_url']
+
+def test_abort_removes_partial_file(app):
+    with app.app_context():
+        session = create()
+        UploadService.write_chunk(session.id, 0, io.BytesIO(CONTENT[:5]))
+        UploadService.abort(session.id)
+        assert not os.path.exists(UploadService.part_path(session.id))
+        with pytest.raises(ValueError):
+            UploadService.write_chunk(session.id, 5, io.BytesIO(CONTENT[5:]))
@@ -0,0 +1,18 @@
+import os
+import sys
+import csv
+import io
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.export_stream import _csv_writer
+
+def test_csv_cells_cannot_start_formulas():
+    app = create_app('testing')
+    with app.app_context():
+        write = _csv_writer()
+        data = write({'name': '=HYPERLINK("http://x")', 'remark': '+1', 'code': '@SUM(A1)', 'note': '-2',
+                      'amount': -500.0, 'extra': {'formula': '=1'}, 'plain': '正常'})
+    header, row = csv.reader(io.StringIO(data.decode()))
+    assert header == ['name', 'remark', 'code', 'note', 'amount', 'extra', 'plain']
+    assert row == ["'=HYPERLINK(\"http://x\")", "'+1", "'@SUM(A1)", "'-2", '-500.0', '{"formula":"=1"}', '正常']
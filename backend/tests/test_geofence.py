@@ -0,0 +1,90 @@
+import os
+import sys
+import math
+import random
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.geofence_service import EARTH_RADIUS, GeofenceIndex
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(h)))
+
+def offset(latitude, longitude, north, east):
+    """按米偏移坐标（小范围近似）"""
+    meters = math.pi * EARTH_RADIUS / 180
+    return latitude + north / meters, longitude + east / (meters * math.cos(math.radians(latitude)))
+
+def test_points_just_inside_the_radius_match():
+    index = GeofenceIndex([(1, 31.2304, 121.4737, 200.0)])
+    for north, east in ((199.5, 0), (0, 199.5), (-199.5, 0), (0, -199.5), (141, 141)):
+        match = index.match(*offset(31.2304, 121.4737, north, east))
+        assert match is not None and match.location_id == 1
+        assert match.distance <= 200
+    assert index.match(*offset(31.2304, 121.4737, 201, 0)) is None
+    assert index.match(*offset(31.2304, 121.4737, 0, 201)) is None
+
+def test_grid_agrees_with_brute_force():
+    rng = random.Random(7)
+    sites = [(i, rng.uniform(-60, 60), rng.uniform(-180, 180), rng.uniform(50, 2000)) for i in range(50)]
+    index = GeofenceIndex(sites)
+    points = []
+    for _, latitude, longitude, radius in sites:
+        for _ in range(40):
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = radius * rng.uniform(0.9, 1.1)
+            points.append(offset(latitude, longitude, distance * math.cos(angle), distance * math.sin(angle)))
+
+    for point, match in zip(points, index.match_many(points)):
+        inside = [(haversine(lat, lon, *point), site_id) for site_id, lat, lon, radius in sites
+                  if haversine(lat, lon, *point) <= radius]
+        if inside:
+            assert match is not None and match.location_id == min(inside)[1]
+        else:
+            assert match is None
+
+def test_high_latitude_sites():
+    index = GeofenceIndex([(1, 69.6492, 18.9553, 1000.0)])
+    assert index.match(*offset(69.6492, 18.9553, 700, 700)) is not None
+    assert index.match(*offset(69.6492, 18.9553, 0, 1010)) is None
+
+def test_polar_sites_stay_small_and_match_every_longitude():
+    started = time.perf_counter()
+    index = GeofenceIndex([(1, 90.0, 0.0, 500.0), (2, 89.9, 45.0, 500.0)])
+    assert time.perf_counter() - started < 0.5
+    assert len(index.cells) + len(index.rows) < 1000
+    for longitude in (-180, -90, 0, 135, 180):
+        assert index.match(89.997, longitude).location_id == 1
+    assert index.match(89.99, 0) is None
+
+def test_sites_across_the_antimeridian():
+    index = GeofenceIndex([(1, -16.5, 179.999, 500.0), (2, 64.0, -179.9995, 300.0)])
+    assert index.match(*offset(-16.5, 179.999, 0, 400)).location_id == 1
+    assert index.match(-16.5, -179.997).location_id == 1
+    assert index.match(64.0, 179.9985).location_id == 2
+    assert index.match(*offset(-16.5, 179.999, 0, 600)) is None
+
+def test_grid_agrees_with_brute_force_near_poles_and_antimeridian():
+    rng = random.Random(11)
+    sites = [(i, rng.choice((-1, 1)) * rng.uniform(85, 90), rng.uniform(-180, 180), rng.uniform(50, 2000))
+             for i in range(20)]
+    sites += [(20 + i, rng.uniform(-60, 60), rng.choice((-1, 1)) * rng.uniform(179.9, 180), rng.uniform(50, 2000))
+              for i in range(20)]
+    index = GeofenceIndex(sites)
+    points = []
+    for _, latitude, longitude, radius in sites:
+        for _ in range(40):
+            north, east = rng.uniform(-1.1, 1.1) * radius, rng.uniform(-1.1, 1.1) * radius
+            lat, lon = offset(latitude, longitude, north, east)
+            if abs(lat) <= 90:
+                points.append((lat, (lon + 180) % 360 - 180))
+
+    for point, match in zip(points, index.match_many(points)):
+        inside = [(haversine(lat, lon, *point), site_id) for site_id, lat, lon, radius in sites
+                  if haversine(lat, lon, *point) <= radius]
+        if inside:
+            assert match is not None and match.location_id == min(inside)[1]
+        else:
+            assert match is None
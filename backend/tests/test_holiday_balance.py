@@ -0,0 +1,107 @@
+import os
+import sys
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+from app.models import Employee
+from app.models.holiday import HolidayBalance, HolidayRequest, HolidayRequestCharge, HolidayType
+from app.models.statutory_holiday import StatutoryHoliday
+from app.services.holiday_accrual_service import HolidayAccrualService
+from app.services.leave_duration_service import LeaveDurationService
+
+def balances():
+    db.session.expire_all()
+    return {balance.year: balance for balance in HolidayBalance.query.all()}
+
+def make_request(start, end, start_period='full', end_period='full'):
+    employee = Employee.query.one()
+    holiday_request = HolidayRequest(employee_id=employee.id, holiday_type_id=HolidayType.query.one().id,
+                                     start_date=start, end_date=end, start_period=start_period,
+                                     end_period=end_period, duration=0, reason='休假')
+    holiday_request.duration = sum(LeaveDurationService.request_days_by_year(holiday_request).values())
+    db.session.add(holiday_request)
+    db.session.commit()
+    return holiday_request
+
+def test_days_are_split_across_years(app):
+    with app.app_context():
+        employee_id = Employee.query.one().id
+        # 2026-12-31 周四、2027-01-04 周一（周末不计，未配置法定节假日）
+        days = LeaveDurationService.days_by_year(employee_id, date(2026, 12, 31), date(2027, 1, 4), 'pm', 'am')
+        assert days == {2026: 0.5, 2027: 1.5}
+
+def test_cross_year_request_charges_and_refunds_each_year(app):
+    with app.app_context():
+        holiday_request = make_request(date(2026, 12, 30), date(2027, 1, 5))
+        assert LeaveDurationService.charge_request(holiday_request)
+        db.session.commit()
+        by_year = balances()
+        assert (by_year[2026].used_days, by_year[2027].used_days) == (2, 3)
+
+        LeaveDurationService.refund_request(holiday_request)
+        db.session.commit()
+        by_year = balances()
+        assert (by_year[2026].used_days, by_year[2026].remaining_days) == (0, 5)
+        assert (by_year[2027].used_days, by_year[2027].remaining_days) == (0, by_year[2027].total_days)
+
+def test_refund_returns_what_was_charged_after_calendar_changes(app):
+    with app.app_context():
+        holiday_request = make_request(date(2026, 12, 30), date(2027, 1, 5))
+        assert LeaveDurationService.charge_request(holiday_request)
+        db.session.commit()
+
+        # 批准之后把 2026-12-31、2027-01-04 设为法定节假日
+        db.session.add_all([StatutoryHoliday(name='元旦', date=day, holiday_type='holiday', year=day.year)
+                            for day in (date(2026, 12, 31), date(2027, 1, 4))])
+        db.session.commit()
+        LeaveDurationService.invalidate_calendar()
+        assert LeaveDurationService.request_days_by_year(holiday_request) == {2026: 1, 2027: 2}
+
+        LeaveDurationService.refund_request(holiday_request)
+        db.session.commit()
+        assert all(balance.used_days == 0 for balance in balances().values())
+        assert HolidayRequestCharge.query.count() == 0
+
+def test_charge_fails_when_one_year_is_short(app):
+    with app.app_context():
+        holiday_request = make_request(date(2026, 12, 21), date(2027, 1, 1))
+        assert not LeaveDurationService.charge_request(holiday_request)
+        db.session.rollback()
+        assert all(balance.used_days == 0 for balance in balances().values())
+
+def test_accrual_refreshes_carry_over_of_unused_balances(app):
+    with app.app_context():
+        employee_id = Employee.query.one().id
+        holiday_type = HolidayType.query.one()
+        HolidayAccrualService.run(2026)
+        # 提前生成下一年余额时上一年剩余 5 天，按上限结转 3 天
+        HolidayAccrualService.run(2027)
+        assert (balances()[2027].carried_over_days, balances()[2027].total_days) == (3, 8)
+
+        # 之后上一年又用了 4 天，重新执行时按剩余 1 天结转
+        assert LeaveDurationService.consume_balance(balances()[2026].id, 4)
+        db.session.commit()
+        stats = HolidayAccrualService.run(2027)
+        assert (stats['created'], stats['refreshed']) == (0, 1)
+        by_year = balances()
+        assert (by_year[2027].carried_over_days, by_year[2027].total_days, by_year[2027].remaining_days) == (1, 6, 6)
+
+        # 已开始使用的余额不再变动
+        assert LeaveDurationService.consume_balance(by_year[2027].id, 1)
+        LeaveDurationService.release_balance(by_year[2026].id, 4)
+        db.session.commit()
+        assert HolidayAccrualService.run(2027)['refreshed'] == 0
+        assert balances()[2027].total_days == 6
+
+        # 按需补发同样计算结转
+        assert LeaveDurationService.get_or_create_balance(employee_id, holiday_type, 2028).carried_over_days == 3
+
+def test_accrual_prorates_by_hire_month(app):
+    with app.app_context():
+        employee = Employee.query.one()
+        employee.hire_date = date(2026, 7, 15)
+        db.session.commit()
+        HolidayAccrualService.run(2026)
+        # 5 天 × 6/12 = 2.5 天
+        assert balances()[2026].total_days == 2.5
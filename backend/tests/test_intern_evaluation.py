@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.change_event import ChangeEvent
+from app.models.intern_status import InternStatus, InternEvaluation
+from app.models.salary import SalaryStructure
+from app.services.audit_service import AuditService
+from app.services.intern_service import InternService, SCORE_FIELDS
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        intern_position = Position(name='实习工程师', department_id=department.id)
+        position = Position(name='工程师', department_id=department.id)
+        structure = SalaryStructure(name='试用期', basic_salary=Decimal('8000'), housing_allowance=Decimal('0'),
+                                    transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        db.session.add_all([intern_position, position, structure])
+        db.session.flush()
+        intern = Employee(employee_id='E1', name='张三', department_id=department.id, position_id=intern_position.id,
+                          hire_date=date(2026, 1, 1), employee_type='intern')
+        mentor = Employee(employee_id='E2', name='李四', department_id=department.id, position_id=position.id,
+                          hire_date=date(2020, 1, 1))
+        db.session.add_all([intern, mentor])
+        db.session.flush()
+        db.session.add(InternStatus(employee_id=intern.id, status='intern', start_date=date(2026, 1, 1),
+                                    department_id=department.id, position_id=intern_position.id))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def evaluate(**item):
+    status = InternStatus.query.one()
+    return InternService.bulk_evaluate({
+        'evaluation_date': '2026-03-31',
+        'evaluation_type': 'final',
+        'evaluator_id': Employee.query.filter_by(employee_id='E2').one().id,
+        'salary_assignment': {
+            'salary_structure_id': SalaryStructure.query.one().id,
+            'effective_date': '2026-04-01'
+        },
+        'items': [{'intern_status_id': status.id, **{field: 4 for field in SCORE_FIELDS}, **item}]
+    })
+
+def test_boolean_scores_are_rejected(app):
+    with app.app_context():
+        result, errors = evaluate(work_performance=True)
+        assert result is None
+        assert errors[0]['msg'] == '评分项必须为 1-5 的整数'
+
+def test_conversion_writes_are_captured_and_audited(app):
+    with app.app_context():
+        intern = Employee.query.filter_by(employee_id='E1').one()
+        old_position_id = intern.position_id
+        new_position_id = Position.query.filter_by(name='工程师').one().id
+        result, errors = evaluate(conversion_recommended=True, recommended_position_id=new_position_id)
+        assert errors == []
+        assert (result['converted'], result['position_changes'], result['salary_assignments']) == (1, 1, 1)
+
+        captured = {(event.table_name, event.operation) for event in ChangeEvent.query}
+        assert captured >= {
+            ('intern_evaluations', 'insert'), ('position_change_history', 'insert'),
+            ('salary_structure_assignments', 'insert'), ('intern_status', 'update'), ('employees', 'update')
+        }
+
+        employee_logs = [json.loads(log.changes) for log in AuditService.query(entity='employees').items
+                         if log.action == 'update']
+        assert employee_logs == [{'employee_type': ['intern', 'probation'],
+                                  'position_id': [old_position_id, new_position_id]}]
+        assignment_logs = AuditService.query(entity='salary_structure_assignments').items
+        assert [log.action for log in assignment_logs] == ['insert']
+        assert json.loads(assignment_logs[0].changes)['employee_id'] == [None, intern.id]
+
+def test_repeated_evaluations_are_captured_with_their_own_ids(app):
+    with app.app_context():
+        for _ in range(3):
+            result, errors = evaluate(evaluation_type='monthly')
+            assert errors == []
+        ids = [str(evaluation.id) for evaluation in InternEvaluation.query.order_by(InternEvaluation.id)]
+        captured = [event.pk for event in ChangeEvent.query.filter_by(table_name='intern_evaluations')
+                    .order_by(ChangeEvent.id)]
+        assert captured == ids
@@ -0,0 +1,94 @@
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Employee, Department, Position, User
+from app.models.intern_status import InternStatus, InternEvaluation
+
+@contextmanager
+def count_queries():
+    """统计代码块内执行的 SQL 语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        position = Position(name='工程师', department_id=department.id)
+        db.session.add(position)
+        db.session.flush()
+        mentor = Employee(employee_id='M1', name='导师', department_id=department.id, position_id=position.id)
+        db.session.add(mentor)
+        evaluators = [Employee(employee_id=f'V{i}', name=f'评估人{i}') for i in range(3)]
+        db.session.add_all(evaluators)
+        db.session.flush()
+        user = User(username='admin', email='admin@example.com', role='admin')
+        user.set_password('admin')
+        db.session.add(user)
+        for i in range(30):
+            intern = Employee(employee_id=f'I{i}', name=f'实习生{i}', employee_type='intern',
+                              department_id=department.id, position_id=position.id)
+            db.session.add(intern)
+            db.session.flush()
+            status = InternStatus(employee_id=intern.id, start_date=date(2024, 1, 1), mentor_id=mentor.id,
+                                  department_id=department.id, position_id=position.id)
+            db.session.add(status)
+            db.session.flush()
+            # 每条实习状态有 1~3 条评估，评估人各不相同
+            for month, evaluator in enumerate(evaluators[:i % 3 + 1], start=1):
+                db.session.add(InternEvaluation(
+                    intern_status_id=status.id, evaluation_date=date(2024, month, 1), evaluation_type='monthly',
+                    work_performance=4, learning_ability=4, communication_skill=4, professional_skill=4,
+                    attendance=4, total_score=20, evaluator_id=evaluator.id, recommended_position_id=position.id
+                ))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def request_queries(app, url):
+    """请求接口并返回执行的 SQL 语句数"""
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(User.query.first().id))}'}
+    client = app.test_client()
+    with app.app_context():
+        with count_queries() as statements:
+            response = client.get(url, headers=headers)
+    assert response.get_json()['code'] == 200
+    return len(statements)
+
+def test_intern_status_list_query_count_is_constant(app):
+    """实习状态列表的查询次数与每页条数无关"""
+    small = request_queries(app, '/api/intern/status?per_page=2')
+    large = request_queries(app, '/api/intern/status?per_page=30')
+    assert large == small
+    assert request_queries(app, '/api/intern/status?per_page=30&keyword=实习生') == small
+
+def test_status_evaluations_query_count_is_constant(app):
+    """评估列表不逐条加载评估人和建议职位"""
+    with app.app_context():
+        one, three = [
+            InternStatus.query.filter_by(employee_id=Employee.query.filter_by(employee_id=code).first().id).first().id
+            for code in ('I0', 'I2')
+        ]
+    assert request_queries(app, f'/api/intern/status/{three}/evaluations') == \
+        request_queries(app, f'/api/intern/status/{one}/evaluations')
@@ -0,0 +1,104 @@
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.services.payroll_simulation_service import PayrollSimulationService
+from app.services.salary_service import SalaryService
+
+YEAR, MONTH = 2026, 3
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        research, sales = Department(name='研发部'), Department(name='销售部')
+        db.session.add_all([research, sales])
+        db.session.flush()
+        position = Position(name='工程师', department_id=research.id)
+        standard = SalaryStructure(name='标准', basic_salary=Decimal('8000'), housing_allowance=Decimal('500'),
+                                   transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        senior = SalaryStructure(name='高级', basic_salary=Decimal('20000'), housing_allowance=Decimal('1000'),
+                                 transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        db.session.add_all([position, standard, senior])
+        db.session.flush()
+        first = Employee(employee_id='E1', name='张三', department_id=research.id, position_id=position.id,
+                         hire_date=date(2020, 1, 1))
+        second = Employee(employee_id='E2', name='李四', department_id=sales.id, position_id=position.id,
+                          hire_date=date(2020, 1, 1))
+        db.session.add_all([first, second])
+        db.session.flush()
+        db.session.add_all([
+            SalaryStructureAssignment(salary_structure_id=standard.id, department_id=research.id,
+                                      effective_date=date(2020, 1, 1)),
+            SalaryStructureAssignment(salary_structure_id=senior.id, employee_id=second.id,
+                                      effective_date=date(2020, 1, 1))
+        ])
+        db.session.commit()
+        SalaryService.batch_generate_salary_records(YEAR, MONTH, [first.id, second.id])
+        yield app
+        db.session.remove()
+
+def structure(name):
+    return SalaryStructure.query.filter_by(name=name).one()
+
+def by_department(result):
+    return {item['department_name']: item for item in result['departments']}
+
+def test_baseline_matches_generated_records(app):
+    with app.app_context():
+        result = PayrollSimulationService.simulate(YEAR, MONTH)
+        records = SalaryRecord.query.all()
+        assert result['total']['baseline'] == {
+            'gross': float(sum(Decimal(record.gross_salary) for record in records)),
+            'tax': float(sum(Decimal(record.tax) for record in records)),
+            'net': float(sum(Decimal(record.net_salary) for record in records))
+        }
+        assert result['total']['delta'] == {'gross': 0, 'tax': 0, 'net': 0}
+        assert (result['changed_employees'], result['unassigned']) == (0, 0)
+
+def test_structure_change_only_affects_its_employees(app):
+    with app.app_context():
+        result = PayrollSimulationService.simulate(YEAR, MONTH, {
+            'structures': {str(structure('标准').id): {'basic_salary': '9000'}}
+        })
+        departments = by_department(result)
+        # 基本工资变化同时影响加班费、扣款的计算基数，应发至少增加 1000
+        assert departments['研发部']['delta']['gross'] >= 1000
+        assert departments['研发部']['delta']['tax'] > 0
+        assert departments['销售部']['delta'] == {'gross': 0, 'tax': 0, 'net': 0}
+        assert result['changed_employees'] == 1
+
+def test_reassignment_and_tax_scenarios(app):
+    with app.app_context():
+        second = Employee.query.filter_by(employee_id='E2').one()
+        result = PayrollSimulationService.simulate(YEAR, MONTH, {
+            'assignments': [{'employee_id': second.id, 'salary_structure_id': structure('标准').id}]
+        })
+        assert by_department(result)['销售部']['delta']['gross'] < 0
+
+        result = PayrollSimulationService.simulate(YEAR, MONTH, {'tax': {'monthly_exemption': 100000}})
+        assert result['total']['scenario']['tax'] == 0
+        assert result['total']['delta']['gross'] == 0
+        assert result['total']['delta']['net'] == -result['total']['delta']['tax']
+
+def test_invalid_scenarios_are_rejected(app):
+    with app.app_context():
+        invalid = [
+            {'structures': {str(structure('标准').id): {'bonus': 100}}},
+            {'structures': {'999': {'housing_allowance': 100}}},
+            {'structures': {str(structure('标准').id): {'basic_salary': '-1'}}},
+            {'assignments': [{'is_default': True, 'salary_structure_id': 999}]},
+            {'tax': {'brackets': [[36000, 0.03, 0], [10000, 0.1, 2520], [None, 0.45, 181920]]}}
+        ]
+        for scenario in invalid:
+            with pytest.raises(ValueError):
+                PayrollSimulationService.simulate(YEAR, MONTH, scenario)
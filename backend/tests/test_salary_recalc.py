@@ -0,0 +1,153 @@
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.attendance import Attendance, Overtime
+from app.models.holiday import HolidayRequest, HolidayType
+from app.models.payroll_recalc import PayrollRecalcMark
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.services.payroll_input_service import PayrollInputService
+from app.services.payroll_recalc_service import PayrollRecalcService
+from app.services.salary_service import SalaryService
+
+YEAR, MONTH = 2026, 3
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        position = Position(name='工程师', department_id=department.id)
+        structure = SalaryStructure(name='标准', basic_salary=Decimal('8700'), housing_allowance=Decimal('500'),
+                                    transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        db.session.add_all([position, structure])
+        db.session.flush()
+        employee = Employee(employee_id='E1', name='张三', department_id=department.id, position_id=position.id,
+                            hire_date=date(2020, 1, 1))
+        db.session.add(employee)
+        db.session.flush()
+        db.session.add(SalaryStructureAssignment(salary_structure_id=structure.id, employee_id=employee.id,
+                                                 effective_date=date(2020, 1, 1)))
+        db.session.commit()
+        SalaryService.batch_generate_salary_records(YEAR, MONTH, [employee.id])
+        yield app
+        db.session.remove()
+
+def derived(record):
+    """按考勤汇总计算的加班费和扣除项"""
+    payroll_input = PayrollInputService.aggregate(YEAR, MONTH, [record.employee])[record.employee_id]
+    return payroll_input.overtime_pay(record.basic_salary), payroll_input.deductions(record.basic_salary)
+
+def recalculate(record):
+    SalaryService.recalculate_salary_records(YEAR, MONTH, [record.employee_id])
+    db.session.commit()
+    return db.session.get(SalaryRecord, record.id)
+
+def test_manual_adjustments_survive_recalculation(app):
+    with app.app_context():
+        record = SalaryRecord.query.one()
+        overtime, deductions = derived(record)
+
+        record = SalaryService.update_salary_record(record.id, {
+            'overtime_pay': str(overtime + Decimal('300')),
+            'deductions': str(deductions + Decimal('50'))
+        })
+        assert record.overtime_adjustment == Decimal('300')
+        assert record.deduction_adjustment == Decimal('50')
+
+        record = recalculate(record)
+        assert record.overtime_pay == overtime + Decimal('300')
+        assert record.deductions == deductions + Decimal('50')
+        components = {component.code: component.to_dict() for component in record.components}
+        assert (components['overtime_adjustment']['amount'], components['overtime_adjustment']['kind']) == (300, 'earning')
+        assert (components['deduction_adjustment']['amount'], components['deduction_adjustment']['kind']) == (50, 'deduction')
+        assert components['deduction_adjustment']['name'] == '扣款调整'
+
+def test_recalculation_adds_new_attendance_on_top_of_adjustment(app):
+    with app.app_context():
+        record = SalaryRecord.query.one()
+        overtime, _ = derived(record)
+        SalaryService.update_salary_record(record.id, {'overtime_pay': str(overtime + Decimal('200'))})
+
+        # 调整之后补录一次已批准的加班
+        db.session.add(Overtime(employee_id=record.employee_id, status='approved',
+                                start_time=datetime(YEAR, MONTH, 10, 18), end_time=datetime(YEAR, MONTH, 10, 21)))
+        db.session.commit()
+        new_overtime, _ = derived(record)
+        assert new_overtime > overtime
+
+        record = recalculate(record)
+        assert record.overtime_pay == new_overtime + Decimal('200')
+
+def test_recalculation_without_adjustment_follows_attendance(app):
+    with app.app_context():
+        record = SalaryRecord.query.one()
+        db.session.add(Overtime(employee_id=record.employee_id, status='approved',
+                                start_time=datetime(YEAR, MONTH, 11, 18), end_time=datetime(YEAR, MONTH, 11, 20)))
+        db.session.commit()
+        record = recalculate(record)
+        overtime, deductions = derived(record)
+        assert record.overtime_pay == overtime
+        assert record.deductions == deductions
+        assert record.overtime_adjustment == 0
+
+def test_unpaid_holiday_and_absence_mark_records_for_recalculation(app):
+    with app.app_context():
+        record = SalaryRecord.query.one()
+        holiday_type = HolidayType(name='事假', code='personal')
+        db.session.add(holiday_type)
+        db.session.flush()
+        holiday_request = HolidayRequest(employee_id=record.employee_id, holiday_type_id=holiday_type.id,
+                                         start_date=date(YEAR, MONTH, 16), end_date=date(YEAR, MONTH, 17),
+                                         duration=2, reason='事假')
+        db.session.add(holiday_request)
+        db.session.commit()
+        assert PayrollRecalcMark.query.count() == 0
+
+        holiday_request.status = 'approved'
+        db.session.commit()
+        assert [mark.reason for mark in PayrollRecalcMark.query] == ['holiday_requests']
+        PayrollRecalcService.process_pending(debounce=0)
+
+        db.session.add(Attendance(employee_id=record.employee_id, date=date(YEAR, MONTH, 18), status='absent'))
+        db.session.commit()
+        assert [mark.reason for mark in PayrollRecalcMark.query] == ['attendances']
+        PayrollRecalcService.process_pending(debounce=0)
+
+        record = db.session.get(SalaryRecord, record.id)
+        _, deductions = derived(record)
+        assert deductions > 0
+        assert record.deductions == deductions
+
+def test_regeneration_keeps_attendance_inputs_and_adjustments(app):
+    with app.app_context():
+        record = SalaryRecord.query.one()
+        _, deductions = derived(record)
+        SalaryService.update_salary_record(record.id, {'bonus': '1000', 'deductions': str(deductions + Decimal('80'))})
+
+        # 调整之后补录加班和缺勤
+        db.session.add(Overtime(employee_id=record.employee_id, status='approved',
+                                start_time=datetime(YEAR, MONTH, 12, 18), end_time=datetime(YEAR, MONTH, 12, 21)))
+        db.session.add(Attendance(employee_id=record.employee_id, date=date(YEAR, MONTH, 13), status='absent'))
+        db.session.commit()
+        overtime, deductions = derived(record)
+        assert overtime > 0 and deductions > 0
+
+        result = SalaryService.batch_regenerate_salary_records(record.employee_id, YEAR, MONTH)
+        assert result['failed'] == []
+        record = db.session.get(SalaryRecord, record.id)
+        assert record.overtime_pay == overtime
+        assert record.deductions == deductions + Decimal('80')
+        assert record.bonus == Decimal('1000')
+        codes = {component.code for component in record.components}
+        assert {'overtime_weekday', 'absence_deduction', 'deduction_adjustment'} <= codes
@@ -0,0 +1,129 @@
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.models.tax import TaxYtdState
+from app.services.salary_service import SalaryService
+from app.services.tax_service import TaxService
+
+YEAR = 2026
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        position = Position(name='工程师', department_id=department.id)
+        structure = SalaryStructure(name='标准', basic_salary=Decimal('20000'), housing_allowance=Decimal('1000'),
+                                    transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        db.session.add_all([position, structure])
+        db.session.flush()
+        employee = Employee(employee_id='E1', name='张三', department_id=department.id, position_id=position.id,
+                            hire_date=date(2020, 1, 1))
+        db.session.add(employee)
+        db.session.flush()
+        db.session.add(SalaryStructureAssignment(salary_structure_id=structure.id, employee_id=employee.id,
+                                                 effective_date=date(2020, 1, 1)))
+        db.session.commit()
+        for month in (1, 2, 3):
+            SalaryService.batch_generate_salary_records(YEAR, month, [employee.id])
+        yield app
+        db.session.remove()
+
+def records():
+    db.session.expire_all()
+    return {record.month: record for record in SalaryRecord.query.order_by(SalaryRecord.month)}
+
+def state_values():
+    state = TaxYtdState.query.filter_by(year=YEAR).one()
+    return state.months, state.last_month, Decimal(state.income), Decimal(state.tax_withheld)
+
+def test_batch_pay_from_pending_is_allowed(app):
+    with app.app_context():
+        by_month = records()
+        result = SalaryService.batch_update_salary_records([by_month[1].id, by_month[2].id], {'payment_status': 'paid'})
+        assert result['failed'] == []
+        assert result['affected'] == 2
+
+        by_month = records()
+        assert by_month[1].payment_status == by_month[2].payment_status == 'paid'
+        assert by_month[1].payment_date is not None
+
+        # 批量语句之后的累计状态和待发放记录个税与按年重算一致
+        refreshed = state_values()
+        pending_tax = by_month[3].tax
+        assert refreshed[:2] == (2, 2)
+        TaxService.recompute_year(YEAR)
+        db.session.expire_all()
+        assert state_values() == refreshed
+        assert db.session.get(SalaryRecord, by_month[3].id).tax == pending_tax
+
+def test_approve_then_pay(app):
+    with app.app_context():
+        record_id = records()[1].id
+        assert SalaryService.transition_salary_records('approve', [record_id])['affected'] == 1
+        assert SalaryService.transition_salary_records('pay', [record_id])['affected'] == 1
+        assert records()[1].payment_status == 'paid'
+
+def test_rejected_transitions_are_reported_as_conflicts(app):
+    with app.app_context():
+        by_month = records()
+        SalaryService.transition_salary_records('pay', [by_month[1].id])
+
+        # 已发放的记录不能撤回；待发放的记录已处于目标状态，不算冲突
+        result = SalaryService.transition_salary_records('revoke', [by_month[1].id, by_month[2].id])
+        assert result['affected'] == 0
+        assert result['unchanged'] == 1
+        assert [(conflict['id'], conflict['status']) for conflict in result['conflicts']] == [(by_month[1].id, 'paid')]
+
+        # 已发放的记录不能重新审核
+        result = SalaryService.transition_salary_records('approve', [by_month[1].id, by_month[2].id])
+        assert result['affected'] == 1
+        assert [conflict['id'] for conflict in result['conflicts']] == [by_month[1].id]
+
+        with pytest.raises(ValueError):
+            SalaryService.batch_update_salary_records([by_month[2].id], {'payment_status': 'unknown'})
+
+def test_single_record_update_follows_transitions(app):
+    with app.app_context():
+        record_id = records()[1].id
+        record = SalaryService.update_salary_record(record_id, {'payment_status': 'approved'})
+        assert record.payment_status == 'approved'
+        record = SalaryService.update_salary_record(record_id, {'payment_status': 'pending'})
+        assert record.payment_status == 'pending'
+
+        with pytest.raises(ValueError):
+            SalaryService.update_salary_record(record_id, {'payment_status': 'unknown'})
+        assert records()[1].payment_status == 'pending'
+
+        record = SalaryService.update_salary_record(record_id, {'payment_status': 'paid'})
+        assert record.payment_status == 'paid'
+        assert record.payment_date is not None
+        assert state_values()[:2] == (1, 1)
+
+        # 已发放的记录即使不检查支付状态也不能改回待发放
+        with pytest.raises(ValueError):
+            SalaryService.update_salary_record(record_id, {'payment_status': 'pending'}, check_payment_status=False)
+
+def test_statistics_count_approved_records(app):
+    with app.app_context():
+        by_month = records()
+        SalaryService.transition_salary_records('approve', [by_month[1].id])
+        statistics = SalaryService.get_salary_statistics(YEAR, 1)
+        assert (statistics['total_count'], statistics['approved_count'], statistics['paid_count']) == (1, 1, 0)
+
+        response = app.test_client().get(f'/api/salary/records?year={YEAR}&month=1')
+        statistics = response.get_json()['data']['statistics']
+        assert statistics['total']['approved_count'] == statistics['approved']['total_count'] == 1
+        assert statistics['pending']['total_count'] == statistics['paid']['total_count'] == 0
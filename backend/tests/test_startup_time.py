@@ -0,0 +1,52 @@
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动导入耗时预算（毫秒），可通过环境变量调整
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 1000))
+
+# 这些依赖只应在首次使用时加载
+HEAVY_MODULES = ('pandas', 'openpyxl', 'reportlab', 'numpy')
+
+def run_importtime():
+    """以 -X importtime 启动应用，返回 {顶层模块: 累计耗时(微秒)} 和所有已导入模块"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         "from app import create_app; create_app('testing')"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    top_level = {}
+    imported = set()
+    pattern = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        imported.add(module)
+        if len(indent) == 1:
+            top_level[module] = cumulative
+    return top_level, imported
+
+def test_startup_does_not_import_heavy_dependencies():
+    """测试应用启动时不加载 pandas/openpyxl/reportlab"""
+    _, imported = run_importtime()
+    loaded = sorted(m for m in imported if m.split('.')[0] in HEAVY_MODULES)
+    assert not loaded, f'启动时加载了重量级依赖: {loaded[:10]}'
+
+def test_startup_import_time_budget():
+    """测试应用启动导入耗时不超过预算"""
+    top_level, _ = run_importtime()
+    total_ms = sum(top_level.values()) / 1000
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f'启动导入耗时: {total_ms:.1f}ms, 最慢模块: {slowest}')
+    assert total_ms <= STARTUP_BUDGET_MS, \
+        f'启动导入耗时 {total_ms:.1f}ms 超过预算 {STARTUP_BUDGET_MS}ms, 最慢模块: {slowest}'
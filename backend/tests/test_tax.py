@@ -0,0 +1,113 @@
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import create_app, db
+from app.models import Employee, Department, Position
+from app.models.salary import SalaryStructure, SalaryRecord
+from app.models.salary_structure_assignment import SalaryStructureAssignment
+from app.models.tax import TaxYtdState
+from app.services.salary_service import SalaryService
+from app.services.tax_service import TaxService, YtdTotals, ANNUAL_TAX_BRACKETS
+
+YEAR = 2026
+EXEMPTION = Decimal('5000')
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        department = Department(name='研发部')
+        db.session.add(department)
+        db.session.flush()
+        position = Position(name='工程师', department_id=department.id)
+        structure = SalaryStructure(name='标准', basic_salary=Decimal('20000'), housing_allowance=Decimal('1000'),
+                                    transport_allowance=Decimal('0'), meal_allowance=Decimal('0'))
+        db.session.add_all([position, structure])
+        db.session.flush()
+        employee = Employee(employee_id='E1', name='张三', department_id=department.id, position_id=position.id,
+                            hire_date=date(2020, 1, 1))
+        db.session.add(employee)
+        db.session.flush()
+        db.session.add(SalaryStructureAssignment(salary_structure_id=structure.id, employee_id=employee.id,
+                                                 effective_date=date(2020, 1, 1)))
+        db.session.commit()
+        for month in (1, 2, 3):
+            SalaryService.batch_generate_salary_records(YEAR, month, [employee.id])
+        yield app
+        db.session.remove()
+
+def records():
+    db.session.expire_all()
+    return {record.month: record for record in SalaryRecord.query.order_by(SalaryRecord.month)}
+
+def expected_tax(record, prior):
+    return TaxService.month_tax(prior, TaxService.record_income(record), TaxService.record_deductions(record))
+
+def test_brackets_are_continuous_at_boundaries():
+    assert TaxService.cumulative_tax(Decimal('0')) == 0
+    assert TaxService.cumulative_tax(Decimal('-100')) == 0
+    assert TaxService.cumulative_tax(Decimal('36000')) == Decimal('1080.00')
+    for (upper, rate, quick_deduction), (_, next_rate, next_quick_deduction) in zip(ANNUAL_TAX_BRACKETS,
+                                                                                   ANNUAL_TAX_BRACKETS[1:]):
+        # 上限处按本档和下一档计算的税额相同，超过上限一分钱按下一档计算
+        assert upper * rate - quick_deduction == upper * next_rate - next_quick_deduction
+        assert TaxService.cumulative_tax(upper) == (upper * rate - quick_deduction).quantize(Decimal('0.01'))
+        above = upper + Decimal('0.01')
+        assert TaxService.cumulative_tax(above) == (above * next_rate - next_quick_deduction).quantize(Decimal('0.01'))
+
+def test_month_tax_subtracts_months_already_paid():
+    income = Decimal('20000')
+    # 每月应纳税所得额 15000：前两个月累计 30000 适用 3%，第三个月累计 45000 进入 10% 档
+    first = TaxService.month_tax(YtdTotals(), income, Decimal('0'), monthly_exemption=EXEMPTION)
+    second = TaxService.month_tax(YtdTotals(1, 1, income, Decimal('0'), first), income, Decimal('0'),
+                                  monthly_exemption=EXEMPTION)
+    third = TaxService.month_tax(YtdTotals(2, 2, income * 2, Decimal('0'), first + second), income, Decimal('0'),
+                                 monthly_exemption=EXEMPTION)
+    assert (first, second, third) == (Decimal('450.00'), Decimal('450.00'), Decimal('1080.00'))
+
+def test_pending_tax_uses_paid_months(app):
+    with app.app_context():
+        by_month = records()
+        employee_id = by_month[1].employee_id
+        SalaryService.transition_salary_records('pay', [by_month[1].id, by_month[2].id])
+
+        by_month = records()
+        state = TaxYtdState.query.filter_by(employee_id=employee_id, year=YEAR).one()
+        assert (state.months, state.last_month) == (2, 2)
+        assert Decimal(state.tax_withheld) == Decimal(by_month[1].tax) + Decimal(by_month[2].tax)
+
+        prior = TaxService.prior_totals([employee_id], YEAR, 3)[employee_id]
+        assert prior.months == 2
+        assert by_month[3].tax == expected_tax(by_month[3], prior)
+        # 状态已包含二月，计算二月之前的累计值时按记录汇总
+        assert TaxService.prior_totals([employee_id], YEAR, 2)[employee_id].months == 1
+
+def test_recompute_after_revoke_matches_incremental_state(app):
+    with app.app_context():
+        by_month = records()
+        employee_id = by_month[1].employee_id
+        SalaryService.transition_salary_records('pay', [by_month[1].id])
+        SalaryService.transition_salary_records('approve', [by_month[2].id])
+        SalaryService.transition_salary_records('revoke', [by_month[2].id])
+        paid_one = records()[3].tax
+
+        # 删除已发放记录（撤销发放）后，累计状态和待发放记录的个税随之回退
+        SalaryService.transition_salary_records('pay', [by_month[2].id])
+        assert records()[3].tax != paid_one
+        SalaryService.batch_delete_salary_records([by_month[2].id], check_payment_status=False)
+        state = TaxYtdState.query.filter_by(employee_id=employee_id, year=YEAR).one()
+        assert (state.months, state.last_month) == (1, 1)
+        by_month = records()
+        assert by_month[3].tax == paid_one
+        assert by_month[3].tax == expected_tax(by_month[3], TaxService.prior_totals([employee_id], YEAR, 3)[employee_id])
+
+        incremental = (state.months, Decimal(state.income), Decimal(state.tax_withheld), by_month[3].tax)
+        TaxService.recompute_year(YEAR)
+        state = TaxYtdState.query.filter_by(employee_id=employee_id, year=YEAR).one()
+        assert (state.months, Decimal(state.income), Decimal(state.tax_withheld), records()[3].tax) == incremental
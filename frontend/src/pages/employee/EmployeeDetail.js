@@ -305,7 +305,7 @@ const EmployeeDetail = () => {
       </Upload>
       {employee?.photo_url && (
         <img 
-          src={`http://localhost:5000${employee.photo_url}`}
+          src={`http://localhost:5000${employee.photo_thumbnails?.detail || employee.photo_url}`}
           alt="员工照片" 
           style={{ maxWidth: 200, marginTop: 16 }} 
         />
@@ -895,7 +895,7 @@ const EmployeeDetail = () => {
               >
                 {employee?.photo_url ? (
                   <img 
-                    src={`${process.env.REACT_APP_API_URL}${employee.photo_url}`}
+                    src={`${process.env.REACT_APP_API_URL}${employee.photo_thumbnails?.detail || employee.photo_url}`}
                     alt="员工照片"
                   />
                 ) : (
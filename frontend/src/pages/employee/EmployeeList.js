@@ -51,8 +51,8 @@ const getImageUrl = (avatar) => {
   if (avatar.startsWith('http://') || avatar.startsWith('https://')) {
     return avatar;
   }
-  // 使用static路径
-  if (avatar.startsWith('/static/')) {
+  // 使用static路径或媒体文件路径
+  if (avatar.startsWith('/static/') || avatar.startsWith('/api/media/')) {
     return `${process.env.REACT_APP_API_BASE_URL}${avatar}`;
   }
   // 如果没有/static/前缀，添加它
@@ -621,7 +621,7 @@ const EmployeeList = () => {
               render: (_, record) => (
                 <Space>
                   <Avatar
-                    src={getImageUrl(record.photo_url)}
+                    src={getImageUrl(record.photo_thumbnails?.avatar || record.photo_url)}
                     icon={<UserOutlined />}
                   />
                   <div>
@@ -767,7 +767,7 @@ const EmployeeList = () => {
                       <div className="photo-container">
                         <Avatar
                           size={120}
-                          src={detailEmployee.photo_url ? getImageUrl(detailEmployee.photo_url) : null}
+                          src={detailEmployee.photo_url ? getImageUrl(detailEmployee.photo_thumbnails?.detail || detailEmployee.photo_url) : null}
                           icon={<UserOutlined />}
                         />
                       </div>
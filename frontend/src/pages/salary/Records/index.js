@@ -272,6 +272,7 @@ const SalaryRecords = () => {
       key: 'payment_status',
       render: (status) => ({
         'pending': '待发放',
+        'approved': '已审核',
         'paid': '已发放',
         'cancelled': '已取消'
       }[status] || status),
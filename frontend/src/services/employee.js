@@ -334,6 +334,50 @@ export const uploadContract = async (formData, employeeId) => {
   }
 };
 
+/**
+ * 分片上传员工合同（支持断点续传，适用于大文件）
+ * @param {File} file - 合同文件
+ * @param {number} employeeId - 员工ID
+ * @param {Function} onProgress - 进度回调，参数为已上传百分比
+ * @param {string} uploadId - 之前未完成的上传会话ID，传入时从断点继续
+ * @returns {Promise} 返回上传结果（包含合同附件信息）
+ */
+export const uploadContractChunked = async (file, employeeId, onProgress, uploadId) => {
+  let session;
+  if (uploadId) {
+    session = (await request.get(`/api/uploads/${uploadId}`)).data;
+  } else {
+    session = (await request.post('/api/uploads', {
+      upload_type: 'contract',
+      employee_id: employeeId,
+      file_name: file.name,
+      total_size: file.size
+    })).data;
+  }
+
+  const chunkSize = session.chunk_size || 4 * 1024 * 1024;
+  let offset = session.received_size;
+  while (offset < file.size) {
+    const chunk = file.slice(offset, offset + chunkSize);
+    const response = await request.put(`/api/uploads/${session.upload_id}`, chunk, {
+      params: { offset },
+      timeout: 0
+    });
+    offset = response.data.received_size;
+    if (onProgress) {
+      onProgress(Math.round((offset / file.size) * 100));
+    }
+  }
+
+  // 计算SHA-256校验值，浏览器不支持时由服务端自行计算
+  let checksum;
+  if (window.crypto?.subtle) {
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    checksum = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+  }
+  return request.post(`/api/uploads/${session.upload_id}/finalize`, { checksum }, { timeout: 0 });
+};
+
 /**
  * 获取员工合同列表
  * @param {number} employeeId - 员工ID
@@ -111,6 +111,13 @@ export async function batchCreateSalaryRecords(data) {
   });
 }
 
+export async function transitionSalaryRecords(data) {
+  return request('/api/salary/records/transition', {
+    method: 'POST',
+    data,
+  });
+}
+
 export async function batchSendSalarySlips(data) {
   return request('/api/salary/records/batch-send-slips', {
     method: 'POST',